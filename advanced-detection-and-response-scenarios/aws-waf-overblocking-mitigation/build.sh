@@ -0,0 +1,36 @@
+#!/bin/bash
+set -e
+cd "$(dirname "$0")"
+
+# lambda_zip/<함수>.zip = 핸들러 + 실제로 import하는 저장소 공용 모듈 (shared/)만
+# 외부 패키지 없음 - boto3 / urllib3 는 Lambda Python 런타임에 포함된 것을 사용
+SHARED=../../shared
+
+shared_modules() {
+  case "$1" in
+    lambda-discord)                                       echo "aws_clients metrics notifier" ;;
+    lambda-ebs|lambda-ebs-status)                         echo "aws_clients metrics ebs_snapshot" ;;
+    lambda-isolated-sg)                                   echo "aws_clients metrics ec2_isolation rate_limit" ;;
+    lambda-ssm|lambda-ssm-status)                         echo "aws_clients metrics ssm_command" ;;
+    lambda-upload-findings-to-s3|lambda-compact-findings) echo "aws_clients metrics finding_archive" ;;
+    *)                                                    echo "aws_clients metrics" ;;
+  esac
+}
+
+for SRC in lambda_zip/lambda-*.py; do
+  NAME=$(basename "$SRC" .py)
+  BUILD="lambda_zip/build/${NAME}"
+
+  rm -rf "$BUILD"
+  mkdir -p "$BUILD"
+  cp "$SRC" "$BUILD/"
+  for MODULE in $(shared_modules "$NAME"); do
+    cp "${SHARED}/${MODULE}.py" "$BUILD/"
+  done
+
+  rm -f "lambda_zip/${NAME}.zip"
+  (cd "$BUILD" && zip -X -q -r "../../${NAME}.zip" . -x '*__pycache__*')
+  echo "[+] lambda_zip/${NAME}.zip: $(cd "$BUILD" && ls | tr '\n' ' ')"
+done
+
+rm -rf lambda_zip/build
@@ -0,0 +1,410 @@
+"""분석용 EC2에서 마운트된 증거 볼륨의 아티팩트를 수집해 S3로 바로 스트리밍하는 수집기
+
+SSM 문서(forensic-collector)가 볼륨을 읽기 전용으로 마운트한 뒤 이 스크립트를 실행한다.
+
+- 아티팩트 수집기들을 스레드 풀(--workers)에서 동시에 실행한다.
+- 실행 파일 해시는 프로세스 풀(--hash-workers)로 나눠 계산한다.
+- 각 아티팩트는 gzip으로 압축하면서 S3 multipart upload로 바로 올린다 (/tmp 등 로컬 디스크에 쓰지 않음).
+- 해시 기준선(hash_baseline.py, --baseline-id)이 있으면 기준선과 다른 실행 파일만 기록한다.
+- 마지막에 아티팩트별 크기 / sha256 / 소요 시간을 담은 manifest.json과 단계별 timing.json을 올린다.
+
+    python3 forensic_collector.py --root /mnt/forensic-vol-... --bucket <bucket> --prefix forensic-results/...
+"""
+import argparse
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from hash_baseline import Baseline
+
+CHUNK = 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024            # S3 multipart 최소 5 MiB
+GZIP_LEVEL = 1                         # 압축률보다 업로드 완료 시간 우선 (로그 기준 6 대비 크기 +20% 내외)
+PREWARM_PATHS = ["var/log", "etc", "root", "home", "tmp", "var/tmp", "bin", "usr/bin"]
+
+# (이름, 종류, 대상) - 기존 SSM 스크립트가 만들던 파일과 같은 구성
+ARTIFACTS = [
+    ("syslog_copy.txt", "file", "var/log/syslog"),
+    ("messages_copy.txt", "file", "var/log/messages"),
+    ("passwd_copy.txt", "file", "etc/passwd"),
+    ("shadow_copy.txt", "file", "etc/shadow"),
+    ("group_copy.txt", "file", "etc/group"),
+    ("root_bash_history.txt", "file", "root/.bash_history"),
+    ("user_bash_histories.txt", "find", (["home"], ".bash_history")),
+    ("ssh_keys.txt", "find", (["home", "root"], "authorized_keys")),
+    ("tmp_dir_listing.txt", "listing", "tmp"),
+    ("var_tmp_dir_listing.txt", "listing", "var/tmp"),
+    ("bin_hashes.txt", "hash", "bin"),
+    ("usr_bin_hashes.txt", "hash", "usr/bin"),
+    ("hosts.txt", "file", "etc/hosts"),
+    ("resolv_conf.txt", "file", "etc/resolv.conf"),
+    ("hostname.txt", "file", "etc/hostname"),
+]
+
+
+def resolve(root, rel):
+    """root 기준 경로 해석 - 절대 경로 심볼릭 링크도 분석 인스턴스가 아닌 증거 볼륨 안에서 따라감"""
+    root = os.path.abspath(root)
+    parts = [p for p in rel.strip('/').split('/') if p]
+    current = root
+    hops = 0
+    while parts:
+        part = parts.pop(0)
+        if part == '..':
+            current = os.path.dirname(current) if current != root else root
+            continue
+        candidate = os.path.join(current, part)
+        if os.path.islink(candidate):
+            hops += 1
+            if hops > 40:
+                return None
+            target = os.readlink(candidate)
+            if target.startswith('/'):
+                current = root
+            parts = [p for p in target.split('/') if p and p != '.'] + parts
+            continue
+        current = candidate
+    return current
+
+
+class S3Stream:
+    """gzip 압축하면서 multipart upload로 올리는 쓰기 스트림 (작으면 put_object 한 번)"""
+
+    def __init__(self, s3, bucket, key, part_size=PART_SIZE, compress=True):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key + ('.gz' if compress else '')
+        self.part_size = part_size
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.sha256 = hashlib.sha256()
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.first_byte_at = None
+
+    def write(self, data):
+        if not data:
+            return
+        if self.first_byte_at is None:
+            self.first_byte_at = time.time()
+        self.sha256.update(data)
+        self.raw_bytes += len(data)
+        self.buffer += self.compressor.compress(data) if self.compressor else data
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    def _upload_part(self, body):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType='text/plain',
+                ContentEncoding='gzip' if self.compressor else 'identity'
+            )['UploadId']
+        number = len(self.parts) + 1
+        response = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                       PartNumber=number, Body=body)
+        self.parts.append({'PartNumber': number, 'ETag': response['ETag']})
+        self.stored_bytes += len(body)
+
+    def close(self):
+        if self.compressor:
+            self.buffer += self.compressor.flush()
+        body = bytes(self.buffer)
+        self.buffer = bytearray()
+        if self.upload_id is None:
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=body, ContentType='text/plain',
+                               ContentEncoding='gzip' if self.compressor else 'identity')
+            self.stored_bytes += len(body)
+            return
+        if body:
+            self._upload_part(body)
+        self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                          MultipartUpload={'Parts': self.parts})
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+def copy_file(path, out):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK)
+            if not chunk:
+                break
+            out.write(chunk)
+
+
+def walk_files(root, rel):
+    # 하위 디렉터리까지 파일 경로를 찾음 (다른 파일시스템 / 심볼릭 링크 디렉터리는 따라가지 않음)
+    top = resolve(root, rel)
+    if top is None or not os.path.isdir(top):
+        return
+    device = os.stat(top).st_dev
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames[:] = [d for d in dirnames if os.lstat(os.path.join(dirpath, d)).st_dev == device]
+        for name in filenames:
+            yield os.path.join(dirpath, name)
+
+
+def collect_find(root, spec, out):
+    tops, name = spec
+    for top in tops:
+        for path in walk_files(root, top):
+            if os.path.basename(path) == name and not os.path.islink(path):
+                copy_file(path, out)
+
+
+def collect_listing(root, rel, out):
+    # ls -alR 대신 경로 / 종류 / 권한 / 소유자 / 크기 / mtime을 한 줄씩
+    top = resolve(root, rel)
+    if top is None or not os.path.isdir(top):
+        raise FileNotFoundError(rel)
+    for dirpath, dirnames, filenames in os.walk(top):
+        for name in sorted(dirnames + filenames):
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            line = (f"{stat.filemode(st.st_mode)} {st.st_uid}:{st.st_gid} {st.st_size:>12} "
+                    f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(st.st_mtime))} /{os.path.relpath(path, root)}")
+            if stat.S_ISLNK(st.st_mode):
+                line += f" -> {os.readlink(path)}"
+            out.write((line + "\n").encode())
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError as e:
+        return f"error:{e.strerror}"
+
+
+def hash_targets(root, rel):
+    """sha256sum <dir>/* 와 같은 대상 (바로 아래 파일만, 심볼릭 링크는 증거 볼륨 안에서 해석)"""
+    top = resolve(root, rel)
+    if top is None or not os.path.isdir(top):
+        raise FileNotFoundError(rel)
+    targets = []
+    for entry in sorted(os.scandir(top), key=lambda e: e.name):
+        path = resolve(root, os.path.relpath(entry.path, root))
+        if path and os.path.isfile(path):
+            targets.append((f"/{rel}/{entry.name}", path))
+    return targets
+
+
+class Collector:
+    def __init__(self, root, s3, bucket, prefix, workers=8, hash_workers=None, part_size=PART_SIZE,
+                 baseline=None, trust_metadata=False):
+        self.root = os.path.abspath(root)
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix.rstrip('/')
+        self.workers = workers
+        self.hash_workers = hash_workers or os.cpu_count() or 1
+        self.part_size = part_size
+        self.hash_pool = None
+        self.baseline = baseline
+        self.trust_metadata = trust_metadata
+        self._hashed = {}
+        self._hash_lock = threading.Lock()
+
+    def prewarm(self, mode, device=None, parallelism=32):
+        # 스냅샷 볼륨은 처음 읽는 블록을 S3에서 가져오므로 읽기를 동시에 많이 걸어 지연을 겹침
+        started = time.time()
+        if mode == 'targeted':
+            paths = [p for rel in PREWARM_PATHS for p in walk_files(self.root, rel)]
+
+            def read(path):
+                try:
+                    with open(path, 'rb') as f:
+                        while f.read(CHUNK):
+                            pass
+                except OSError:
+                    pass
+
+            with ThreadPoolExecutor(max_workers=parallelism) as pool:
+                list(pool.map(read, paths))
+        elif mode == 'full' and device:
+            size = os.path.getsize(device) if not stat.S_ISBLK(os.stat(device).st_mode) else _block_size(device)
+            step = -(-size // parallelism)
+
+            def read_range(offset):
+                with open(device, 'rb', buffering=0) as f:
+                    f.seek(offset)
+                    remaining = min(step, size - offset)
+                    while remaining > 0:
+                        chunk = f.read(min(CHUNK * 4, remaining))
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
+
+            with ThreadPoolExecutor(max_workers=parallelism) as pool:
+                list(pool.map(read_range, range(0, size, step)))
+        return time.time() - started
+
+    def _hash_lines(self, rel, out):
+        targets = hash_targets(self.root, rel)
+        if self.baseline is None:
+            digests = self._hash_paths([path for _, path in targets])
+            for shown, path in targets:
+                out.write(f"{digests[path]}  {shown}\n".encode())
+            return {'files': len(targets), 'hashed': len(targets)}
+
+        # 기준선과 메타데이터까지 같은 파일은 건너뛰고, 나머지만 해시해 다른 파일만 기록
+        todo, skipped = self.baseline.plan(targets, self.trust_metadata)
+        digests = self._hash_paths([path for _, path in todo])
+        found = self.baseline.deviations(f"/{rel}", [shown for shown, _ in targets],
+                                         {shown: digests[path] for shown, path in todo})
+        for status, digest, shown in found:
+            out.write(f"{status}  {digest}  {shown}\n".encode())
+        return {'files': len(targets), 'skipped': skipped, 'hashed': len(todo), 'deviations': len(found)}
+
+    def _hash_paths(self, paths):
+        # /bin → /usr/bin 처럼 같은 파일을 가리키면 한 번만 계산
+        with self._hash_lock:
+            todo = [path for path in dict.fromkeys(paths) if path not in self._hashed]
+            for path in todo:
+                self._hashed[path] = None
+        digests = {path: 'error:hash failed' for path in todo}
+        try:
+            if todo:
+                digests = dict(zip(todo, self.hash_pool.map(hash_file, todo, chunksize=32)))
+        finally:
+            with self._hash_lock:
+                self._hashed.update(digests)      # 실패해도 기다리는 다른 아티팩트가 멈추지 않도록
+        return {path: digests.get(path) or self._wait_hash(path) for path in paths}
+
+    def _wait_hash(self, path):
+        while True:
+            with self._hash_lock:
+                digest = self._hashed.get(path)
+            if digest is not None:
+                return digest
+            time.sleep(0.01)
+
+    def collect_one(self, artifact):
+        name, kind, target = artifact
+        started = time.time()
+        out = S3Stream(self.s3, self.bucket, f"{self.prefix}/{name}", self.part_size)
+        entry = {'name': name, 'key': out.key, 'source': target if isinstance(target, str) else list(target[0])}
+        try:
+            if kind == 'file':
+                path = resolve(self.root, target)
+                if path is None or not os.path.isfile(path):
+                    raise FileNotFoundError(target)
+                copy_file(path, out)
+            elif kind == 'find':
+                collect_find(self.root, target, out)
+            elif kind == 'listing':
+                collect_listing(self.root, target, out)
+            elif kind == 'hash':
+                entry['hash'] = self._hash_lines(target, out)
+            out.close()
+            entry['status'] = 'ok'
+        except FileNotFoundError:
+            out.close()                 # 기존 스크립트처럼 빈 결과를 남김
+            entry['status'] = 'missing'
+        except Exception as e:
+            out.abort()
+            entry['status'] = f"error: {e}"
+        entry.update({
+            'bytes': out.raw_bytes,
+            'stored_bytes': out.stored_bytes,
+            'sha256': out.sha256.hexdigest(),
+            'parts': len(out.parts) or 1,
+            'seconds': round(time.time() - started, 3),
+            'first_byte_at': out.first_byte_at
+        })
+        return entry
+
+    def run(self, artifacts=ARTIFACTS, timing=None):
+        timing = dict(timing or {})
+        started = time.time()
+        with ProcessPoolExecutor(max_workers=self.hash_workers) as self.hash_pool, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            entries = list(pool.map(self.collect_one, artifacts))
+        finished = time.time()
+
+        t0 = timing.get('t0', started)
+        first = min((e['first_byte_at'] for e in entries if e['first_byte_at']), default=finished)
+        timing.update({
+            'collection_seconds': round(finished - started, 3),
+            'time_to_first_byte_seconds': round(first - t0, 3),
+            'total_seconds': round(finished - t0, 3),
+            'finished_at': finished
+        })
+        manifest = {
+            'root': self.root,
+            'bucket': self.bucket,
+            'prefix': self.prefix,
+            'baseline': self.baseline.meta if self.baseline else None,
+            'started_at': started,
+            'finished_at': finished,
+            'timing': timing,
+            'artifacts': entries
+        }
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}/manifest.json",
+                           Body=json.dumps(manifest, indent=1).encode(), ContentType='application/json')
+        self.s3.put_object(Bucket=self.bucket, Key=f"{self.prefix}/timing.json",
+                           Body=json.dumps(timing).encode(), ContentType='application/json')
+        return manifest
+
+
+def _block_size(device):
+    with open(device, 'rb') as f:
+        return f.seek(0, os.SEEK_END)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--root", required=True)
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--prefix", required=True)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--hash-workers", type=int, default=0)
+    parser.add_argument("--prewarm", choices=["targeted", "full", "off"], default="off")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--t0", type=float, default=None, help="SSM 명령 시작 시각 (epoch)")
+    parser.add_argument("--t-mount", type=float, default=None)
+    parser.add_argument("--provisioned-at", type=float, default=0)
+    parser.add_argument("--baseline-id", default="", help="AMI ID - s3://<bucket>/forensic-baselines/<id>.sqlite")
+    parser.add_argument("--trust-metadata", choices=["true", "false"], default="false",
+                        help="기준선과 inode / size / mtime / ctime이 같은 파일은 해시 생략 (root가 위조할 수 있어 기본값 false)")
+    args = parser.parse_args()
+
+    import boto3
+    from botocore.config import Config
+    s3 = boto3.client('s3', config=Config(max_pool_connections=args.workers * 2))
+
+    baseline = None
+    if args.baseline_id:
+        baseline = Baseline.fetch(s3, args.bucket, args.baseline_id, f"/tmp/{args.baseline_id}.sqlite")
+    collector = Collector(args.root, s3, args.bucket, args.prefix, args.workers, args.hash_workers or None,
+                          baseline=baseline, trust_metadata=args.trust_metadata == 'true')
+    now = time.time()
+    timing = {'t0': args.t0 or now, 'prewarm_mode': args.prewarm, 'provisioned_at': args.provisioned_at}
+    if args.t_mount:
+        timing['mount_seconds'] = round(args.t_mount - timing['t0'], 3)
+    timing['prewarm_seconds'] = round(collector.prewarm(args.prewarm, args.device), 3)
+    manifest = collector.run(timing=timing)
+    # 마지막 줄 요약은 lambda-ssm-status가 get_command_invocation 출력에서 읽음
+    print(json.dumps({'timing': manifest['timing'],
+                      'artifacts': {e['name']: e['status'] for e in manifest['artifacts']},
+                      'hash_deviations': sum(e.get('hash', {}).get('deviations', 0) for e in manifest['artifacts'])}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""실행 파일 해시 기준선(known-good) 인덱스
+
+AMI(또는 같은 패키지 세트)별로 정상 상태 /bin, /usr/bin 파일의 해시를 SQLite 파일 하나에 보관하고,
+조사 때는 기준선과 다른 파일만 보고한다 (전체 해시 목록을 사람이 diff 하지 않도록).
+
+- 저장 형식: (path, sha256 32바이트, size, inode, mtime_ns, ctime_ns) - path가 기본 키인 WITHOUT ROWID 테이블
+- 비교: trust_metadata이면 inode / size / mtime / ctime이 기준선과 모두 같은 파일은 해시를 건너뜀
+  (스냅샷 볼륨은 파일시스템 메타데이터를 그대로 보존. ctime은 touch -r 로는 되돌릴 수 없지만 root 권한이면
+  시계 변경 / debugfs로 위조할 수 있으므로 기본값은 모두 해시해 비교하고, 건너뛰기는 선택 사항)
+- 결과: modified(해시 다름) / added(기준선에 없음) / missing(기준선에만 있음)
+
+기준선 만들기 (정상 인스턴스 또는 AMI 스냅샷 볼륨을 마운트한 위치에서):
+
+    python3 hash_baseline.py build --root / --id ami-0fc8aeaa301af7663 --bucket <logarchive 버킷>
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+BASELINE_PREFIX = "forensic-baselines"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    sha256 BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def baseline_key(baseline_id):
+    return f"{BASELINE_PREFIX}/{baseline_id}.sqlite"
+
+
+def stat_key(st):
+    return (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+class Baseline:
+    """기준선 파일을 한 번 읽어 메모리 dict로 조회 (수집 스레드 여러 개가 함께 사용)"""
+
+    def __init__(self, files, meta=None):
+        self.files = files            # path -> (sha256 hex, (inode, size, mtime_ns, ctime_ns))
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, path):
+        conn = sqlite3.connect(path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            files = {
+                row[0]: (row[1].hex(), (row[3], row[2], row[4], row[5]))
+                for row in conn.execute("SELECT path, sha256, size, inode, mtime_ns, ctime_ns FROM files")
+            }
+        finally:
+            conn.close()
+        return cls(files, meta)
+
+    @classmethod
+    def fetch(cls, s3, bucket, baseline_id, path):
+        """S3에 기준선이 있으면 내려받아 읽고, 없으면 None (기준선 없이 전체 해시 목록을 남김)"""
+        try:
+            s3.download_file(bucket, baseline_key(baseline_id), path)
+        except Exception as e:
+            print(f"No hash baseline for {baseline_id}: {e}")
+            return None
+        return cls.load(path)
+
+    def save(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in self.meta.items()])
+            conn.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                [(p, bytes.fromhex(digest), key[1], key[0], key[2], key[3])
+                 for p, (digest, key) in sorted(self.files.items())]
+            )
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def under(self, directory):
+        """directory 바로 아래에 기준선이 기록된 경로 (sha256sum <dir>/* 와 같은 범위)"""
+        directory = directory.rstrip('/') + '/'
+        return {p for p in self.files if p.startswith(directory) and '/' not in p[len(directory):]}
+
+    def plan(self, targets, trust_metadata=False):
+        """(표시 경로, 실제 경로) 목록 → (해시할 목록, 메타데이터 일치로 건너뛴 수)"""
+        todo, skipped = [], 0
+        for shown, path in targets:
+            known = self.files.get(shown)
+            if trust_metadata and known:
+                try:
+                    if known[1] == stat_key(os.stat(path)):
+                        skipped += 1
+                        continue
+                except OSError:
+                    pass
+            todo.append((shown, path))
+        return todo, skipped
+
+    def deviations(self, directory, present, digests):
+        """present: 현재 있는 표시 경로 전체, digests: 이번에 해시한 표시 경로 → sha256 hex"""
+        result = []
+        for shown in sorted(digests):
+            known = self.files.get(shown)
+            if known is None:
+                result.append(('added', digests[shown], shown))
+            elif known[0] != digests[shown]:
+                result.append(('modified', digests[shown], shown))
+        for shown in sorted(self.under(directory) - set(present)):
+            result.append(('missing', self.files[shown][0], shown))
+        return result
+
+
+def build(root, directories, hash_map, baseline_id, resolve_targets):
+    """root 아래 directories를 해시해 기준선 생성 (hash_map: 경로 목록 → 해시 목록, 병렬 map)"""
+    files = {}
+    for directory in directories:
+        try:
+            targets = resolve_targets(root, directory)
+        except FileNotFoundError:
+            continue
+        digests = hash_map([path for _, path in targets])
+        for (shown, path), digest in zip(targets, digests):
+            if digest.startswith('error:'):
+                continue
+            files[shown] = (digest, stat_key(os.stat(path)))
+    meta = {'id': baseline_id, 'schema': SCHEMA_VERSION, 'created_at': time.time(), 'files': len(files)}
+    return Baseline(files, meta)
+
+
+def main():
+    from concurrent.futures import ProcessPoolExecutor
+
+    import forensic_collector
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmd = sub.add_parser("build", help="정상 상태 파일시스템에서 기준선 생성")
+    cmd.add_argument("--root", default="/")
+    cmd.add_argument("--id", required=True, help="AMI ID 또는 패키지 세트 이름")
+    cmd.add_argument("--out", default=None)
+    cmd.add_argument("--bucket", default=None, help="지정하면 s3://<bucket>/forensic-baselines/<id>.sqlite로 업로드")
+    args = parser.parse_args()
+
+    directories = [target for _, kind, target in forensic_collector.ARTIFACTS if kind == 'hash']
+    out = args.out or f"/tmp/{args.id}.sqlite"
+    with ProcessPoolExecutor() as pool:
+        baseline = build(args.root, directories,
+                         lambda paths: list(pool.map(forensic_collector.hash_file, paths, chunksize=32)),
+                         args.id, forensic_collector.hash_targets)
+    baseline.save(out)
+    print(f"Baseline {args.id}: {len(baseline.files)} files, {os.path.getsize(out)} bytes -> {out}")
+    if args.bucket:
+        import boto3
+        boto3.client('s3').upload_file(out, args.bucket, baseline_key(args.id))
+        print(f"Uploaded to s3://{args.bucket}/{baseline_key(args.id)}")
+
+
+if __name__ == "__main__":
+    main()
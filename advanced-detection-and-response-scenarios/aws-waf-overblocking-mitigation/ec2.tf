@@ -103,6 +103,9 @@ systemctl enable amazon-ssm-agent
 
 # SSM Agent 즉시 시작
 systemctl start amazon-ssm-agent
+
+# 포렌식 수집기(forensic-collector SSM 문서) 실행에 필요한 boto3
+yum install -y python3-boto3
 EOF
 }
 
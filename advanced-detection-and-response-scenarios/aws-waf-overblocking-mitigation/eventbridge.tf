@@ -14,21 +14,33 @@ resource "aws_cloudwatch_event_rule" "gd_findings_rule" {
 }
 
 #--------------------------------------
-# EventBridge Rule Target: Lambda로 연결
+# EventBridge Rule Target: SQS 버퍼 큐로 연결 (finding마다 Lambda / S3 객체를 만들지 않도록)
 #--------------------------------------
 resource "aws_cloudwatch_event_target" "gd_findings_lambda" {
   rule      = aws_cloudwatch_event_rule.gd_findings_rule.name
   target_id = "gd-findings-to-s3"
-  arn       = aws_lambda_function.lambda_upload_findings_to_s3.arn
+  arn       = aws_sqs_queue.findings_buffer.arn
 }
 
 #--------------------------------------
-# Lambda Permission: EventBridge에서 트리거 허용
+# EventBridge Schedule: 전날 파티션의 작은 finding 객체 압축(compaction)
 #--------------------------------------
-resource "aws_lambda_permission" "eventbridge_to_lambda" {
-  statement_id  = "AllowExecutionFromEventBridge"
+resource "aws_cloudwatch_event_rule" "findings_compaction_schedule" {
+  name                = "eventbridge-findings-compaction-${random_id.suffix.hex}"
+  description         = "Merge small GuardDuty finding archive objects of the previous day"
+  schedule_expression = var.findings_compaction_schedule
+}
+
+resource "aws_cloudwatch_event_target" "findings_compaction_lambda" {
+  rule      = aws_cloudwatch_event_rule.findings_compaction_schedule.name
+  target_id = "findings-compaction"
+  arn       = aws_lambda_function.lambda_compact_findings.arn
+}
+
+resource "aws_lambda_permission" "compaction_schedule_to_lambda" {
+  statement_id  = "AllowExecutionFromEventBridgeSchedule"
   action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.lambda_upload_findings_to_s3.function_name
+  function_name = aws_lambda_function.lambda_compact_findings.function_name
   principal     = "events.amazonaws.com"
-  source_arn    = aws_cloudwatch_event_rule.gd_findings_rule.arn
+  source_arn    = aws_cloudwatch_event_rule.findings_compaction_schedule.arn
 }
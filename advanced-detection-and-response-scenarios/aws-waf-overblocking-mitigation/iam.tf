@@ -38,12 +38,32 @@ resource "aws_iam_policy" "ec2_ssm_s3_write" {
     Version = "2012-10-17"
     Statement = [{
       Effect   = "Allow"
-      Action   = ["s3:PutObject"]
+      # 수집기는 큰 아티팩트를 multipart upload로 올리므로 실패 시 정리(Abort) 권한도 필요
+      Action   = ["s3:PutObject", "s3:AbortMultipartUpload"]
       Resource = "${aws_s3_bucket.logarchive.arn}/*"
     }]
   })
 }
 
+# 수집기가 실행 파일 해시 기준선(forensic-baselines/<AMI ID>.sqlite)을 내려받음
+resource "aws_iam_policy" "ec2_ssm_baseline_read" {
+  name        = "EC2ReadHashBaseline-${random_id.suffix.hex}"
+  description = "Allow EC2 SSM role to read known-good hash baselines from S3 logarchive"
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Effect   = "Allow"
+      Action   = ["s3:GetObject"]
+      Resource = "${aws_s3_bucket.logarchive.arn}/forensic-baselines/*"
+    }]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "ec2_ssm_baseline_read_attach" {
+  role       = aws_iam_role.ec2_ssm_role.name
+  policy_arn = aws_iam_policy.ec2_ssm_baseline_read.arn
+}
+
 resource "aws_iam_role_policy_attachment" "ec2_ssm_s3_write_attach" {
   role       = aws_iam_role.ec2_ssm_role.name
   policy_arn = aws_iam_policy.ec2_ssm_s3_write.arn
@@ -129,11 +149,6 @@ resource "aws_iam_role" "lambda_ssm_role" {
   assume_role_policy = data.aws_iam_policy_document.lambda_assume.json
 }
 
-resource "aws_iam_role" "lambda_s3_role" {
-  name = "lambda-s3-role-${random_id.suffix.hex}"
-  assume_role_policy = data.aws_iam_policy_document.lambda_assume.json
-}
-
 resource "aws_iam_role" "lambda_discord_role" {
   name = "lambda-discord-role-${random_id.suffix.hex}"
   assume_role_policy = data.aws_iam_policy_document.lambda_assume.json
@@ -160,7 +175,8 @@ resource "aws_iam_policy" "lambda_isolated_sg_policy" {
         Action   = [
           "ec2:DescribeInstances", 
           "ec2:ModifyInstanceAttribute",
-          "ec2:ModifyNetworkInterfaceAttribute"
+          "ec2:ModifyNetworkInterfaceAttribute",
+          "ec2:CreateTags"
         ],
         Resource = "*"
       },
@@ -214,9 +230,11 @@ resource "aws_iam_policy" "step_function_lambda_invoke" {
       Resource = [
         aws_lambda_function.lambda_isolated_sg.arn,
         aws_lambda_function.lambda_ebs.arn,
+        aws_lambda_function.lambda_ebs_status.arn,
         aws_lambda_function.lambda_ebs_attach.arn,
+        aws_lambda_function.lambda_ebs_cleanup.arn,
         aws_lambda_function.lambda_ssm.arn,
-        aws_lambda_function.lambda_s3.arn,
+        aws_lambda_function.lambda_ssm_status.arn,
         aws_lambda_function.lambda_discord.arn,
         aws_lambda_function.lambda_upload_findings_to_s3.arn
       ]
@@ -295,7 +313,7 @@ resource "aws_iam_policy" "lambda_upload_findings_to_s3_policy" {
           "s3:PutObject",
           "s3:AbortMultipartUpload"
         ]
-        Resource = "${aws_s3_bucket.guardduty_events.arn}/guardduty/finding-logs/*"
+        Resource = "${aws_s3_bucket.guardduty_events.arn}/guardduty/findings/*"
       },
       # 선택: ListBucket(프리픽스 제한) 및 GetBucketLocation (멀티파트 등 일부 SDK 동작 시 필요)
       {
@@ -308,7 +326,7 @@ resource "aws_iam_policy" "lambda_upload_findings_to_s3_policy" {
         Resource = aws_s3_bucket.guardduty_events.arn
         Condition = {
           StringLike = {
-            "s3:prefix" = "guardduty/finding-logs/*"
+            "s3:prefix" = "guardduty/findings/*"
           }
         }
       }
@@ -328,6 +346,89 @@ resource "aws_iam_role_policy_attachment" "attach_basic_logs" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# SQS 버퍼 큐 수신 / 삭제 권한 (이벤트 소스 매핑)
+resource "aws_iam_policy" "lambda_upload_findings_sqs_policy" {
+  name        = "lambda-upload-findings-sqs-policy-${random_id.suffix.hex}"
+  description = "Allow Lambda to consume the GuardDuty findings buffer queue"
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect = "Allow"
+      Action = [
+        "sqs:ReceiveMessage",
+        "sqs:DeleteMessage",
+        "sqs:GetQueueAttributes"
+      ]
+      Resource = aws_sqs_queue.findings_buffer.arn
+    }]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "attach_sqs_policy" {
+  role       = aws_iam_role.lambda_upload_findings_to_s3_role.name
+  policy_arn = aws_iam_policy.lambda_upload_findings_sqs_policy.arn
+}
+
+#--------------------------------------
+# IAM Role for lambda-compact-findings
+#--------------------------------------
+resource "aws_iam_role" "lambda_compact_findings_role" {
+  name = "lambda-compact-findings-role-${random_id.suffix.hex}"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect = "Allow",
+      Principal = { Service = "lambda.amazonaws.com" },
+      Action   = "sts:AssumeRole"
+    }]
+  })
+}
+
+# 아카이브 프리픽스 안에서 읽기 / 쓰기 / 삭제 (작은 객체를 합친 뒤 원본 삭제)
+resource "aws_iam_policy" "lambda_compact_findings_policy" {
+  name        = "lambda-compact-findings-policy-${random_id.suffix.hex}"
+  description = "Allow Lambda to merge small GuardDuty finding archive objects"
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Sid    = "CompactObjects"
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = "${aws_s3_bucket.guardduty_events.arn}/guardduty/findings/*"
+      },
+      {
+        Sid      = "ListArchivePrefix"
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.guardduty_events.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = "guardduty/findings/*"
+          }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy_attachment" "attach_compact_policy" {
+  role       = aws_iam_role.lambda_compact_findings_role.name
+  policy_arn = aws_iam_policy.lambda_compact_findings_policy.arn
+}
+
+resource "aws_iam_role_policy_attachment" "attach_compact_basic_logs" {
+  role       = aws_iam_role.lambda_compact_findings_role.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
 # lambda-ebs가 EC2 메타데이터를 조회하기 위한 읽기 전용 정책
 resource "aws_iam_policy" "lambda_ebs_ec2_read" {
   name   = "lambda-ebs-ec2-read-${random_id.suffix.hex}"
@@ -371,6 +472,7 @@ resource "aws_iam_policy" "lambda_ebs_attach_ec2_ctrl" {
         Action = [
           "ec2:AttachVolume",
           "ec2:DetachVolume",
+          "ec2:DeleteVolume", # lambda-ebs-cleanup (수집 후 분석용 볼륨 삭제)
           "ec2:DescribeInstances",
           "ec2:DescribeVolumes",
           "ec2:DescribeVolumeStatus",
@@ -402,6 +504,7 @@ resource "aws_iam_policy" "lambda_ebs_ec2_write" {
         Effect   = "Allow",
         Action   = [
           "ec2:CreateSnapshot",
+          "ec2:CreateSnapshots", # 다중 볼륨 crash-consistent 스냅샷
           "ec2:CreateTags"
         ],
         Resource = "*"
@@ -425,7 +528,10 @@ resource "aws_iam_policy" "lambda_ebs_attach_read" {
         Action = [
           "ec2:DescribeSnapshots",
           "ec2:CreateVolume",
-           "ec2:CreateTags"
+           "ec2:CreateTags",
+          "ec2:EnableFastSnapshotRestores",  # forensic_fast_snapshot_restore = true 일 때
+          "ec2:DescribeFastSnapshotRestores",
+          "ec2:DisableFastSnapshotRestores"
         ],
         Resource = "*"
       }
@@ -480,44 +586,3 @@ resource "aws_iam_role_policy_attachment" "lambda_ssm_invoke_attach" {
   role       = aws_iam_role.lambda_ssm_role.name
   policy_arn = aws_iam_policy.lambda_ssm_invoke.arn
 }
-
-resource "aws_iam_policy" "lambda_s3_ssm_invoke" {
-  name   = "lambda-s3-ssm-invoke-${random_id.suffix.hex}"
-  policy = jsonencode({
-    Version = "2012-10-17",
-    Statement = [
-      {
-        Effect = "Allow",
-        Action = ["ssm:SendCommand"],
-        Resource = [
-          # 대상 EC2 인스턴스(자기 계정)
-          "arn:aws:ec2:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:instance/*",
-          # (중요) AWS 관리 문서는 계정 ID가 비어 있음
-          "arn:aws:ssm:${data.aws_region.current.name}::document/AWS-RunShellScript",
-          # 필요 시 계정 소유 커스텀 문서도 허용
-          "arn:aws:ssm:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:document/*"
-        ]
-      },
-      {
-        Effect = "Allow",
-        Action = [
-          "ssm:GetCommandInvocation",
-          "ssm:ListCommandInvocations",
-          "ssm:ListCommands"
-        ],
-        Resource = "*"
-      }
-    ]
-  })
-}
-
-resource "aws_iam_role_policy_attachment" "lambda_s3_ssm_invoke_attach" {
-  role       = aws_iam_role.lambda_s3_role.name
-  policy_arn = aws_iam_policy.lambda_s3_ssm_invoke.arn
-}
-
-# (권장) CloudWatch Logs 기본 권한
-resource "aws_iam_role_policy_attachment" "lambda_s3_logs_basic" {
-  role       = aws_iam_role.lambda_s3_role.name
-  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
-}
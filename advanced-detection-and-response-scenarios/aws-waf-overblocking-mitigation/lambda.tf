@@ -6,7 +6,7 @@ resource "aws_lambda_function" "lambda_isolated_sg" {
   filename      = "${path.module}/lambda_zip/lambda-isolated-sg.zip"
   handler       = "lambda-isolated-sg.lambda_handler"
   runtime       = "python3.10"
-  timeout       = 60
+  timeout       = 300   # 다수 인스턴스 격리 시 EC2 변경 API 한도(초당 5개)에 맞춰 진행
   environment {
     variables = {
       ISOLATION_SG_ID = aws_security_group.isolated_sg.id
@@ -27,11 +27,29 @@ resource "aws_lambda_function" "lambda_ebs" {
   filename      = "${path.module}/lambda_zip/lambda-ebs.zip"
   handler       = "lambda-ebs.lambda_handler"
   runtime       = "python3.10"
-  timeout       = 300
+  timeout       = 60 # 스냅샷 생성 요청만 하고 반환 (완료 대기 없음)
   role = aws_iam_role.lambda_ebs_role.arn
   tags = { Name = "lambda-ebs-${random_id.suffix.hex}" }
 }
 
+#--------------------------------------
+# lambda-ebs-status: 스냅샷 진행 상황 조회 (Step Functions Wait 루프에서 호출)
+#--------------------------------------
+resource "aws_lambda_function" "lambda_ebs_status" {
+  function_name = "lambda-ebs-status-${random_id.suffix.hex}"
+  filename      = "${path.module}/lambda_zip/lambda-ebs-status.zip"
+  handler       = "lambda-ebs-status.lambda_handler"
+  runtime       = "python3.10"
+  timeout       = 30
+  environment {
+    variables = {
+      SNAPSHOT_TIMEOUT_SECONDS = var.snapshot_timeout_seconds
+    }
+  }
+  role = aws_iam_role.lambda_ebs_role.arn
+  tags = { Name = "lambda-ebs-status-${random_id.suffix.hex}" }
+}
+
 #--------------------------------------
 # lambda-ebs-attach: 스냅샷 볼륨을 분석용 EC2에 Attach
 #--------------------------------------
@@ -43,13 +61,36 @@ resource "aws_lambda_function" "lambda_ebs_attach" {
   timeout       = 300
   environment {
     variables = {
-      TARGET_INSTANCE_ID = aws_instance.malware_analysis.id
+      TARGET_INSTANCE_ID    = aws_instance.malware_analysis.id
+      VOLUME_TYPE           = var.forensic_volume_type
+      VOLUME_IOPS           = var.forensic_volume_iops
+      VOLUME_THROUGHPUT     = var.forensic_volume_throughput
+      FAST_SNAPSHOT_RESTORE = var.forensic_fast_snapshot_restore
+      FSR_TIMEOUT_SECONDS   = var.forensic_fsr_timeout_seconds
     }
   }
   role = aws_iam_role.lambda_ebs_attach_role.arn
   tags = { Name = "lambda-ebs-attach-${random_id.suffix.hex}" }
 }
 
+#--------------------------------------
+# lambda-ebs-cleanup: 수집이 끝난 분석용 볼륨 Detach (장치 이름 반납, 삭제는 forensic_delete_volume일 때만)
+#--------------------------------------
+resource "aws_lambda_function" "lambda_ebs_cleanup" {
+  function_name = "lambda-ebs-cleanup-${random_id.suffix.hex}"
+  filename      = "${path.module}/lambda_zip/lambda-ebs-cleanup.zip"
+  handler       = "lambda-ebs-cleanup.lambda_handler"
+  runtime       = "python3.10"
+  timeout       = 300
+  environment {
+    variables = {
+      DELETE_VOLUME = var.forensic_delete_volume
+    }
+  }
+  role = aws_iam_role.lambda_ebs_attach_role.arn
+  tags = { Name = "lambda-ebs-cleanup-${random_id.suffix.hex}" }
+}
+
 #--------------------------------------
 # lambda-ssm: 분석용 EC2에서 SSM 명령 실행
 #--------------------------------------
@@ -61,7 +102,11 @@ resource "aws_lambda_function" "lambda_ssm" {
   timeout       = 120
   environment {
     variables = {
-      TARGET_INSTANCE_ID = aws_instance.malware_analysis.id
+      TARGET_INSTANCE_ID  = aws_instance.malware_analysis.id
+      COLLECTOR_DOCUMENT  = aws_ssm_document.forensic_collector.name
+      S3_BUCKET_NAME      = aws_s3_bucket.logarchive.bucket
+      PREWARM_MODE        = var.forensic_prewarm_mode
+      HASH_TRUST_METADATA = tostring(var.forensic_hash_trust_metadata)
     }
   }
   role = aws_iam_role.lambda_ssm_role.arn
@@ -69,22 +114,21 @@ resource "aws_lambda_function" "lambda_ssm" {
 }
 
 #--------------------------------------
-# lambda-s3: 분석 로그를 S3로 업로드
+# lambda-ssm-status: 수집 SSM 명령 완료 조회 (Step Functions Wait 루프에서 호출)
 #--------------------------------------
-resource "aws_lambda_function" "lambda_s3" {
-  function_name = "lambda-s3-${random_id.suffix.hex}"
-  filename      = "${path.module}/lambda_zip/lambda-s3.zip"
-  handler       = "lambda-s3.lambda_handler"
+resource "aws_lambda_function" "lambda_ssm_status" {
+  function_name = "lambda-ssm-status-${random_id.suffix.hex}"
+  filename      = "${path.module}/lambda_zip/lambda-ssm-status.zip"
+  handler       = "lambda-ssm-status.lambda_handler"
   runtime       = "python3.10"
-  timeout       = 120
+  timeout       = 30
   environment {
     variables = {
-      TARGET_INSTANCE_ID = aws_instance.malware_analysis.id
-      S3_BUCKET_NAME     = aws_s3_bucket.logarchive.bucket
+      MAX_POLLS = 240  # 조회 간격이 최대 30초라 약 2시간 뒤 실패 처리 (Step Functions 루프 상한)
     }
   }
-  role = aws_iam_role.lambda_s3_role.arn
-  tags = { Name = "lambda-s3-${random_id.suffix.hex}" }
+  role = aws_iam_role.lambda_ssm_role.arn
+  tags = { Name = "lambda-ssm-status-${random_id.suffix.hex}" }
 }
 
 #--------------------------------------
@@ -115,12 +159,46 @@ resource "aws_lambda_function" "lambda_upload_findings_to_s3" {
   handler       = "lambda-upload-findings-to-s3.lambda_handler"
   runtime       = "python3.10"
   timeout       = 60
+  memory_size   = 512 # 배치(최대 수천 건)를 파티션별로 모아 gzip 압축
   environment {
     variables = {
       S3_BUCKET = aws_s3_bucket.guardduty_events.bucket
-      S3_PREFIX = "guardduty/finding-logs/"
+      S3_PREFIX = "guardduty/findings/" # {account}/{region}/{finding_type}/{yyyy}/{mm}/{dd}/*.ndjson.gz
     }
   }
   role = aws_iam_role.lambda_upload_findings_to_s3_role.arn
   tags = { Name = "lambda-upload-findings-to-s3-${random_id.suffix.hex}" }
 }
+
+#--------------------------------------
+# SQS 버퍼 큐 → 업로드 Lambda (배치 윈도우 / 배치 크기 중 먼저 도달하는 쪽에서 한 번에 저장)
+#--------------------------------------
+resource "aws_lambda_event_source_mapping" "findings_buffer" {
+  event_source_arn                   = aws_sqs_queue.findings_buffer.arn
+  function_name                      = aws_lambda_function.lambda_upload_findings_to_s3.arn
+  batch_size                         = 10000
+  maximum_batching_window_in_seconds = var.findings_batch_window
+  function_response_types            = ["ReportBatchItemFailures"] # 쓰기에 실패한 파티션의 메시지만 재시도
+
+  depends_on = [aws_iam_role_policy_attachment.attach_sqs_policy]
+}
+
+#--------------------------------------
+# lambda-compact-findings: 전날 파티션의 작은 finding 객체를 합치는 Lambda
+#--------------------------------------
+resource "aws_lambda_function" "lambda_compact_findings" {
+  function_name = "lambda-compact-findings-${random_id.suffix.hex}"
+  filename      = "${path.module}/lambda_zip/lambda-compact-findings.zip"
+  handler       = "lambda-compact-findings.lambda_handler"
+  runtime       = "python3.10"
+  timeout       = 900
+  memory_size   = 1024
+  environment {
+    variables = {
+      S3_BUCKET = aws_s3_bucket.guardduty_events.bucket
+      S3_PREFIX = "guardduty/findings/"
+    }
+  }
+  role = aws_iam_role.lambda_compact_findings_role.arn
+  tags = { Name = "lambda-compact-findings-${random_id.suffix.hex}" }
+}
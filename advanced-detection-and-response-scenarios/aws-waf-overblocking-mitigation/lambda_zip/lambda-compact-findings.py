@@ -0,0 +1,39 @@
+import datetime
+import os
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import finding_archive  # finding 파티션 / gzip NDJSON 공용 모듈 (shared/finding_archive.py, 패키징 시 함께 포함)
+
+s3 = aws_clients.lazy('s3')
+BUCKET = os.environ.get('S3_BUCKET', 'your-guardduty-logs-bucket')
+PREFIX = os.environ.get('S3_PREFIX', 'guardduty/findings/')
+# 합친 객체의 목표 크기 (gzip 기준 바이트)
+TARGET_BYTES = int(os.environ.get('COMPACT_TARGET_BYTES', str(finding_archive.COMPACT_TARGET_BYTES)))
+# 오늘 기준 며칠 전 파티션을 합칠지 (기본: 어제 - 더 이상 새 finding이 쓰이지 않는 날짜)
+DAYS_AGO = int(os.environ.get('COMPACT_DAYS_AGO', '1'))
+
+@metrics.handler('lambda-compact-findings')
+def lambda_handler(event, context):
+    # {"day": "YYYY-MM-DD"}로 특정 날짜를 다시 합칠 수 있음 (기본: 스케줄 실행 시 DAYS_AGO일 전)
+    if event.get('day'):
+        day = datetime.datetime.strptime(event['day'], '%Y-%m-%d').date()
+    else:
+        day = datetime.datetime.utcnow().date() - datetime.timedelta(days=DAYS_AGO)
+
+    partitions = finding_archive.partitions_for_day(s3, BUCKET, PREFIX, day)
+    results = []
+    for partition_key, objects in sorted(partitions.items()):
+        result = finding_archive.compact(s3, BUCKET, objects, partition_key, target_bytes=TARGET_BYTES)
+        if result['merged']:
+            print(f"[INFO] {partition_key}: {result['merged']} objects -> {result['written']} "
+                  f"({result['findings']} findings)")
+        results.append(result)
+
+    return {
+        'day': day.isoformat(),
+        'partitions': len(results),
+        'merged': sum(r['merged'] for r in results),
+        'written': sum(r['written'] for r in results),
+        'findings': sum(r['findings'] for r in results)
+    }
@@ -1,25 +1,78 @@
 import json
-import urllib.request
 import os
-import boto3
 
-# 환경 변수 불러오기
-WEBHOOK_URL = os.environ['WEBHOOK_URL']
-SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')  
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import notifier  # Discord / SNS 발송 공용 모듈 (shared/notifier.py, 패키징 시 함께 포함)
 
-# SNS 클라이언트 생성
-sns = boto3.client('sns')
+# 환경 변수 불러오기 (Discord 연결 / SNS 클라이언트는 컨테이너당 하나)
+dispatcher = notifier.Notifier(os.environ['WEBHOOK_URL'], os.environ.get('SNS_TOPIC_ARN', ''))
 
+# 실패 단계별 안내 문구 (상태 머신의 실패 보고 Task가 failure 값으로 전달)
+FAILURE_STAGES = {
+    'snapshot': "EBS 스냅샷 생성이 실패했거나 제한 시간을 넘겼습니다.",
+    'collection': "증거 수집 SSM 명령이 실패 / 취소되었거나 제한 시간 안에 끝나지 않았습니다."
+}
+
+def report_failure(event, context, instance_id, snapshot_id, isolation_status):
+    """워크플로우 실패 보고 - 격리는 끝났지만 이후 단계가 실패했음을 담당자에게 알림"""
+    failure = event['failure']
+    status = event.get('status') or '-'
+    error = (event.get('error') or '').strip()
+    content = (
+        "**[조치 실패 보고]**\n"
+        f"{FAILURE_STAGES.get(failure, f'{failure} 단계가 실패했습니다.')}\n\n"
+        f"• 인스턴스 ID: `{instance_id}`\n"
+        f"• 격리 상태: {isolation_status}\n"
+        f"• EBS 스냅샷 ID: `{snapshot_id}`\n"
+        f"• 실패 단계: {failure} (상태: {status})\n"
+        + (f"• 오류: ```{error[-500:]}```\n" if error else "")
+        + "• 담당자 확인 필요 (수동 수집 / 재실행)"
+    )
+    result = dispatcher.send(
+        content,
+        subject="[조치 실패] 감염 인스턴스 자동 대응 결과",
+        deadline=notifier.deadline_from(context)
+    )
+    print(f"Webhook sent: {result}")
+    metrics.tag(failure=failure)    # 로그 검색용 (알림 자체는 성공)
+    if result['dropped']:
+        raise RuntimeError("Error sending webhook")
+    return {
+        "status": "failed",
+        "notified": True
+    }
+
+@metrics.handler('lambda-discord', propagate=True)
 def lambda_handler(event, context):
     print(f"Received event: {json.dumps(event)}")
 
     # 이벤트에서 필요한 데이터 추출
     instance_id = event.get('instance_id', 'unknown')
     snapshot_id = event.get('snapshot_id', 'unknown')
+    snapshots = event.get('snapshots') or []
+    provision = event.get('provision_seconds') or {}
+    collection = event.get('collection_seconds') or {}
+    summary = event.get('collection_summary') or {}
     s3_bucket = event.get('s3_bucket', 'unknown')
     s3_prefix = event.get('s3_key_prefix', instance_id)
     isolation_status = event.get('isolation_status', '격리 완료')
 
+    if event.get('failure'):
+        return report_failure(event, context, instance_id, snapshot_id, isolation_status)
+
+    # 볼륨별 스냅샷 결과 (장치 / 스냅샷 ID / 소요 시간)
+    snapshot_detail = "".join(
+        f"    - {s['device']} `{s['snapshot_id']}` {s.get('elapsed_seconds', 0):.0f}초\n" for s in snapshots
+    )
+
+    # 수집 결과 (lambda-ssm-status가 SSM 명령 출력의 마지막 줄에서 읽은 요약)
+    artifacts = summary.get('artifacts') or {}
+    collected = sum(1 for status in artifacts.values() if status == 'ok')
+    collection_line = (
+        f"• 증거 수집: 대기 {collection.get('queued', '-')}초 / 실행 {collection.get('execution', '-')}초, "
+        f"아티팩트 {collected}/{len(artifacts)}개, 기준선과 다른 실행 파일 {summary.get('hash_deviations', '-')}개\n"
+    )
+
     # Discord 메시지 내용 포맷 구성
     content = (
         "**[조치 완료 보고]**\n"
@@ -27,40 +80,26 @@ def lambda_handler(event, context):
         f"• 인스턴스 ID: `{instance_id}`\n"
         f"• 격리 상태: {isolation_status}\n"
         f"• EBS 스냅샷 ID: `{snapshot_id}`\n"
+        f"{snapshot_detail}"
         f"• 분석 로그 위치: `s3://{s3_bucket}/{s3_prefix}/`\n"
+        f"• 분석 볼륨 준비: 생성 {provision.get('create_volume', '-')}초 / 연결 {provision.get('attach', '-')}초 "
+        f"(수집 결과 / 소요 시간: `manifest.json`, `timing.json`)\n"
+        f"{collection_line}"
         f"• 담당자 확인 필요"
     )
 
-    # Discord Webhook 요청 구성
-    req = urllib.request.Request(
-        WEBHOOK_URL,
-        data=json.dumps({"content": content}).encode("utf-8"),
-        headers={
-            "Content-Type": "application/json",
-            "User-Agent": "Mozilla/5.0"
-        },
-        method="POST"
+    # Discord 전송과 SNS 이메일 발행을 동시에 진행 (429 응답 시 retry_after만큼 대기 후 재전송)
+    result = dispatcher.send(
+        content,
+        subject="[조치 완료] 감염 인스턴스 자동 대응 결과",
+        deadline=notifier.deadline_from(context)
     )
-
-    try:
-        with urllib.request.urlopen(req) as response:
-            print(f"Webhook sent. Status: {response.status}")
-    except Exception as e:
-        print(f"Error sending webhook: {e}")
-        raise
-
-
-    # SNS 이메일 알림 전송
-    if SNS_TOPIC_ARN:
-        try:
-            sns.publish(
-                TopicArn=SNS_TOPIC_ARN,
-                Subject="[조치 완료] 감염 인스턴스 자동 대응 결과",
-                Message=content.replace("**", "")  # 이메일에 굵은 텍스트 제거
-            )
-            print(f"[SNS] Email notification sent via SNS.")
-        except Exception as e:
-            print(f"[SNS] Error sending SNS email: {e}")
+    print(f"Webhook sent: {result}")
+    if result['dropped']:
+        # Step Functions가 실패로 처리하도록 예외 발생 (기존 동작과 동일)
+        raise RuntimeError("Error sending webhook")
+    # 실행 시작 → 조치 완료 보고 전송 (time-to-notify SLO)
+    metrics.since_trace('TimeToNotify')
 
     return {
         "status": "ok",
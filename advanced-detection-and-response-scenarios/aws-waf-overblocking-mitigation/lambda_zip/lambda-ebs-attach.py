@@ -1,57 +1,176 @@
-import boto3
 import os
+import time
+from botocore.exceptions import ClientError
 
-# EC2 클라이언트 생성
-ec2 = boto3.client('ec2')
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+
+# EC2 클라이언트 (첫 API 호출 때 생성, warm 호출에서 재사용)
+ec2 = aws_clients.lazy('ec2')
 
 # 환경변수로 대상 EC2 인스턴스 ID 설정
 TARGET_INSTANCE_ID = os.environ['TARGET_INSTANCE_ID']
 
+# 분석용 볼륨 설정 (gp3는 크기와 무관하게 IOPS / 처리량 지정 가능)
+VOLUME_TYPE = os.environ.get('VOLUME_TYPE', 'gp3')
+VOLUME_IOPS = int(os.environ.get('VOLUME_IOPS', '3000'))
+VOLUME_THROUGHPUT = int(os.environ.get('VOLUME_THROUGHPUT', '125'))  # MiB/s, gp3 전용
+# Fast Snapshot Restore: 켜면 분석 AZ에서 스냅샷 블록을 미리 적재 (시간당 과금, 볼륨 생성 직후 해제)
+FAST_SNAPSHOT_RESTORE = os.environ.get('FAST_SNAPSHOT_RESTORE', 'false').lower() == 'true'
+# FSR이 optimizing / enabled가 될 때까지 기다리는 최대 시간 - 넘기면 FSR 없이 볼륨 생성
+FSR_TIMEOUT_SECONDS = int(os.environ.get('FSR_TIMEOUT_SECONDS', '900'))
+FSR_POLL_SECONDS = 30
+
+# enabling 상태에서 만든 볼륨은 FSR 효과가 없음 (optimizing부터 적용)
+FSR_READY = ('optimizing', 'enabled')
+
+# 분석 인스턴스에 붙일 수 있는 장치 이름 후보 (여러 조사가 동시에 진행될 수 있음, 조사 후 lambda-ebs-cleanup이 반납)
+DEVICE_CANDIDATES = [f"/dev/sd{c}" for c in "fghijklmnop"]
+
+# 볼륨 상태 조회 간격 (기본 waiter는 15초 간격이라 최대 15초를 그냥 기다림)
+FAST_WAITER = {'Delay': 2, 'MaxAttempts': 90}
+
+def enable_fast_snapshot_restore(snapshot_id, az):
+    # 활성화 요청만 하고 기다리지 않음 - optimizing이 될 때까지는 Step Functions Wait 상태가 대기
+    response = ec2.enable_fast_snapshot_restores(AvailabilityZones=[az], SourceSnapshotIds=[snapshot_id])
+    for item in response.get('Successful', []):
+        print(f"Fast snapshot restore {item['State']} for {snapshot_id} in {az}")
+        return item['State']
+    for item in response.get('Unsuccessful', []):
+        print(f"Fast snapshot restore failed: {item['FastSnapshotRestoreStateErrors']}")
+    return 'failed'
+
+def fast_snapshot_restore_state(snapshot_id, az):
+    response = ec2.describe_fast_snapshot_restores(Filters=[
+        {'Name': 'snapshot-id', 'Values': [snapshot_id]},
+        {'Name': 'availability-zone', 'Values': [az]}
+    ])
+    for item in response.get('FastSnapshotRestores', []):
+        return item['State']
+    return 'failed'
+
+def disable_fast_snapshot_restore(snapshot_id, az):
+    # FSR 효과는 볼륨 생성 시점에만 적용되므로 바로 해제해 과금 중단
+    ec2.disable_fast_snapshot_restores(AvailabilityZones=[az], SourceSnapshotIds=[snapshot_id])
+
+def used_devices(instance_id):
+    instance = ec2.describe_instances(InstanceIds=[instance_id])['Reservations'][0]['Instances'][0]
+    devices = {mapping['DeviceName'] for mapping in instance.get('BlockDeviceMappings', [])}
+    # /dev/xvdf 와 /dev/sdf 는 같은 슬롯
+    return instance, {d.replace('/dev/xvd', '/dev/sd') for d in devices}
+
+def attach_to_free_device(volume_id, used):
+    # 다른 조사가 같은 이름을 먼저 가져가면 다음 후보로 재시도
+    for device in DEVICE_CANDIDATES:
+        if device in used:
+            continue
+        try:
+            ec2.attach_volume(VolumeId=volume_id, InstanceId=TARGET_INSTANCE_ID, Device=device)
+            return device
+        except ClientError as e:
+            if 'already in use' not in str(e):
+                raise
+            print(f"Device {device} is in use, trying next")
+            used.add(device)
+    raise Exception(f"No free device name on {TARGET_INSTANCE_ID}")
+
+def wait_for_fast_snapshot_restore(event, snapshot_id, az):
+    """FSR 준비 상태를 갱신하고, 아직 enabling이면 다시 조회할 결과(ready=False)를 돌려줌"""
+    fsr = event.get('fsr')
+    if fsr is None:
+        fsr = {'state': enable_fast_snapshot_restore(snapshot_id, az), 'requested_at': time.time(), 'polls': 0}
+    else:
+        fsr = dict(fsr, state=fast_snapshot_restore_state(snapshot_id, az), polls=fsr.get('polls', 0) + 1)
+
+    waited = time.time() - fsr['requested_at']
+    if fsr['state'] == 'enabling' and waited < FSR_TIMEOUT_SECONDS:
+        print(f"Fast snapshot restore for {snapshot_id} is still enabling ({waited:.0f}s)")
+        return fsr, {
+            'ready': False,
+            'snapshot_id': snapshot_id,
+            'fsr': fsr,
+            'wait_seconds': FSR_POLL_SECONDS
+        }
+    if fsr['state'] not in FSR_READY:
+        print(f"Fast snapshot restore not ready ({fsr['state']} after {waited:.0f}s), restoring without it")
+    return fsr, None
+
+@metrics.handler('lambda-ebs-attach', propagate=True)
 def lambda_handler(event, context):
     # 이벤트에서 스냅샷 ID 추출
     snapshot_id = event.get('snapshot_id')
     if not snapshot_id:
         raise Exception("snapshot_id is required in the event payload")
 
-    # 스냅샷 완료 상태 대기
-    print(f"Waiting for snapshot {snapshot_id} to complete...")
-    waiter = ec2.get_waiter('snapshot_completed')
-    waiter.wait(SnapshotIds=[snapshot_id])
-    print(f"Snapshot {snapshot_id} is now completed.")
+    # 스냅샷 완료는 Step Functions의 lambda-ebs-status 조회 루프가 보장 (Lambda 안에서 대기하지 않음)
+    started = time.time()
 
     # 대상 인스턴스의 가용 영역(Availability Zone) 확인
-    instance_info = ec2.describe_instances(InstanceIds=[TARGET_INSTANCE_ID])
-    az = instance_info['Reservations'][0]['Instances'][0]['Placement']['AvailabilityZone']
+    instance, used = used_devices(TARGET_INSTANCE_ID)
+    az = instance['Placement']['AvailabilityZone']
+
+    # FSR은 optimizing / enabled 이후에 만든 볼륨에만 효과가 있으므로 그때까지 Wait 상태로 재호출
+    fsr = None
+    if FAST_SNAPSHOT_RESTORE:
+        fsr, pending = wait_for_fast_snapshot_restore(event, snapshot_id, az)
+        if pending:
+            metrics.tag(outcome='fsr_pending')
+            return pending
+    fsr_state = fsr['state'] if fsr else 'disabled'
 
     # 스냅샷을 기반으로 볼륨 생성
-    volume_response = ec2.create_volume(
-        SnapshotId=snapshot_id,
-        AvailabilityZone=az,
-        VolumeType='gp2',
-        TagSpecifications=[
+    volume_args = {
+        'SnapshotId': snapshot_id,
+        'AvailabilityZone': az,
+        'VolumeType': VOLUME_TYPE,
+        'TagSpecifications': [
             {
                 'ResourceType': 'volume',
                 'Tags': [{'Key': 'Name', 'Value': f'forensic-volume-from-{snapshot_id}'}]
             }
         ]
-    )
+    }
+    if VOLUME_TYPE in ('gp3', 'io1', 'io2'):
+        volume_args['Iops'] = VOLUME_IOPS
+    if VOLUME_TYPE == 'gp3':
+        volume_args['Throughput'] = VOLUME_THROUGHPUT
+    try:
+        volume_response = ec2.create_volume(**volume_args)
+    finally:
+        if fsr and fsr_state != 'failed':
+            disable_fast_snapshot_restore(snapshot_id, az)
 
     volume_id = volume_response['VolumeId']
-    print(f"Created volume {volume_id}")
+    print(f"Created {VOLUME_TYPE} volume {volume_id} (fast snapshot restore: {fsr_state})")
 
     # 볼륨이 available 상태가 될 때까지 대기
-    ec2.get_waiter('volume_available').wait(VolumeIds=[volume_id])
+    ec2.get_waiter('volume_available').wait(VolumeIds=[volume_id], WaiterConfig=FAST_WAITER)
+    available = time.time()
 
-    # 생성한 볼륨을 대상 인스턴스에 /dev/sdf로 연결
-    ec2.attach_volume(
-        VolumeId=volume_id,
-        InstanceId=TARGET_INSTANCE_ID,
-        Device='/dev/sdf'
+    # 비어 있는 장치 이름으로 분석 인스턴스에 연결하고, 연결 완료(in-use)까지 대기
+    device = attach_to_free_device(volume_id, used)
+    ec2.get_waiter('volume_in_use').wait(
+        VolumeIds=[volume_id],
+        Filters=[{'Name': 'attachment.status', 'Values': ['attached']}],
+        WaiterConfig=FAST_WAITER
     )
+    attached = time.time()
+    print(f"Attached {volume_id} at {device}")
 
-    # 연결 결과 반환
+    # 연결 결과 반환 (provisioned_at 이후 수집 시간은 lambda-ssm의 timing.json에 기록)
     return {
+        'ready': True,
         'attached_volume_id': volume_id,
         'target_instance_id': TARGET_INSTANCE_ID,
-        'device': '/dev/sdf'
+        'device': device,
+        'availability_zone': az,
+        'volume_type': VOLUME_TYPE,
+        'fast_snapshot_restore': fsr_state,
+        'snapshot_id': snapshot_id,
+        'provisioned_at': attached,
+        'provision_seconds': {
+            'fast_snapshot_restore': round(started - fsr['requested_at'], 1) if fsr else 0,
+            'create_volume': round(available - started, 1),
+            'attach': round(attached - available, 1)
+        }
     }
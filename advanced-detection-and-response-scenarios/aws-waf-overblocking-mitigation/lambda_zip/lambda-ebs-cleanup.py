@@ -0,0 +1,50 @@
+import os
+import time
+from botocore.exceptions import ClientError
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+
+# EC2 클라이언트 (첫 API 호출 때 생성, warm 호출에서 재사용)
+ec2 = aws_clients.lazy('ec2')
+
+# 볼륨 상태 조회 간격 (lambda-ebs-attach와 동일)
+FAST_WAITER = {'Delay': 2, 'MaxAttempts': 90}
+
+# 분리한 분석용 볼륨 삭제 여부 (기본값: 분리만 하고 볼륨은 남겨 담당자가 추가 분석 / 보존 후 직접 삭제)
+DELETE_VOLUME = os.environ.get('DELETE_VOLUME', 'false').lower() == 'true'
+
+@metrics.handler('lambda-ebs-cleanup', propagate=True)
+def lambda_handler(event, context):
+    # 수집이 끝난 분석용 볼륨을 분리해 분석 인스턴스의 장치 이름(/dev/sdf~sdp)을 반납
+    # 삭제는 DELETE_VOLUME=true일 때만 (원본 증거는 스냅샷과 S3 수집 결과로 남아 있어 볼륨은 다시 만들 수 있음)
+    volume_id = event.get('volume_id')
+    if not volume_id:
+        raise Exception("volume_id is required in the event payload")
+    # 수집이 실패하면 SSM 문서가 마운트를 해제하지 못했을 수 있으므로 강제 분리
+    force = bool(event.get('collection_failed'))
+    started = time.time()
+
+    try:
+        ec2.detach_volume(VolumeId=volume_id, Force=force)
+    except ClientError as e:
+        code = e.response['Error']['Code']
+        if code == 'InvalidVolume.NotFound':
+            print(f"Volume {volume_id} already deleted")
+            metrics.tag(outcome='not_found')
+            return {'volume_id': volume_id, 'detached': False, 'deleted': False}
+        if code != 'IncorrectState':
+            raise
+        print(f"Volume {volume_id} is not attached")
+
+    ec2.get_waiter('volume_available').wait(VolumeIds=[volume_id], WaiterConfig=FAST_WAITER)
+    if DELETE_VOLUME:
+        ec2.delete_volume(VolumeId=volume_id)
+    print(f"Detached {volume_id} (force={force}, deleted={DELETE_VOLUME})")
+
+    return {
+        'volume_id': volume_id,
+        'detached': True,
+        'deleted': DELETE_VOLUME,
+        'cleanup_seconds': round(time.time() - started, 1)
+    }
@@ -0,0 +1,37 @@
+import os
+import time
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ebs_snapshot  # 다중 볼륨 스냅샷 공용 모듈 (shared/ebs_snapshot.py, 패키징 시 함께 포함)
+
+# EC2 클라이언트 (첫 API 호출 때 생성, warm 호출에서 재사용)
+ec2 = aws_clients.lazy('ec2')
+
+# 이 시간(초)이 지나도 끝나지 않으면 실패로 처리
+SNAPSHOT_TIMEOUT_SECONDS = int(os.environ.get('SNAPSHOT_TIMEOUT_SECONDS', '21600'))
+
+@metrics.handler('lambda-ebs-status', propagate=True)
+def lambda_handler(event, context):
+    # lambda-ebs(또는 직전 조회)의 결과를 그대로 받아 진행 상황만 갱신 - 대기는 Step Functions Wait 상태가 담당
+    snapshots = event.get('snapshots')
+    if not snapshots:
+        raise Exception("snapshots is required in the event payload")
+
+    result = ebs_snapshot.update_progress(ec2, snapshots)
+    for line in ebs_snapshot.summary_lines(snapshots):
+        print(line)
+
+    started_at = min(s['started_at'] for s in snapshots)
+    if not result['complete'] and time.time() - started_at > SNAPSHOT_TIMEOUT_SECONDS:
+        print(f"Snapshot timeout after {SNAPSHOT_TIMEOUT_SECONDS}s")
+        result['failed'] = True
+
+    result.update({
+        'snapshot_id': event.get('snapshot_id'),
+        'snapshot_ids': event.get('snapshot_ids'),
+        'instance_id': event.get('instance_id'),
+        'image_id': event.get('image_id', ''),
+        'polls': event.get('polls', 0) + 1
+    })
+    return result
\ No newline at end of file
@@ -1,9 +1,13 @@
-import boto3
 import json
 
-# EC2 클라이언트 생성
-ec2 = boto3.client('ec2')
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ebs_snapshot  # 다중 볼륨 스냅샷 공용 모듈 (shared/ebs_snapshot.py, 패키징 시 함께 포함)
 
+# EC2 클라이언트 (첫 API 호출 때 생성, warm 호출에서 재사용)
+ec2 = aws_clients.lazy('ec2')
+
+@metrics.handler('lambda-ebs', propagate=True)
 def lambda_handler(event, context):
     # 이벤트에서 인스턴스 ID 추출
     instance_id = event.get('instance_id')
@@ -14,41 +18,25 @@ def lambda_handler(event, context):
     response = ec2.describe_instances(InstanceIds=[instance_id])
     instance = response['Reservations'][0]['Instances'][0]
 
-    # 루트 디바이스 이름 추출 (예: /dev/xvda)
-    root_device = instance['RootDeviceName']
-    root_volume_id = None
-
-    # 루트 디바이스와 일치하는 EBS 볼륨 ID 찾기
-    for mapping in instance['BlockDeviceMappings']:
-        if mapping['DeviceName'] == root_device:
-            root_volume_id = mapping['Ebs']['VolumeId']
-            break
-
-    if not root_volume_id:
-        raise Exception("Root volume not found")
-
-    print(f"Root volume ID: {root_volume_id}")
-
-    # 스냅샷 생성 (루트 볼륨 기준)
-    snapshot_response = ec2.create_snapshot(
-        VolumeId=root_volume_id,
-        Description=f"Snapshot of {root_volume_id} from instance {instance_id} for forensic analysis",
-        TagSpecifications=[   # 스냅샷에 태그 지정
-            {
-                'ResourceType': 'snapshot',
-                'Tags': [
-                    {'Key': 'Name', 'Value': f"{instance_id}-forensic-snapshot"},
-                    {'Key': 'SourceInstance', 'Value': instance_id}
-                ]
-            }
+    # 연결된 모든 EBS 볼륨을 같은 시점의 crash-consistent 세트로 스냅샷 (완료 대기는 Step Functions 루프에서)
+    snapshots = ebs_snapshot.create_instance_snapshots(
+        ec2,
+        instance,
+        description=f"Snapshot of {instance_id} for forensic analysis",
+        tags=[   # 스냅샷에 태그 지정
+            {'Key': 'Name', 'Value': f"{instance_id}-forensic-snapshot"},
+            {'Key': 'SourceInstance', 'Value': instance_id}
         ]
     )
-
-    snapshot_id = snapshot_response['SnapshotId']
-    print(f"Created snapshot: {snapshot_id}")
-
-    # 생성된 스냅샷 ID와 인스턴스 ID 반환
-    return {
-        'snapshot_id': snapshot_id,
-        'instance_id': instance_id
-    }
\ No newline at end of file
+    print(f"Created snapshots: {json.dumps(snapshots)}")
+
+    # 루트 볼륨 스냅샷 ID(이후 분석 단계 입력)와 전체 스냅샷 진행 상태 반환
+    result = ebs_snapshot.update_progress(ec2, snapshots)
+    result.update({
+        'snapshot_id': snapshots[0]['snapshot_id'],
+        'snapshot_ids': [s['snapshot_id'] for s in snapshots],
+        'instance_id': instance_id,
+        'image_id': instance.get('ImageId', ''),   # 실행 파일 해시 기준선 선택용
+        'polls': 0
+    })
+    return result
\ No newline at end of file
@@ -1,39 +1,56 @@
-import boto3
 import os
 import json
 
-# EC2 클라이언트 생성
-ec2 = boto3.client('ec2')
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ec2_isolation  # 다중 인스턴스 격리 공용 모듈 (shared/ec2_isolation.py, 패키징 시 함께 포함)
+
+# EC2 클라이언트 (첫 API 호출 때 생성, warm 호출에서 재사용)
+ec2 = aws_clients.lazy('ec2')
 
 # 격리용 보안 그룹 ID를 환경 변수에서 가져옴
 ISOLATION_SG_ID = os.environ['ISOLATION_SG_ID']
 
+@metrics.handler('lambda-isolated-sg', propagate=True)
 def lambda_handler(event, context):
     # 이벤트 로그 출력
     print("Received event:", json.dumps(event))
     
-    # 이벤트에서 EC2 인스턴스 ID 추출
-    instance_id = event.get('instance_id')
-    if not instance_id:
-        raise Exception("Error: 'instance_id' is required in the event payload")
-
-    # EC2 인스턴스에서 네트워크 인터페이스 정보 조회
-    response = ec2.describe_instances(InstanceIds=[instance_id])
-    network_interfaces = response['Reservations'][0]['Instances'][0]['NetworkInterfaces']
-
-    # 각 네트워크 인터페이스에 대해 격리 보안 그룹 적용
-    for ni in network_interfaces:
-        eni_id = ni['NetworkInterfaceId']
-        print(f"Attaching isolation security group to ENI: {eni_id}")
-
-        # 해당 ENI에 격리용 보안 그룹 설정
-        ec2.modify_network_interface_attribute(
-            NetworkInterfaceId=eni_id,
-            Groups=[ISOLATION_SG_ID]
-        )
-
-    # 결과 반환
+    # 이벤트에서 격리 대상 추출 (단일 instance_id, instance_ids 목록, 태그 선택자 중 하나 이상)
+    instance_ids = list(event.get('instance_ids') or [])
+    if event.get('instance_id'):
+        instance_ids.insert(0, event['instance_id'])
+    selector = event.get('selector')
+    if not instance_ids and not selector:
+        raise Exception("Error: 'instance_id', 'instance_ids' or 'selector' is required in the event payload")
+
+    # 대상 인스턴스의 모든 ENI를 API 한도 안에서 동시에 격리 보안 그룹으로 전환 + quarantined 태그 일괄 지정
+    result = ec2_isolation.Isolator(ec2, ISOLATION_SG_ID).isolate(instance_ids=instance_ids, selector=selector)
+    for inst in result['instances']:
+        print(f"{inst['instance_id']}: {inst['status']} ({inst['seconds']}s, {len(inst['enis'])} ENI)")
+    if result['not_found']:
+        print(f"Instances not found: {result['not_found']}")
+
+    isolated = [i['instance_id'] for i in result['instances'] if i['status'] != 'failed']
+    if not isolated:
+        raise Exception(f"Error: no instance isolated ({result['failed']} failed, not found {result['not_found']})")
+
+    # 실행 시작 → 격리 완료 (time-to-contain SLO)
+    metrics.since_trace('TimeToContain')
+    metrics.count('isolate.instances', len(isolated))
+    if len(isolated) < len(result['instances']):
+        metrics.tag(outcome='partial')
+
+    # 결과 반환 (이후 단계는 첫 번째 대상 instance_id로 포렌식 진행)
+    first = event.get('instance_id') if event.get('instance_id') in isolated else isolated[0]
     return {
-        'status': 'isolated',
-        'instance_id': instance_id
+        'status': 'isolated' if result['isolated'] == len(result['instances']) else 'partial',
+        'instance_id': first,
+        'instance_ids': isolated,
+        'not_found': result['not_found'],
+        'instances': [
+            {'instance_id': i['instance_id'], 'status': i['status'], 'seconds': i['seconds']}
+            for i in result['instances']
+        ],
+        'seconds': result['seconds']
     }
@@ -0,0 +1,28 @@
+import json
+import os
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ssm_command  # SSM 명령 완료 추적 공용 모듈 (shared/ssm_command.py, 패키징 시 함께 포함)
+
+ssm = aws_clients.lazy('ssm')
+
+# 이 횟수만큼 조회해도 끝나지 않으면 실패로 처리 (호출 기록이 끝내 생기지 않으면 update_progress는 계속 Pending)
+MAX_POLLS = int(os.environ.get('MAX_POLLS', '240'))
+
+@metrics.handler('lambda-ssm-status', propagate=True)
+def lambda_handler(event, context):
+    # lambda-ssm(또는 직전 조회)의 결과를 그대로 받아 명령 상태만 갱신 - 대기는 Step Functions Wait 상태가 담당
+    if not event.get('command_id'):
+        raise Exception("command_id is required in the event payload")
+
+    result = ssm_command.update_progress(ssm, event)
+    if not (result['complete'] or result['failed']) and result['polls'] >= MAX_POLLS:
+        print(f"Collection still {result['status']} after {result['polls']} polls")
+        result['failed'] = True
+        result['error'] = f"no result after {result['polls']} polls ({result['status_details']})"
+    print(f"Command {result['command_id']} on {result['instance_id']}: {result['status']} "
+          f"({result['status_details']}) durations={json.dumps(result['durations'])}")
+    if result['failed']:
+        print(f"Collection failed: {result.get('error', '')}")
+    return result
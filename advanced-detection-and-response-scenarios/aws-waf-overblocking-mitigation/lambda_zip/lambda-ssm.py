@@ -1,60 +1,48 @@
-import boto3
 import os
-import json
 
-ssm = boto3.client('ssm')
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ssm_command  # SSM 명령 완료 추적 공용 모듈 (shared/ssm_command.py, 패키징 시 함께 포함)
+
+ssm = aws_clients.lazy('ssm')
 
 # 분석용 EC2 인스턴스 ID는 환경변수로 전달
 TARGET_INSTANCE_ID = os.environ['TARGET_INSTANCE_ID']
 
-def lambda_handler(event, context):
-    device_name = event.get('device', '/dev/sdf')  # 기본값 /dev/sdf
-    mount_point = "/mnt/forensic"
-
-    commands = [
-        f"sudo mkdir -p {mount_point}",
-        f"sudo mount {device_name} {mount_point}",
-
-        # 시스템 로그 수집
-        f"sudo cat {mount_point}/var/log/syslog > /tmp/syslog_copy.txt || echo 'No syslog'",
-        f"sudo cat {mount_point}/var/log/messages > /tmp/messages_copy.txt || echo 'No messages'",
-
-        # 사용자 및 권한 관련 정보
-        f"sudo cat {mount_point}/etc/passwd > /tmp/passwd_copy.txt || echo 'No passwd'",
-        f"sudo cat {mount_point}/etc/shadow > /tmp/shadow_copy.txt || echo 'No shadow'",
-        f"sudo cat {mount_point}/etc/group > /tmp/group_copy.txt || echo 'No group'",
+# 수집 SSM 문서(ssm_document.tf)와 결과 업로드 버킷
+COLLECTOR_DOCUMENT = os.environ['COLLECTOR_DOCUMENT']
+S3_BUCKET = os.environ['S3_BUCKET_NAME']
+S3_PREFIX = 'forensic-results'
 
-        # 셸 히스토리
-        f"sudo cat {mount_point}/root/.bash_history > /tmp/root_bash_history.txt || echo 'No root bash history'",
-        f"sudo find {mount_point}/home -name '.bash_history' -exec cat {{}} \\; > /tmp/user_bash_histories.txt || echo 'No user bash histories'",
+# 수집 전 블록 미리 읽기: targeted(수집 대상 경로만 병렬로 읽기) / full(볼륨 전체) / off
+PREWARM_MODE = os.environ.get('PREWARM_MODE', 'targeted')
+COLLECTOR_WORKERS = os.environ.get('COLLECTOR_WORKERS', '8')
+# true면 감염 인스턴스 AMI의 해시 기준선과 inode / size / mtime / ctime이 같은 실행 파일은 해시 생략
+# (기본값 false: 메타데이터는 감염 인스턴스의 root가 위조할 수 있으므로 모두 해시해 기준선과 비교)
+HASH_TRUST_METADATA = os.environ.get('HASH_TRUST_METADATA', 'false').lower()
 
-        # SSH 백도어 흔적 확인
-        f"sudo find {mount_point}/home -name 'authorized_keys' -exec cat {{}} \\; > /tmp/ssh_keys.txt || echo 'No authorized_keys'",
-        f"sudo find {mount_point}/root -name 'authorized_keys' -exec cat {{}} \\; >> /tmp/ssh_keys.txt || echo 'No root ssh keys'",
-
-        # 임시 디렉토리 내용 확인
-        f"sudo ls -alhR {mount_point}/tmp > /tmp/tmp_dir_listing.txt || echo 'No /tmp dir'",
-        f"sudo ls -alhR {mount_point}/var/tmp > /tmp/var_tmp_dir_listing.txt || echo 'No /var/tmp dir'",
-
-        # 실행파일 해시 수집
-        f"sudo sha256sum {mount_point}/bin/* > /tmp/bin_hashes.txt || echo 'No bin files'",
-        f"sudo sha256sum {mount_point}/usr/bin/* > /tmp/usr_bin_hashes.txt || echo 'No usr/bin files'",
-
-        # 네트워크 설정
-        f"sudo cat {mount_point}/etc/hosts > /tmp/hosts.txt || echo 'No hosts'",
-        f"sudo cat {mount_point}/etc/resolv.conf > /tmp/resolv_conf.txt || echo 'No resolv.conf'",
-        f"sudo cat {mount_point}/etc/hostname > /tmp/hostname.txt || echo 'No hostname'",
-
-        # 마운트 해제
-        f"sudo umount {mount_point}"
-    ]
+@metrics.handler('lambda-ssm', propagate=True)
+def lambda_handler(event, context):
+    device_name = event.get('device', '/dev/sdf')  # 기본값 /dev/sdf
+    volume_id = event.get('volume_id', '')
+    # 조사마다 S3 경로를 분리 (분석 인스턴스에서도 /mnt/forensic-<볼륨 ID>로 따로 마운트)
+    name = volume_id or device_name.rsplit('/', 1)[-1]
+    s3_prefix = f"{S3_PREFIX}/forensic-{name}"
 
-    # SSM 명령 실행
+    # 마운트 → 수집 + S3 업로드 → 마운트 해제를 명령 한 번으로 실행 (/tmp에 중간 파일을 남기지 않음)
     response = ssm.send_command(
         InstanceIds=[TARGET_INSTANCE_ID],
-        DocumentName="AWS-RunShellScript",
+        DocumentName=COLLECTOR_DOCUMENT,
         Parameters={
-            "commands": commands
+            "volumeId": [volume_id],
+            "device": [device_name],
+            "bucket": [S3_BUCKET],
+            "prefix": [s3_prefix],
+            "prewarmMode": [PREWARM_MODE],
+            "provisionedAt": [str(event.get('provisioned_at') or 0)],
+            "workers": [COLLECTOR_WORKERS],
+            "baselineId": [event.get('image_id') or ''],
+            "trustMetadata": [HASH_TRUST_METADATA]
         },
         TimeoutSeconds=180,
     )
@@ -62,7 +50,12 @@ def lambda_handler(event, context):
     command_id = response['Command']['CommandId']
     print(f"SSM command sent. Command ID: {command_id}")
 
-    return {
-        "command_id": command_id,
-        "target_instance_id": TARGET_INSTANCE_ID
-    }
+    # 완료 여부는 Step Functions의 lambda-ssm-status 조회 루프가 확인 (완료 전에는 다음 단계로 넘어가지 않음)
+    result = ssm_command.started(command_id, TARGET_INSTANCE_ID)
+    result.update({
+        "target_instance_id": TARGET_INSTANCE_ID,
+        "prewarm_mode": PREWARM_MODE,
+        "s3_bucket": S3_BUCKET,
+        "s3_key_prefix": s3_prefix
+    })
+    return result
@@ -1,27 +1,41 @@
 import json
-import boto3
-import datetime
 import os
 
-s3 = boto3.client('s3')
-# 환경변수로 S3 버킷명 prefix를 관리
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import finding_archive  # finding 파티션 / gzip NDJSON 공용 모듈 (shared/finding_archive.py, 패키징 시 함께 포함)
+
+s3 = aws_clients.lazy('s3')
+# 환경변수로 S3 버킷명과 prefix를 관리
 BUCKET = os.environ.get('S3_BUCKET', 'your-guardduty-logs-bucket')
-PREFIX = os.environ.get('S3_PREFIX', 'guardduty/finding-logs/')
+PREFIX = os.environ.get('S3_PREFIX', 'guardduty/findings/')
+# 파티션 버퍼가 이 크기(비압축 바이트)를 넘으면 배치 도중에도 바로 씀
+MAX_OBJECT_BYTES = int(os.environ.get('MAX_OBJECT_BYTES', str(finding_archive.MAX_OBJECT_BYTES)))
 
+@metrics.handler('lambda-upload-findings-to-s3')
 def lambda_handler(event, context):
-    # 파일명에 타임스탬프와 랜덤성을 추가
-    timestamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-    unique = context.aws_request_id if hasattr(context, 'aws_request_id') else 'unknown'
-    key = f"{PREFIX}{timestamp}_{unique}.json"
+    # SQS 버퍼 큐의 배치(배치 윈도우 동안 모인 EventBridge 이벤트) 또는 EventBridge 이벤트 하나
+    records = event.get('Records')
+    writer = finding_archive.ArchiveWriter(s3, BUCKET, PREFIX, max_bytes=MAX_OBJECT_BYTES)
+    if records is None:
+        writer.add(event)
+    else:
+        for record in records:
+            try:
+                writer.add(json.loads(record['body']), ref=record['messageId'])
+            except ValueError:
+                print(f"[WARN] Invalid message body: {record['messageId']}")
 
-    # S3에 저장할 JSON(이벤트 원본 저장)
-    s3.put_object(
-        Bucket=BUCKET,
-        Key=key,
-        Body=json.dumps(event, ensure_ascii=False, indent=2),
-        ContentType='application/json'
-    )
-    return {
-        'statusCode': 200,
-        'body': f"Saved finding to {BUCKET}/{key}"
-    }
+    # 파티션(account/region/finding_type/yyyy/mm/dd)마다 gzip NDJSON 객체 하나로 저장
+    failed = writer.flush()
+    print(f"[INFO] findings={writer.stats['findings']} objects={writer.stats['objects']} "
+          f"bytes={writer.stats['bytes']} (raw {writer.stats['raw_bytes']}) failed_messages={len(failed)}")
+    if records is None:
+        if failed or not writer.stats['objects']:
+            raise Exception("Error: failed to archive finding")
+        return {
+            'statusCode': 200,
+            'body': f"Saved finding to {BUCKET}/{PREFIX}"
+        }
+    # 쓰기에 실패한 파티션의 메시지만 큐로 돌려보냄
+    return {'batchItemFailures': [{'itemIdentifier': m} for m in failed]}
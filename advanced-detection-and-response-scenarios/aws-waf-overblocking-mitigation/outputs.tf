@@ -34,6 +34,11 @@ output "s3_logarchive_bucket" {
   value       = aws_s3_bucket.logarchive.bucket
 }
 
+output "forensic_timing_location" {
+  description = "조사별 수집 소요 시간(time_to_first_byte_seconds / total_seconds 등) 기록 위치"
+  value       = "s3://${aws_s3_bucket.logarchive.bucket}/forensic-results/forensic-<볼륨 ID>/timing.json"
+}
+
 #--------------------------------------
 # Security Group 출력
 #--------------------------------------
@@ -55,6 +60,11 @@ output "lambda_ebs_arn" {
   value       = aws_lambda_function.lambda_ebs.arn
 }
 
+output "lambda_ebs_status_arn" {
+  description = "EBS 스냅샷 진행 상황 조회 Lambda 함수 ARN"
+  value       = aws_lambda_function.lambda_ebs_status.arn
+}
+
 output "lambda_ebs_attach_arn" {
   description = "EBS 볼륨 Attach Lambda 함수 ARN"
   value       = aws_lambda_function.lambda_ebs_attach.arn
@@ -65,9 +75,19 @@ output "lambda_ssm_arn" {
   value       = aws_lambda_function.lambda_ssm.arn
 }
 
-output "lambda_s3_arn" {
-  description = "S3 업로드 Lambda 함수 ARN"
-  value       = aws_lambda_function.lambda_s3.arn
+output "lambda_ssm_status_arn" {
+  description = "수집 SSM 명령 완료 조회 Lambda 함수 ARN"
+  value       = aws_lambda_function.lambda_ssm_status.arn
+}
+
+output "forensic_hash_baseline_location" {
+  description = "AMI별 실행 파일 해시 기준선 위치 (collector/hash_baseline.py build로 생성, 없으면 전체 해시 목록 수집)"
+  value       = "s3://${aws_s3_bucket.logarchive.bucket}/forensic-baselines/<AMI ID>.sqlite"
+}
+
+output "forensic_collector_document" {
+  description = "포렌식 수집 SSM 문서 이름 (마운트 + 수집 + S3 업로드)"
+  value       = aws_ssm_document.forensic_collector.name
 }
 
 output "lambda_discord_arn" {
@@ -80,6 +100,16 @@ output "lambda_upload_findings_to_s3_arn" {
   value       = aws_lambda_function.lambda_upload_findings_to_s3.arn
 }
 
+output "lambda_compact_findings_arn" {
+  description = "GuardDuty Findings 아카이브 압축(compaction) Lambda 함수 ARN"
+  value       = aws_lambda_function.lambda_compact_findings.arn
+}
+
+output "findings_buffer_queue_url" {
+  description = "GuardDuty Findings 버퍼 SQS 큐 URL"
+  value       = aws_sqs_queue.findings_buffer.url
+}
+
 #--------------------------------------
 # Step Functions 출력
 #--------------------------------------
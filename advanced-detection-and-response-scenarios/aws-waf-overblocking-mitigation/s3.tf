@@ -27,6 +27,24 @@ resource "aws_s3_bucket_server_side_encryption_configuration" "guardduty_events"
   }
 }
 
+# 버전 관리 버킷이므로 압축(compaction)으로 지운 작은 객체의 이전 버전은 일정 기간 후 만료
+resource "aws_s3_bucket_lifecycle_configuration" "guardduty_events" {
+  bucket = aws_s3_bucket.guardduty_events.id
+
+  rule {
+    id     = "expire-compacted-finding-objects"
+    status = "Enabled"
+    filter {
+      prefix = "guardduty/findings/"
+    }
+    noncurrent_version_expiration {
+      noncurrent_days = 7
+    }
+  }
+
+  depends_on = [aws_s3_bucket_versioning.guardduty_events]
+}
+
 #--------------------------------------
 # 분석 로그/아카이브 S3 버킷
 #--------------------------------------
@@ -0,0 +1,41 @@
+#--------------------------------------
+# GuardDuty Findings 버퍼 큐: EventBridge → SQS → 업로드 Lambda (배치 윈도우 단위로 모아 저장)
+#--------------------------------------
+resource "aws_sqs_queue" "findings_buffer_dlq" {
+  name                      = "guardduty-findings-buffer-dlq-${random_id.suffix.hex}"
+  message_retention_seconds = 1209600 # 14일 보관
+}
+
+resource "aws_sqs_queue" "findings_buffer" {
+  name                       = "guardduty-findings-buffer-${random_id.suffix.hex}"
+  visibility_timeout_seconds = 360    # 업로드 Lambda 제한 시간(60초)의 6배 (이벤트 소스 매핑 권장값)
+  message_retention_seconds  = 345600 # 4일 보관
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.findings_buffer_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = { Name = "guardduty-findings-buffer-${random_id.suffix.hex}" }
+}
+
+#--------------------------------------
+# EventBridge Rule에서만 큐에 메시지를 넣도록 허용
+#--------------------------------------
+resource "aws_sqs_queue_policy" "findings_buffer" {
+  queue_url = aws_sqs_queue.findings_buffer.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Sid       = "AllowEventBridgeSendMessage"
+      Effect    = "Allow"
+      Principal = { Service = "events.amazonaws.com" }
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.findings_buffer.arn
+      Condition = {
+        ArnEquals = { "aws:SourceArn" = aws_cloudwatch_event_rule.gd_findings_rule.arn }
+      }
+    }]
+  })
+}
@@ -0,0 +1,99 @@
+#--------------------------------------
+# 포렌식 수집 SSM 문서
+# 볼륨을 읽기 전용으로 마운트 → collector/forensic_collector.py 실행(동시 수집 + S3 스트리밍 업로드) → 마운트 해제
+# 기존 lambda-ssm(수집) / lambda-s3(업로드) 두 번의 명령을 한 번으로 합침
+#--------------------------------------
+resource "aws_ssm_document" "forensic_collector" {
+  name            = "forensic-collector-${random_id.suffix.hex}"
+  document_type   = "Command"
+  document_format = "JSON"
+
+  content = jsonencode({
+    schemaVersion = "2.2",
+    description   = "Mount a forensic volume read-only and stream artifacts to S3",
+    parameters = {
+      volumeId = {
+        type           = "String",
+        description    = "분석 볼륨 ID (NVMe 장치 이름 확인용)",
+        default        = "",
+        allowedPattern = "^(vol-[0-9a-f]+)?$"
+      },
+      device = {
+        type           = "String",
+        description    = "attach_volume에 사용한 장치 이름",
+        default        = "/dev/sdf",
+        allowedPattern = "^/dev/[a-z0-9]+$"
+      },
+      bucket = {
+        type           = "String",
+        allowedPattern = "^[a-z0-9.-]+$"
+      },
+      prefix = {
+        type           = "String",
+        allowedPattern = "^[A-Za-z0-9/_.-]+$"
+      },
+      prewarmMode = {
+        type          = "String",
+        default       = "targeted",
+        allowedValues = ["targeted", "full", "off"]
+      },
+      provisionedAt = {
+        type           = "String",
+        default        = "0",
+        allowedPattern = "^[0-9.]+$"
+      },
+      workers = {
+        type           = "String",
+        default        = "8",
+        allowedPattern = "^[0-9]+$"
+      },
+      baselineId = {
+        type           = "String",
+        description    = "실행 파일 해시 기준선 ID (감염 인스턴스 AMI ID, 비어 있으면 전체 해시 목록)",
+        default        = "",
+        allowedPattern = "^[A-Za-z0-9._-]*$"
+      },
+      trustMetadata = {
+        type          = "String",
+        default       = "false",
+        allowedValues = ["true", "false"]
+      }
+    },
+    mainSteps = [{
+      action = "aws:runShellScript",
+      name   = "collect",
+      inputs = {
+        timeoutSeconds = "900",
+        runCommand = [
+          "T0=$(date +%s.%N)",
+          "VOL='{{ volumeId }}'",
+          "NAME=$${VOL:-$(basename {{ device }})}",
+          "MNT=/mnt/forensic-$NAME",
+          "mkdir -p $MNT /opt/forensic",
+          "echo ${base64encode(file("${path.module}/collector/forensic_collector.py"))} | base64 -d > /opt/forensic/forensic_collector.py",
+          "echo ${base64encode(file("${path.module}/collector/hash_baseline.py"))} | base64 -d > /opt/forensic/hash_baseline.py",
+
+          # Nitro 인스턴스는 /dev/sdX 대신 NVMe 이름으로 보이므로 볼륨 ID로 실제 장치를 찾음
+          "DEV=$(readlink -f /dev/disk/by-id/nvme-Amazon_Elastic_Block_Store_$${VOL//-/} 2>/dev/null)",
+          "[ -b \"$DEV\" ] || DEV={{ device }}",
+          "[ -b \"$DEV\" ] || DEV=$(echo {{ device }} | sed 's#/dev/sd#/dev/xvd#')",
+          # 루트 볼륨 스냅샷은 파티션이 있으므로 첫 번째 파티션을 마운트
+          "PART=$(lsblk -lnpo NAME,TYPE $DEV | awk '$2==\"part\"{print $1; exit}')",
+          "PART=$${PART:-$DEV}",
+          # 증거 보존을 위해 읽기 전용 마운트 (같은 AMI의 XFS는 UUID가 겹치므로 nouuid)
+          "OPTS=ro; [ \"$(blkid -o value -s TYPE $PART)\" = xfs ] && OPTS=ro,norecovery,nouuid",
+          "mount -o $OPTS $PART $MNT || exit 1",
+          "T_MOUNT=$(date +%s.%N)",
+
+          # 수집 + 업로드 (manifest.json / timing.json 포함), 실패해도 마운트는 해제
+          "python3 /opt/forensic/forensic_collector.py --root $MNT --bucket {{ bucket }} --prefix {{ prefix }} --prewarm {{ prewarmMode }} --device $PART --workers {{ workers }} --t0 $T0 --t-mount $T_MOUNT --provisioned-at {{ provisionedAt }} --baseline-id '{{ baselineId }}' --trust-metadata {{ trustMetadata }}",
+          "RC=$?",
+          "umount $MNT",
+          "exit $RC"
+        ]
+      }
+    }]
+  })
+
+  tags = { Name = "forensic-collector-${random_id.suffix.hex}" }
+}
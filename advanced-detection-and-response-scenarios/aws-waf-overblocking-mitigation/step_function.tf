@@ -1,3 +1,15 @@
+#--------------------------------------
+# 실행 추적 정보: 모든 Lambda 단계에 같은 trace(실행 이름 / 시작 시각)를 넘겨
+# 단계별 EMF 지표(shared/metrics.py)를 실행 단위로 묶고 time-to-contain / time-to-notify를 계산
+# (lambda-ssm-status는 InputPath로 lambda-ssm 결과에 실린 trace를 그대로 받음)
+#--------------------------------------
+locals {
+  sfn_trace = {
+    "id.$"    = "$$.Execution.Name",
+    "start.$" = "$$.Execution.StartTime"
+  }
+}
+
 #--------------------------------------
 # Step Functions 상태 머신 정의 (Malware 자동대응 워크플로우)
 #--------------------------------------
@@ -13,7 +25,8 @@ resource "aws_sfn_state_machine" "malware_step" {
         Type = "Task",
         Resource = "${aws_lambda_function.lambda_isolated_sg.arn}",
         Parameters = {
-          "instance_id.$" = "$.instance_id"
+          "instance_id.$" = "$.instance_id",
+          "trace" = local.sfn_trace
         },
         ResultPath = "$.isolate",
         Next = "lambda-ebs"
@@ -22,37 +35,200 @@ resource "aws_sfn_state_machine" "malware_step" {
         Type = "Task",
         Resource = "${aws_lambda_function.lambda_ebs.arn}",
         Parameters = {
-          "instance_id.$" = "$.isolate.instance_id"
+          "instance_id.$" = "$.isolate.instance_id",
+          "trace" = local.sfn_trace
         },
         ResultPath = "$.ebs",
-        Next = "lambda-ebs-attach"
+        Next = "snapshot-complete"
+      },
+      # 스냅샷 완료까지 Lambda를 붙잡지 않고 Wait → 진행 상황 조회 → 분기를 반복
+      "snapshot-complete" = {
+        Type = "Choice",
+        Choices = [
+          {
+            Variable = "$.ebs.failed",
+            BooleanEquals = true,
+            Next = "snapshot-failed-report"
+          },
+          {
+            Variable = "$.ebs.complete",
+            BooleanEquals = true,
+            Next = "lambda-ebs-attach"
+          }
+        ],
+        Default = "wait-snapshot"
+      },
+      "wait-snapshot" = {
+        Type = "Wait",
+        SecondsPath = "$.ebs.wait_seconds", # 진행률로 추정한 다음 조회 시점 (10~120초)
+        Next = "lambda-ebs-status"
+      },
+      "lambda-ebs-status" = {
+        Type = "Task",
+        Resource = "${aws_lambda_function.lambda_ebs_status.arn}",
+        Parameters = {
+          "instance_id.$" = "$.ebs.instance_id",
+          "image_id.$" = "$.ebs.image_id",
+          "snapshot_id.$" = "$.ebs.snapshot_id",
+          "snapshot_ids.$" = "$.ebs.snapshot_ids",
+          "snapshots.$" = "$.ebs.snapshots",
+          "polls.$" = "$.ebs.polls",
+          "trace" = local.sfn_trace
+        },
+        ResultPath = "$.ebs",
+        Next = "snapshot-complete"
+      },
+      # 실패도 담당자에게 알린 뒤 실행을 실패로 종료 (알림 전송이 실패해도 Fail 상태로)
+      "snapshot-failed-report" = {
+        Type = "Task",
+        Resource = "${aws_lambda_function.lambda_discord.arn}",
+        Parameters = {
+          "failure" = "snapshot",
+          "instance_id.$" = "$.isolate.instance_id",
+          "snapshot_id.$" = "$.ebs.snapshot_id",
+          "isolation_status.$" = "$.isolate.status",
+          "trace" = local.sfn_trace
+        },
+        ResultPath = "$.discord",
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"],
+            ResultPath = "$.discord_error",
+            Next = "snapshot-failed"
+          }
+        ],
+        Next = "snapshot-failed"
+      },
+      "snapshot-failed" = {
+        Type = "Fail",
+        Error = "SnapshotFailed",
+        Cause = "EBS snapshot entered error state or timed out"
       },
       "lambda-ebs-attach" = {
         Type = "Task",
         Resource = "${aws_lambda_function.lambda_ebs_attach.arn}",
         Parameters = {
-          "snapshot_id.$" = "$.ebs.snapshot_id"
+          "snapshot_id.$" = "$.ebs.snapshot_id",
+          "trace" = local.sfn_trace
         },
         ResultPath = "$.attach",
-        Next = "lambda-ssm"
+        Next = "volume-ready"
+      },
+      # Fast Snapshot Restore가 optimizing / enabled가 되기 전에는 볼륨을 만들지 않고 Wait → 재호출 반복
+      "volume-ready" = {
+        Type = "Choice",
+        Choices = [
+          {
+            Variable = "$.attach.ready",
+            BooleanEquals = true,
+            Next = "lambda-ssm"
+          }
+        ],
+        Default = "wait-fast-restore"
+      },
+      "wait-fast-restore" = {
+        Type = "Wait",
+        SecondsPath = "$.attach.wait_seconds",
+        Next = "lambda-ebs-attach-retry"
+      },
+      "lambda-ebs-attach-retry" = {
+        Type = "Task",
+        Resource = "${aws_lambda_function.lambda_ebs_attach.arn}",
+        InputPath = "$.attach",
+        ResultPath = "$.attach",
+        Next = "volume-ready"
       },
       "lambda-ssm" = {
         Type = "Task",
         Resource = "${aws_lambda_function.lambda_ssm.arn}",
         Parameters = {
-          "device.$" = "$.attach.device"
+          "device.$" = "$.attach.device",
+          "volume_id.$" = "$.attach.attached_volume_id",
+          "provisioned_at.$" = "$.attach.provisioned_at",
+          "image_id.$" = "$.ebs.image_id",
+          "trace" = local.sfn_trace
         },
         ResultPath = "$.ssm",
-        Next = "lambda-s3"
+        Next = "collection-complete"
+      },
+      # 수집 명령이 실제로 끝난 뒤에만 볼륨 정리 → 알림 단계로 진행 (Wait → 명령 상태 조회 → 분기 반복)
+      "collection-complete" = {
+        Type = "Choice",
+        Choices = [
+          {
+            Variable = "$.ssm.failed",
+            BooleanEquals = true,
+            Next = "lambda-ebs-cleanup"
+          },
+          {
+            Variable = "$.ssm.complete",
+            BooleanEquals = true,
+            Next = "lambda-ebs-cleanup"
+          }
+        ],
+        Default = "wait-collection"
+      },
+      "wait-collection" = {
+        Type = "Wait",
+        SecondsPath = "$.ssm.wait_seconds", # 경과 시간에 따라 2~30초
+        Next = "lambda-ssm-status"
+      },
+      "lambda-ssm-status" = {
+        Type = "Task",
+        Resource = "${aws_lambda_function.lambda_ssm_status.arn}",
+        InputPath = "$.ssm",
+        ResultPath = "$.ssm",
+        Next = "collection-complete"     # MAX_POLLS번 조회해도 끝나지 않으면 failed로 돌려줘 루프 종료
       },
-      "lambda-s3" = {
+      # 성공 / 실패와 관계없이 분석용 볼륨을 분리해 장치 이름(/dev/sdf~sdp)을 다음 조사에 반납 (삭제는 forensic_delete_volume)
+      "lambda-ebs-cleanup" = {
         Type = "Task",
-        Resource = "${aws_lambda_function.lambda_s3.arn}",
+        Resource = "${aws_lambda_function.lambda_ebs_cleanup.arn}",
         Parameters = {
-          "command_id.$" = "$.ssm.command_id"
+          "volume_id.$" = "$.attach.attached_volume_id",
+          "collection_failed.$" = "$.ssm.failed",
+          "trace" = local.sfn_trace
         },
-        ResultPath = "$.s3",
-        Next = "lambda-discord"
+        ResultPath = "$.cleanup",
+        Next = "collection-result"
+      },
+      "collection-result" = {
+        Type = "Choice",
+        Choices = [
+          {
+            Variable = "$.ssm.failed",
+            BooleanEquals = true,
+            Next = "collection-failed-report"
+          }
+        ],
+        Default = "lambda-discord"
+      },
+      "collection-failed-report" = {
+        Type = "Task",
+        Resource = "${aws_lambda_function.lambda_discord.arn}",
+        Parameters = {
+          "failure" = "collection",
+          "instance_id.$" = "$.isolate.instance_id",
+          "snapshot_id.$" = "$.ebs.snapshot_id",
+          "isolation_status.$" = "$.isolate.status",
+          "status.$" = "$.ssm.status",
+          "error.$" = "$.ssm.error",
+          "trace" = local.sfn_trace
+        },
+        ResultPath = "$.discord",
+        Catch = [
+          {
+            ErrorEquals = ["States.ALL"],
+            ResultPath = "$.discord_error",
+            Next = "collection-failed"
+          }
+        ],
+        Next = "collection-failed"
+      },
+      "collection-failed" = {
+        Type = "Fail",
+        Error = "CollectionFailed",
+        Cause = "Forensic collection SSM command failed, was cancelled, timed out or never reported (MAX_POLLS)"
       },
       "lambda-discord" = {
         Type = "Task",
@@ -60,9 +236,14 @@ resource "aws_sfn_state_machine" "malware_step" {
         Parameters = {
           "instance_id.$" = "$.isolate.instance_id",
           "snapshot_id.$" = "$.ebs.snapshot_id",
-          "s3_bucket.$" = "$.s3.s3_bucket",
-          "s3_key_prefix.$" = "$.s3.s3_key_prefix",
-          "isolation_status.$" = "$.isolate.status"
+          "snapshots.$" = "$.ebs.snapshots",
+          "provision_seconds.$" = "$.attach.provision_seconds",
+          "collection_seconds.$" = "$.ssm.durations",
+          "collection_summary.$" = "$.ssm.output",
+          "s3_bucket.$" = "$.ssm.s3_bucket",
+          "s3_key_prefix.$" = "$.ssm.s3_key_prefix",
+          "isolation_status.$" = "$.isolate.status",
+          "trace" = local.sfn_trace
         },
         ResultPath = "$.discord",
         End = true
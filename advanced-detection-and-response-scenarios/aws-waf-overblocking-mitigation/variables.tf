@@ -131,3 +131,85 @@ variable "sns_alarm_email" {
   type        = string
   description = "Email address to receive SNS malware alarms"
 }
+
+#--------------------------------------
+# EBS 스냅샷 완료 대기 한도 (lambda-ebs-status)
+#--------------------------------------
+variable "snapshot_timeout_seconds" {
+  type        = number
+  description = "Seconds to wait for forensic EBS snapshots before failing the workflow"
+  default     = 21600
+}
+
+#--------------------------------------
+# 분석용 볼륨 / 수집 설정 (lambda-ebs-attach, lambda-ssm)
+#--------------------------------------
+variable "forensic_volume_type" {
+  type        = string
+  description = "EBS volume type for the forensic volume restored from the snapshot"
+  default     = "gp3"
+}
+
+variable "forensic_volume_iops" {
+  type        = number
+  description = "Provisioned IOPS for gp3/io1/io2 forensic volumes"
+  default     = 6000
+}
+
+variable "forensic_volume_throughput" {
+  type        = number
+  description = "Provisioned throughput (MiB/s) for gp3 forensic volumes"
+  default     = 500
+}
+
+variable "forensic_fast_snapshot_restore" {
+  type        = bool
+  description = "Enable Fast Snapshot Restore in the analysis AZ before restoring (billed per hour, disabled right after volume creation)"
+  default     = false
+}
+
+variable "forensic_fsr_timeout_seconds" {
+  type        = number
+  description = "Seconds to wait for Fast Snapshot Restore to reach optimizing/enabled before restoring without it"
+  default     = 900
+}
+
+variable "forensic_delete_volume" {
+  type        = bool
+  description = "Delete the analysis volume after collection (false = only detach it and keep it for follow-up analysis)"
+  default     = false
+}
+
+variable "forensic_prewarm_mode" {
+  type        = string
+  description = "Block pre-warm before collection: targeted (collected paths only), full (whole volume) or off"
+  default     = "targeted"
+
+  validation {
+    condition     = contains(["targeted", "full", "off"], var.forensic_prewarm_mode)
+    error_message = "forensic_prewarm_mode must be targeted, full or off."
+  }
+}
+
+variable "forensic_hash_trust_metadata" {
+  type        = bool
+  description = "Skip hashing binaries whose inode/size/mtime/ctime match the AMI hash baseline (false = rehash everything; root on the infected host can forge ctime, so opt in only for speed)"
+  default     = false
+}
+
+variable "findings_batch_window" {
+  type        = number
+  description = "Seconds the findings buffer queue collects GuardDuty findings before one archive write (0-300)"
+  default     = 300
+
+  validation {
+    condition     = var.findings_batch_window >= 0 && var.findings_batch_window <= 300
+    error_message = "findings_batch_window must be between 0 and 300 seconds."
+  }
+}
+
+variable "findings_compaction_schedule" {
+  type        = string
+  description = "Schedule expression for merging the previous day's small finding archive objects"
+  default     = "cron(30 0 * * ? *)"
+}
@@ -0,0 +1,95 @@
+"""AbuseIPDB 단건 조회 vs 배치 조회 벤치마크 (로컬 mock 서버, 실제 API 호출 없음)
+
+500개 IP를 기존 방식(IP마다 lambda_handler 1회)과 batch_handler(스레드 풀 + 토큰 버킷 +
+로컬 FireHOL 목록 우선 조회)로 각각 처리해 소요 시간과 API 호출 수를 비교한다.
+
+    python bench/abuseipdb_batch_bench.py [--ips 500] [--latency 0.05] [--rate 100] [--listed 0.1]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'lambda_zips'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+
+
+class MockAbuseIPDB(BaseHTTPRequestHandler):
+    latency = 0.05
+    calls = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with MockAbuseIPDB.lock:
+            MockAbuseIPDB.calls += 1
+        time.sleep(self.latency)
+        body = json.dumps({"data": {
+            "countryCode": "KR", "isp": "Mock ISP", "abuseConfidenceScore": 42, "totalReports": 3,
+            "domain": "example.com", "usageType": "Data Center/Web Hosting/Transit", "hostnames": []
+        }}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ips", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock API 응답 지연(초)")
+    parser.add_argument("--rate", type=float, default=100, help="토큰 버킷 초당 호출 한도")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--listed", type=float, default=0.1, help="로컬 FireHOL 목록에 포함된 IP 비율")
+    args = parser.parse_args()
+
+    MockAbuseIPDB.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockAbuseIPDB)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+    os.environ["ABUSEIPDB_RATE_PER_SEC"] = str(args.rate)
+    os.environ["BATCH_CONCURRENCY"] = str(args.concurrency)
+    import abuseipdb_lookup_lambda as lookup
+    import threat_ip_matcher
+    from reputation_cache import ReputationCache
+    from threat_ip_matcher import ThreatIPMatcher
+
+    lookup.ABUSEIPDB_URL = f"http://127.0.0.1:{server.server_port}/api/v2/check"
+
+    ips = [f"203.0.{i // 256}.{i % 256}" for i in range(args.ips)]
+    listed = int(args.ips * args.listed)
+    firehol = ThreatIPMatcher.from_lines(f"{ip}/32" for ip in ips[:listed])
+
+    # 기존 방식: 실행마다 1 IP, 로컬 목록 없음
+    lookup.cache = ReputationCache()
+    threat_ip_matcher._matcher = ThreatIPMatcher.from_lines([])
+    MockAbuseIPDB.calls = 0
+    start = time.perf_counter()
+    for ip in ips:
+        lookup.lambda_handler({"ip": ip}, None)
+    sequential = time.perf_counter() - start
+    print(f"sequential : {sequential:7.2f}s  {args.ips / sequential:8.1f} IPs/s  api_calls={MockAbuseIPDB.calls}")
+
+    # 배치 방식: 스레드 풀 + 토큰 버킷 + 로컬 FireHOL 목록 우선
+    lookup.cache = ReputationCache()
+    threat_ip_matcher._matcher = firehol
+    MockAbuseIPDB.calls = 0
+    start = time.perf_counter()
+    result = lookup.batch_handler({"ips": ips}, None)
+    batched = time.perf_counter() - start
+    print(f"batched    : {batched:7.2f}s  {args.ips / batched:8.1f} IPs/s  api_calls={MockAbuseIPDB.calls}  "
+          f"sources={result['sources']}  speedup={sequential / batched:.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
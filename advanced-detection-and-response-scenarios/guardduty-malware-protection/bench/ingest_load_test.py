@@ -0,0 +1,252 @@
+"""API Gateway 트리거 수집 계층 부하 테스트 (가짜 시계 + stub Step Functions / SQS, AWS 호출 없음)
+
+--requests개의 차단 요청(소수의 공격 IP가 대부분을 차지 + 긴 꼬리 IP + 잘못된 요청)을 --duration초에 걸쳐
+보내고 상태 머신 실행이 몇 번 시작되는지 비교한다. 트리거 Lambda는 --containers개의 컨테이너
+(모듈을 따로 읽은 사본, 컨테이너별 중복 제거 캐시)가 번갈아 처리하고, 429를 받은 클라이언트는
+Retry-After 후 최대 3번 재시도한다.
+
+  legacy : 요청마다 start_execution (IP가 없으면 0.0.0.0으로 실행)
+  direct : 검증 + IP별 중복 제거(실행 이름 = IP + 윈도우 번호) + 실행 적체 429
+  queue  : 검증 + 중복 제거 + 수집 큐 → batch_handler가 배치 윈도우마다 서로 다른 IP를 실행 하나로
+
+--slow를 주면 실행 시간이 길어진 상황(예: AbuseIPDB 장애)에서 적체 한도가 실행 수를 묶는지 확인한다.
+direct 모드는 컨테이너마다 적체 값을 5초 캐시하므로(ListExecutions 충전 속도 초당 2회) 그 사이 한도를
+넘을 수 있고, queue 모드는 배치 실행기 하나만 실행을 시작하므로 한도 안에 머문다.
+
+    python bench/ingest_load_test.py [--requests 10000] [--duration 120] [--slow]
+"""
+import argparse
+import heapq
+import importlib.util
+import itertools
+import json
+import math
+import os
+import random
+import sys
+
+from botocore.exceptions import ClientError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'lambda_zips'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+os.environ.update({'STEP_FUNCTION_ARN': 'arn:aws:states:ap-northeast-2:123456789012:stateMachine:waf-step-function',
+                   'THREAT_LIST_BUCKET': ''})
+
+MAP_CONCURRENCY = 10
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubStepFunctions:
+    """실행 이름 중복 / RUNNING 목록을 흉내 내는 stub (STANDARD 의미)"""
+
+    def __init__(self, clock, slow):
+        self.clock = clock
+        self.slow = slow
+        self.executions = {}
+        self.started = 0
+        self.ips = set()
+        self.peak = 0
+
+    def duration(self, data):
+        n = len(data.get('ips', [])) or 1
+        base = 1.2 if n == 1 else 0.6 + math.ceil(n / MAP_CONCURRENCY) * 0.55 + 0.3
+        return base * (25 if self.slow else 1)
+
+    def running(self):
+        return [name for name, (_, end) in self.executions.items() if end > self.clock()]
+
+    def start_execution(self, stateMachineArn, input, name=None):
+        name = name or f"auto-{self.started}"
+        if name in self.executions:
+            same_input, end = self.executions[name][0] == input, self.executions[name][1]
+            if same_input and end > self.clock():
+                return {'executionArn': f"arn:execution:{name}"}
+            raise ClientError({'Error': {'Code': 'ExecutionAlreadyExists', 'Message': name}}, 'StartExecution')
+        data = json.loads(input)
+        self.executions[name] = (input, self.clock() + self.duration(data))
+        self.started += 1
+        self.ips.update(data.get('ips') or [data.get('ip')])
+        self.peak = max(self.peak, len(self.running()))
+        return {'executionArn': f"arn:execution:{name}"}
+
+    def list_executions(self, stateMachineArn, statusFilter, maxResults):
+        running = self.running()
+        page = {'executions': [{'name': n} for n in running[:maxResults]]}
+        if len(running) > maxResults:
+            page['nextToken'] = 'more'
+        return page
+
+
+class StubSQS:
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages = []          # (보이는 시각, id, body)
+        self.ids = itertools.count()
+        self.max_depth = 0
+        self.sent = 0
+        self.requeued = 0           # 실패로 돌려보낸 메시지 (수신 횟수 증가 → maxReceiveCount 대상)
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0):
+        self.messages.append((self.clock() + DelaySeconds, str(next(self.ids)), MessageBody))
+        self.max_depth = max(self.max_depth, len(self.messages))
+        self.sent += 1
+
+    def send_message_batch(self, QueueUrl, Entries):
+        for entry in Entries:
+            self.send_message(QueueUrl, entry['MessageBody'], entry.get('DelaySeconds', 0))
+        return {'Successful': [{'Id': e['Id']} for e in Entries], 'Failed': []}
+
+    def get_queue_attributes(self, QueueUrl, AttributeNames):
+        return {'Attributes': {'ApproximateNumberOfMessages': str(len(self.messages))}}
+
+    def receive(self, limit=1000):
+        visible = [m for m in self.messages if m[0] <= self.clock()][:limit]
+        taken = {m[1] for m in visible}
+        self.messages = [m for m in self.messages if m[1] not in taken]
+        return visible
+
+    def requeue(self, message, visibility=60):
+        self.messages.append((self.clock() + visibility, message[1], message[2]))
+        self.requeued += 1
+
+
+def load_container(clock, sfn, sqs, queue_url):
+    spec = importlib.util.spec_from_file_location('gateway_trigger_lambda',
+                                                  os.path.join(HERE, '..', 'lambda_zips', 'gateway_trigger_lambda.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.print = lambda *a, **k: None
+    module.clock = clock
+    module.stepfunctions = sfn
+    module.sqs = sqs
+    module.INGEST_QUEUE_URL = queue_url
+    return module
+
+
+def workload(args):
+    rng = random.Random(args.seed)
+    heavy = [f"203.0.113.{i}" for i in range(1, 21)]
+    tail = [f"198.51.{i // 250}.{i % 250 + 1}" for i in range(800)]
+    requests = []
+    for i in range(args.requests):
+        t = rng.uniform(0, args.duration)
+        r = rng.random()
+        if r < 0.02:
+            payload = rng.choice([{}, {"ip": "not-an-ip"}, {"ip": "0.0.0.0"}, {"ip": "127.0.0.1"},
+                                  {"ip": heavy[0], "event_count": "many"}])
+        else:
+            payload = {"ip": rng.choice(heavy) if r < 0.62 else rng.choice(tail), "rule_id": "sqli-rule",
+                       "event_count": rng.randint(1, 5), "timestamp": f"t{i}"}
+        requests.append((t, i, payload))
+    requests.sort()
+    valid = {p['ip'] for _, _, p in requests if p.get('ip') and p['ip'][0].isdigit() and
+             p['ip'] not in ("0.0.0.0", "127.0.0.1") and not isinstance(p.get('event_count', 1), str)}
+    return requests, valid
+
+
+def run_legacy(requests, args):
+    sfn = StubStepFunctions(Clock(), args.slow)
+    for t, _, payload in requests:
+        sfn.clock.now = t
+        ip = payload.get('ip') or payload.get('source_ip') or "0.0.0.0"
+        sfn.start_execution(stateMachineArn='waf', input=json.dumps({"ip": ip, **payload}))
+    return {'executions': sfn.started, 'peak': sfn.peak, 'codes': {200: len(requests)}, 'ips': sfn.ips}
+
+
+def run_ingest(requests, args, queued):
+    clock = Clock()
+    sfn = StubStepFunctions(clock, args.slow)
+    sqs = StubSQS(clock)
+    url = "https://sqs.invalid/waf-step-ingest" if queued else None
+    containers = [load_container(clock, sfn, sqs, url) for _ in range(args.containers)]
+    batcher = load_container(clock, sfn, sqs, None)
+    batcher.DEFER_QUEUE_URL = url
+    for module in containers + [batcher]:
+        module.MAX_RUNNING = args.max_running
+
+    codes, accepted = {}, set()
+    events = [(t, 0, i, payload, 0) for t, i, payload in requests]
+    heapq.heapify(events)
+    if queued:
+        for tick in range(0, int(args.duration * 3 / args.batch_window) + 1):
+            heapq.heappush(events, (tick * args.batch_window, 1, -1, None, 0))
+    retries_left = 3
+    rr = itertools.count()
+    while events:
+        t, kind, i, payload, attempt = heapq.heappop(events)
+        clock.now = t
+        if kind == 1:                                        # SQS 이벤트 소스 매핑이 배치 전달
+            for start in range(0, 10**9, 1000):
+                batch = sqs.receive(1000)
+                if not batch:
+                    break
+                records = [{'messageId': m[1], 'body': m[2]} for m in batch]
+                failed = {f['itemIdentifier'] for f in batcher.batch_handler({'Records': records}, None)['batchItemFailures']}
+                for m in batch:
+                    if m[1] in failed:
+                        sqs.requeue(m)
+            continue
+        module = containers[next(rr) % len(containers)]
+        result = module.lambda_handler({'body': json.dumps(payload)}, None)
+        code = result['statusCode']
+        codes[code] = codes.get(code, 0) + 1
+        if code in (200, 202):
+            accepted.add(payload['ip'])
+        if code == 429 and attempt < retries_left:
+            retry_after = float(result['headers']['Retry-After'])
+            heapq.heappush(events, (t + retry_after, 0, i, payload, attempt + 1))
+    return {'executions': sfn.started, 'peak': sfn.peak, 'codes': codes, 'ips': sfn.ips, 'max_queue': sqs.max_depth,
+            'accepted': accepted, 'requeued': sqs.requeued}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=120, help="요청을 보내는 기간(초)")
+    parser.add_argument("--containers", type=int, default=10, help="동시에 떠 있는 트리거 Lambda 컨테이너 수")
+    parser.add_argument("--batch-window", type=float, default=5)
+    parser.add_argument("--max-running", type=int, default=200)
+    parser.add_argument("--slow", action="store_true", help="실행 시간 25배 (하위 단계 장애 상황)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    requests, valid = workload(args)
+    print(f"{len(requests)} requests over {args.duration:.0f}s, {len(valid)} distinct valid IPs, "
+          f"{args.containers} trigger containers{', slow executions' if args.slow else ''}")
+    print(f"  {'mode':7} | {'executions':>10} {'per 10k':>8} | {'peak running':>12} | {'IPs covered':>11} | responses")
+    for label, runner in (("legacy", lambda: run_legacy(requests, args)),
+                          ("direct", lambda: run_ingest(requests, args, False)),
+                          ("queue", lambda: run_ingest(requests, args, True))):
+        result = runner()
+        covered = len(result['ips'] & valid)
+        codes = " ".join(f"{code}={count}" for code, count in sorted(result['codes'].items()))
+        extra = f"  max queue depth {result['max_queue']}" if result.get('max_queue') else ""
+        print(f"  {label:7} | {result['executions']:10d} {result['executions'] * 10000 / len(requests):8.0f} | "
+              f"{result['peak']:12d} | {covered:5d}/{len(valid):<5d} | {codes}{extra}")
+        if label == "legacy":
+            assert "0.0.0.0" in result['ips']
+            legacy_peak = result['peak']
+            continue
+        # 잘못된 요청은 실행 없이 400, 받아들인(200/202) IP는 모두 실행에 포함
+        assert "0.0.0.0" not in result['ips'] and result['codes'].get(400, 0) > 0
+        assert result['accepted'] <= result['ips'], sorted(result['accepted'] - result['ips'])[:5]
+        if not args.slow:
+            assert covered == len(valid), sorted(valid - result['ips'])[:5]
+        # 적체로 미룬 배치는 지연 재전송 - 실패로 돌려보내 수신 횟수(maxReceiveCount)를 쓰지 않음
+        assert result.get('requeued', 0) == 0, result['requeued']
+        # queue: 배치 실행기만 실행을 시작하므로 한도를 넘지 않음
+        # direct: 컨테이너마다 적체 값을 BACKLOG_CACHE_SECONDS 동안 재사용하므로 그 사이 컨테이너 수만큼 초과 가능
+        assert result['peak'] <= args.max_running if label == "queue" or not args.slow else result['peak'] < legacy_peak / 4
+
+
+if __name__ == "__main__":
+    main()
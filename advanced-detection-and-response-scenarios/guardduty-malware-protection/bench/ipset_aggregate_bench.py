@@ -0,0 +1,72 @@
+"""CIDR 병합 / IPSet 용량 관리 벤치마크 (로컬 stub, AWS 호출 없음)
+
+10만 개 합성 공격 IP(연속 스캔 대역 + 산발 IP)를 prefix 트라이로 병합해
+결과 CIDR 개수와 소요 시간을 출력하고, ipaddress.collapse_addresses 결과와 비교한다.
+이어서 용량 관리자가 샤드 IPSet에 배분한 결과(샤드별 개수, LRU 축출 수)를 출력한다.
+
+    python bench/ipset_aggregate_bench.py [--ips 100000] [--shards 2] [--seed 7]
+"""
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda_zips'))
+
+from ipset_capacity import IPSetCapacityManager, MemoryStateStore, build_trie  # noqa: E402
+from ipset_load_test import StubWAF  # noqa: E402
+
+
+def synthetic_attack(count, seed):
+    rng = random.Random(seed)
+    ips = []
+    # 60%: /20 대역 안을 순차적으로 훑는 스캐너 (인접 /32가 대량 발생)
+    while len(ips) < count * 0.6:
+        base = rng.randrange(1 << 12, 1 << 20) << 12
+        start = rng.randrange(0, 1 << 11)
+        length = rng.randrange(64, 2048)
+        ips.extend(base + start + i for i in range(length))
+    # 40%: 산발적인 단일 IP (일부는 중복)
+    while len(ips) < count:
+        ips.append(rng.randrange(1 << 24, 0xDFFFFFFF))
+    rng.shuffle(ips)
+    return [str(ipaddress.IPv4Address(ip)) for ip in ips[:count]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ips", type=int, default=100000)
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    ips = synthetic_attack(args.ips, args.seed)
+    print(f"input IPs: {len(ips)} (unique {len(set(ips))})")
+
+    start = time.perf_counter()
+    cidrs = build_trie(f"{ip}/32" for ip in ips).cidrs()
+    trie_time = time.perf_counter() - start
+    print(f"prefix trie       : {len(cidrs):>7} CIDRs  {trie_time:.3f}s")
+
+    start = time.perf_counter()
+    reference = [str(n) for n in ipaddress.collapse_addresses(ipaddress.IPv4Network(ip) for ip in ips)]
+    ref_time = time.perf_counter() - start
+    print(f"collapse_addresses: {len(reference):>7} CIDRs  {ref_time:.3f}s  "
+          f"(match={sorted(reference) == sorted(cidrs)})")
+
+    # 용량 관리자: 샤드당 10,000개 한도에서 배분
+    waf = StubWAF(latency=0)
+    shards = [{"name": f"shard-{i}", "id": f"shard-{i}"} for i in range(args.shards)]
+    clock = iter(range(len(ips) + 1))
+    store = MemoryStateStore({f"{ip}/32": next(clock) for ip in ips})
+    manager = IPSetCapacityManager(waf, shards, store, clock=lambda: len(ips))
+    start = time.perf_counter()
+    result = manager.apply([])
+    print(f"capacity manager  : {result['cidrs']:>7} CIDRs  {time.perf_counter() - start:.3f}s  "
+          f"shards={result['shards']} expired={result['expired']} evicted={result['evicted']}")
+
+
+if __name__ == "__main__":
+    main()
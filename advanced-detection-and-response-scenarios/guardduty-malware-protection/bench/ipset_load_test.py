@@ -0,0 +1,123 @@
+"""IPSet 반영 부하 테스트 (로컬 stub, AWS 호출 없음)
+
+기존 방식(실행마다 get_ip_set → append → update_ip_set)과 배치 작성기(ipset_writer)를
+1k / 10k IP 버스트로 비교해 초당 반영 IP 수와 유실 건수를 출력한다.
+
+    python bench/ipset_load_test.py [--latency 0.02] [--executions 50]
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda_zips'))
+
+from ipset_writer import IPSetWriter  # noqa: E402
+
+
+class StubWAF:
+    """LockToken 낙관적 잠금을 흉내 내는 메모리 기반 wafv2 클라이언트"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.addresses = []
+        self.token = 0
+        self.calls = 0
+
+    def get_ip_set(self, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            return {"IPSet": {"Addresses": list(self.addresses)}, "LockToken": str(self.token)}
+
+    def update_ip_set(self, Addresses, LockToken, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            if LockToken != str(self.token):
+                raise ClientError(
+                    {"Error": {"Code": "WAFOptimisticLockException", "Message": "stale LockToken"}},
+                    "UpdateIPSet"
+                )
+            self.addresses = list(Addresses)
+            self.token += 1
+            return {"NextLockToken": str(self.token)}
+
+
+def burst(count):
+    # 10.0.0.0/8 대역에서 서로 다른 IP를 생성
+    return [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(1, count + 1)]
+
+
+def legacy_add(waf, ip):
+    # 기존 ipset_add_lambda와 동일한 실행당 1회 왕복 (재시도 없음)
+    try:
+        response = waf.get_ip_set(Name="bench", Scope="REGIONAL", Id="bench")
+        addresses = response['IPSet']['Addresses']
+        ip_cidr = f"{ip}/32"
+        if ip_cidr in addresses:
+            return "skipped"
+        addresses.append(ip_cidr)
+        waf.update_ip_set(Name="bench", Scope="REGIONAL", Id="bench",
+                          Addresses=addresses, LockToken=response['LockToken'])
+        return "success"
+    except Exception:
+        return "error"
+
+
+def run_legacy(ips, latency, executions):
+    waf = StubWAF(latency)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=executions) as pool:
+        results = list(pool.map(lambda ip: legacy_add(waf, ip), ips))
+    elapsed = time.perf_counter() - start
+    return elapsed, len(waf.addresses), results.count("error"), waf.calls
+
+
+def run_batched(ips, latency, batch_size, consumers):
+    waf = StubWAF(latency)
+    batches = [ips[i:i + batch_size] for i in range(0, len(ips), batch_size)]
+    writer = IPSetWriter(waf, "bench", "bench", base_delay=latency)
+    failed = itertools.count()
+
+    def flush(batch):
+        try:
+            writer.apply(batch)
+        except ClientError:
+            next(failed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=consumers) as pool:
+        list(pool.map(flush, batches))
+    elapsed = time.perf_counter() - start
+    return elapsed, len(waf.addresses), next(failed), waf.calls
+
+
+def report(label, total, elapsed, stored, errors, calls):
+    print(f"  {label:<28} {stored / elapsed:>10.1f} IPs/s  stored={stored:>6}/{total:<6} "
+          f"dropped={total - stored:>6} errors={errors:>5} api_calls={calls:>6} time={elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02, help="WAF API 호출당 지연(초)")
+    parser.add_argument("--executions", type=int, default=50, help="동시 Step Functions 실행 수")
+    parser.add_argument("--batch-size", type=int, default=1000, help="SQS 배치 크기")
+    args = parser.parse_args()
+
+    for count in (1000, 10000):
+        ips = burst(count)
+        print(f"[burst {count} IPs]")
+        report(f"legacy x{args.executions}", count, *run_legacy(ips, args.latency, args.executions))
+        report("batched x1 consumer", count, *run_batched(ips, args.latency, args.batch_size, 1))
+        report("batched x4 consumers", count, *run_batched(ips, args.latency, args.batch_size, 4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""WAF 로그 스트리밍 분석기 처리량 / 최대 메모리 (합성 Firehose 객체, AWS 호출 없음)
+
+Firehose가 waf/ 아래에 쌓는 것과 같은 gzip 객체(비압축 약 5MB씩)로 합성 WAF 로그 --size-mb를 만든다.
+  - 정상 클라이언트 --clients명(대부분 허용, 일부 요청은 SQLi 룰 오탐으로 차단)
+  - 공격자 300개 IP, 그중 하나가 20% (block-bad-ips / managed-core/SQLi_QUERYARGUMENTS 로 꾸준히 차단)
+  - 전체 기간의 2/3 지점부터 managed-core/SizeRestrictions_BODY가 정상 사용자의 업로드(POST)를 차단 (과차단)
+  - 일부 줄은 uri에 이스케이프 문자가 있어 fast path 대신 json.loads로 처리됨
+
+각 방식을 별도 프로세스에서 실행해 records/s 와 최대 RSS(ru_maxrss)를 비교한다.
+
+  json    : 줄마다 json.loads 후 집계 (WafLogAnalyzer(fast=False))
+  fast    : 필요한 필드만 바이트 검색 (parse_fast, 실패한 줄만 json.loads)
+  handler : 실제 waf_log_analyzer_lambda.lambda_handler를 객체마다 호출 (S3 상태 파일 읽기 / 쓰기 포함)
+
+과차단 룰만, 시작 윈도우에서 처음 탐지되는지와 HLL / 상위 IP 추정치가 정확한 값과 가까운지 확인한다.
+
+    python bench/waf_log_analyzer_bench.py [--size-mb 1024] [--data /tmp/waf-log-bench]
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'lambda_zips'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+
+import waf_log_stats  # noqa: E402
+
+OBJECT_BYTES = 5 * 1024 * 1024       # Firehose buffering_size = 5MB
+START = 1789999800                   # 합성 로그 시작 시각 (윈도우 경계에 맞춤)
+WINDOWS = 24                         # 2시간
+INCIDENT_WINDOW = 16
+OVERBLOCK_RULE = "managed-core/SizeRestrictions_BODY"
+WEBACL = "arn:aws:wafv2:ap-northeast-2:123456789012:regional/webacl/waf-dvwa/0f1e2d3c"
+UAS = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36",
+       "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15",
+       "Mozilla/5.0 (iPhone; CPU iPhone OS 17_6 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148"]
+ATTACK_UAS = ["sqlmap/1.8.3#stable (https://sqlmap.org)", "python-requests/2.31.0", "Nikto/2.5.0"]
+LEGIT_URIS = ["/", "/login.php", "/index.php", "/vulnerabilities/xss_r/", "/dvwa/css/main.css", "/dvwa/js/dvwaPage.js",
+              "/favicon.ico", "/about.php", "/instructions.php", "/setup.php"]
+ATTACK_URIS = ["/vulnerabilities/sqli/", "/vulnerabilities/exec/", "/.env", "/wp-login.php", "/phpmyadmin/index.php"]
+
+LINE = ('{"timestamp":%d,"formatVersion":1,"webaclId":"' + WEBACL + '","terminatingRuleId":"%s",'
+        '"terminatingRuleType":"%s","action":"%s","terminatingRuleMatchDetails":[],"httpSourceName":"ALB",'
+        '"httpSourceId":"123456789012-app/alb-dvwa/50dc6c495c0c9188","ruleGroupList":[{"ruleGroupId":'
+        '"AWS#AWSManagedRulesCommonRuleSet","terminatingRule":%s,"nonTerminatingMatchingRules":[],"excludedRules":null,'
+        '"customerConfig":null}],"rateBasedRuleList":[],"nonTerminatingMatchingRules":[],"requestHeadersInserted":null,'
+        '"responseCodeSent":null,"httpRequest":{"clientIp":"%s","country":"%s","headers":[{"name":"Host","value":'
+        '"alb-dvwa-1234567890.ap-northeast-2.elb.amazonaws.com"},{"name":"User-Agent","value":"%s"},{"name":"Accept",'
+        '"value":"text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"},{"name":"Accept-Language","value":'
+        '"ko-KR,ko;q=0.9,en-US;q=0.8"},{"name":"Cookie","value":"PHPSESSID=%032x; security=low"}],"uri":"%s",'
+        '"args":"%s","httpVersion":"HTTP/1.1","httpMethod":"%s","requestId":"1-%08x-%024x"},"labels":[]}\n')
+
+
+def line(rng, ts, client, country, ua, uri, args, method, action, rule):
+    if rule.startswith("managed-core/"):
+        rule_id, rule_type = "managed-core", "MANAGED_RULE_GROUP"
+        terminating = '{"ruleId":"%s","action":"BLOCK","ruleMatchDetails":null}' % rule.split('/', 1)[1]
+    else:
+        rule_id, rule_type, terminating = rule, ("REGULAR" if action == "BLOCK" else "RULE"), "null"
+    return LINE % (ts * 1000 + rng.randrange(1000), rule_id, rule_type, action, terminating, client, country, ua,
+                   rng.getrandbits(128), json.dumps(uri)[1:-1], args, method, ts, rng.getrandbits(96))
+
+
+def generate(args, directory):
+    """합성 WAF 로그 객체 생성 + 정확한 윈도우별 집계(검증용) 저장"""
+    rng = random.Random(args.seed)
+    legit = [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(1, args.clients + 1)]
+    legit = [f"{rng.randrange(1, 223)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+             for _ in legit]
+    attackers = [f"203.0.113.{i}" for i in range(1, 201)] + [f"198.51.100.{i}" for i in range(1, 101)]
+    sample = line(rng, START, legit[0], "KR", UAS[0], "/", "", "GET", "ALLOW", "Default_Action")
+    total = args.size_mb * 1024 * 1024 // len(sample)
+    per_window = total // WINDOWS
+    truth = {}
+    last_allowed = {}                                            # 클라이언트 → 마지막으로 허용된 윈도우
+    buffer, size, objects, written = [], 0, 0, 0
+
+    def flush():
+        nonlocal buffer, size, objects
+        if not buffer:
+            return
+        ts = time.gmtime(START + (written * WINDOWS * 300) // total)
+        name = time.strftime("waf/%Y/%m/%d/%H/aws-waf-logs-siem-1-%Y-%m-%d-%H-%M-%S-", ts) + f"{objects:06d}.gz"
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(gzip.compress("".join(buffer).encode(), compresslevel=6))
+        objects += 1
+        buffer, size = [], 0
+
+    for w in range(WINDOWS):
+        stats = truth.setdefault(w * 300 + START, {})
+        for n in range(per_window):
+            ts = START + w * 300 + n * 300 // per_window
+            r = rng.random()
+            if r < 0.10:                                         # 공격자
+                client = attackers[0] if rng.random() < 0.2 else rng.choice(attackers)   # 상위 IP 하나
+                rule = "block-bad-ips" if r < 0.07 else "managed-core/SQLi_QUERYARGUMENTS"
+                text = line(rng, ts, client, rng.choice(["RU", "CN", "BR"]), rng.choice(ATTACK_UAS),
+                            rng.choice(ATTACK_URIS), "id=1%27%20OR%201%3D1--", "GET", "BLOCK", rule)
+            else:                                                # 정상 사용자
+                client = rng.choice(legit)
+                uri, method, action, rule = rng.choice(LEGIT_URIS), "GET", "ALLOW", "Default_Action"
+                if r < 0.18:
+                    uri, method = "/vulnerabilities/upload/", "POST"
+                    if w >= INCIDENT_WINDOW:
+                        action, rule = "BLOCK", OVERBLOCK_RULE
+                elif r < 0.18005:
+                    action, rule = "BLOCK", "managed-core/SQLi_QUERYARGUMENTS"   # 드문 오탐
+                if rng.random() < 0.002:
+                    uri = uri + 'search"q'                       # 이스케이프 → fallback 경로
+                text = line(rng, ts, client, "KR", rng.choice(UAS), uri, "", method, action, rule)
+            if "BLOCK" in text[:400]:
+                s = stats.setdefault(rule, {'blocked': 0, 'clients': set(), 'legit': set(), 'legit_max': set(),
+                                            'ips': {}})
+                s['blocked'] += 1
+                s['clients'].add(client)
+                s['ips'][client] = s['ips'].get(client, 0) + 1
+                # 분석기와 같은 기준: 보관 윈도우 안에서 이전에 허용된 적이 있는 클라이언트
+                # (만료는 evaluate() 때만 하므로 객체 하나가 걸친 만큼 오래된 윈도우가 더 남아 있을 수 있음 → legit_max)
+                age = w - last_allowed.get(client, -2 * WINDOWS)
+                if age < waf_log_stats.WINDOW_COUNT:
+                    s['legit'].add(client)
+                if age < waf_log_stats.WINDOW_COUNT + 2:
+                    s['legit_max'].add(client)
+            else:
+                last_allowed[client] = w
+            buffer.append(text)
+            size += len(text)
+            written += 1
+            if size >= OBJECT_BYTES:
+                flush()
+    flush()
+    summary = {str(start): {rule: {'blocked': s['blocked'], 'clients': len(s['clients']), 'legit': len(s['legit']),
+                                   'legit_max': len(s['legit_max']),
+                                   'top_ip': max(s['ips'], key=s['ips'].get)} for rule, s in rules.items()}
+               for start, rules in truth.items()}
+    with open(os.path.join(directory, 'truth.json'), 'w') as f:
+        json.dump({'records': written, 'objects': objects, 'summary': summary}, f)
+
+
+def object_paths(directory):
+    paths = []
+    for root, _, files in os.walk(os.path.join(directory, 'waf')):
+        paths.extend(os.path.join(root, f) for f in files)
+    return sorted(paths)
+
+
+class FileS3:
+    """로그 객체는 디스크 파일을 스트리밍, 상태 / 보고서는 메모리에 보관"""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.memory = {}
+
+    def get_object(self, Bucket, Key):
+        if Key in self.memory:
+            return {'Body': io.BytesIO(self.memory[Key])}
+        path = os.path.join(self.directory, Key)
+        if not os.path.exists(path):
+            raise self.exceptions.NoSuchKey(Key)
+        return {'Body': open(path, 'rb')}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.memory[Key] = Body if isinstance(Body, bytes) else Body.encode()
+
+
+def run(mode, directory):
+    """자식 프로세스: 한 방식으로 전체 객체를 처리하고 결과를 JSON으로 출력"""
+    paths = object_paths(directory)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    flags = []
+    start = time.perf_counter()
+    if mode == "handler":
+        import waf_log_analyzer_lambda as handler
+        handler.s3 = FileS3(directory)
+        handler.print = lambda *a, **k: None
+        for path in paths:
+            key = os.path.relpath(path, directory)
+            event = {'Records': [{'s3': {'bucket': {'name': 'waf-logs-bucket-whs'}, 'object': {'key': key}}}]}
+            flags.extend(handler.lambda_handler(event, None)['flags'])
+        state = json.loads(gzip.decompress(handler.s3.memory[handler.STATE_KEY]))
+        analyzer = waf_log_stats.WafLogAnalyzer.from_state(state)
+        state_bytes = len(handler.s3.memory[handler.STATE_KEY])
+    else:
+        analyzer = waf_log_stats.WafLogAnalyzer(fast=(mode == "fast"))
+        for path in paths:
+            with open(path, 'rb') as f:
+                analyzer.consume(gzip.GzipFile(fileobj=f))
+            flags.extend(analyzer.evaluate())
+        state_bytes = len(gzip.compress(json.dumps(analyzer.to_state()).encode(), compresslevel=1))
+    elapsed = time.perf_counter() - start
+    estimates = {str(w.start): {rule: {'blocked': rw.blocked, 'clients': rw.clients.count(),
+                                       'legit': rw.legit.count(), 'top_ip': rw.ips.top(1)[0][0]}
+                                for rule, rw in w.rules.items()} for w in analyzer.windows.values()}
+    print(json.dumps({'seconds': elapsed, 'stats': analyzer.stats, 'flags': flags, 'estimates': estimates,
+                      'state_bytes': state_bytes, 'baseline_rss_kb': baseline_rss,
+                      'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=1024, help="합성 WAF 로그 크기(비압축 MB)")
+    parser.add_argument("--clients", type=int, default=20000)
+    parser.add_argument("--data", help="합성 로그 위치 (같은 크기로 다시 실행하면 재사용)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    directory = args.data or os.path.join(tempfile.gettempdir(), f"waf-log-bench-{args.size_mb}mb-{args.seed}")
+    if args.run:
+        return run(args.run, directory)
+
+    if not os.path.exists(os.path.join(directory, 'truth.json')):
+        start = time.perf_counter()
+        generate(args, directory)
+        print(f"generated in {time.perf_counter() - start:.0f}s")
+    with open(os.path.join(directory, 'truth.json')) as f:
+        truth = json.load(f)
+    compressed = sum(os.path.getsize(p) for p in object_paths(directory))
+    print(f"{truth['records']} records, {args.size_mb} MB raw / {compressed / 2**20:.0f} MB gzip in {truth['objects']} "
+          f"objects, {WINDOWS} windows of {waf_log_stats.WINDOW_SECONDS}s, overblocking from window {INCIDENT_WINDOW}")
+
+    results = {}
+    for mode in ("json", "fast", "handler"):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", mode, "--data", directory],
+                             check=True, capture_output=True, text=True).stdout
+        result = results[mode] = json.loads(out)
+        flagged = sorted({(f['rule'], f['window_start']) for f in result['flags']})
+        print(f"  {mode:8}: {result['stats']['records'] / result['seconds']:9.0f} records/s  "
+              f"{result['seconds']:6.1f}s  peak RSS {result['peak_rss_kb'] / 1024:6.1f} MB "
+              f"(after imports {result['baseline_rss_kb'] / 1024:5.1f} MB)  fallback {result['stats']['fallback']}  "
+              f"state {result['state_bytes'] / 1024:.0f} KB  flags {len(flagged)}")
+
+    for flag in results['fast']['flags'][:3]:
+        print(f"    flag: window {(flag['window_start'] - START) // 300:2d} {flag['rule']} {flag['reasons']} "
+              f"block_rate {flag['block_rate']} (baseline {flag['baseline_block_rate']}) legit_clients "
+              f"{flag['legit_clients']} (baseline {flag['baseline_legit_clients']})")
+
+    # 모든 방식이 같은 레코드 수 / 같은 탐지 결과
+    for mode, result in results.items():
+        assert result['stats']['records'] == truth['records'] and result['stats']['invalid'] == 0, mode
+        assert {f['rule'] for f in result['flags']} == {OVERBLOCK_RULE}, (mode, result['flags'][:2])
+        assert min(f['window_start'] for f in result['flags']) == START + INCIDENT_WINDOW * 300, mode
+    assert results['fast']['flags'] == results['json']['flags'] == results['handler']['flags']
+
+    # 마지막 윈도우들의 HLL / 상위 IP 추정치 vs 정확한 값
+    worst = 0.0
+    for start, rules in results['fast']['estimates'].items():
+        for rule, estimate in rules.items():
+            exact = truth['summary'][start][rule]
+            assert estimate['blocked'] == exact['blocked']
+            if exact['clients'] >= 100:
+                worst = max(worst, abs(estimate['clients'] - exact['clients']) / exact['clients'])
+            if exact['legit'] >= 100:
+                assert exact['legit'] * 0.92 <= estimate['legit'] <= exact['legit_max'] * 1.08, (start, rule, estimate)
+            if rule == "block-bad-ips":
+                assert estimate['top_ip'] == exact['top_ip'] == '203.0.113.1'
+    print(f"  HLL distinct-client error (max over retained windows, counts >= 100): {worst:.1%}")
+    assert worst < 0.08
+
+
+if __name__ == "__main__":
+    main()
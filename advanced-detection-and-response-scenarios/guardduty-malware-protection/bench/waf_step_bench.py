@@ -0,0 +1,501 @@
+"""waf_step 상태 머신 로컬 실행 비교 (ASL 에뮬레이터 + 실제 Lambda 핸들러 + stub 서비스, AWS 호출 없음)
+
+stepfunctions/waf_step.asl.json을 그대로 읽어(templatefile 변수만 치환) 아래 상태를 지원하는 작은
+ASL 인터프리터로 실행한다: Task / Parallel / Map(INLINE, 비교용 이전 정의) / Choice / Pass / Fail,
+InputPath / Parameters / ItemSelector / ResultSelector / ResultPath / OutputPath, Retry / Catch,
+States.JsonMerge, 컨텍스트 객체($$.Execution / $$.Map). Task는 lambda_zips의 핸들러를 직접 호출하고 외부 서비스만 stub으로 대신한다.
+
+  WAF IPSet   : LockToken 낙관적 잠금 stub (ipset_load_test.StubWAF), 호출당 --waf-latency
+  AbuseIPDB   : fetch_reputation 대체, 로그 정규 분포 지연 (중앙값 --abuse-latency), 토큰 버킷 --abuse-rate/초
+  Discord     : notifier.Notifier + stub HTTP, 요청당 --discord-latency
+
+비교 대상 (지연 시간은 AWS 기준 초, 실제 실행은 --speedup배 빠르게)
+
+  sequential  : 기존 정의 (ipset-add → abuseipdb-lookup → discord 순차)
+  parallel    : 새 정의 단일 IP 경로 (IPSet 추가 ∥ 조회 → 알림)
+  map         : 새 정의 "ips" 경로 (한 번의 IPSet 반영 ∥ 배치 조회 Lambda 한 번 → 한 번의 알림)
+
+상태 전이 오버헤드(STANDARD --standard-transition, EXPRESS --express-transition)와 Lambda 호출
+오버헤드(--invoke-overhead)는 가정값이다. 비용은 us-east-1 공시 단가로 계산한다.
+
+    python bench/waf_step_bench.py [--ips 50] [--speedup 10]
+"""
+import argparse
+import copy
+import datetime
+import importlib.util
+import itertools
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(ROOT, 'lambda_zips'))
+sys.path.insert(0, os.path.join(ROOT, '..', '..', 'shared'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+os.environ.update({
+    'IPSET_NAME': 'blocked-ips', 'IPSET_ID': 'ipset-1', 'DISCORD_WEBHOOK_URL': 'https://discord.invalid/webhook',
+    'ABUSEIPDB_API_KEY': 'bench', 'ABUSEIPDB_RATE_PER_SEC': '1000000', 'THREAT_LIST_BUCKET': ''
+})
+
+import metrics  # noqa: E402
+import notifier  # noqa: E402
+import ipset_writer  # noqa: E402
+from ipset_load_test import StubWAF  # noqa: E402
+from ipset_writer import IPSetWriter  # noqa: E402
+from rate_limit import TokenBucket  # noqa: E402
+
+# 단가 (USD, us-east-1)
+STANDARD_PER_TRANSITION = 0.000025
+EXPRESS_PER_REQUEST = 0.000001
+EXPRESS_PER_GB_SECOND = 0.00001667       # 64MB 단위 메모리, 100ms 단위 올림
+EXPRESS_MEMORY_GB = 64 / 1024
+LAMBDA_PER_REQUEST = 0.0000002
+LAMBDA_PER_GB_SECOND = 0.0000166667
+LAMBDA_MEMORY_GB = 128 / 1024            # lambda_functions.tf 기본 메모리
+
+LAMBDA_RETRY = [{"ErrorEquals": ["Lambda.ServiceException"], "IntervalSeconds": 1, "MaxAttempts": 2,
+                 "BackoffRate": 2}]
+# 기존 정의 (stepfunctions.tf의 이전 jsonencode와 동일)
+SEQUENTIAL = {
+    "StartAt": "ipset-add-lambda",
+    "States": {
+        "ipset-add-lambda": {"Type": "Task", "Resource": "ipset_add", "Parameters": {"ip.$": "$.ip"},
+                             "ResultPath": "$.ipResult", "Next": "abuseipdb-lookup-lambda",
+                             "Catch": [{"ErrorEquals": ["States.ALL"], "Next": "FailState"}]},
+        "abuseipdb-lookup-lambda": {"Type": "Task", "Resource": "abuse_lookup", "Parameters": {"ip.$": "$.ipResult.ip"},
+                                    "ResultPath": "$", "Next": "discord-alarm-lambda",
+                                    "Catch": [{"ErrorEquals": ["States.ALL"], "Next": "FailState"}]},
+        "discord-alarm-lambda": {"Type": "Task", "Resource": "discord_notify", "End": True,
+                                 "Catch": [{"ErrorEquals": ["States.ALL"], "Next": "FailState"}]},
+        "FailState": {"Type": "Fail", "Error": "WorkflowFailed", "Cause": "Step Function execution failed"}
+    }
+}
+
+
+def render_template():
+    """terraform templatefile()과 같은 방식으로 ${var} 치환"""
+    with open(os.path.join(ROOT, 'stepfunctions', 'waf_step.asl.json')) as f:
+        text = f.read()
+    values = {'ipset_add_arn': 'ipset_add', 'abuse_lookup_arn': 'abuse_lookup',
+              'abuse_lookup_batch_arn': 'abuse_lookup_batch', 'discord_notify_arn': 'discord_notify'}
+    return json.loads(re.sub(r'\$\{(\w+)\}', lambda m: values[m.group(1)], text))
+
+
+#--------------------------------------
+# ASL 인터프리터
+#--------------------------------------
+class StatesError(Exception):
+    def __init__(self, error, cause=""):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+_TOKEN = re.compile(r'\.([^.\[]+)|\[(\d+)\]')
+
+
+def get_path(data, path, context=None):
+    if path.startswith('$$'):
+        data, path = context or {}, path[1:]
+    for name, index in _TOKEN.findall(path[1:]):
+        try:
+            data = data[int(index)] if index else data[name]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError("States.Runtime", f"path {path} not found")
+    return data
+
+
+def has_path(data, path):
+    try:
+        get_path(data, path)
+        return True
+    except StatesError:
+        return False
+
+
+def set_path(data, path, value):
+    if path is None:
+        return data
+    if path == '$':
+        return value
+    data = dict(data)
+    names = [n for n, _ in _TOKEN.findall(path[1:])]
+    target = data
+    for name in names[:-1]:
+        target[name] = dict(target.get(name) or {})
+        target = target[name]
+    target[names[-1]] = value
+    return data
+
+
+def evaluate(expr, data, context):
+    match = re.fullmatch(r'States\.(\w+)\((.*)\)', expr)
+    if not match:
+        return get_path(data, expr, context)
+    args = [a.strip() for a in match.group(2).split(',')]
+    values = [a == 'true' if a in ('true', 'false') else evaluate(a, data, context) for a in args]
+    if match.group(1) == 'JsonMerge':
+        return dict(values[0], **values[1])
+    if match.group(1) == 'Array':
+        return values
+    raise StatesError("States.Runtime", f"unsupported intrinsic {expr}")
+
+
+def render(template, data, context):
+    if isinstance(template, dict):
+        return {(k[:-2] if k.endswith('.$') else k):
+                (evaluate(v, data, context) if k.endswith('.$') else render(v, data, context))
+                for k, v in template.items()}
+    if isinstance(template, list):
+        return [render(v, data, context) for v in template]
+    return template
+
+
+def matches(error, names):
+    return 'States.ALL' in names or error in names or ('States.TaskFailed' in names and not error.startswith('States.'))
+
+
+class LocalStepFunctions:
+    """ASL 정의를 스레드로 실행하는 에뮬레이터 (상태 전이 / Lambda 호출 / 실행 시간 기록)"""
+
+    def __init__(self, resources, transition, invoke_overhead, speedup):
+        self.resources = resources
+        self.transition = transition / speedup
+        self.invoke_overhead = invoke_overhead / speedup
+        self.speedup = speedup
+        self.lock = threading.Lock()
+        self.names = itertools.count(1)
+
+    def execute(self, definition, data):
+        run = {'transitions': 0, 'lambda_seconds': [], 'task_end': {}, 'start': time.monotonic(),
+               'name': f"bench-{next(self.names)}"}
+        start_time = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds')
+        context = {'Execution': {'Name': run['name'], 'StartTime': start_time.replace('+00:00', 'Z')}}
+        try:
+            output, status = self._machine(definition, data, run, context), 'SUCCEEDED'
+        except StatesError as e:
+            output, status = {'Error': e.error, 'Cause': e.cause}, 'FAILED'
+        run.update(output=output, status=status, seconds=(time.monotonic() - run['start']) * self.speedup)
+        return run
+
+    def _machine(self, machine, data, run, context):
+        name = machine['StartAt']
+        while True:
+            state = machine['States'][name]
+            with self.lock:
+                run['transitions'] += 1
+            time.sleep(self.transition)
+            try:
+                data, name = self._state(name, state, data, run, context)
+            except StatesError as e:
+                catch = next((c for c in state.get('Catch', []) if matches(e.error, c['ErrorEquals'])), None)
+                if catch is None:
+                    raise
+                data = set_path(data, catch.get('ResultPath', '$'), {'Error': e.error, 'Cause': e.cause})
+                name = catch['Next']
+            if name is None:
+                return data
+
+    def _state(self, name, state, raw, run, context):
+        kind = state['Type']
+        nxt = None if state.get('End') else state.get('Next')
+        if kind == 'Fail':
+            raise StatesError(state.get('Error', 'States.Fail'), state.get('Cause', ''))
+        if kind == 'Succeed':
+            return raw, None
+        if kind == 'Choice':
+            for rule in state['Choices']:
+                present = has_path(raw, rule['Variable'])
+                if ('IsPresent' in rule and present == rule['IsPresent']) or \
+                        ('BooleanEquals' in rule and present and get_path(raw, rule['Variable']) == rule['BooleanEquals']):
+                    return raw, rule['Next']
+            return raw, state['Default']
+
+        data = get_path(raw, state.get('InputPath', '$'))
+        if 'Parameters' in state:
+            data = render(state['Parameters'], data, context)
+        if kind == 'Pass':
+            result = state.get('Result', data)
+        elif kind == 'Task':
+            result = self._task(name, state, data, run)
+        elif kind == 'Parallel':
+            with ThreadPoolExecutor(max_workers=len(state['Branches'])) as pool:
+                futures = [pool.submit(self._machine, b, copy.deepcopy(data), run, context) for b in state['Branches']]
+                result = [f.result() for f in futures]
+        elif kind == 'Map':
+            items = get_path(data, state.get('ItemsPath', '$'))
+            processor = state.get('ItemProcessor') or state['Iterator']
+
+            def item(pair):
+                index, value = pair
+                ctx = dict(context, Map={'Item': {'Index': index, 'Value': value}})
+                item_input = render(state['ItemSelector'], data, ctx) if 'ItemSelector' in state else value
+                return self._machine(processor, item_input, run, ctx)
+            with ThreadPoolExecutor(max_workers=max(1, state.get('MaxConcurrency') or len(items))) as pool:
+                result = list(pool.map(item, enumerate(items)))
+        else:
+            raise StatesError("States.Runtime", f"unsupported state type {kind}")
+
+        if 'ResultSelector' in state:
+            result = render(state['ResultSelector'], result, context)
+        output = raw if kind == 'Pass' and 'Result' not in state and 'Parameters' not in state else \
+            set_path(raw, state.get('ResultPath', '$'), result)
+        return get_path(output, state.get('OutputPath', '$')), nxt
+
+    def _task(self, name, state, data, run):
+        handler = self.resources[state['Resource']]
+        for attempt in range(10):
+            time.sleep(self.invoke_overhead)
+            start = time.monotonic()
+            try:
+                result = handler(copy.deepcopy(data), None)
+                error = None
+            except Exception as e:
+                error = StatesError(type(e).__name__, str(e))
+            elapsed = time.monotonic() - start
+            with self.lock:
+                run['lambda_seconds'].append(elapsed * self.speedup)
+                run['task_end'].setdefault(name, []).append((time.monotonic() - run['start']) * self.speedup)
+            if error is None:
+                return result
+            retry = next((r for r in state.get('Retry', []) if matches(error.error, r['ErrorEquals'])), None)
+            if retry is None or attempt >= retry.get('MaxAttempts', 3):
+                raise error
+            time.sleep(retry.get('IntervalSeconds', 1) * retry.get('BackoffRate', 2) ** attempt / self.speedup)
+
+
+#--------------------------------------
+# Lambda 핸들러 + stub 서비스
+#--------------------------------------
+def load(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, 'lambda_zips', f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.print = lambda *a, **k: None      # 핸들러 로그는 출력하지 않음
+    return module
+
+
+class StubHTTP:
+    def __init__(self, latency, speedup):
+        self.latency = latency / speedup
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None):
+        time.sleep(self.latency)
+        with self.lock:
+            self.requests.append(json.loads(body))
+
+        class Response:
+            status, headers, data = 204, {}, b''
+        return Response()
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        s = args.speedup
+        self.ipset_add = load('ipset_add_lambda')
+        self.abuse = load('abuseipdb_lookup_lambda')
+        self.discord = load('discord_notify_lambda')
+        self.rng = random.Random(args.seed)
+        self.fail_ips = set()
+
+        def fetch_reputation(ip):
+            if ip in self.fail_ips:
+                raise RuntimeError("AbuseIPDB unavailable")
+            time.sleep(self.rng.lognormvariate(math.log(args.abuse_latency), 0.35) / s)
+            return self.abuse.to_reputation({"countryCode": "KR", "isp": "Bench ISP", "abuseConfidenceScore": 87,
+                                             "totalReports": 12, "usageType": "Data Center/Web Hosting/Transit"})
+        self.abuse.fetch_reputation = fetch_reputation
+        self.original_enrich = self.abuse.enrich
+
+        def enrich(ip):
+            if ip in self.fail_ips:     # 조회 Lambda 자체가 실패하는 경우 (Catch 경로 확인)
+                raise RuntimeError("lookup crashed")
+            return self.original_enrich(ip)
+        self.abuse.enrich = enrich
+        notifier.get_notifier = lambda: notifier.Notifier(topic_arn='', http=self.http)
+        ipset_writer.print = lambda *a, **k: None
+
+    def reset(self):
+        s = self.args.speedup
+        self.waf = StubWAF(self.args.waf_latency / s)
+        self.ipset_add.writer = IPSetWriter(self.waf, 'blocked-ips', 'ipset-1',
+                                            sleep=lambda d: time.sleep(d / s))
+        self.ipset_add.QUEUE_URL = None
+        self.abuse.cache = self.abuse.ReputationCache()
+        # AWS 시간 기준 초당 --abuse-rate회 (배치 Lambda 컨테이너 하나가 모든 IP의 호출 속도를 제한)
+        self.abuse.rate_limiter = TokenBucket(self.args.abuse_rate, clock=lambda: time.monotonic() * s,
+                                              sleep=lambda d: time.sleep(d / s))
+        self.abuse.BATCH_CONCURRENCY = self.args.batch_concurrency
+        self.http = StubHTTP(self.args.discord_latency, s)
+        self.resources = {'ipset_add': self.ipset_add.lambda_handler, 'abuse_lookup': self.abuse.lambda_handler,
+                          'abuse_lookup_batch': self.abuse.batch_handler, 'discord_notify': self.discord.lambda_handler}
+
+
+def cost(runs, mode):
+    """실행 전체 비용 (상태 머신 + Lambda)"""
+    transitions = sum(r['transitions'] for r in runs)
+    if mode == 'STANDARD':
+        sfn = transitions * STANDARD_PER_TRANSITION
+    else:
+        sfn = sum(EXPRESS_PER_REQUEST + math.ceil(r['seconds'] / 0.1) * 0.1 * EXPRESS_MEMORY_GB * EXPRESS_PER_GB_SECOND
+                  for r in runs)
+    calls = sum(len(r['lambda_seconds']) for r in runs)
+    lam = calls * LAMBDA_PER_REQUEST + sum(sum(r['lambda_seconds']) for r in runs) * LAMBDA_MEMORY_GB * LAMBDA_PER_GB_SECOND
+    return sfn, lam, transitions, calls
+
+
+def block_time(run):
+    return max(t for name, ends in run['task_end'].items() if name.startswith('ipset-add') for t in ends)
+
+
+def run_many(emulator, definition, inputs):
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(inputs)) as pool:
+        runs = list(pool.map(lambda data: emulator.execute(definition, data), inputs))
+    offset = [(r['start'] - start) * emulator.speedup for r in runs]
+    return runs, offset
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ips", type=int, default=50, help="한 번의 게이트웨이 호출에 들어온 IP 수 (Map 모드)")
+    parser.add_argument("--repeat", type=int, default=20, help="단일 IP 실행 반복 횟수")
+    parser.add_argument("--waf-latency", type=float, default=0.12, help="get_ip_set / update_ip_set 지연(초)")
+    parser.add_argument("--abuse-latency", type=float, default=0.45, help="AbuseIPDB 응답 지연 중앙값(초)")
+    parser.add_argument("--abuse-rate", type=float, default=10, help="AbuseIPDB 초당 호출 한도 (abuseipdb_rate_per_sec)")
+    parser.add_argument("--batch-concurrency", type=int, default=10, help="배치 조회 동시 스레드 수 (waf_step_map_concurrency)")
+    parser.add_argument("--discord-latency", type=float, default=0.25)
+    parser.add_argument("--invoke-overhead", type=float, default=0.03, help="warm Lambda 호출 오버헤드(초, 가정)")
+    parser.add_argument("--standard-transition", type=float, default=0.05, help="STANDARD 상태 전이 지연(초, 가정)")
+    parser.add_argument("--express-transition", type=float, default=0.01, help="EXPRESS 상태 전이 지연(초, 가정)")
+    parser.add_argument("--speedup", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    new = render_template()
+    base = {"rule_id": "bench-rule", "event_count": 3, "timestamp": "2025-01-01T00:00:00Z"}
+
+    print(f"single IP, {args.repeat} runs each (ms, AWS time; cost per execution incl. Lambda, USD)")
+    print(f"  {'definition':10} {'type':8} | {'block p50':>9} {'notify p50':>10} {'notify max':>10} | "
+          f"{'transitions':>11} {'lambdas':>7} | {'sfn $':>10} {'lambda $':>10}")
+    for label, definition in (("sequential", SEQUENTIAL), ("parallel", new)):
+        for mode in ("STANDARD", "EXPRESS"):
+            transition = args.standard_transition if mode == 'STANDARD' else args.express_transition
+            runs = []
+            for i in range(args.repeat):
+                harness.reset()
+                emulator = LocalStepFunctions(harness.resources, transition, args.invoke_overhead, args.speedup)
+                run = emulator.execute(definition, dict(base, ip=f"203.0.113.{i + 1}"))
+                assert run['status'] == 'SUCCEEDED', run['output']
+                assert harness.waf.addresses == [f"203.0.113.{i + 1}/32"]
+                assert len(harness.http.requests) == 1
+                runs.append(run)
+            blocks = [block_time(r) * 1000 for r in runs]
+            totals = sorted(r['seconds'] * 1000 for r in runs)
+            sfn, lam, transitions, calls = cost(runs, mode)
+            print(f"  {label:10} {mode:8} | {statistics.median(blocks):9.0f} {statistics.median(totals):10.0f} "
+                  f"{totals[-1]:10.0f} | "
+                  f"{transitions / len(runs):11.0f} {calls / len(runs):7.0f} | "
+                  f"{sfn / len(runs):10.7f} {lam / len(runs):10.7f}")
+            if label == "parallel":
+                # 알림 입력은 기존 형태(평판 필드 + ipResult) 그대로
+                event = runs[-1]['output']
+                assert event['statusCode'] == 200
+
+    # 조회 Lambda가 실패해도 차단과 알림은 진행
+    harness.reset()
+    harness.fail_ips = {"198.51.100.7"}
+    emulator = LocalStepFunctions(harness.resources, args.standard_transition, args.invoke_overhead, args.speedup)
+    run = emulator.execute(new, dict(base, ip="198.51.100.7"))
+    assert run['status'] == 'SUCCEEDED' and harness.waf.addresses == ["198.51.100.7/32"]
+    assert len(harness.http.requests) == 1
+    # 여러 IP 중 하나의 조회가 실패해도 나머지 평판과 함께 모든 IP가 차단 / 알림됨
+    harness.reset()
+    run = emulator.execute(new, dict(base, ips=["198.51.100.7", "198.51.100.8"]))
+    assert run['status'] == 'SUCCEEDED' and sorted(harness.waf.addresses) == ["198.51.100.7/32", "198.51.100.8/32"]
+    embeds = harness.http.requests[0]['embeds']
+    assert len(harness.http.requests) == 1 and len(embeds) == 2, harness.http.requests
+    assert [e['fields'][4]['value'] for e in embeds] == ["N/A", "87"], embeds
+    harness.fail_ips = set()
+    print("  enrichment failure: IP still blocked and notified (Catch → enrichment-unavailable, batch → N/A fields)")
+
+    # EMF 지표: 한 실행의 모든 단계가 실행 이름(trace-context)을 TraceId로 공유하고 SLO 지표를 남김
+    lines = []
+    metrics.ENABLED, metrics.emit = True, lines.append
+    # Lambda 컨테이너는 한 번에 호출 하나만 처리 (metrics의 진행 중 호출은 프로세스 전역)
+    # → 한 프로세스에서 단계를 동시에 돌리는 에뮬레이터에서는 핸들러를 한 번에 하나씩 호출
+    serial = threading.Lock()
+
+    def one_at_a_time(fn):
+        def call(event, context):
+            with serial:
+                return fn(event, context)
+        return call
+    for label, data in (("single IP", dict(base, ip="198.51.100.9")), ("map", dict(base, ips=["192.0.2.201", "192.0.2.202"]))):
+        harness.reset()
+        resources = {name: one_at_a_time(fn) for name, fn in harness.resources.items()}
+        emulator = LocalStepFunctions(resources, args.express_transition, args.invoke_overhead, args.speedup)
+        del lines[:]
+        run = emulator.execute(new, data)
+        assert run['status'] == 'SUCCEEDED', run['output']
+        docs = [json.loads(line) for line in lines]
+        assert {d['TraceId'] for d in docs} == {run['name']}, docs
+        by_function = {d['Function']: d for d in docs}
+        assert 'TimeToContain' in by_function['ipset_add_lambda'] and 'TimeToNotify' in by_function['discord_notify_lambda']
+        print(f"  EMF trace ({label}): {len(docs)} stage records share TraceId {run['name']} "
+              f"({', '.join(sorted(d['Function'] for d in docs))})")
+    metrics.ENABLED = False
+
+    ips = [f"192.0.2.{i + 1}" for i in range(args.ips)]
+    print(f"\none gateway call with {len(ips)} IPs (seconds from the call, AWS time; cost for the whole call)")
+    print(f"  {'mode':28} | {'blocked':>9} {'all blocked':>11} {'all notified':>12} | {'IPSet calls':>11} "
+          f"{'discord msgs':>12} | {'transitions':>11} {'std $':>9} {'express $':>9}")
+    scenarios = (
+        ("sequential x N executions", SEQUENTIAL, [dict(base, ip=ip) for ip in ips]),
+        ("parallel x N executions", new, [dict(base, ip=ip) for ip in ips]),
+        ("map (1 execution)", new, [dict(base, ips=ips)]),
+    )
+    for label, definition, inputs in scenarios:
+        results = {}
+        for mode in ("STANDARD", "EXPRESS"):
+            transition = args.standard_transition if mode == 'STANDARD' else args.express_transition
+            harness.reset()
+            emulator = LocalStepFunctions(harness.resources, transition, args.invoke_overhead, args.speedup)
+            runs, offsets = run_many(emulator, definition, inputs)
+            assert all(r['status'] == 'SUCCEEDED' for r in runs), [r['output'] for r in runs if r['status'] != 'SUCCEEDED']
+            delivered = sum(len(p.get('embeds', [None])) for p in harness.http.requests)
+            assert delivered == len(ips)
+            # 동시 실행이 같은 IPSet을 고치면 LockToken 재시도 한도를 넘겨 일부 IP가 반영되지 않을 수 있음
+            results[mode] = {
+                'blocked_ips': len(set(harness.waf.addresses) & {f"{ip}/32" for ip in ips}),
+                'blocked': max(o + block_time(r) for o, r in zip(offsets, runs)),
+                'notified': max(o + r['seconds'] for o, r in zip(offsets, runs)),
+                'waf_calls': harness.waf.calls, 'messages': len(harness.http.requests),
+                'cost': sum(cost(runs, mode)[:2]), 'transitions': cost(runs, mode)[2]
+            }
+        std = results['STANDARD']
+        print(f"  {label:28} | {std['blocked_ips']:4d}/{len(ips):<4d} {std['blocked']:10.2f}s {std['notified']:11.2f}s | "
+              f"{std['waf_calls']:11d} "
+              f"{std['messages']:12d} | {std['transitions']:11d} {std['cost']:9.6f} {results['EXPRESS']['cost']:9.6f}")
+        if label.startswith("map"):
+            assert std['waf_calls'] == 2 and std['messages'] == math.ceil(len(ips) / 10)
+            assert all(r['blocked_ips'] == len(ips) for r in results.values())
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ LAMBDA_FILES=(
   "discord_notify_lambda.py"
   "gateway_trigger_lambda.py"
   "ipset_add_lambda.py"
+  "ipset_flush_lambda.py"
+  "waf_log_analyzer_lambda.py"
 )
 
 for FILE in "${LAMBDA_FILES[@]}"; do
@@ -22,13 +24,40 @@ for FILE in "${LAMBDA_FILES[@]}"; do
   mkdir -p lambda_zips/build
   cp "lambda_zips/${FILE}" lambda_zips/build/
 
-  # requests가 필요한 함수만 dependencies 포함
-  if [[ "$FILE" == "abuseipdb_lookup_lambda.py" || "$FILE" == "discord_notify_lambda.py" ]]; then
-    echo "  [+] Installing dependencies for ${FILE}"
-    pip install requests -t lambda_zips/build/
+  # IPSet 작성기 공용 모듈 포함
+  if [[ "$FILE" == "ipset_add_lambda.py" || "$FILE" == "ipset_flush_lambda.py" ]]; then
+    cp lambda_zips/ipset_writer.py lambda_zips/build/
+  fi
+  if [[ "$FILE" == "ipset_flush_lambda.py" ]]; then
+    cp lambda_zips/ipset_capacity.py lambda_zips/build/
+  fi
+  if [[ "$FILE" == "abuseipdb_lookup_lambda.py" ]]; then
+    cp lambda_zips/reputation_cache.py lambda_zips/build/
+  fi
+  if [[ "$FILE" == "waf_log_analyzer_lambda.py" ]]; then
+    cp lambda_zips/waf_log_stats.py lambda_zips/build/
+  fi
+
+  # 저장소 공용 모듈 (shared/) - 지연 생성 클라이언트 / 연결 풀, EMF 지표 (모든 함수)
+  cp ../../shared/aws_clients.py ../../shared/metrics.py lambda_zips/build/
+
+  # 저장소 공용 모듈 (shared/) - FireHOL 인덱스 조회기
+  if [[ "$FILE" == "abuseipdb_lookup_lambda.py" || "$FILE" == "gateway_trigger_lambda.py" ]]; then
+    cp ../../shared/ip_index.py ../../shared/threat_ip_matcher.py lambda_zips/build/
+  fi
+
+  # 저장소 공용 모듈 (shared/) - 토큰 버킷 (AbuseIPDB 호출 한도)
+  if [[ "$FILE" == "abuseipdb_lookup_lambda.py" ]]; then
+    cp ../../shared/rate_limit.py lambda_zips/build/
+  fi
+
+  # 저장소 공용 모듈 (shared/) - Discord / SNS 알림 발송기
+  if [[ "$FILE" == "discord_notify_lambda.py" ]]; then
+    cp ../../shared/notifier.py lambda_zips/build/
   fi
 
-  (cd lambda_zips/build && zip -r "../${BASENAME}.zip" .)
+  # 외부 패키지 없음 - boto3 / urllib3 는 Lambda Python 런타임에 포함된 것을 사용
+  (cd lambda_zips/build && zip -X -q -r "../${BASENAME}.zip" . -x '*__pycache__*')
   rm -rf lambda_zips/build
 done
 
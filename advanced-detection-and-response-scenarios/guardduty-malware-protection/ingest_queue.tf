@@ -0,0 +1,140 @@
+#####################
+# 51. 수집 큐 (SQS) - API 요청을 모아 상태 머신 실행 하나로 묶음
+#####################
+
+resource "aws_sqs_queue" "ingest_dlq" {
+  name                      = "waf-step-ingest-dlq"             # 반복 실패한 요청 보관용
+  message_retention_seconds = 1209600                           # 14일 보관
+}
+
+resource "aws_sqs_queue" "ingest" {
+  name                       = "waf-step-ingest"                # 차단 요청 수집 큐
+  # batch Lambda 제한 시간(30초)의 6배 + 배치 윈도우 (이벤트 소스 매핑 권장값)
+  visibility_timeout_seconds = 180 + var.ingest_batch_window
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.ingest_dlq.arn
+    maxReceiveCount     = 10                                    # 처리 실패만 집계 (적체로 미룬 배치는 지연 재전송이라 제외)
+  })
+}
+
+#####################
+# 52. Lambda 실행 역할에 수집 큐 권한 부여
+#####################
+
+resource "aws_iam_role_policy" "inline_ingest_queue" {
+  name = "inline-ingest-queue"
+  role = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "sqs:SendMessage",                                    # 트리거 Lambda → 큐 적재
+          "sqs:GetQueueAttributes",                             # 큐 적체 확인 (backpressure)
+          "sqs:ReceiveMessage",                                 # batch Lambda 이벤트 소스 매핑
+          "sqs:DeleteMessage"
+        ],
+        Resource = aws_sqs_queue.ingest.arn
+      }
+    ]
+  })
+}
+
+#####################
+# 53. Lambda 함수 - (G) 수집 큐 배치 → 상태 머신 실행
+#####################
+
+resource "aws_lambda_function" "ingest_batch" {
+  function_name = "lambda-ingest-batch"
+  filename      = "${path.module}/lambda_zips/gateway_trigger_lambda.zip"  # 트리거와 같은 패키지 사용
+  handler       = "gateway_trigger_lambda.batch_handler"      # 배치 진입점
+  runtime       = "python3.10"
+  role          = aws_iam_role.lambda_exec.arn
+  timeout       = 30
+
+  # 예약 동시성은 두지 않음 - SQS 폴러가 제한(throttle)당한 수신도 maxReceiveCount에 포함됨
+  # 동시 실행은 이벤트 소스 매핑의 maximum_concurrency(2)로 제한하고, 컨테이너 간 중복은 실행 이름(IP + 윈도우 번호)으로 제거
+
+  environment {
+    variables = {
+      STEP_FUNCTION_ARN      = aws_sfn_state_machine.waf_step.arn
+      THREAT_LIST_BUCKET     = var.threat_list_bucket
+      DEDUPE_WINDOW_SECONDS  = var.ingest_dedupe_window
+      MAX_RUNNING_EXECUTIONS = var.ingest_max_running_executions
+      EXECUTION_NAME_TABLE   = var.waf_step_type == "EXPRESS" ? aws_dynamodb_table.execution_names[0].name : ""
+      DEFER_QUEUE_URL        = aws_sqs_queue.ingest.url          # 실행 적체 시 배치를 지연 재전송할 큐
+      DEFER_SECONDS          = 60                                # 재전송 지연 (초, 최대 900)
+      MAX_DEFERRALS          = 30                                # 넘기면 실패로 돌려보내 DLQ 경로로
+    }
+  }
+
+  depends_on = [aws_sfn_state_machine.waf_step]
+}
+
+#####################
+# 54. SQS → batch Lambda 이벤트 소스 매핑 (윈도우 단위 배치)
+#####################
+
+resource "aws_lambda_event_source_mapping" "ingest_batch" {
+  count                              = var.ingest_batching_enabled ? 1 : 0
+  event_source_arn                   = aws_sqs_queue.ingest.arn
+  function_name                      = aws_lambda_function.ingest_batch.arn
+  batch_size                         = 1000                     # 한 번에 최대 1000개 메시지
+  maximum_batching_window_in_seconds = var.ingest_batch_window  # 윈도우 동안 모인 IP를 실행 하나로
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # 폴러가 Lambda를 최대 2개(설정 가능한 최솟값)까지만 호출 - 함수 throttle 없이 실행 시작기 수를 제한
+  scaling_config {
+    maximum_concurrency = 2
+  }
+
+  depends_on = [aws_iam_role_policy.inline_ingest_queue]
+}
+
+#####################
+# 58. 실행 이름 중복 제거 테이블 (EXPRESS일 때만 - Express 워크플로우는 실행 이름 중복을 거절하지 않음)
+#####################
+
+resource "aws_dynamodb_table" "execution_names" {
+  count        = var.waf_step_type == "EXPRESS" ? 1 : 0
+  name         = "waf-step-execution-names"                     # 윈도우별 실행 이름 (조건부 쓰기로 선점)
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "name"
+
+  attribute {
+    name = "name"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"                               # 중복 제거 윈도우가 지난 이름은 자동 삭제
+    enabled        = true
+  }
+}
+
+#####################
+# 59. Lambda 실행 역할에 실행 이름 테이블 권한 부여 (EXPRESS일 때만)
+#####################
+
+resource "aws_iam_role_policy" "inline_execution_names" {
+  count = var.waf_step_type == "EXPRESS" ? 1 : 0
+  name  = "inline-execution-names"
+  role  = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:PutItem",                                   # 실행 이름 선점 (attribute_not_exists 조건)
+          "dynamodb:DeleteItem"                                 # 실행 시작 실패 시 선점 해제
+        ],
+        Resource = aws_dynamodb_table.execution_names[0].arn
+      }
+    ]
+  })
+}
@@ -0,0 +1,115 @@
+#####################
+# 42. IPSet 반영 대기열 (SQS) 및 DLQ
+#####################
+
+resource "aws_sqs_queue" "ipset_dlq" {
+  name                      = "ipset-pending-dlq"               # 반복 실패한 IP 메시지 보관용
+  message_retention_seconds = 1209600                           # 14일 보관
+}
+
+resource "aws_sqs_queue" "ipset_pending" {
+  name                       = "ipset-pending"                  # 차단 대기 IP 큐
+  # flush Lambda 제한 시간(120초)의 6배 + 배치 윈도우 (이벤트 소스 매핑 권장값, 처리 중인 메시지가 다시 보이지 않도록)
+  visibility_timeout_seconds = 720 + var.ipset_batch_window
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.ipset_dlq.arn
+    maxReceiveCount     = 5                                     # 5회 실패 시 DLQ로 이동
+  })
+}
+
+#####################
+# 43. Lambda 실행 역할에 SQS / WAF IPSet 권한 부여
+#####################
+
+resource "aws_iam_role_policy" "inline_ipset_queue" {
+  name = "inline-ipset-queue"
+  role = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "sqs:SendMessage",                                    # ipset-add-lambda → 큐 적재
+          "sqs:ReceiveMessage",                                 # flush Lambda 이벤트 소스 매핑
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ],
+        Resource = aws_sqs_queue.ipset_pending.arn
+      },
+      {
+        Effect = "Allow",
+        Action = [
+          "wafv2:GetIPSet",
+          "wafv2:UpdateIPSet"
+        ],
+        Resource = concat([aws_wafv2_ip_set.blocked_ips.arn], aws_wafv2_ip_set.blocked_ips_shard[*].arn)
+      },
+      {
+        Effect   = "Allow",
+        Action   = ["s3:GetObject", "s3:PutObject"],          # 항목별 마지막 탐지 시각 상태 파일
+        Resource = "${aws_s3_bucket.waf_logs.arn}/ipset-state/*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = "s3:ListBucket",                           # 상태 파일이 없을 때 NoSuchKey를 받기 위해 필요
+        Resource = aws_s3_bucket.waf_logs.arn
+      }
+    ]
+  })
+}
+
+#####################
+# 44. Lambda 함수 - (E) IPSet 배치 반영
+#####################
+
+resource "aws_lambda_function" "ipset_flush" {
+  function_name = "lambda-ipset-flush"
+  filename      = "${path.module}/lambda_zips/ipset_flush_lambda.zip"
+  handler       = "ipset_flush_lambda.lambda_handler"
+  runtime       = "python3.10"
+  role          = aws_iam_role.lambda_exec.arn
+  # 상태 항목이 많으면 트라이 구성 / 상태 JSON 직렬화가 CPU를 씀 (로컬 10만 항목 기준 약 6초)
+  # 128MB는 vCPU 할당이 작아 30초를 넘기므로 메모리(= CPU)와 제한 시간을 함께 늘림
+  timeout       = 120
+  memory_size   = 1024
+
+  # 예약 동시성(1)은 두지 않음 - SQS 폴러가 제한(throttle)당한 수신도 maxReceiveCount에 포함되어
+  # 부하 시 대기 중인 차단 요청이 DLQ로 넘어감. 동시 실행은 이벤트 소스 매핑의 maximum_concurrency로 제한
+
+  environment {
+    variables = {
+      IPSET_NAME         = aws_wafv2_ip_set.blocked_ips.name
+      IPSET_ID           = aws_wafv2_ip_set.blocked_ips.id
+      WAF_SCOPE          = "REGIONAL"
+      IPSET_SHARDS       = jsonencode(concat(                   # 기본 IPSet + 추가 샤드
+        [{ name = aws_wafv2_ip_set.blocked_ips.name, id = aws_wafv2_ip_set.blocked_ips.id }],
+        [for shard in aws_wafv2_ip_set.blocked_ips_shard : { name = shard.name, id = shard.id }]
+      ))
+      IPSET_STATE_BUCKET = aws_s3_bucket.waf_logs.bucket        # CIDR 병합 / TTL·LRU 상태 저장 위치
+      IPSET_TTL_SECONDS  = var.ipset_ttl_days * 86400
+    }
+  }
+}
+
+#####################
+# 45. SQS → flush Lambda 이벤트 소스 매핑 (윈도우 단위 배치)
+#####################
+
+resource "aws_lambda_event_source_mapping" "ipset_flush" {
+  event_source_arn                   = aws_sqs_queue.ipset_pending.arn
+  function_name                      = aws_lambda_function.ipset_flush.arn
+  batch_size                         = 1000                     # 한 번에 최대 1000개 메시지
+  maximum_batching_window_in_seconds = var.ipset_batch_window   # 윈도우 동안 모인 IP를 한 번에 반영
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  # 폴러가 Lambda를 최대 2개(설정 가능한 최솟값)까지만 호출 - 함수 throttle 없이 동시 작성기 수를 제한
+  # (두 작성기의 경합은 IPSetWriter의 LockToken 재시도와 현재 내용 병합으로 처리)
+  scaling_config {
+    maximum_concurrency = 2
+  }
+
+  depends_on = [aws_iam_role_policy.inline_ipset_queue]
+}
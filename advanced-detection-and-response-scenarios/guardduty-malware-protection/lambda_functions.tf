@@ -44,7 +44,10 @@ resource "aws_iam_role_policy" "inline_start_sf" {
     Statement = [
       {
         Effect = "Allow",
-        Action = "states:StartExecution",                     # Step Functions 실행 권한 부여
+        Action = [
+          "states:StartExecution",                            # Step Functions 실행 권한 부여
+          "states:ListExecutions"                             # 실행 적체 확인 (backpressure)
+        ],
         Resource = aws_sfn_state_machine.waf_step.arn         # 실행 대상: waf_step 상태 머신
       }
     ]
@@ -66,7 +69,13 @@ resource "aws_lambda_function" "api_trigger" {
 
   environment {
     variables = {
-      STEP_FUNCTION_ARN = aws_sfn_state_machine.waf_step.arn  # Step Functions 상태 머신 ARN
+      STEP_FUNCTION_ARN      = aws_sfn_state_machine.waf_step.arn  # Step Functions 상태 머신 ARN
+      THREAT_LIST_BUCKET     = var.threat_list_bucket              # FireHOL 인덱스 버킷 (비우면 조회 안 함)
+      INGEST_QUEUE_URL       = var.ingest_batching_enabled ? aws_sqs_queue.ingest.url : ""  # 수집 큐 (비우면 바로 실행)
+      DEDUPE_WINDOW_SECONDS  = var.ingest_dedupe_window             # 같은 IP 중복 제거 윈도우
+      MAX_RUNNING_EXECUTIONS = var.ingest_max_running_executions    # 실행 적체 한도 (넘으면 429)
+      MAX_QUEUE_BACKLOG      = var.ingest_max_queue_backlog         # 수집 큐 적체 한도 (넘으면 429)
+      EXECUTION_NAME_TABLE   = var.waf_step_type == "EXPRESS" ? aws_dynamodb_table.execution_names[0].name : ""  # EXPRESS 실행 이름 중복 제거
     }
   }
 
@@ -86,9 +95,10 @@ resource "aws_lambda_function" "ipset_add" {
 
   environment {
     variables = {
-      IPSET_NAME = aws_wafv2_ip_set.blocked_ips.name          # 차단할 IPSet 이름
-      IPSET_ID   = aws_wafv2_ip_set.blocked_ips.id            # IPSet의 ID
-      WAF_SCOPE  = "REGIONAL"                                 # WAF의 범위
+      IPSET_NAME      = aws_wafv2_ip_set.blocked_ips.name     # 차단할 IPSet 이름
+      IPSET_ID        = aws_wafv2_ip_set.blocked_ips.id       # IPSet의 ID
+      WAF_SCOPE       = "REGIONAL"                            # WAF의 범위
+      IPSET_QUEUE_URL = var.ipset_batching_enabled ? aws_sqs_queue.ipset_pending.url : ""  # 배치 반영 큐 (비우면 직접 반영)
     }
   }
 }
@@ -106,7 +116,10 @@ resource "aws_lambda_function" "abuse_lookup" {
 
   environment {
     variables = {
-      ABUSEIPDB_API_KEY = var.abuseipdb_api_key              # AbuseIPDB API Key를 환경변수로 주입
+      ABUSEIPDB_API_KEY      = var.abuseipdb_api_key         # AbuseIPDB API Key를 환경변수로 주입
+      REPUTATION_TABLE       = aws_dynamodb_table.reputation_cache.name  # 평판 공유 캐시 테이블
+      REPUTATION_TTL_SECONDS = var.reputation_cache_ttl_hours * 3600
+      THREAT_LIST_BUCKET     = var.threat_list_bucket        # FireHOL 인덱스 버킷 (비우면 API만 사용)
     }
   }
 }
@@ -1,49 +1,150 @@
-import requests
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import aws_clients
+import metrics
+from rate_limit import TokenBucket
+from reputation_cache import DEFAULT_TTL, NEGATIVE_TTL, DynamoDBTier, ReputationCache
+from threat_ip_matcher import get_matcher
 
 ABUSEIPDB_API_KEY = os.environ.get('ABUSEIPDB_API_KEY')
 ABUSEIPDB_URL = "https://api.abuseipdb.com/api/v2/check"
+# (연결, 응답) 타임아웃(초)
+REQUEST_TIMEOUT = (2, 5)
+# 공유 캐시 DynamoDB 테이블 (설정하지 않으면 컨테이너 내 캐시만 사용)
+REPUTATION_TABLE = os.environ.get('REPUTATION_TABLE')
+# 배치 조회 동시성 / AbuseIPDB 초당 호출 한도
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '8'))
+API_RATE_PER_SEC = float(os.environ.get('ABUSEIPDB_RATE_PER_SEC', '10'))
 
-def lambda_handler(event, context):
-    ip = event.get("ip")
-    if not ip:
-        return event
+HEADERS = {
+    "Key": ABUSEIPDB_API_KEY or "",
+    "Accept": "application/json"
+}
+
+# warm 호출 간 재사용되는 캐시 (DynamoDB 클라이언트 / 연결 풀은 캐시·FireHOL에 없는 IP를 처음 조회할 때 생성)
+cache = ReputationCache(
+    shared=DynamoDBTier(aws_clients.lazy('dynamodb'), REPUTATION_TABLE) if REPUTATION_TABLE else None,
+    ttl=int(os.environ.get('REPUTATION_TTL_SECONDS', DEFAULT_TTL)),
+    negative_ttl=int(os.environ.get('REPUTATION_NEGATIVE_TTL_SECONDS', NEGATIVE_TTL))
+)
+
+rate_limiter = TokenBucket(API_RATE_PER_SEC)
 
-    headers = {
-        "Key": ABUSEIPDB_API_KEY,
-        "Accept": "application/json"
+UNKNOWN_REPUTATION = {
+    "countryCode": "N/A",
+    "isp": "N/A",
+    "abuse_score": "N/A",
+    "total_reports": "N/A",
+    "domain": "N/A",
+    "usage_type": "N/A",
+    "is_hosting": "False",
+    "hostnames": "N/A"
+}
+
+def to_reputation(data):
+    # AbuseIPDB 응답(data)을 Step Functions 이벤트 필드로 변환
+    return {
+        "countryCode": data.get("countryCode", "N/A"),
+        "isp": data.get("isp", "N/A"),
+        "abuse_score": str(data.get("abuseConfidenceScore", "N/A")),
+        "total_reports": str(data.get("totalReports", "N/A")),
+        "domain": data.get("domain", "N/A"),
+        "usage_type": data.get("usageType", "N/A"),
+        "is_hosting": "True" if "Hosting" in (data.get("usageType") or "") else "False",
+        "hostnames": ", ".join(data.get("hostnames") or []) or "N/A"
     }
 
+LISTED_REPUTATION = dict(UNKNOWN_REPUTATION, abuse_score="100", usage_type="FireHOL level1", listed_in="firehol_level1")
+
+_http = None
+
+def get_http():
+    global _http
+    if _http is None:
+        import urllib3
+        _http = aws_clients.http(
+            timeout=urllib3.Timeout(connect=REQUEST_TIMEOUT[0], read=REQUEST_TIMEOUT[1]),
+            retries=False,
+            maxsize=max(10, BATCH_CONCURRENCY)
+        )
+    return _http
+
+def fetch_reputation(ip):
     params = {
         "ipAddress": ip,
         "maxAgeInDays": "90"
     }
+    with metrics.timer('abuseipdb.request'):
+        res = get_http().request("GET", ABUSEIPDB_URL, fields=params, headers=HEADERS)
+    if res.status >= 400:
+        raise RuntimeError(f"AbuseIPDB HTTP {res.status}: {res.data[:200]!r}")
+    return to_reputation(json.loads(res.data).get("data", {}))
+
+def lookup(ip):
+    """캐시 → AbuseIPDB 순으로 조회하고 (평판 필드, 출처)를 반환"""
+    reputation, source = cache.get(ip)
+    if reputation is not None:
+        return reputation, source
 
     try:
-        res = requests.get(ABUSEIPDB_URL, headers=headers, params=params)
-        if res.ok:
-            data = res.json().get("data", {})
-            event.update({
-                "countryCode": data.get("countryCode", "N/A"),
-                "isp": data.get("isp", "N/A"),
-                "abuse_score": str(data.get("abuseConfidenceScore", "N/A")),
-                "total_reports": str(data.get("totalReports", "N/A")),
-                "domain": data.get("domain", "N/A"),
-                "usage_type": data.get("usageType", "N/A"),
-                "is_hosting": "True" if "Hosting" in data.get("usageType", "") else "False",
-                "hostnames": ", ".join(data.get("hostnames", [])) or "N/A"
-            })
-        return event
+        rate_limiter.acquire()
+        reputation = fetch_reputation(ip)
+        cache.put(ip, reputation)
+        return reputation, "api"
     except Exception as e:
-        event.update({
-            "countryCode": "N/A",
-            "isp": "N/A",
-            "abuse_score": "N/A",
-            "total_reports": "N/A",
-            "domain": "N/A",
-            "usage_type": "N/A",
-            "is_hosting": "False",
-            "hostnames": "N/A"
-        })
-        return event
\ No newline at end of file
+        # 실패 결과도 짧게 캐싱해 장애/쿼터 소진 시 재호출을 막음
+        print(f"[WARN] AbuseIPDB lookup failed for {ip}: {e}")
+        cache.put(ip, UNKNOWN_REPUTATION, negative=True)
+        return UNKNOWN_REPUTATION, "error"
+
+def enrich(ip):
+    # update_ip_list가 게시한 FireHOL 인덱스에 있으면 API를 호출하지 않음
+    # (THREAT_LIST_BUCKET 미설정 시 항상 미등재)
+    listed = get_matcher().match(ip)
+    if listed:
+        return dict(LISTED_REPUTATION, ip=ip, threat_match=listed), "blocklist"
+    reputation, source = lookup(ip)
+    return dict(reputation, ip=ip), source
+
+@metrics.handler('abuseipdb_lookup_lambda', propagate=True)
+def lambda_handler(event, context):
+    ip = event.get("ip")
+    if not ip:
+        return event
+
+    reputation, source = enrich(ip)
+    metrics.count(f"lookup.{source}")
+    event.update(reputation)
+    event["cache"] = dict(cache.stats, source=source)
+    return event
+
+@metrics.handler('abuseipdb_lookup_batch')
+def batch_handler(event, context):
+    """여러 IP를 한 번에 조회하는 배치 진입점 ({"ips": [...]} 또는 IP 리스트)"""
+    ips = event.get("ips", []) if isinstance(event, dict) else event
+    unique = list(dict.fromkeys(ip for ip in ips if ip))
+
+    def enrich_one(ip):
+        # IP 하나의 실패가 배치 전체(다른 IP의 평판과 알림)를 막지 않도록 N/A로 대체
+        try:
+            return enrich(ip)
+        except Exception as e:
+            print(f"[WARN] enrichment failed for {ip}: {e}")
+            return dict(UNKNOWN_REPUTATION, ip=ip), "error"
+
+    with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as pool:
+        enriched = dict(zip(unique, pool.map(enrich_one, unique)))
+
+    sources = {}
+    for _, source in enriched.values():
+        sources[source] = sources.get(source, 0) + 1
+    for source, n in sources.items():
+        metrics.count(f"lookup.{source}", n)
+
+    return {
+        "results": [enriched[ip][0] for ip in unique],
+        "sources": sources,
+        "cache": dict(cache.stats)
+    }
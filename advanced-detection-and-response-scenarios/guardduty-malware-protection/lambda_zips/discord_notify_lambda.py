@@ -1,10 +1,7 @@
-import json
-import os
-import requests
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import notifier  # Discord 전송 공용 모듈 (shared/notifier.py, 패키징 시 함께 포함)
 
-DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
-
-def lambda_handler(event, context):
+def build_embed(event):
     ip = event.get("ip", "N/A")
     abuse_score = event.get("abuse_score", "N/A")
     isp = event.get("isp", "N/A")
@@ -29,12 +26,23 @@ def lambda_handler(event, context):
         ],
         "footer": {"text": "AWS WAF 자동 대응 시스템"}
     }
+    return embed
 
-    data = { "embeds": [embed] }
-
-    try:
-        res = requests.post(DISCORD_WEBHOOK_URL, json=data)
-        res.raise_for_status()
-        return {"statusCode": 200, "body": "Notification sent"}
-    except Exception as e:
-        return {"statusCode": 500, "body": str(e)}
\ No newline at end of file
+@metrics.handler('discord_notify_lambda')
+def lambda_handler(event, context):
+    dispatcher = notifier.get_notifier()
+    if "results" in event or "ips" in event:
+        # 여러 IP 모드: IP별 embed를 모아 한 번에 전송 (메시지당 embed 최대 10개)
+        # 배치 조회 자체가 실패하면(enrichment-unavailable) 평판 없이 IP만 알림
+        for result in event.get("results") or [{"ip": ip} for ip in event["ips"]]:
+            dispatcher.add(embed=build_embed(result))
+        stats = dispatcher.flush(deadline=notifier.deadline_from(context))
+    else:
+        # 429 응답 시 retry_after만큼 기다렸다가 재전송 (남은 실행 시간 안에서만)
+        stats = dispatcher.send(embed=build_embed(event), deadline=notifier.deadline_from(context))
+    if stats["dropped"]:
+        metrics.tag(outcome='failed')
+        return {"statusCode": 500, "body": "Discord notification failed"}
+    # 실행 시작 → 알림 전송 (time-to-notify SLO)
+    metrics.since_trace('TimeToNotify')
+    return {"statusCode": 200, "body": "Notification sent"}
\ No newline at end of file
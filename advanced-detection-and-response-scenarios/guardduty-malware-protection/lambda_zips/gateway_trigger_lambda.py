@@ -1,36 +1,367 @@
+import hashlib
+import ipaddress
 import json
-import boto3
 import os
+import time
 
-stepfunctions = boto3.client('stepfunctions')
+from botocore.exceptions import ClientError
+
+import aws_clients
+import metrics
+import threat_ip_matcher
+
+# 큐 모드에서는 요청 경로가 SQS만, 직접 모드에서는 Step Functions만 쓰므로 쓰는 쪽만 생성
+stepfunctions = aws_clients.lazy('stepfunctions')
+sqs = aws_clients.lazy('sqs')
+dynamodb = aws_clients.lazy('dynamodb')
 STEP_FUNCTION_ARN = os.environ['STEP_FUNCTION_ARN']
+# EXPRESS 상태 머신은 실행 이름 중복을 거절하지 않으므로 이 테이블에 이름을 조건부로 먼저 기록해 중복 제거
+# (STANDARD는 start_execution의 ExecutionAlreadyExists로 충분 - 비워 둠)
+EXECUTION_NAME_TABLE = os.environ.get('EXECUTION_NAME_TABLE')
+# 큐 URL이 설정되면 실행을 바로 시작하지 않고 수집 큐에 넣어 batch_handler가 윈도우 단위로 묶어 시작
+INGEST_QUEUE_URL = os.environ.get('INGEST_QUEUE_URL')
+# batch_handler가 실행 적체로 미룬 메시지를 다시 넣는 큐 (수집 큐와 같음) / 지연(초, 최대 900) / 최대 횟수
+DEFER_QUEUE_URL = os.environ.get('DEFER_QUEUE_URL')
+DEFER_SECONDS = min(int(os.environ.get('DEFER_SECONDS', '60')), 900)
+MAX_DEFERRALS = int(os.environ.get('MAX_DEFERRALS', '30'))
+SQS_BATCH_LIMIT = 10
+# 같은 IP는 이 시간(초) 안에 한 번만 실행 (실행 이름에 윈도우 번호를 넣어 컨테이너 간에도 중복 제거)
+DEDUPE_WINDOW = int(os.environ.get('DEDUPE_WINDOW_SECONDS', '60'))
+# 실행 중인 상태 머신 실행 수 / 수집 큐 적체가 이 값을 넘으면 429로 거절 (0이면 확인 안 함)
+MAX_RUNNING = int(os.environ.get('MAX_RUNNING_EXECUTIONS', '200'))
+MAX_QUEUE_BACKLOG = int(os.environ.get('MAX_QUEUE_BACKLOG', '5000'))
+BACKLOG_CACHE_SECONDS = 5
+# 요청 하나 / 실행 하나에 담을 수 있는 IP 수
+MAX_IPS_PER_REQUEST = 100
+MAX_IPS_PER_EXECUTION = 500
+MAX_RULE_ID_LENGTH = 128
+
+clock = time.time
+
+# warm 호출 간 재사용 (IP → 중복 제거 만료 시각, 적체 확인 결과)
+recent = {}
+_backlog = {'checked': float('-inf'), 'value': 0}
+
+
+def response(status, body, headers=None):
+    return {"statusCode": status, "headers": dict({"Content-Type": "application/json"}, **(headers or {})),
+            "body": json.dumps(body)}
+
+
+def parse_ip(value):
+    """차단 가능한 단일 IPv4면 정규화된 문자열, 아니면 None (0.0.0.0 / 루프백 / 멀티캐스트 / 예약 대역 거절)
+
+    차단 IPSet(waf_ipset_acl.tf)은 IPV4 전용이라 IPv6가 섞이면 update_ip_set이 배치 전체를 거절하므로 받지 않는다.
+    """
+    try:
+        ip = ipaddress.ip_address(str(value).strip())
+    except ValueError:
+        return None
+    if ip.version != 4:
+        return None
+    if ip.is_unspecified or ip.is_loopback or ip.is_multicast or ip.is_reserved or ip.is_link_local:
+        return None
+    return str(ip)
+
+
+def validate(payload):
+    """요청 본문 검사 → (IP 목록, 메타데이터, 오류 목록)"""
+    if not isinstance(payload, dict):
+        return [], {}, ["payload must be a JSON object"]
+    errors = []
+    raw = payload.get('ips')
+    if raw is None:
+        raw = [payload.get('ip') or payload.get('source_ip')] if (payload.get('ip') or payload.get('source_ip')) else []
+    if not isinstance(raw, list) or not raw:
+        errors.append("'ip' or 'ips' is required")
+        raw = []
+    elif len(raw) > MAX_IPS_PER_REQUEST:
+        errors.append(f"at most {MAX_IPS_PER_REQUEST} IPs per request")
+    ips = []
+    for value in raw[:MAX_IPS_PER_REQUEST]:
+        ip = parse_ip(value)
+        if ip is None:
+            errors.append(f"invalid or non-IPv4 IP: {str(value)[:64]}")
+        elif ip not in ips:
+            ips.append(ip)
+
+    rule_id = payload.get('rule_id', "unknown-rule")
+    if not isinstance(rule_id, str) or len(rule_id) > MAX_RULE_ID_LENGTH:
+        errors.append("'rule_id' must be a string of at most 128 characters")
+    event_count = payload.get('event_count', 1)
+    if isinstance(event_count, bool) or not isinstance(event_count, int) or event_count < 1:
+        errors.append("'event_count' must be a positive integer")
+    meta = {"rule_id": rule_id, "event_count": event_count, "timestamp": str(payload.get('timestamp', "unknown"))}
+    return ips, meta, errors
+
+
+def window():
+    return int(clock() // DEDUPE_WINDOW)
+
+
+def execution_name(ips):
+    """같은 윈도우 안의 같은 IP(목록)는 같은 이름 → start_execution이 중복 실행을 만들지 않음
+
+    STANDARD 상태 머신만 이름 중복을 거절한다. EXPRESS는 같은 이름으로도 새 실행을 시작하므로
+    EXECUTION_NAME_TABLE에 이름을 먼저 조건부로 기록(claim)해 컨테이너 간 중복을 막는다.
+    """
+    if len(ips) == 1:
+        key = ips[0].replace('.', '-').replace(':', '_')
+    else:
+        key = "batch-" + hashlib.sha256(",".join(sorted(ips)).encode()).hexdigest()[:16]
+    return f"ip-{key}-{window()}"[:80]
+
+
+def fresh(ips):
+    """컨테이너 안에서 중복 제거 윈도우가 지나지 않은 IP를 제외"""
+    now = clock()
+    if len(recent) > 10000:
+        for ip in [ip for ip, expires in recent.items() if expires <= now]:
+            del recent[ip]
+    return [ip for ip in ips if recent.get(ip, 0) <= now]
+
+
+def remember(ips):
+    expires = (window() + 1) * DEDUPE_WINDOW
+    for ip in ips:
+        recent[ip] = expires
+
+
+def backlog():
+    """실행 중인 실행 수 (큐 모드는 수집 큐 적체) - BACKLOG_CACHE_SECONDS 동안 재사용"""
+    now = clock()
+    if now - _backlog['checked'] < BACKLOG_CACHE_SECONDS:
+        return _backlog['value']
+    value = 0
+    try:
+        if INGEST_QUEUE_URL:
+            attrs = sqs.get_queue_attributes(QueueUrl=INGEST_QUEUE_URL, AttributeNames=['ApproximateNumberOfMessages'])
+            value = int(attrs['Attributes']['ApproximateNumberOfMessages'])
+        elif MAX_RUNNING:
+            page = stepfunctions.list_executions(stateMachineArn=STEP_FUNCTION_ARN, statusFilter='RUNNING',
+                                                 maxResults=min(MAX_RUNNING, 1000))
+            value = len(page['executions']) + (1 if page.get('nextToken') else 0)
+    except ClientError as e:
+        # Express 상태 머신은 list_executions를 지원하지 않음 → 확인 생략
+        print(f"[WARN] backlog check failed: {e}")
+    _backlog.update(checked=now, value=value)
+    return value
+
+
+def over_limit(value):
+    return (MAX_QUEUE_BACKLOG and value >= MAX_QUEUE_BACKLOG) if INGEST_QUEUE_URL else (MAX_RUNNING and value >= MAX_RUNNING)
+
 
+def execution_arn(name):
+    return f"{STEP_FUNCTION_ARN.replace(':stateMachine:', ':execution:')}:{name}"
+
+
+def claim(name):
+    """실행 이름을 테이블에 조건부로 기록 - 다른 컨테이너가 먼저 기록했으면 False"""
+    try:
+        dynamodb.put_item(
+            TableName=EXECUTION_NAME_TABLE,
+            Item={'name': {'S': name}, 'expires_at': {'N': str((window() + 2) * DEDUPE_WINDOW)}},
+            ConditionExpression='attribute_not_exists(#name)',
+            ExpressionAttributeNames={'#name': 'name'}
+        )
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return False
+
+
+def release(name):
+    # 실행 시작에 실패한 이름은 지워 재시도(SQS 재전달 / 호출자 재요청)가 중복으로 취급되지 않게 함
+    try:
+        dynamodb.delete_item(TableName=EXECUTION_NAME_TABLE, Key={'name': {'S': name}})
+    except ClientError as e:
+        print(f"[WARN] failed to release execution name {name}: {e}")
+
+
+def start(ips, meta):
+    """IP 하나는 기존 단일 입력, 여러 개는 상태 머신 Map 모드 입력으로 실행 시작 → (executionArn, 중복 여부)"""
+    input_data = dict(meta)
+    if len(ips) == 1:
+        input_data["ip"] = ips[0]
+        # FireHOL 목록 등재 여부 (조회 실패/버킷 미설정 시 미등재로 처리)
+        threat = threat_ip_matcher.lookup(ips[0])
+        input_data["threat_listed"] = threat["listed"]
+        input_data["threat_match"] = threat["match"] or "N/A"
+    else:
+        # FireHOL 확인은 조회 단계에서 IP별로
+        input_data["ips"] = ips
+    name = execution_name(ips)
+    if EXECUTION_NAME_TABLE and not claim(name):
+        return execution_arn(name), True
+    try:
+        result = stepfunctions.start_execution(stateMachineArn=STEP_FUNCTION_ARN, name=name,
+                                               input=json.dumps(input_data))
+        return result['executionArn'], False
+    except ClientError as e:
+        # 같은 이름의 실행이 이미 있음 = 다른 컨테이너가 같은 윈도우에 이미 시작
+        if e.response['Error']['Code'] != 'ExecutionAlreadyExists':
+            if EXECUTION_NAME_TABLE:
+                release(name)
+            raise
+        return execution_arn(name), True
+    except Exception:
+        if EXECUTION_NAME_TABLE:
+            release(name)
+        raise
+
+
+def merge_meta(requests):
+    """여러 요청의 메타데이터를 실행 하나의 입력으로 합침 (규칙 / 시각 목록, 이벤트 수 합계)
+
+    rule_id / timestamp는 단일 입력과 같은 형식으로 첫 요청 값을 유지하고, 묶인 모든 요청의 값은
+    rule_ids / timestamps에 (중복 없이) 담는다.
+    """
+    rule_ids = list(dict.fromkeys(m.get("rule_id", "unknown-rule") for m in requests))
+    timestamps = list(dict.fromkeys(m.get("timestamp", "unknown") for m in requests))
+    return {
+        "rule_id": rule_ids[0] if rule_ids else "unknown-rule",
+        "rule_ids": rule_ids,
+        "event_count": sum(m.get("event_count", 1) for m in requests),
+        "timestamp": timestamps[0] if timestamps else "unknown",
+        "timestamps": timestamps,
+        "requests": len(requests)
+    }
+
+
+@metrics.handler('gateway_trigger_lambda')
 def lambda_handler(event, context):
     print("[INFO] Raw event: ", json.dumps(event))
     if 'body' in event:
         body = event['body']
-        payload = json.loads(body) if isinstance(body, str) else body
+        try:
+            payload = json.loads(body) if isinstance(body, str) else body
+        except ValueError:
+            metrics.tag(outcome='rejected')
+            return response(400, {"message": "Invalid JSON body"})
     else:
         payload = event
 
-    ip = payload.get('ip') or payload.get('source_ip') or "0.0.0.0"
-    rule_id = payload.get('rule_id', "unknown-rule")
-    event_count = payload.get('event_count', 1)
-    timestamp = payload.get('timestamp', "unknown")
+    # 잘못된 요청은 실행을 만들기 전에 거절 (IP 누락 시 0.0.0.0으로 대체하지 않음)
+    ips, meta, errors = validate(payload)
+    if errors:
+        metrics.tag(outcome='rejected')
+        return response(400, {"message": "Invalid payload", "errors": errors})
 
-    input_data = {
-        "ip": ip,
-        "rule_id": rule_id,
-        "event_count": event_count,
-        "timestamp": timestamp
-    }
+    pending = fresh(ips)
+    if not pending:
+        metrics.tag(outcome='duplicate')
+        return response(200, {"message": "Duplicate within dedupe window", "coalesced": len(ips)})
 
-    response = stepfunctions.start_execution(
-        stateMachineArn=STEP_FUNCTION_ARN,
-        input=json.dumps(input_data)
-    )
+    # 적체가 한도를 넘으면 실행을 늘리지 않고 호출자에게 재시도를 요청
+    if over_limit(backlog()):
+        metrics.tag(outcome='throttled')
+        return response(429, {"message": "Too many pending executions, retry later"},
+                        headers={"Retry-After": str(BACKLOG_CACHE_SECONDS)})
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps({"message": "Step Function started", "executionArn": response['executionArn']})
-    }
\ No newline at end of file
+    if INGEST_QUEUE_URL:
+        sqs.send_message(QueueUrl=INGEST_QUEUE_URL, MessageBody=json.dumps(dict(meta, ips=pending)))
+        remember(pending)
+        _backlog['value'] += 1
+        metrics.tag(outcome='queued')
+        return response(202, {"message": "Queued", "ips": len(pending), "coalesced": len(ips) - len(pending)})
+
+    arn, duplicate = start(pending, meta)
+    remember(pending)
+    # 캐시된 적체 값에 이 컨테이너가 시작한 실행을 더해 다음 확인 전까지 한도를 넘지 않도록
+    _backlog['value'] += not duplicate
+    # 실행 이름 = 이후 단계 지표의 TraceId (로그에서 요청과 실행을 연결)
+    metrics.tag(outcome='duplicate' if duplicate else 'started', ExecutionName=arn.rsplit(':', 1)[-1])
+    return response(200, {
+        "message": "Duplicate within dedupe window" if duplicate else "Step Function started",
+        "executionArn": arn
+    })
+
+
+def defer(records):
+    """적체로 미룬 메시지를 DEFER_SECONDS 지연을 건 새 메시지로 다시 넣고, 다시 넣지 못한 messageId 목록을 반환
+
+    실패로 돌려보내면 수신 횟수가 쌓여 적체가 길어질 때 maxReceiveCount를 넘어 DLQ로 가므로, 원본은 성공 처리로
+    지우고 본문의 deferred 횟수만 늘려 재전송한다. MAX_DEFERRALS를 넘긴 메시지는 실패로 돌려보내 DLQ 경로를 따른다.
+    """
+    if not DEFER_QUEUE_URL:
+        return [r['messageId'] for r in records]
+    failed, entries = [], []
+    for record in records:
+        try:
+            body = json.loads(record['body'])
+        except ValueError:
+            continue
+        deferred = body.get('deferred', 0) + 1
+        if deferred > MAX_DEFERRALS:
+            failed.append(record['messageId'])
+            continue
+        entries.append((record['messageId'], json.dumps(dict(body, deferred=deferred))))
+    for i in range(0, len(entries), SQS_BATCH_LIMIT):
+        chunk = entries[i:i + SQS_BATCH_LIMIT]
+        try:
+            result = sqs.send_message_batch(QueueUrl=DEFER_QUEUE_URL, Entries=[
+                {'Id': str(n), 'MessageBody': body, 'DelaySeconds': DEFER_SECONDS} for n, (_, body) in enumerate(chunk)
+            ])
+            failed.extend(chunk[int(item['Id'])][0] for item in result.get('Failed', []))
+        except ClientError as e:
+            print(f"[WARN] defer failed: {e}")
+            failed.extend(message_id for message_id, _ in chunk)
+    return failed
+
+
+@metrics.handler('gateway_trigger_batch')
+def batch_handler(event, context):
+    """수집 큐(SQS) 배치 → 윈도우 동안 모인 서로 다른 IP를 실행 하나로 묶어 시작"""
+    ips, requests, sources, message_ids = [], [], {}, []
+    for record in event.get('Records', []):
+        message_ids.append(record['messageId'])
+        try:
+            body = json.loads(record['body'])
+        except ValueError:
+            print(f"[WARN] Invalid message body: {record['body']}")
+            continue
+        # IP마다 그 IP를 요청한 메시지의 메타데이터 번호를 기록 (실행별로 해당 요청들의 메타데이터만 합침)
+        requests.append({k: body[k] for k in ("rule_id", "event_count", "timestamp") if k in body})
+        for ip in body.get('ips', []):
+            if ip not in sources:
+                ips.append(ip)
+                sources[ip] = []
+            sources[ip].append(len(requests) - 1)
+
+    pending = fresh(ips)
+    if not pending:
+        return {"batchItemFailures": []}
+
+    # 실행 적체가 한도를 넘으면 배치를 지연 재전송해(DEFER_SECONDS 후 재처리) 실행 수를 늘리지 않음
+    if MAX_RUNNING:
+        try:
+            page = stepfunctions.list_executions(stateMachineArn=STEP_FUNCTION_ARN, statusFilter='RUNNING',
+                                                 maxResults=min(MAX_RUNNING, 1000))
+            if len(page['executions']) >= MAX_RUNNING:
+                print(f"[WARN] {len(page['executions'])} running executions, deferring {len(pending)} IPs")
+                metrics.tag(outcome='deferred')
+                failed = defer(event.get('Records', []))
+                return {"batchItemFailures": [{"itemIdentifier": m} for m in failed]}
+        except ClientError as e:
+            print(f"[WARN] backlog check failed: {e}")
+
+    started = duplicates = 0
+    try:
+        for i in range(0, len(pending), MAX_IPS_PER_EXECUTION):
+            chunk = pending[i:i + MAX_IPS_PER_EXECUTION]
+            indexes = sorted({n for ip in chunk for n in sources[ip]})
+            _, duplicate = start(chunk, merge_meta([requests[n] for n in indexes]))
+            remember(chunk)
+            started += not duplicate
+            duplicates += duplicate
+    except Exception as e:
+        print(f"[ERROR] start_execution failed: {e}")
+        metrics.tag(outcome='retry')
+        return {"batchItemFailures": [{"itemIdentifier": m} for m in message_ids]}
+
+    print(f"[INFO] messages={len(message_ids)} ips={len(pending)} executions={started} duplicates={duplicates}")
+    metrics.count('gateway.executions', started)
+    metrics.count('gateway.ips', len(pending))
+    return {"batchItemFailures": []}
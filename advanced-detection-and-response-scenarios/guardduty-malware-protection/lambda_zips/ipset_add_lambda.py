@@ -1,29 +1,74 @@
 import json
-import boto3
 import os
 
-waf = boto3.client('wafv2', region_name='ap-northeast-2')
+import aws_clients
+import metrics
+from ipset_writer import IPSetWriter, to_cidr
+
+# 큐 모드는 SQS만, 직접 반영은 WAF만 사용 (첫 호출 때 생성)
+waf = aws_clients.lazy('wafv2', region_name='ap-northeast-2')
+sqs = aws_clients.lazy('sqs', region_name='ap-northeast-2')
 IPSET_NAME = os.environ['IPSET_NAME']
 IPSET_ID = os.environ['IPSET_ID']
 SCOPE = os.environ.get('WAF_SCOPE', 'REGIONAL')
+# 큐 URL이 설정되면 IPSet을 직접 수정하지 않고 배치 작성기(ipset_flush_lambda)로 넘김
+QUEUE_URL = os.environ.get('IPSET_QUEUE_URL')
 
-def lambda_handler(event, context):
+writer = IPSetWriter(waf, IPSET_NAME, IPSET_ID, SCOPE)
+
+def add_many(ips):
+    """Map 모드: 여러 IP를 한 번의 IPSet 반영(또는 큐 메시지 하나)으로 처리 (IPv4가 아닌 값은 invalid로 분리)"""
+    valid = [ip for ip in dict.fromkeys(ips) if to_cidr(ip)]
+    invalid = [ip for ip in ips if not to_cidr(ip)]
+    if not valid:
+        return {"status": "failed", "reason": "No valid IP provided", "invalid": invalid}
+
+    try:
+        if QUEUE_URL:
+            # trace를 함께 넘겨 ipset_flush_lambda가 실제 반영 시점의 time-to-contain을 기록
+            sqs.send_message(QueueUrl=QUEUE_URL,
+                             MessageBody=json.dumps({"ips": valid, "trace": metrics.current_trace()}))
+            return {"status": "queued", "message": f"{len(valid)} IPs queued", "invalid": invalid}
+
+        result = writer.apply(valid)
+        if result["added"]:
+            metrics.since_trace('TimeToContain')
+        return {
+            "status": "success" if result["added"] else "skipped",
+            "message": f"{len(result['added'])} added, {len(result['skipped'])} already blocked",
+            "added": result["added"],
+            "invalid": invalid
+        }
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+def add_one(event):
     source_ip = event.get('ip')
     if not source_ip:
         return {"status": "failed", "reason": "No IP provided", "ip": "N/A"}
 
+    ip_cidr = to_cidr(source_ip)
+    if ip_cidr is None:
+        return {"status": "failed", "reason": "Invalid or non-IPv4 IP", "ip": source_ip}
+
     try:
-        response = waf.get_ip_set(Name=IPSET_NAME, Scope=SCOPE, Id=IPSET_ID)
-        addresses = response['IPSet']['Addresses']
-        lock_token = response['LockToken']
-        ip_cidr = f"{source_ip}/32"
+        if QUEUE_URL:
+            sqs.send_message(QueueUrl=QUEUE_URL,
+                             MessageBody=json.dumps({"ip": source_ip, "trace": metrics.current_trace()}))
+            return {"status": "queued", "message": f"{ip_cidr} queued", "ip": source_ip}
 
-        if ip_cidr in addresses:
+        result = writer.apply([source_ip])
+        if not result["added"]:
             return {"status": "skipped", "reason": "IP already exists", "ip": source_ip}
 
-        addresses.append(ip_cidr)
-        waf.update_ip_set(Name=IPSET_NAME, Scope=SCOPE, Id=IPSET_ID, Addresses=addresses, LockToken=lock_token)
-
+        # 실행 시작 → IPSet 반영 (time-to-contain SLO)
+        metrics.since_trace('TimeToContain')
         return {"status": "success", "message": f"{ip_cidr} added", "ip": source_ip}
     except Exception as e:
-        return {"status": "error", "error": str(e), "ip": source_ip}
\ No newline at end of file
+        return {"status": "error", "error": str(e), "ip": source_ip}
+
+@metrics.handler('ipset_add_lambda', propagate=True)
+def lambda_handler(event, context):
+    result = add_many(event['ips']) if event.get('ips') else add_one(event)
+    metrics.tag(outcome=result["status"])
+    return result
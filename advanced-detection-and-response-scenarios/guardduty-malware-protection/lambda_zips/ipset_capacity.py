@@ -0,0 +1,330 @@
+import json
+import socket
+import time
+from array import array
+
+from ipset_writer import IPSetWriter, to_cidr
+
+# WAF IPSet 한 개당 최대 주소 수
+IPSET_LIMIT = 10000
+# 전체 용량 대비 이 비율을 넘으면 TTL 만료 항목부터 정리
+HIGH_WATERMARK = 0.9
+# 마지막 탐지 이후 이 시간이 지나면 만료 대상 (기본 7일)
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def parse_cidr(cidr):
+    """정규화된 IPv4 CIDR 문자열을 (정수 주소, prefix 길이)로 변환"""
+    addr, _, prefixlen = cidr.partition('/')
+    prefixlen = int(prefixlen) if prefixlen else 32
+    mask = (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+    return int.from_bytes(socket.inet_aton(addr), 'big') & mask, prefixlen
+
+
+class PrefixTrie:
+    """IPv4 이진 radix(prefix) 트라이
+
+    완전히 채워진 노드는 하나의 CIDR로 표현되고, 형제 노드가 둘 다 채워지면
+    부모로 합쳐진다. 따라서 cidrs()는 항상 입력을 정확히 덮는 최소 CIDR 집합이다.
+    노드는 배열(left/right/full/count)로 보관해 객체 생성 비용을 줄인다.
+    """
+
+    def __init__(self):
+        self.left = array('I', [0])
+        self.right = array('I', [0])
+        self.full = bytearray(1)
+        self.count = array('I', [0])   # 서브트리의 CIDR(채워진 노드) 개수
+
+    def __len__(self):
+        return self.count[0]
+
+    def _new_node(self):
+        self.left.append(0)
+        self.right.append(0)
+        self.full.append(0)
+        self.count.append(0)
+        return len(self.full) - 1
+
+    def insert(self, addr, prefixlen):
+        """네트워크(정수 주소, prefix 길이)를 추가하고 CIDR 개수 변화량을 반환"""
+        left, right, full, count = self.left, self.right, self.full, self.count
+        before = count[0]
+        path = []
+        node = 0
+        for depth in range(prefixlen):
+            if full[node]:
+                return 0                      # 상위 대역에 이미 포함됨
+            path.append(node)
+            if (addr >> (31 - depth)) & 1:
+                child = right[node]
+                if not child:
+                    child = self._new_node()
+                    right[node] = child
+            else:
+                child = left[node]
+                if not child:
+                    child = self._new_node()
+                    left[node] = child
+            node = child
+        if full[node]:
+            return 0
+
+        # 하위 대역을 흡수하고 채워진 노드로 표시
+        full[node] = 1
+        left[node] = right[node] = 0
+        count[node] = 1
+
+        # 루트 방향으로 올라가며 형제 병합 및 개수 갱신
+        while path:
+            parent = path.pop()
+            l, r = left[parent], right[parent]
+            if l and r and full[l] and full[r]:
+                full[parent] = 1
+                left[parent] = right[parent] = 0
+                count[parent] = 1
+            else:
+                count[parent] = (count[l] if l else 0) + (count[r] if r else 0)
+        return count[0] - before
+
+    def delta(self, addr, prefixlen):
+        """insert()를 했을 때의 CIDR 개수 변화량 (트라이는 변경하지 않음)"""
+        path = []
+        node = 0
+        for depth in range(prefixlen):
+            if self.full[node]:
+                return 0
+            bit = (addr >> (31 - depth)) & 1
+            path.append((node, bit))
+            node = self.right[node] if bit else self.left[node]
+            if not node:
+                break
+        else:
+            if self.full[node]:
+                return 0
+        absorbed = self.count[node] if node and len(path) == prefixlen else 0
+
+        # 형제가 채워져 있는 동안 위로 병합이 이어진다 (병합마다 1개 감소)
+        merges = 0
+        if len(path) == prefixlen:
+            for parent, bit in reversed(path):
+                sibling = self.left[parent] if bit else self.right[parent]
+                if not (sibling and self.full[sibling]):
+                    break
+                merges += 1
+        return 1 - absorbed - merges
+
+    def covers(self, addr, prefixlen):
+        """네트워크가 이미 트라이의 CIDR(상위 대역 또는 병합된 대역)에 완전히 포함되는지"""
+        node = 0
+        for depth in range(prefixlen):
+            if self.full[node]:
+                return True
+            node = self.right[node] if (addr >> (31 - depth)) & 1 else self.left[node]
+            if not node:
+                return False
+        return bool(self.full[node])
+
+    def add(self, cidr):
+        return self.insert(*parse_cidr(cidr))
+
+    def cidrs(self):
+        """최소 CIDR 목록을 주소 순으로 반환"""
+        result = []
+        stack = [(0, 0, 0)]
+        while stack:
+            node, addr, depth = stack.pop()
+            if self.full[node]:
+                result.append(f"{socket.inet_ntoa(addr.to_bytes(4, 'big'))}/{depth}")
+                continue
+            if self.right[node]:
+                stack.append((self.right[node], addr | (1 << (31 - depth)), depth + 1))
+            if self.left[node]:
+                stack.append((self.left[node], addr, depth + 1))
+        return result
+
+
+class MemoryStateStore:
+    """항목별 마지막 탐지 시각을 메모리에 보관 (로컬 테스트용)"""
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+
+    def load(self):
+        return dict(self.entries)
+
+    def save(self, entries):
+        self.entries = dict(entries)
+
+
+class S3StateStore:
+    """항목별 마지막 탐지 시각을 S3 JSON 객체 하나로 보관
+
+    flush Lambda는 이벤트 소스 매핑에서 동시 실행이 최대 2개라 마지막 저장이 이긴다.
+    덮어써져 빠진 항목도 IPSet에는 남아 있으므로 다음 flush가 기존 주소로 다시 편입한다
+    (차단이 풀리지는 않고 마지막 탐지 시각만 그 시점으로 갱신됨).
+    """
+
+    def __init__(self, s3, bucket, key):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+
+    def load(self):
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=self.key)['Body'].read()
+        except self.s3.exceptions.NoSuchKey:
+            return {}
+        return json.loads(body).get('entries', {})
+
+    def save(self, entries):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Body=json.dumps({"entries": entries}, separators=(',', ':')),
+            ContentType='application/json'
+        )
+
+
+def aggregate(entries, capacity):
+    """최근 탐지 순으로 트라이에 넣어 capacity 이내의 최소 CIDR 집합을 만든다
+
+    넣었을 때 용량을 넘기는 항목(가장 오래전에 탐지된 것들)은 LRU로 제외되어 함께 반환된다.
+    이미 있는 대역에 흡수되거나 병합으로 개수가 늘지 않는 항목은 가득 찬 상태에서도 들어간다.
+    """
+    trie = PrefixTrie()
+    evicted = []
+    for cidr, _ in sorted(entries.items(), key=lambda item: item[1], reverse=True):
+        addr, prefixlen = parse_cidr(cidr)
+        # 한 항목은 개수를 최대 1 늘리므로 여유가 있으면 delta 계산(트라이 한 번 더 순회)을 생략
+        if len(trie) >= capacity and len(trie) + trie.delta(addr, prefixlen) > capacity:
+            evicted.append(cidr)
+        else:
+            trie.insert(addr, prefixlen)
+    return trie, evicted
+
+
+def build_trie(cidrs):
+    trie = PrefixTrie()
+    for cidr in cidrs:
+        trie.add(cidr)
+    return trie
+
+
+class IPSetCapacityManager:
+    """여러 IPSet 샤드에 걸쳐 차단 목록을 집계·만료·분산하는 관리자
+
+    - 새 IP를 상태 저장소(마지막 탐지 시각)에 기록
+    - prefix 트라이로 인접/중복 대역을 최소 CIDR로 병합
+    - 전체 용량의 HIGH_WATERMARK를 넘으면 TTL 만료 항목 제거, 그래도 넘치면 LRU 제거
+    - 기존 샤드 배치를 최대한 유지하며 남는 CIDR을 여유 있는 샤드에 배분
+    """
+
+    def __init__(self, waf, shards, store, scope='REGIONAL', limit=IPSET_LIMIT,
+                 ttl=DEFAULT_TTL, high_watermark=HIGH_WATERMARK, clock=time.time, **writer_options):
+        self.writers = [IPSetWriter(waf, shard['name'], shard['id'], scope, **writer_options) for shard in shards]
+        self.store = store
+        self.limit = limit
+        self.ttl = ttl
+        self.high_watermark = high_watermark
+        self.clock = clock
+
+    @property
+    def capacity(self):
+        return self.limit * len(self.writers)
+
+    def plan(self, entries, trie=None):
+        """항목(cidr → 마지막 탐지 시각)에서 만료/축출을 적용한 최소 CIDR 트라이 계산
+
+        trie는 entries 전체를 넣은 트라이 (호출자가 이미 만들었으면 재사용)
+        """
+        now = self.clock()
+        if trie is None:
+            trie = build_trie(entries)
+        expired = []
+        if len(trie) > self.capacity * self.high_watermark:
+            expired = [cidr for cidr, seen in entries.items() if now - seen > self.ttl]
+            for cidr in expired:
+                del entries[cidr]
+            trie = build_trie(entries)
+
+        evicted = []
+        if len(trie) > self.capacity:
+            trie, evicted = aggregate(entries, self.capacity)
+            for cidr in evicted:
+                del entries[cidr]
+        return trie, expired, evicted
+
+    def apply(self, ips):
+        now = self.clock()
+        entries = self.store.load()
+        invalid = []
+        for ip in ips:
+            cidr = to_cidr(ip)
+            if cidr is None or ':' in cidr:
+                invalid.append(ip)
+            else:
+                entries[cidr] = now
+
+        # 상태 저장소에 없는 기존 주소(수동 등록 등)는 지금 탐지된 것으로 편입
+        # 이전 실행이 병합해 쓴 CIDR처럼 기존 항목이 이미 덮는 주소는 제외 (TTL은 구성 항목의 탐지 시각을 따름)
+        # known은 편입한 주소까지 넣어 두고 plan()에서 그대로 재사용 (10만 항목 기준 트라이 구성이 수 초)
+        known = build_trie(entries)
+        shard_addresses = []
+        for writer in self.writers:
+            response = writer.waf.get_ip_set(Name=writer.name, Scope=writer.scope, Id=writer.ipset_id)
+            shard_addresses.append(response['IPSet']['Addresses'])
+            for address in response['IPSet']['Addresses']:
+                network = parse_cidr(address)
+                if not known.covers(*network):
+                    entries.setdefault(address, now)
+                    known.insert(*network)
+
+        desired_trie, expired, evicted = self.plan(entries, known)
+        desired = desired_trie.cidrs()
+        desired_set = set(desired)
+
+        # 1차: 각 샤드에서 여전히 필요한 주소는 그대로 유지
+        current = []
+        placed = set()
+        for addresses in shard_addresses:
+            kept = [a for a in addresses if a in desired_set and a not in placed]
+            placed.update(kept)
+            current.append(kept)
+
+        # 2차: 아직 배치되지 않은 CIDR을 여유 있는 샤드 순서대로 채움
+        remaining = [cidr for cidr in desired if cidr not in placed]
+        for addresses in current:
+            free = self.limit - len(addresses)
+            if free > 0 and remaining:
+                addresses.extend(remaining[:free])
+                remaining = remaining[free:]
+
+        # 샤드를 통째로 교체하지 않고 LockToken으로 읽은 현재 내용과 병합
+        # (계획 이후 다른 작성자 - 배치 비활성화 시 ipset_add_lambda 직접 모드 등 - 가 추가한 주소는 유지하고,
+        #  계획 시점에 있던 주소만 만료 / 축출 / 병합 결과대로 제거)
+        attempts = 0
+        for writer, addresses, snapshot in zip(self.writers, current, shard_addresses):
+            target = sorted(set(addresses))
+            snapshot = set(snapshot)
+
+            def merge(existing, target=target, snapshot=snapshot):
+                added = [a for a in existing if a not in snapshot and not desired_trie.covers(*parse_cidr(a))]
+                for address in added:
+                    entries.setdefault(address, now)
+                # 샤드 한도를 넘는 동시 추가분은 상태에만 기록하고 다음 배치에서 배치
+                free = max(0, self.limit - len(target))
+                merged = sorted(set(target).union(added[:free]))
+                return None if sorted(existing) == merged else merged
+
+            attempts += writer.update(merge)
+
+        self.store.save(entries)
+        return {
+            "entries": len(entries),
+            "cidrs": len(desired),
+            "shards": [len(addresses) for addresses in current],
+            "expired": len(expired),
+            "evicted": len(evicted),
+            "invalid": invalid,
+            "attempts": attempts
+        }
@@ -0,0 +1,65 @@
+import json
+import os
+
+import aws_clients
+import metrics
+from ipset_capacity import DEFAULT_TTL, IPSetCapacityManager, S3StateStore
+from ipset_writer import IPSetWriter
+
+waf = aws_clients.lazy('wafv2', region_name='ap-northeast-2')
+IPSET_NAME = os.environ['IPSET_NAME']
+IPSET_ID = os.environ['IPSET_ID']
+SCOPE = os.environ.get('WAF_SCOPE', 'REGIONAL')
+# 샤드 IPSet 목록 (JSON: [{"name": ..., "id": ...}, ...]), 없으면 기본 IPSet 하나만 사용
+IPSET_SHARDS = json.loads(os.environ.get('IPSET_SHARDS') or '[]') or [{"name": IPSET_NAME, "id": IPSET_ID}]
+# 항목별 마지막 탐지 시각을 보관할 S3 위치 (설정 시 CIDR 병합 / TTL·LRU / 샤딩 사용)
+STATE_BUCKET = os.environ.get('IPSET_STATE_BUCKET')
+STATE_KEY = os.environ.get('IPSET_STATE_KEY', 'ipset-state/entries.json')
+TTL = int(os.environ.get('IPSET_TTL_SECONDS', DEFAULT_TTL))
+
+if STATE_BUCKET:
+    writer = IPSetCapacityManager(
+        waf, IPSET_SHARDS, S3StateStore(aws_clients.lazy('s3'), STATE_BUCKET, STATE_KEY), SCOPE, ttl=TTL
+    )
+else:
+    writer = IPSetWriter(waf, IPSET_NAME, IPSET_ID, SCOPE)
+
+@metrics.handler('ipset_flush_lambda')
+def lambda_handler(event, context):
+    # SQS 배치(배치 윈도우 동안 모인 메시지)에서 IP 수집
+    ips = []
+    message_ids = []
+    traces = []
+    for record in event.get('Records', []):
+        message_ids.append(record['messageId'])
+        try:
+            body = json.loads(record['body'])
+        except ValueError:
+            print(f"[WARN] Invalid message body: {record['body']}")
+            continue
+        if body.get('ip'):
+            ips.append(body['ip'])
+        ips.extend(body.get('ips', []))
+        if body.get('trace'):
+            traces.append(body['trace'])
+
+    if not ips:
+        return {"batchItemFailures": []}
+
+    # 윈도우 전체를 한 번의 update_ip_set으로 반영
+    try:
+        result = writer.apply(ips)
+    except Exception as e:
+        # 재시도 한도를 넘기면 배치 전체를 SQS로 돌려보내 다시 처리
+        print(f"[ERROR] IPSet update failed: {e}")
+        metrics.tag(outcome='retry')
+        return {"batchItemFailures": [{"itemIdentifier": m} for m in message_ids]}
+
+    summary = {k: len(v) if k in ("added", "skipped", "invalid") else v for k, v in result.items()}
+    # 요청을 받은 상태 머신 실행 시작 → 배치 반영 (큐 모드의 time-to-contain SLO)
+    for trace in traces:
+        metrics.since_trace('TimeToContain', trace)
+    metrics.count('ipset.messages', len(message_ids))
+    metrics.count('ipset.added', summary.get('added', 0))
+    print(f"[INFO] messages={len(message_ids)} result={json.dumps(summary)}")
+    return {"batchItemFailures": []}
@@ -0,0 +1,128 @@
+import ipaddress
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+# LockToken 충돌 시 재시도 설정
+MAX_RETRIES = 6
+BASE_DELAY = 0.1      # 첫 재시도 대기 시간(초)
+MAX_DELAY = 3.0       # 재시도 대기 시간 상한(초)
+# 차단 IPSet의 주소 버전 (waf_ipset_acl.tf의 IPSet은 모두 IPV4 - IPv6 주소가 섞이면 update_ip_set이 배치 전체를 거절)
+IP_VERSION = 4
+
+
+def to_cidr(value):
+    """IP 또는 CIDR 문자열을 정규화된 CIDR 문자열로 변환 (잘못된 값 / IPv4가 아닌 값은 None)"""
+    try:
+        net = ipaddress.ip_network(str(value).strip(), strict=False)
+    except ValueError:
+        return None
+    return str(net) if net.version == IP_VERSION else None
+
+
+class CidrIndex:
+    """IPSet 주소를 prefix 길이별 네트워크 정수 집합으로 보관하는 인덱스
+
+    `ip_cidr in addresses` 리스트 탐색 대신, 이미 등록된 CIDR(상위 대역 포함)에
+    포함되는지 prefix 길이 개수만큼의 set 조회로 판정한다.
+    """
+
+    def __init__(self, addresses=()):
+        self._by_prefix = {}
+        for address in addresses:
+            self.add(address)
+
+    def add(self, cidr):
+        net = ipaddress.ip_network(cidr, strict=False)
+        self._by_prefix.setdefault((net.version, net.prefixlen), set()).add(int(net.network_address))
+
+    def covers(self, cidr):
+        net = ipaddress.ip_network(cidr, strict=False)
+        bits = net.max_prefixlen
+        addr = int(net.network_address)
+        for (version, prefixlen), networks in self._by_prefix.items():
+            if version != net.version or prefixlen > net.prefixlen:
+                continue
+            mask = ((1 << prefixlen) - 1) << (bits - prefixlen) if prefixlen else 0
+            if addr & mask in networks:
+                return True
+        return False
+
+
+def is_lock_conflict(error):
+    return isinstance(error, ClientError) and \
+        error.response.get('Error', {}).get('Code') == 'WAFOptimisticLockException'
+
+
+class IPSetWriter:
+    """여러 IP를 한 번의 get_ip_set / update_ip_set으로 반영하는 WAF IPSet 작성기"""
+
+    def __init__(self, waf, name, ipset_id, scope='REGIONAL',
+                 max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 sleep=time.sleep):
+        self.waf = waf
+        self.name = name
+        self.ipset_id = ipset_id
+        self.scope = scope
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+
+    def update(self, compute):
+        """IPSet을 읽어 compute(addresses)가 돌려준 주소 목록으로 교체
+
+        compute가 None을 반환하면 변경 없이 종료한다. LockToken이 만료되면
+        (WAFOptimisticLockException) IPSet을 다시 읽어 지수 백오프(full jitter) 후
+        compute부터 재시도한다. 시도 횟수를 반환.
+        """
+        attempt = 0
+        while True:
+            response = self.waf.get_ip_set(Name=self.name, Scope=self.scope, Id=self.ipset_id)
+            addresses = compute(response['IPSet']['Addresses'])
+            if addresses is None:
+                return attempt + 1
+
+            try:
+                self.waf.update_ip_set(
+                    Name=self.name, Scope=self.scope, Id=self.ipset_id,
+                    Addresses=addresses, LockToken=response['LockToken']
+                )
+                return attempt + 1
+            except ClientError as e:
+                if not is_lock_conflict(e) or attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                attempt += 1
+                print(f"[WARN] LockToken conflict on {self.name}, retry {attempt}/{self.max_retries}")
+                self.sleep(random.uniform(0, delay))
+
+    def apply(self, ips):
+        """IP 목록을 IPSet에 병합하고 added/skipped/invalid 결과를 반환"""
+        pending = []
+        invalid = []
+        seen = set()
+        for ip in ips:
+            cidr = to_cidr(ip)
+            if cidr is None:
+                invalid.append(ip)
+            elif cidr not in seen:
+                seen.add(cidr)
+                pending.append(cidr)
+
+        result = {"added": [], "skipped": [], "invalid": invalid}
+
+        def merge(addresses):
+            index = CidrIndex(addresses)
+            result["added"], result["skipped"] = [], []
+            for cidr in pending:
+                if index.covers(cidr):
+                    result["skipped"].append(cidr)
+                else:
+                    index.add(cidr)
+                    result["added"].append(cidr)
+            return addresses + result["added"] if result["added"] else None
+
+        result["attempts"] = self.update(merge)
+        return result
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# 정상 조회 결과 / 조회 실패(negative) 결과 보관 시간(초)
+DEFAULT_TTL = 24 * 3600
+NEGATIVE_TTL = 5 * 60
+# 컨테이너 내 캐시 최대 항목 수
+LOCAL_MAXSIZE = 4096
+
+
+class TTLCache:
+    """TTL + LRU 축출을 지원하는 컨테이너 내 캐시 (warm 호출 간 유지)"""
+
+    def __init__(self, maxsize=LOCAL_MAXSIZE, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, self.clock() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DynamoDBTier:
+    """DynamoDB TTL 테이블 기반 공유 캐시 (expires_at 속성으로 자동 만료)"""
+
+    def __init__(self, dynamodb, table, clock=time.time):
+        self.dynamodb = dynamodb
+        self.table = table
+        self.clock = clock
+
+    def get(self, key):
+        item = self.dynamodb.get_item(TableName=self.table, Key={"ip": {"S": key}}).get("Item")
+        # TTL 삭제는 지연될 수 있으므로 만료 시각을 직접 확인
+        if not item or int(item["expires_at"]["N"]) <= self.clock():
+            return None
+        return json.loads(item["data"]["S"])
+
+    def put(self, key, value, ttl):
+        self.dynamodb.put_item(
+            TableName=self.table,
+            Item={
+                "ip": {"S": key},
+                "data": {"S": json.dumps(value, ensure_ascii=False)},
+                "expires_at": {"N": str(int(self.clock() + ttl))}
+            }
+        )
+
+
+class MemoryTier(TTLCache):
+    """DynamoDBTier 대신 쓰는 로컬 공유 캐시 (테스트/벤치마크용)"""
+
+
+class ReputationCache:
+    """컨테이너 내 캐시 → 공유 캐시 순으로 조회하는 2단 평판 캐시
+
+    공유 캐시에서 찾은 값은 컨테이너 내 캐시에도 채운다. 조회 실패 결과는
+    짧은 TTL로 negative 캐싱해 장애/쿼터 소진 시 API를 반복 호출하지 않는다.
+    """
+
+    def __init__(self, local=None, shared=None, ttl=DEFAULT_TTL, negative_ttl=NEGATIVE_TTL):
+        self.local = local if local is not None else TTLCache()
+        self.shared = shared
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stats = {"hits": 0, "local_hits": 0, "shared_hits": 0, "negative_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(값, 출처) 반환. 출처는 'local' / 'shared', 없으면 (None, None)"""
+        entry = self.local.get(key)
+        source = "local"
+        if entry is None and self.shared is not None:
+            try:
+                entry = self.shared.get(key)
+            except Exception as e:
+                print(f"[WARN] shared cache get failed: {e}")
+                entry = None
+            source = "shared"
+            if entry is not None:
+                self.local.put(key, entry, self.negative_ttl if entry.get("negative") else self.ttl)
+
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, None
+
+            self.stats["hits"] += 1
+            self.stats[f"{source}_hits"] += 1
+            if entry.get("negative"):
+                self.stats["negative_hits"] += 1
+        return entry["value"], source
+
+    def put(self, key, value, negative=False):
+        entry = {"value": value, "negative": negative}
+        ttl = self.negative_ttl if negative else self.ttl
+        self.local.put(key, entry, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, entry, ttl)
+            except Exception as e:
+                print(f"[WARN] shared cache put failed: {e}")
@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+import time
+import urllib.parse
+
+import aws_clients
+import metrics
+from waf_log_stats import WafLogAnalyzer
+
+s3 = aws_clients.lazy('s3')
+# 윈도우 집계 상태 / 과차단 의심 보고서를 저장할 위치 (기본: 로그 버킷)
+STATE_BUCKET = os.environ.get('ANALYTICS_BUCKET')
+STATE_KEY = os.environ.get('ANALYTICS_STATE_KEY', 'waf-analytics/state.json.gz')
+REPORT_PREFIX = os.environ.get('ANALYTICS_REPORT_PREFIX', 'waf-analytics/flags/')
+
+
+def load_state(bucket):
+    # 동시 실행 1개로 고정되어 있으므로 단일 작성자 전제로 읽고 덮어씀
+    try:
+        body = s3.get_object(Bucket=bucket, Key=STATE_KEY)['Body'].read()
+    except s3.exceptions.NoSuchKey:
+        return {}
+    return json.loads(gzip.decompress(body))
+
+
+def save_state(bucket, state):
+    s3.put_object(Bucket=bucket, Key=STATE_KEY, ContentType='application/json', ContentEncoding='gzip',
+                  Body=gzip.compress(json.dumps(state, separators=(',', ':')).encode(), compresslevel=1))
+
+
+@metrics.handler('waf_log_analyzer_lambda')
+def lambda_handler(event, context):
+    # Firehose가 waf/ 아래에 객체를 저장할 때마다 S3 이벤트로 호출
+    started = time.time()
+    objects = [(r['s3']['bucket']['name'], urllib.parse.unquote_plus(r['s3']['object']['key']))
+               for r in event.get('Records', []) if 's3' in r]
+    if not objects:
+        return {"objects": 0, "flags": []}
+    bucket = STATE_BUCKET or objects[0][0]
+
+    analyzer = WafLogAnalyzer.from_state(load_state(bucket))
+    before = analyzer.stats['records']
+    for log_bucket, key in objects:
+        # 객체 전체를 메모리에 올리지 않고 압축을 풀며 줄 단위로 처리 (Firehose GZIP 압축 객체)
+        body = s3.get_object(Bucket=log_bucket, Key=key)['Body']
+        stream = body.iter_lines() if key.endswith('.json') else gzip.GzipFile(fileobj=body)
+        try:
+            analyzer.consume(stream)
+        except (OSError, EOFError) as e:
+            print(f"[WARN] {key}: failed to read ({e})")
+
+    flags = analyzer.evaluate()
+    save_state(bucket, analyzer.to_state())
+
+    for flag in flags:
+        print(f"[ALERT] possible overblocking: {json.dumps(flag)}")
+    if flags:
+        window = time.strftime('%Y/%m/%d/%H%M', time.gmtime(flags[0]['window_start']))
+        s3.put_object(Bucket=bucket, Key=f"{REPORT_PREFIX}{window}-{int(started)}.json",
+                      Body=json.dumps(flags, indent=2), ContentType='application/json')
+
+    records = analyzer.stats['records'] - before
+    metrics.count('waflog.records', records)
+    metrics.count('waflog.flags', len(flags))
+    elapsed = time.time() - started
+    print(f"[INFO] objects={len(objects)} records={records} windows={len(analyzer.windows)} "
+          f"flags={len(flags)} seconds={elapsed:.2f} records_per_second={records / max(elapsed, 1e-6):.0f}")
+    return {"objects": len(objects), "records": records, "flags": flags}
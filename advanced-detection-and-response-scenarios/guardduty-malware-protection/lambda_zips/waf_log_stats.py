@@ -0,0 +1,395 @@
+import base64
+import gzip
+import hashlib
+import json
+import math
+
+# 집계 윈도우 (Firehose 버퍼링 간격과 같은 5분) / 기준선으로 보관할 윈도우 수 (1시간)
+WINDOW_SECONDS = 300
+WINDOW_COUNT = 12
+# HyperLogLog 레지스터 수 = 2^HLL_PRECISION (2048개, 표준 오차 약 2.3%)
+HLL_PRECISION = 11
+# 윈도우별 허용 클라이언트 Bloom filter 크기 (2^21비트 = 256KB, k=3 - 윈도우당 5만 IP에서 필터 하나의 오탐 약 0.03%)
+# 허용 이력 확인은 보관 중인 윈도우 필터마다 따로 하므로 전체 오탐은 약 WINDOW_COUNT배 (5만 IP x 12윈도우에서 약 0.4%).
+# 모든 윈도우를 OR한 합집합 필터는 같은 크기라 1시간 60만 IP에서는 오탐이 20%를 넘으므로 "없음"을 빨리 걸러내는 데만 쓴다.
+BLOOM_BITS = 1 << 21
+BLOOM_HASHES = 3
+# 룰별 상위 IP / URI 추적 개수 (Space-Saving)
+TOP_K = 32
+# 이상 판단 기준
+SPIKE_FACTOR = 3.0            # 기준선 평균의 몇 배를 넘으면 급증
+SPIKE_SIGMA = 4.0             # 또는 평균 + 표준편차 몇 배
+MIN_BLOCK_RATE = 0.05         # 차단 비율 급증으로 보려면 최소 이 비율 이상
+MIN_BLOCKED = 50              # 윈도우 내 최소 차단 건수
+MIN_LEGIT_CLIENTS = 20        # 정상 이력이 있는 클라이언트를 이 수 이상 차단하면 과차단 의심
+MIN_BASELINE_WINDOWS = 3      # 차단 비율 기준선을 만들 최소 윈도우 수
+# IP별 해시 / Bloom 위치 캐시 크기 (넘으면 비움)
+HASH_CACHE_SIZE = 1 << 17
+
+# 모듈 전역: 상태를 매번 새로 읽는 Lambda에서도 웜 컨테이너면 캐시가 유지됨
+_clients = {}
+
+
+def hash64(value):
+    """프로세스와 무관하게 같은 64비트 해시 (상태를 S3에 저장해 다음 호출에서 이어 쓰므로 hash() 대신 사용)"""
+    if isinstance(value, str):
+        value = value.encode()
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """서로 다른 값 개수 추정 (레지스터 2^p개, 작은 값은 linear counting 보정)"""
+
+    def __init__(self, p=HLL_PRECISION, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add_hash(self, h):
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(estimate)
+
+
+class BloomFilter:
+    """허용 요청이 있었던 클라이언트 집합 (k개 해시는 64비트 해시 하나로 이중 해싱, 비트 수는 2의 거듭제곱)"""
+
+    def __init__(self, bits=BLOOM_BITS, k=BLOOM_HASHES, data=None):
+        self.bits = bits
+        self.k = k
+        self.data = bytearray(data) if data is not None else bytearray(bits // 8)
+
+    def positions(self, h):
+        """64비트 해시 → (바이트 위치, 비트 마스크) k개 (같은 크기의 필터끼리 재사용 가능)"""
+        h1, h2, mask = h & 0xFFFFFFFF, (h >> 32) | 1, self.bits - 1
+        return tuple(((pos >> 3), 1 << (pos & 7)) for pos in ((h1 + i * h2) & mask for i in range(self.k)))
+
+    def add_positions(self, positions):
+        data = self.data
+        for index, bit in positions:
+            data[index] |= bit
+
+    def contains_positions(self, positions):
+        data = self.data
+        for index, bit in positions:
+            if not data[index] & bit:
+                return False
+        return True
+
+    def add_hash(self, h):
+        self.add_positions(self.positions(h))
+
+    def contains_hash(self, h):
+        return self.contains_positions(self.positions(h))
+
+
+class SpaceSaving:
+    """상위 k개 빈도 항목 (Space-Saving: 가득 차면 최솟값 항목을 밀어내고 그 값을 오차로 이어받음)"""
+
+    def __init__(self, k=TOP_K, counts=None):
+        self.k = k
+        self.counts = dict(counts or {})      # item → [count, error]
+
+    def add(self, item, n=1):
+        entry = self.counts.get(item)
+        if entry is not None:
+            entry[0] += n
+        elif len(self.counts) < self.k:
+            self.counts[item] = [n, 0]
+        else:
+            victim = min(self.counts, key=lambda key: self.counts[key][0])
+            floor = self.counts.pop(victim)[0]
+            self.counts[item] = [floor + n, floor]
+
+    def top(self, n=10):
+        return sorted(([item, c, e] for item, (c, e) in self.counts.items()), key=lambda x: -x[1])[:n]
+
+
+def _b64(data):
+    return base64.b64encode(bytes(data)).decode()
+
+
+def _unb64(text):
+    return base64.b64decode(text)
+
+
+class RuleWindow:
+    """윈도우 하나 안의 룰별 집계"""
+
+    __slots__ = ('blocked', 'clients', 'legit', 'ips', 'uris')
+
+    def __init__(self, blocked=0, clients=None, legit=None, ips=None, uris=None):
+        self.blocked = blocked
+        self.clients = clients or HyperLogLog()      # 차단된 서로 다른 클라이언트
+        self.legit = legit or HyperLogLog()          # 그중 허용 이력이 있는 클라이언트
+        self.ips = ips or SpaceSaving()
+        self.uris = uris or SpaceSaving()
+
+    def to_state(self):
+        return {'blocked': self.blocked, 'clients': _b64(self.clients.registers), 'legit': _b64(self.legit.registers),
+                'ips': self.ips.counts, 'uris': self.uris.counts}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state['blocked'], HyperLogLog(registers=_unb64(state['clients'])),
+                   HyperLogLog(registers=_unb64(state['legit'])), SpaceSaving(counts=state['ips']),
+                   SpaceSaving(counts=state['uris']))
+
+
+class Window:
+    __slots__ = ('start', 'requests', 'blocked', 'allowed', 'rules', 'evaluated')
+
+    def __init__(self, start, requests=0, blocked=0, allowed=None, rules=None, evaluated=False):
+        self.start = start
+        self.requests = requests
+        self.blocked = blocked
+        self.allowed = allowed or BloomFilter()
+        self.rules = rules or {}
+        self.evaluated = evaluated
+
+    def to_state(self):
+        return {'start': self.start, 'requests': self.requests, 'blocked': self.blocked,
+                'allowed': _b64(gzip.compress(bytes(self.allowed.data), compresslevel=1, mtime=0)),
+                'rules': {rule: rw.to_state() for rule, rw in self.rules.items()}, 'evaluated': self.evaluated}
+
+    @classmethod
+    def from_state(cls, state):
+        data = gzip.decompress(_unb64(state['allowed']))
+        # 필터 크기가 바뀐 이전 상태는 위치 계산이 맞지 않으므로 허용 이력만 버림 (룰별 집계 / 기준선은 유지)
+        allowed = BloomFilter(data=data) if len(data) == BLOOM_BITS // 8 else BloomFilter()
+        return cls(state['start'], state['requests'], state['blocked'], allowed,
+                   {rule: RuleWindow.from_state(rw) for rule, rw in state['rules'].items()}, state['evaluated'])
+
+
+def parse_fast(line):
+    """WAF 로그 한 줄(압축 JSON, 바이트) → (timestamp초, action, rule, clientIp, uri) - 필요한 필드만 바이트 검색
+
+    WAF 로그는 {"timestamp":..., 로 시작하고 terminatingRuleId, terminatingRuleType, action 이 이 순서로 붙어 있으며
+    clientIp / uri 는 httpRequest 안에만 있다. 형식이 다르거나 uri에 이스케이프가 있으면 None (parse_json으로 처리).
+    문자열 필드는 바이트 그대로 반환 (차단 레코드만 add()에서 디코딩).
+    """
+    if not line.startswith(b'{"timestamp":'):
+        return None
+    j = line.find(b',', 13)
+    i = line.find(b'"terminatingRuleId":"', j)
+    if i < 0:
+        return None
+    i += 21
+    k = line.find(b'"', i)
+    rule = line[i:k]
+    if not line.startswith(b'","terminatingRuleType":"', k):
+        return None
+    managed = line.startswith(b'MANAGED_RULE_GROUP"', k + 25)
+    i = line.find(b'"action":"', k)
+    if i < 0:
+        return None
+    i += 10
+    k = line.find(b'"', i)
+    action = line[i:k]
+    i = line.find(b'"clientIp":"', k)
+    if i < 0:
+        return None
+    i += 12
+    e = line.find(b'"', i)
+    ip = line[i:e]
+    i = line.find(b'"uri":"', e)
+    if i < 0:
+        return None
+    i += 7
+    e = line.find(b'"', i)
+    uri = line[i:e]
+    if e < 0 or b'\\' in uri:
+        return None
+    if managed:
+        # 관리형 룰 그룹은 그룹 안에서 실제로 차단한 룰까지 (예: managed-core/SizeRestrictions_BODY)
+        i = line.find(b'"terminatingRule":{"ruleId":"', k)
+        if i >= 0:
+            i += 29
+            rule = rule + b'/' + line[i:line.find(b'"', i)]
+    try:
+        return int(line[13:j]) // 1000, action, rule, ip, uri
+    except ValueError:
+        return None
+
+
+def parse_json(line):
+    """json.loads로 전체를 파싱 (fast path 실패 시 / 비교용) - parse_fast와 같은 형태(바이트)로 반환"""
+    try:
+        record = json.loads(line)
+        request = record['httpRequest']
+        rule = record['terminatingRuleId']
+        if record.get('terminatingRuleType') == 'MANAGED_RULE_GROUP':
+            for group in record.get('ruleGroupList') or []:
+                sub = (group.get('terminatingRule') or {}).get('ruleId')
+                if sub:
+                    rule = f"{rule}/{sub}"
+                    break
+        return (int(record['timestamp']) // 1000, record['action'].encode(), rule.encode(),
+                request['clientIp'].encode(), request['uri'].encode())
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+class WafLogAnalyzer:
+    """WAF 로그 스트리밍 분석기 - 윈도우별 룰 / IP / URI 집계와 과차단 의심 룰 탐지
+
+    - consume()은 Firehose가 저장한 gzip 객체의 줄을 하나씩 읽어 윈도우(WINDOW_SECONDS)에 더한다.
+      전체 JSON 파싱 대신 parse_fast()로 필요한 필드만 꺼내고, 실패한 줄만 json.loads로 처리한다.
+    - 윈도우마다 허용 클라이언트 Bloom filter, 룰별 차단 수 / 차단 클라이언트 HLL / 허용 이력이 있는
+      차단 클라이언트 HLL / 상위 IP·URI(Space-Saving)를 둔다. 메모리는 룰 수 x 윈도우 수에만 비례한다.
+    - evaluate()는 워터마크(가장 늦은 timestamp)보다 한 윈도우 이상 지난 윈도우를 한 번씩 평가해
+      차단 비율 또는 허용 이력 클라이언트 차단 수가 이전 윈도우 기준선보다 급증한 룰을 반환한다.
+    """
+
+    def __init__(self, windows=None, watermark=0, stats=None, fast=True):
+        self.windows = {w.start: w for w in (windows or [])}
+        self.watermark = watermark
+        self.stats = dict(stats or {'records': 0, 'fallback': 0, 'invalid': 0, 'late': 0})
+        self.parse = parse_fast if fast else parse_json
+        self._rebuild_seen()
+
+    def _rebuild_seen(self):
+        # 보관 중인 모든 윈도우의 허용 클라이언트 합집합 - 대부분의 처음 보는 클라이언트를 필터 하나로 걸러냄
+        # (합집합은 채워진 비트가 많아 오탐이 크므로 "있음"은 _allowed_before()로 윈도우별 필터에서 다시 확인)
+        merged = 0
+        for window in self.windows.values():
+            merged |= int.from_bytes(window.allowed.data, 'little')
+        self.seen_allowed = BloomFilter(data=merged.to_bytes(BLOOM_BITS // 8, 'little'))
+
+    def _allowed_before(self, positions):
+        """보관 중인 윈도우 중 하나에서 허용된 적이 있는지 (윈도우별 필터로 확인 - 오탐은 윈도우 수에 비례)"""
+        for window in self.windows.values():
+            if window.allowed.contains_positions(positions):
+                return True
+        return False
+
+    def _client(self, ip):
+        # 같은 클라이언트가 반복해서 나오므로 해시와 Bloom 위치를 캐시
+        entry = _clients.get(ip)
+        if entry is None:
+            if len(_clients) >= HASH_CACHE_SIZE:
+                _clients.clear()
+            h = hash64(ip)
+            entry = _clients[ip] = (h, self.seen_allowed.positions(h))
+        return entry
+
+    def add(self, ts, action, rule, ip, uri):
+        """레코드 하나 추가 (action / rule / ip / uri 는 parse_fast / parse_json이 돌려준 바이트)"""
+        start = ts - ts % WINDOW_SECONDS
+        window = self.windows.get(start)
+        if window is None:
+            if start <= self.watermark - WINDOW_COUNT * WINDOW_SECONDS:
+                self.stats['late'] += 1
+                return
+            window = self.windows[start] = Window(start)
+        if ts > self.watermark:
+            self.watermark = ts
+        window.requests += 1
+        h, positions = self._client(ip)
+        if action != b'BLOCK':
+            window.allowed.add_positions(positions)
+            self.seen_allowed.add_positions(positions)
+            return
+        window.blocked += 1
+        rule = rule.decode()
+        rw = window.rules.get(rule)
+        if rw is None:
+            rw = window.rules[rule] = RuleWindow()
+        rw.blocked += 1
+        rw.clients.add_hash(h)
+        # 보관 중인 윈도우에서 허용된 적이 있는 클라이언트 = 정상 이용자였을 가능성
+        if self.seen_allowed.contains_positions(positions) and self._allowed_before(positions):
+            rw.legit.add_hash(h)
+        rw.ips.add(ip.decode())
+        rw.uris.add(uri.decode(errors='replace'))
+
+    def consume(self, lines):
+        parse, stats, add = self.parse, self.stats, self.add
+        records = fallback = invalid = 0
+        for line in lines:
+            if len(line) < 2:
+                continue
+            parsed = parse(line)
+            if parsed is None:
+                fallback += 1
+                parsed = parse_json(line)
+                if parsed is None:
+                    invalid += 1
+                    continue
+            records += 1
+            add(*parsed)
+        stats['records'] += records
+        stats['fallback'] += fallback
+        stats['invalid'] += invalid
+
+    def evaluate(self):
+        """닫힌 윈도우를 기준선과 비교해 과차단 의심 룰 목록 반환 (윈도우당 한 번만 평가)"""
+        flags = []
+        for start in sorted(self.windows):
+            window = self.windows[start]
+            if window.evaluated or start + 2 * WINDOW_SECONDS > self.watermark:
+                continue
+            window.evaluated = True
+            history = [w for s, w in sorted(self.windows.items()) if s < start]
+            for rule, rw in window.rules.items():
+                rate = rw.blocked / window.requests
+                legit = rw.legit.count()
+                rates = [w.rules[rule].blocked / w.requests if rule in w.rules else 0.0 for w in history]
+                legits = [w.rules[rule].legit.count() if rule in w.rules else 0 for w in history]
+                reasons = []
+                if len(rates) >= MIN_BASELINE_WINDOWS and rw.blocked >= MIN_BLOCKED and rate >= MIN_BLOCK_RATE:
+                    if rate > _threshold(rates):
+                        reasons.append("block_rate_spike")
+                if legit >= MIN_LEGIT_CLIENTS and legit > _threshold(legits):
+                    reasons.append("legit_client_spike")
+                if reasons:
+                    flags.append({
+                        'rule': rule, 'window_start': start, 'reasons': reasons,
+                        'blocked': rw.blocked, 'requests': window.requests, 'block_rate': round(rate, 4),
+                        'baseline_block_rate': round(sum(rates) / len(rates), 4) if rates else None,
+                        'distinct_clients': rw.clients.count(), 'legit_clients': legit,
+                        'baseline_legit_clients': round(sum(legits) / len(legits), 1) if legits else None,
+                        'top_ips': rw.ips.top(5), 'top_uris': rw.uris.top(5)
+                    })
+        # 기준선 범위를 벗어난 오래된 윈도우 정리
+        expired = [s for s in self.windows if s <= self.watermark - WINDOW_COUNT * WINDOW_SECONDS]
+        for start in expired:
+            del self.windows[start]
+        if expired:
+            self._rebuild_seen()
+        return flags
+
+    def to_state(self):
+        return {'watermark': self.watermark, 'stats': self.stats,
+                'windows': [w.to_state() for w in self.windows.values()]}
+
+    @classmethod
+    def from_state(cls, state, fast=True):
+        return cls([Window.from_state(w) for w in state.get('windows', [])], state.get('watermark', 0),
+                   state.get('stats'), fast=fast)
+
+
+def _threshold(values):
+    if not values:
+        return 0.0
+    mean = sum(values) / len(values)
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+    return max(mean * SPIKE_FACTOR, mean + SPIKE_SIGMA * std)
@@ -0,0 +1,91 @@
+#####################
+# 46. AbuseIPDB 평판 공유 캐시 (DynamoDB, TTL 자동 만료)
+#####################
+
+resource "aws_dynamodb_table" "reputation_cache" {
+  name         = "abuseipdb-reputation-cache"                   # 평판 캐시 테이블 이름
+  billing_mode = "PAY_PER_REQUEST"                              # 요청량 기반 과금
+  hash_key     = "ip"                                           # 조회 키: IP 주소
+
+  attribute {
+    name = "ip"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"                               # 만료 시각(epoch 초)이 지나면 자동 삭제
+    enabled        = true
+  }
+}
+
+#####################
+# 47. Lambda 실행 역할에 평판 캐시 읽기/쓰기 권한 부여
+#####################
+
+resource "aws_iam_role_policy" "inline_reputation_cache" {
+  name = "inline-reputation-cache"
+  role = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ],
+        Resource = aws_dynamodb_table.reputation_cache.arn
+      }
+    ]
+  })
+}
+
+#####################
+# 48. Lambda 함수 - (F) AbuseIPDB 배치 조회 (여러 IP 동시 조회)
+#####################
+
+# waf_step 상태 머신의 여러 IP("ips") 경로가 한 번 호출 - 컨테이너 하나의 토큰 버킷이 모든 IP의 AbuseIPDB 호출 속도를 제한
+# IP별 조회 실패는 배치를 실패시키지 않고 N/A 평판으로 돌려줌
+
+resource "aws_lambda_function" "abuse_lookup_batch" {
+  function_name = "lambda-abuse-lookup-batch"
+  filename      = "${path.module}/lambda_zips/abuseipdb_lookup_lambda.zip"  # 단건 조회와 같은 패키지 사용
+  handler       = "abuseipdb_lookup_lambda.batch_handler"      # 배치 진입점
+  runtime       = "python3.10"
+  role          = aws_iam_role.lambda_exec.arn
+  timeout       = 120
+  memory_size   = 256
+
+  environment {
+    variables = {
+      ABUSEIPDB_API_KEY      = var.abuseipdb_api_key
+      REPUTATION_TABLE       = aws_dynamodb_table.reputation_cache.name
+      REPUTATION_TTL_SECONDS = var.reputation_cache_ttl_hours * 3600
+      BATCH_CONCURRENCY      = var.waf_step_map_concurrency    # 동시 조회 스레드 수
+      ABUSEIPDB_RATE_PER_SEC = var.abuseipdb_rate_per_sec      # 토큰 버킷 초당 호출 한도
+      THREAT_LIST_BUCKET     = var.threat_list_bucket          # FireHOL 인덱스 버킷 (비우면 API만 사용)
+    }
+  }
+}
+
+#####################
+# 49. FireHOL 목록 읽기 권한 (버킷을 지정한 경우에만)
+#####################
+
+resource "aws_iam_role_policy" "inline_threat_list_read" {
+  count = var.threat_list_bucket == "" ? 0 : 1
+  name  = "inline-threat-list-read"
+  role  = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect   = "Allow",
+        Action   = "s3:GetObject",
+        Resource = "arn:aws:s3:::${var.threat_list_bucket}/threat/*"
+      }
+    ]
+  })
+}
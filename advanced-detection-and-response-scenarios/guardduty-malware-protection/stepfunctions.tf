@@ -34,6 +34,7 @@ resource "aws_iam_role_policy" "step_function_lambda_invoke" {
         Resource = [                                          # 호출 가능한 Lambda 목록
           aws_lambda_function.ipset_add.arn,
           aws_lambda_function.abuse_lookup.arn,
+          aws_lambda_function.abuse_lookup_batch.arn,             # 여러 IP 요청 (ips) 배치 조회
           aws_lambda_function.discord_notify.arn
         ]
       }
@@ -45,73 +46,74 @@ resource "aws_iam_role_policy" "step_function_lambda_invoke" {
 # 33. Step Functions 상태 머신 정의
 #####################
 
+# 정의는 stepfunctions/waf_step.asl.json (bench/waf_step_bench.py가 같은 파일을 로컬에서 실행)
+# - IPSet 추가와 AbuseIPDB 조회를 Parallel로 동시에 실행 (차단이 조회를 기다리지 않음) → 둘 다 끝나면 Discord 알림
+# - "ips" 목록이 오면 한 번의 IPSet 반영 + 배치 조회 Lambda 한 번(토큰 버킷 하나로 AbuseIPDB 호출 속도 제한) → 한 번의 알림
+# - 첫 상태(trace-context)가 실행 이름 / 시작 시각을 $.trace에 넣어 모든 단계의 EMF 지표가 같은 TraceId를 씀
 resource "aws_sfn_state_machine" "waf_step" {
   name     = "waf-step-function"                               # 상태 머신 이름
   role_arn = aws_iam_role.step_function_exec.arn               # 실행 역할 지정
+  type     = var.waf_step_type                                 # STANDARD 또는 EXPRESS (대량 / 짧은 실행)
 
-  definition = jsonencode({                                    # 상태 머신 정의 (JSON 기반)
-    Comment = "Auto block IP via WAF IPSet and notify user on Discord",  # 설명
-    StartAt = "ipset-add-lambda",                              # 시작 단계
-
-    States = {
-      # 1단계: IPSet에 IP 추가
-      "ipset-add-lambda" = {
-        Type       = "Task",
-        Resource   = "${aws_lambda_function.ipset_add.arn}",   # 실행할 Lambda ARN
-        Parameters = {
-          "ip.$" = "$.ip"                                      # 입력 JSON에서 ip 값 추출하여 전달
-        },
-        ResultPath = "$.ipResult",                             # 결과를 저장할 위치
-        Next       = "abuseipdb-lookup-lambda",                # 다음 단계
-
-        Catch = [{                                             # 예외 처리
-          ErrorEquals = ["States.ALL"],
-          Next        = "FailState"
-        }]
-      },
-
-      # 2단계: AbuseIPDB에서 IP 조회
-      "abuseipdb-lookup-lambda" = {
-        Type       = "Task",
-        Resource   = "${aws_lambda_function.abuse_lookup.arn}",
-        Parameters = {
-          "ip.$" = "$.ipResult.ip"                             # 이전 결과에서 ip 추출하여 전달
-        },
-        ResultPath = "$",                                      # 결과를 전체 context에 저장
-        Next       = "discord-alarm-lambda",                   # 다음 단계
-
-        Catch = [{
-          ErrorEquals = ["States.ALL"],
-          Next        = "FailState"
-        }]
-      },
-
-      # 3단계: Discord 알림 전송
-      "discord-alarm-lambda" = {
-        Type     = "Task",
-        Resource = "${aws_lambda_function.discord_notify.arn}",
-        End      = true,                                       # 상태 머신 종료 지점
-
-        Catch = [{
-          ErrorEquals = ["States.ALL"],
-          Next        = "FailState"
-        }]
-      },
+  definition = templatefile("${path.module}/stepfunctions/waf_step.asl.json", {
+    ipset_add_arn          = aws_lambda_function.ipset_add.arn
+    abuse_lookup_arn       = aws_lambda_function.abuse_lookup.arn
+    abuse_lookup_batch_arn = aws_lambda_function.abuse_lookup_batch.arn
+    discord_notify_arn     = aws_lambda_function.discord_notify.arn
+  })
 
-      # 실패 시 상태
-      "FailState" = {
-        Type  = "Fail",                                        # 실패 상태 정의
-        Error = "WorkflowFailed",
-        Cause = "Step Function execution failed"
-      }
+  # Express 워크플로우는 실행 기록이 CloudWatch Logs로만 남음
+  dynamic "logging_configuration" {
+    for_each = var.waf_step_type == "EXPRESS" ? [1] : []
+    content {
+      log_destination        = "${aws_cloudwatch_log_group.waf_step[0].arn}:*"
+      include_execution_data = false
+      level                  = "ERROR"
     }
-  })
+  }
 
   depends_on = [
     aws_lambda_function.ipset_add,                             # Lambda들이 모두 생성된 후 실행
     aws_lambda_function.abuse_lookup,
+    aws_lambda_function.abuse_lookup_batch,
     aws_lambda_function.discord_notify,
     aws_iam_role.step_function_exec,
-    aws_iam_role_policy.step_function_lambda_invoke
+    aws_iam_role_policy.step_function_lambda_invoke,
+    aws_iam_role_policy.step_function_logs
   ]
 }
+
+#####################
+# 50. Express 워크플로우 실행 로그 (EXPRESS일 때만)
+#####################
+
+resource "aws_cloudwatch_log_group" "waf_step" {
+  count             = var.waf_step_type == "EXPRESS" ? 1 : 0
+  name              = "/aws/vendedlogs/states/waf-step-function"  # Step Functions 로그 그룹 이름 규칙
+  retention_in_days = 14
+}
+
+resource "aws_iam_role_policy" "step_function_logs" {
+  name = "step-logs-delivery"                                 # 정책 이름
+  role = aws_iam_role.step_function_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect = "Allow",
+        Action = [                                            # Step Functions 로그 전달 설정 권한
+          "logs:CreateLogDelivery",
+          "logs:GetLogDelivery",
+          "logs:UpdateLogDelivery",
+          "logs:DeleteLogDelivery",
+          "logs:ListLogDeliveries",
+          "logs:PutResourcePolicy",
+          "logs:DescribeResourcePolicies",
+          "logs:DescribeLogGroups"
+        ],
+        Resource = "*"
+      }
+    ]
+  })
+}
@@ -17,3 +17,106 @@ variable "abuseipdb_api_key" {
   type        = string
   sensitive   = true
 }
+
+# IPSet 배치 반영 사용 여부 (false면 ipset-add-lambda가 직접 반영)
+variable "ipset_batching_enabled" {
+  description = "차단 IP를 SQS 큐에 모아 윈도우 단위로 IPSet에 반영할지 여부"
+  type        = bool
+  default     = true
+}
+
+# IPSet 배치 윈도우 (초)
+variable "ipset_batch_window" {
+  description = "flush Lambda가 큐 메시지를 모으는 최대 대기 시간(초, 1~300)"
+  type        = number
+  default     = 5
+}
+
+# IPSet 샤드 개수 (IPSet 하나당 최대 10,000개 주소)
+variable "ipset_shard_count" {
+  description = "차단 목록을 나눠 담을 WAF IPSet 개수 (기본 IPSet 포함)"
+  type        = number
+  default     = 1
+}
+
+# 차단 항목 TTL (일)
+variable "ipset_ttl_days" {
+  description = "용량 한계에 가까워졌을 때 만료시킬 차단 항목의 마지막 탐지 이후 경과 일수"
+  type        = number
+  default     = 7
+}
+
+# AbuseIPDB 평판 캐시 TTL (시간)
+variable "reputation_cache_ttl_hours" {
+  description = "AbuseIPDB 조회 결과를 캐시에 보관할 시간(시간 단위)"
+  type        = number
+  default     = 24
+}
+
+# AbuseIPDB 초당 호출 한도
+variable "abuseipdb_rate_per_sec" {
+  description = "배치 조회 시 AbuseIPDB API를 초당 몇 번까지 호출할지 (토큰 버킷)"
+  type        = number
+  default     = 10
+}
+
+# FireHOL 악성 IP 목록 버킷 (guardduty-threat-ip-monitoring 시나리오의 update_ip_list가 관리)
+variable "threat_list_bucket" {
+  description = "API 조회 전에 확인할 FireHOL 목록이 저장된 S3 버킷 이름 (비우면 사용 안 함)"
+  type        = string
+  default     = ""
+}
+
+# Step Functions 워크플로우 유형
+variable "waf_step_type" {
+  description = "waf_step 상태 머신 유형 (STANDARD: 실행 기록 보존, EXPRESS: 대량의 짧은 실행에 저렴)"
+  type        = string
+  default     = "STANDARD"
+
+  validation {
+    condition     = contains(["STANDARD", "EXPRESS"], var.waf_step_type)
+    error_message = "waf_step_type은 STANDARD 또는 EXPRESS여야 합니다."
+  }
+}
+
+# Map 모드 AbuseIPDB 동시 조회 수
+variable "waf_step_map_concurrency" {
+  description = "한 번의 요청으로 여러 IP가 들어왔을 때 배치 조회 Lambda가 동시에 조회할 IP 수 (호출 속도는 abuseipdb_rate_per_sec로 제한)"
+  type        = number
+  default     = 10
+}
+
+# API 요청 수집 큐 사용 여부
+variable "ingest_batching_enabled" {
+  description = "API 요청을 SQS 수집 큐에 모아 윈도우 단위로 상태 머신 실행 하나로 묶을지 여부"
+  type        = bool
+  default     = true
+}
+
+# 수집 큐 배치 윈도우 (초)
+variable "ingest_batch_window" {
+  description = "batch Lambda가 수집 큐 메시지를 모으는 최대 대기 시간(초, 1~300)"
+  type        = number
+  default     = 5
+}
+
+# 같은 IP 중복 제거 윈도우 (초)
+variable "ingest_dedupe_window" {
+  description = "같은 IP에 대한 요청을 한 번의 실행으로 합칠 시간(초)"
+  type        = number
+  default     = 60
+}
+
+# 실행 적체 한도
+variable "ingest_max_running_executions" {
+  description = "실행 중인 waf_step 실행이 이 수 이상이면 새 실행을 미루고 API는 429 응답 (0이면 확인 안 함, EXPRESS는 확인 불가)"
+  type        = number
+  default     = 200
+}
+
+# 수집 큐 적체 한도
+variable "ingest_max_queue_backlog" {
+  description = "수집 큐에 쌓인 메시지가 이 수 이상이면 API가 429 응답"
+  type        = number
+  default     = 5000
+}
@@ -9,6 +9,19 @@ resource "aws_wafv2_ip_set" "blocked_ips" {
   addresses          = []                                      # 초기에는 비어 있음 (추후 Lambda 등으로 추가)
 }
 
+# 기본 IPSet이 가득 찼을 때 사용할 추가 샤드 IPSet (flush Lambda가 배분)
+resource "aws_wafv2_ip_set" "blocked_ips_shard" {
+  count              = var.ipset_shard_count - 1
+  name               = "blocked-ipset-${count.index + 2}"
+  scope              = "REGIONAL"
+  ip_address_version = "IPV4"
+  addresses          = []
+
+  lifecycle {
+    ignore_changes = [addresses]                               # 주소는 Lambda가 관리
+  }
+}
+
 #####################
 # 21. WAF Web ACL 생성 (차단 룰 + 관리형 룰)
 #####################
@@ -46,6 +59,28 @@ resource "aws_wafv2_web_acl" "web_acl" {
     }
   }
 
+  # 추가 샤드 IPSet 차단 룰 (샤드마다 하나씩)
+  dynamic "rule" {
+    for_each = aws_wafv2_ip_set.blocked_ips_shard
+    content {
+      name     = "block-bad-ips-${rule.key + 2}"
+      priority = 10 + rule.key                                 # 관리형 룰 뒤에 평가 (관리형 룰은 허용으로 종료하지 않음)
+      action {
+        block {}
+      }
+      statement {
+        ip_set_reference_statement {
+          arn = rule.value.arn
+        }
+      }
+      visibility_config {
+        sampled_requests_enabled   = true
+        cloudwatch_metrics_enabled = true
+        metric_name                = "block-bad-ips-${rule.key + 2}"
+      }
+    }
+  }
+
   # AWS 관리형 룰 추가 (CommonRuleSet)
   rule {
     name     = "managed-core"                                  # 룰 이름
@@ -0,0 +1,75 @@
+#####################
+# 55. Lambda 실행 역할에 WAF 로그 읽기 / 분석 상태 쓰기 권한 부여
+#####################
+
+resource "aws_iam_role_policy" "inline_waf_log_analytics" {
+  name = "inline-waf-log-analytics"
+  role = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Effect   = "Allow",
+        Action   = "s3:GetObject",                            # Firehose가 저장한 WAF 로그 객체
+        Resource = "${aws_s3_bucket.waf_logs.arn}/waf/*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = ["s3:GetObject", "s3:PutObject"],          # 윈도우 집계 상태 / 과차단 의심 보고서
+        Resource = "${aws_s3_bucket.waf_logs.arn}/waf-analytics/*"
+      },
+      {
+        Effect   = "Allow",
+        Action   = "s3:ListBucket",                           # 상태 파일이 없을 때 NoSuchKey를 받기 위해 필요
+        Resource = aws_s3_bucket.waf_logs.arn
+      }
+    ]
+  })
+}
+
+#####################
+# 56. Lambda 함수 - (H) WAF 로그 스트리밍 분석 (과차단 의심 룰 탐지)
+#####################
+
+resource "aws_lambda_function" "waf_log_analyzer" {
+  function_name = "lambda-waf-log-analyzer"
+  filename      = "${path.module}/lambda_zips/waf_log_analyzer_lambda.zip"
+  handler       = "waf_log_analyzer_lambda.lambda_handler"
+  runtime       = "python3.10"
+  role          = aws_iam_role.lambda_exec.arn
+  timeout       = 300
+  memory_size   = 1024                                          # 압축 해제 + 파싱은 CPU 위주 (메모리에 비례해 CPU 할당)
+
+  reserved_concurrent_executions = 1                            # 단일 작성자로 윈도우 상태 파일 갱신
+
+  environment {
+    variables = {
+      ANALYTICS_BUCKET = aws_s3_bucket.waf_logs.bucket          # 집계 상태 / 보고서 저장 위치 (waf-analytics/)
+    }
+  }
+}
+
+#####################
+# 57. Firehose 객체 생성 시 분석 Lambda 호출 (waf/ 접두어만)
+#####################
+
+resource "aws_lambda_permission" "waf_logs_to_analyzer" {
+  statement_id  = "AllowExecutionFromWafLogsBucket"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.waf_log_analyzer.function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = aws_s3_bucket.waf_logs.arn
+}
+
+resource "aws_s3_bucket_notification" "waf_logs" {
+  bucket = aws_s3_bucket.waf_logs.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.waf_log_analyzer.arn
+    events              = ["s3:ObjectCreated:*"]
+    filter_prefix       = "waf/"                                # 분석 상태(waf-analytics/) 쓰기로 다시 호출되지 않도록
+  }
+
+  depends_on = [aws_lambda_permission.waf_logs_to_analyzer]
+}
@@ -1,8 +1,12 @@
-import os, json, urllib3
+import os, json
 
-http = urllib3.PoolManager()
-WEBHOOK = os.environ["HOOK_URL"]
+import metrics
+import notifier
 
+# Discord 발송기 (컨테이너당 하나 - 429 retry_after / 5xx 재시도, 이메일은 SNS 구독이 따로 받음)
+dispatcher = notifier.Notifier(os.environ["HOOK_URL"], topic_arn='')
+
+@metrics.handler('log-group-change-detect')
 def lambda_handler(event, context):
     for rec in event["Records"]:
         msg = json.loads(rec["Sns"]["Message"])
@@ -15,8 +19,9 @@ def lambda_handler(event, context):
             f"User: {detail.get('userIdentity', {}).get('arn', 'Unknown')}\n"
             f"Time: {msg.get('time')}"
         )
-        http.request(
-            "POST", WEBHOOK,
-            body=json.dumps({"content": content}).encode(),
-            headers={"Content-Type": "application/json"}
-        )
\ No newline at end of file
+        dispatcher.add(content)
+
+    result = dispatcher.flush(deadline=notifier.deadline_from(context))
+    if result["dropped"]:
+        metrics.tag(outcome='failed')
+        print(f"Discord 전송 실패: {result}")
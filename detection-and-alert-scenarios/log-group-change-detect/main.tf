@@ -104,7 +104,7 @@ resource "aws_iam_role_policy_attachment" "lambda_basic" {
 
 # Discord Webhook으로 알림을 보내는 Lambda 함수 생성
 resource "aws_lambda_function" "discord_alert" {
-  filename         = "lambda.zip" # 패키징된 코드 zip 파일
+  filename         = "lambda.zip" # 패키징된 코드 zip 파일 (lambda_function.py + shared/aws_clients.py, metrics.py, notifier.py)
   function_name    = "log_group_alert"
   role             = aws_iam_role.lambda_exec_role.arn
   handler          = "lambda_function.lambda_handler" # Python 핸들러 경로
@@ -0,0 +1,181 @@
+"""규칙 엔진 처리량 벤치마크 (로컬, AWS / Discord 호출 없음)
+
+rules/의 실제 규칙 8개 + 합성 규칙 42개(총 --rules 개)를 올리고, 합성 CloudTrail / Config 이벤트를
+다음 세 방식으로 평가해 초당 이벤트 수를 비교한다 (세 방식의 탐지 결과가 같은지도 확인).
+
+  per-lambda : 기존 시나리오처럼 규칙마다 Lambda가 SNS 메시지를 json.loads 한 뒤 자기 규칙만 검사
+  linear     : 메시지는 한 번만 파싱하지만 모든 규칙을 순서대로 검사 (색인 없음)
+  indexed    : RuleSet.match - (eventSource, eventName) / detail-type 색인으로 후보 규칙만 한 번에 검사
+
+    python bench/rule_engine_bench.py [--events 200000] [--rules 50]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import rule_engine  # noqa: E402
+
+CT = "AWS API Call via CloudTrail"
+SERVICES = {
+    "ec2": ["RunInstances", "TerminateInstances", "CreateVolume", "DeleteVolume", "CreateKeyPair",
+            "DeleteKeyPair", "ModifyInstanceAttribute", "CreateVpc", "DeleteVpc", "CreateRoute"],
+    "iam": ["AttachUserPolicy", "DetachUserPolicy", "CreateAccessKey", "DeleteAccessKey", "PutUserPolicy",
+            "CreateRole", "DeleteRole", "UpdateAssumeRolePolicy", "CreateLoginProfile", "AddUserToGroup"],
+    "s3": ["PutBucketPolicy", "DeleteBucketPolicy", "PutBucketAcl", "PutBucketPublicAccessBlock",
+           "DeleteBucket", "PutBucketLogging", "PutBucketVersioning", "PutBucketEncryption"],
+    "kms": ["DisableKey", "ScheduleKeyDeletion", "PutKeyPolicy", "CreateGrant"],
+    "guardduty": ["DeleteDetector", "UpdateDetector", "DisassociateFromMasterAccount"],
+    "lambda": ["AddPermission20150331v2", "UpdateFunctionCode20150331v2", "CreateFunction20150331"],
+}
+# 아무 규칙에도 걸리지 않는 조회성 호출 (실제 이벤트의 대부분)
+NOISE = [("ec2", "DescribeInstances"), ("s3", "GetObject"), ("sts", "AssumeRole"), ("s3", "ListBuckets"),
+         ("kms", "Decrypt"), ("iam", "GetUser"), ("logs", "PutLogEvents"), ("ec2", "DescribeSecurityGroups")]
+
+
+def synthetic_rules(rng, count):
+    """실제 규칙과 같은 형태의 합성 규칙 (색인 키가 겹치는 규칙 / 추가 조건 / 색인 불가 규칙 포함)"""
+    specs = []
+    pairs = [(service, name) for service, names in SERVICES.items() for name in names]
+    for i in range(count):
+        service, _ = rng.choice(pairs)
+        names = rng.sample(SERVICES[service], rng.randint(1, 3))
+        detail = {"eventSource": [f"{service}.amazonaws.com"], "eventName": names}
+        kind = i % 6
+        if kind == 1:
+            detail["userIdentity"] = {"type": ["Root", "IAMUser"]}
+        elif kind == 2:
+            detail["sourceIPAddress"] = [{"anything-but": ["AWS Internal"]}]
+        elif kind == 3:
+            detail["userIdentity"] = {"arn": [{"prefix": "arn:aws:iam::000000000000:user/admin"}]}
+        elif kind == 4:
+            detail["errorCode"] = [{"exists": False}]
+        pattern = {"source": [f"aws.{service}"], "detail-type": [CT], "detail": detail}
+        if i % 21 == 20:
+            # eventName을 정확히 지정하지 않는 규칙 → detail-type이 같은 모든 이벤트에 대해 검사
+            pattern = {"detail-type": [CT], "detail": {"eventName": [{"prefix": "Delete"}],
+                                                        "userIdentity": {"type": ["Root"]}}}
+        specs.append({
+            "id": f"synthetic-{i:02d}",
+            "title": f"synthetic rule {i}",
+            "event_pattern": pattern,
+            "fields": {"event_name": "detail.eventName", "user_arn": "detail.userIdentity.arn",
+                       "time": {"path": "detail.eventTime", "format": "kst"}},
+            "template": "**[ synthetic ]**\n• 이벤트 이름: `{event_name}`\n• 사용자 ARN: `{user_arn}`\n• 발생 시간: `{time}`",
+        })
+    return specs
+
+
+def make_event(rng, specs):
+    if rng.random() < 0.02:
+        return {"source": "aws.config", "detail-type": "Config Rules Compliance Change", "time": "2025-03-01T01:02:03Z",
+                "region": "ap-northeast-2", "account": "000000000000",
+                "detail": {"resourceId": f"bucket-{rng.randrange(100)}", "configRuleName": "s3-bucket-public-read-prohibited",
+                           "messageType": "ComplianceChangeNotification",
+                           "newEvaluationResult": {"complianceType": rng.choice(["NON_COMPLIANT", "COMPLIANT"])}}}
+    if rng.random() < 0.7:
+        service, name = rng.choice(NOISE)
+    else:
+        # 규칙 패턴에 있는 이벤트 이름 (추가 조건 때문에 실제 탐지 여부는 달라짐)
+        detail = rng.choice(specs)["event_pattern"]["detail"]
+        name = rng.choice([n for n in detail.get("eventName", []) if isinstance(n, str)] or ["DeleteBucket"])
+        sources = detail.get("eventSource") or ["ec2.amazonaws.com"]
+        service = sources[0].split(".")[0]
+    user_type = rng.choice(["IAMUser", "IAMUser", "AssumedRole", "Root"])
+    detail = {
+        "eventVersion": "1.08", "eventTime": "2025-03-01T01:02:03Z",
+        "eventSource": f"{service}.amazonaws.com", "eventName": name, "awsRegion": "ap-northeast-2",
+        "sourceIPAddress": rng.choice(["203.0.113.7", "198.51.100.20", "AWS Internal"]),
+        "userIdentity": {"type": user_type, "arn": rng.choice(["arn:aws:iam::000000000000:user/admin-kim",
+                                                               "arn:aws:iam::000000000000:user/dev"])},
+        "requestParameters": {"groupId": "sg-0123", "attributeType": "launchPermission",
+                              "launchPermission": {"add": {"items": [{"group": "all"}]}}},
+        "recipientAccountId": "000000000000",
+    }
+    if rng.random() < 0.1:
+        detail["errorCode"] = "AccessDenied"
+    if rng.random() < 0.02:
+        # 콘솔 로그인 이벤트 (eventSource가 빠진 이벤트도 일부 섞음)
+        detail.update(eventSource="signin.amazonaws.com", eventName="ConsoleLogin",
+                      additionalEventData={"MFAUsed": "No"}, responseElements={"ConsoleLogin": "Success"})
+        if rng.random() < 0.5:
+            del detail["eventSource"]
+        return {"source": "aws.signin", "detail-type": "AWS Console Sign In via CloudTrail",
+                "time": "2025-03-01T01:02:03Z", "detail": detail}
+    return {"source": f"aws.{service}", "detail-type": CT, "time": "2025-03-01T01:02:03Z", "detail": detail}
+
+
+def per_lambda(messages, rules):
+    hits = 0
+    for message in messages:
+        for rule in rules:
+            if rule.matches(json.loads(message)):
+                hits += 1
+    return hits
+
+
+def linear(events, rules):
+    return sum(1 for event in events for rule in rules if rule.matches(event))
+
+
+def indexed(events, ruleset):
+    return sum(len(ruleset.match(event)) for event in events)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--rules", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    real = rule_engine.load_specs(os.path.join(HERE, '..', 'rules'))
+    specs = real + synthetic_rules(rng, args.rules - len(real))
+
+    start = time.perf_counter()
+    ruleset = rule_engine.RuleSet(specs)
+    compile_ms = (time.perf_counter() - start) * 1000
+    plain = [rule_engine.Rule(spec) for spec in specs]        # 색인 없이 전체 조건을 가진 규칙
+    print(f"rules: {len(ruleset)} ({len(real)} real + {len(ruleset) - len(real)} synthetic), "
+          f"compiled in {compile_ms:.1f} ms, index keys={len(ruleset.by_name) + len(ruleset.by_type)}, "
+          f"detail-type only={sum(map(len, ruleset.by_type.values()))}, catch-all={len(ruleset.catch_all)}")
+
+    events = [make_event(rng, specs) for _ in range(args.events)]
+    messages = [json.dumps(event) for event in events]
+    candidates = sum(len(ruleset.candidates(event)) for event in events) / len(events)
+
+    # 이벤트마다 세 방식의 탐지 결과가 같은지 확인
+    by_id = {rule.id: rule for rule in plain}
+    for event in events[:20000]:
+        matched = ruleset.match(event)
+        assert len(matched) == len(set(matched))
+        assert sorted(r.id for r in ruleset.match(event)) == sorted(r.id for r in plain if r.matches(event))
+    assert all(by_id[r.id].render(e) == r.render(e) for e in events[:2000] for r in ruleset.match(e))
+
+    base_events = min(len(events), 20000)                     # per-lambda는 느리므로 일부만 측정 후 환산
+    hits, base_time = timed(per_lambda, messages[:base_events], plain)
+    base_rate = base_events / base_time
+    lin_hits, lin_time = timed(linear, events, plain)
+    idx_hits, idx_time = timed(indexed, events, ruleset)
+    assert lin_hits == idx_hits
+    print(f"events: {len(events):,}  matches: {idx_hits:,}  avg candidate rules/event: {candidates:.2f}")
+    print(f"  per-lambda : {base_rate:>12,.0f} events/s  (json.loads per rule, {base_events:,} events, {hits:,} matches)")
+    print(f"  linear     : {len(events) / lin_time:>12,.0f} events/s")
+    print(f"  indexed    : {len(events) / idx_time:>12,.0f} events/s  "
+          f"(x{lin_time / idx_time:.1f} vs linear, x{len(events) / idx_time / base_rate:.0f} vs per-lambda)")
+
+
+if __name__ == "__main__":
+    main()
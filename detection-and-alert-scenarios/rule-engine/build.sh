@@ -0,0 +1,16 @@
+#!/bin/bash
+set -e
+
+# lambda.zip = 규칙 엔진 + 규칙 파일 + 저장소 공용 모듈 (shared/ 지연 생성 클라이언트, EMF 지표, FireHOL 조회기, 알림 발송기)
+rm -f lambda.zip
+rm -rf build
+mkdir -p build/rules
+
+cp lambda_function.py rule_engine.py build/
+cp rules/*.json build/rules/
+cp ../../shared/aws_clients.py ../../shared/metrics.py ../../shared/ip_index.py ../../shared/threat_ip_matcher.py ../../shared/notifier.py build/
+
+(cd build && zip -X -q -r ../lambda.zip .)
+rm -rf build
+
+echo "[+] lambda.zip created."
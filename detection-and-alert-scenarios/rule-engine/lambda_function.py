@@ -0,0 +1,43 @@
+import json
+import os
+
+import metrics
+import notifier
+import rule_engine
+
+RULES_DIR = os.environ.get("RULES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules"))
+
+# 규칙은 컨테이너당 한 번만 읽고 컴파일 (호출마다 JSON / 패턴을 다시 해석하지 않음)
+RULES = rule_engine.load_rules(RULES_DIR)
+print(f"탐지 규칙 {len(RULES)}개 로드")
+
+
+def iter_events(event):
+    """EventBridge 직접 호출 / SNS 구독 / {"events": [...]} 묶음 호출을 모두 EventBridge 이벤트 단위로 변환"""
+    if "Records" in event:
+        for rec in event["Records"]:
+            try:
+                yield json.loads(rec["Sns"]["Message"])
+            except (KeyError, ValueError) as e:
+                print("SNS 메시지 파싱 실패:", str(e))
+    elif "events" in event:
+        yield from event["events"]
+    else:
+        yield event
+
+
+@metrics.handler('rule-engine')
+def lambda_handler(event, context):
+    # DISCORD_WEBHOOK_URL / SNS_TOPIC_ARN(이메일, 선택) 환경 변수 사용
+    dispatcher = notifier.get_notifier()
+    events = alerts = 0
+    for item in iter_events(event):
+        events += 1
+        for rule in RULES.match(item):
+            print(f"[{rule.id}] 탐지")
+            dispatcher.add(rule.render(item), subject=f"[ALERT] {rule.title}")
+            alerts += 1
+    metrics.count('rules.events', events)
+    metrics.count('rules.alerts', alerts)
+    result = dispatcher.flush(deadline=notifier.deadline_from(context))
+    return {"statusCode": 200, "events": events, "alerts": alerts, **result}
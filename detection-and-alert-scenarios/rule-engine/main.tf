@@ -0,0 +1,204 @@
+#---------------------------------------------------------------------------
+# 1. PROVIDER ─ AWS 리전 설정
+#---------------------------------------------------------------------------
+provider "aws" {
+  region = var.aws_region # IAM / Root 로그인 같은 글로벌 서비스 이벤트는 us-east-1에서만 발생
+}
+
+# 현재 AWS 계정 정보 조회
+data "aws_caller_identity" "current" {}
+
+# rules/*.json 탐지 규칙 목록 (규칙 추가 시 파일만 추가하고 lambda.zip 재빌드)
+locals {
+  rules = {
+    for file in fileset("${path.module}/rules", "*.json") :
+    trimsuffix(file, ".json") => jsondecode(file("${path.module}/rules/${file}"))
+  }
+}
+
+#---------------------------------------------------------------------------
+# 2. CloudTrail 설정 (이미 리전에 추적이 존재한다면 create_trail = false)
+#---------------------------------------------------------------------------
+
+# CloudTrail 로그를 저장할 S3 버킷 생성
+resource "aws_s3_bucket" "trail_bucket" {
+  count         = var.create_trail ? 1 : 0
+  bucket        = "rule-engine-trail-bucket-${data.aws_caller_identity.current.account_id}"
+  force_destroy = true # 버킷 비워진 후 삭제 허용
+}
+
+# 생성한 S3 버킷에 대한 퍼블릭 액세스 차단
+resource "aws_s3_bucket_public_access_block" "trail_bucket_block" {
+  count                   = var.create_trail ? 1 : 0
+  bucket                  = aws_s3_bucket.trail_bucket[0].id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# CloudTrail 서비스가 로그 기록을 위한 S3 버킷에 접근 허용
+resource "aws_s3_bucket_policy" "trail_bucket_policy" {
+  count  = var.create_trail ? 1 : 0
+  bucket = aws_s3_bucket.trail_bucket[0].id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [
+      {
+        Sid       = "AWSCloudTrailAclCheck",
+        Effect    = "Allow",
+        Principal = { Service = "cloudtrail.amazonaws.com" },
+        Action    = "s3:GetBucketAcl",
+        Resource  = aws_s3_bucket.trail_bucket[0].arn
+      },
+      {
+        Sid       = "AWSCloudTrailWrite",
+        Effect    = "Allow",
+        Principal = { Service = "cloudtrail.amazonaws.com" },
+        Action    = "s3:PutObject",
+        Resource  = "${aws_s3_bucket.trail_bucket[0].arn}/AWSLogs/${data.aws_caller_identity.current.account_id}/*",
+        Condition = {
+          StringEquals = {
+            "s3:x-amz-acl" = "bucket-owner-full-control"
+          }
+        }
+      }
+    ]
+  })
+}
+
+# CloudTrail 트레일 생성 (모든 리전에서 이벤트 수집)
+resource "aws_cloudtrail" "rule_engine_trail" {
+  count                         = var.create_trail ? 1 : 0
+  name                          = "rule-engine-trail"
+  s3_bucket_name                = aws_s3_bucket.trail_bucket[0].id
+  include_global_service_events = true # 글로벌 서비스 이벤트 포함
+  is_multi_region_trail         = true # 다중 리전 이벤트 포함
+  enable_logging                = true
+
+  depends_on = [
+    aws_s3_bucket_policy.trail_bucket_policy
+  ]
+}
+
+#---------------------------------------------------------------------------
+# 3. SNS Topic 및 Email 구독 설정 (notification_email 미입력 시 생략)
+#---------------------------------------------------------------------------
+
+resource "aws_sns_topic" "alert_topic" {
+  count = var.notification_email == "" ? 0 : 1
+  name  = "rule-engine-alert"
+}
+
+resource "aws_sns_topic_subscription" "email_sub" {
+  count     = var.notification_email == "" ? 0 : 1
+  topic_arn = aws_sns_topic.alert_topic[0].arn
+  protocol  = "email"
+  endpoint  = var.notification_email
+}
+
+#---------------------------------------------------------------------------
+# 4. Lambda 설정 (규칙 엔진 하나가 모든 탐지 규칙을 처리)
+#---------------------------------------------------------------------------
+
+# Lambda 실행을 위한 IAM 역할 생성
+resource "aws_iam_role" "lambda_exec_role" {
+  name = "rule_engine_lambda_role"
+
+  assume_role_policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect    = "Allow",
+      Action    = "sts:AssumeRole",
+      Principal = { Service = "lambda.amazonaws.com" }
+    }]
+  })
+}
+
+# CloudWatch 로그 기록 권한
+resource "aws_iam_role_policy_attachment" "lambda_basic" {
+  role       = aws_iam_role.lambda_exec_role.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+# 이메일 알림 발행 권한
+resource "aws_iam_role_policy" "lambda_sns_publish" {
+  count = var.notification_email == "" ? 0 : 1
+  name  = "rule_engine_sns_publish"
+  role  = aws_iam_role.lambda_exec_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect   = "Allow",
+      Action   = "sns:Publish",
+      Resource = aws_sns_topic.alert_topic[0].arn
+    }]
+  })
+}
+
+# FireHOL 인덱스 조회 권한 (threat 포맷을 쓰는 규칙용, threat_list_bucket 미입력 시 생략)
+resource "aws_iam_role_policy" "lambda_threat_list_read" {
+  count = var.threat_list_bucket == "" ? 0 : 1
+  name  = "rule_engine_threat_list_read"
+  role  = aws_iam_role.lambda_exec_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect   = "Allow",
+      Action   = ["s3:GetObject"],
+      Resource = "arn:aws:s3:::${var.threat_list_bucket}/threat/*"
+    }]
+  })
+}
+
+# 규칙 엔진 Lambda (lambda.zip = lambda_function.py + rule_engine.py + rules/ + shared 공용 모듈, build.sh로 생성)
+resource "aws_lambda_function" "rule_engine" {
+  filename         = "lambda.zip"
+  function_name    = "detection_rule_engine"
+  role             = aws_iam_role.lambda_exec_role.arn
+  handler          = "lambda_function.lambda_handler"
+  runtime          = "python3.12"
+  timeout          = 30
+  source_code_hash = filebase64sha256("lambda.zip") # 코드 / 규칙 변경 감지용
+
+  environment {
+    variables = {
+      DISCORD_WEBHOOK_URL = var.discord_webhook_url
+      SNS_TOPIC_ARN       = var.notification_email == "" ? "" : aws_sns_topic.alert_topic[0].arn
+      THREAT_LIST_BUCKET  = var.threat_list_bucket
+    }
+  }
+}
+
+#---------------------------------------------------------------------------
+# 5. EventBridge 설정 (규칙 파일마다 이벤트 규칙 하나, 대상은 모두 같은 Lambda)
+#---------------------------------------------------------------------------
+
+resource "aws_cloudwatch_event_rule" "detection_rule" {
+  for_each    = local.rules
+  name        = "rule-engine-${each.key}"
+  description = each.value.title
+
+  # Lambda도 같은 패턴을 컴파일해 재검사하므로 규칙 파일의 패턴을 그대로 사용
+  event_pattern = jsonencode(each.value.event_pattern)
+}
+
+resource "aws_cloudwatch_event_target" "send_to_lambda" {
+  for_each  = local.rules
+  rule      = aws_cloudwatch_event_rule.detection_rule[each.key].name
+  target_id = "ruleEngineLambda"
+  arn       = aws_lambda_function.rule_engine.arn
+}
+
+# EventBridge가 Lambda를 호출할 수 있도록 권한 부여
+resource "aws_lambda_permission" "allow_eventbridge" {
+  for_each      = local.rules
+  statement_id  = "AllowEventBridge-${each.key}"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.rule_engine.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.detection_rule[each.key].arn
+}
@@ -0,0 +1,221 @@
+import glob
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+# 규칙 파일 형식 (rules/*.json)
+#   id            : 규칙 이름
+#   title         : 규칙 설명
+#   event_pattern : EventBridge 이벤트 패턴 (Terraform이 규칙 생성에 그대로 사용, 엔진은 같은 패턴을 컴파일해 재검사)
+#   fields        : {템플릿 변수: "detail.userIdentity.arn"} 또는 {"path": ..., "format": ..., "default": ...}
+#   template      : Discord 메시지 (str.format 형식, fields의 변수만 사용)
+
+KST = timezone(timedelta(hours=9))
+MISSING = object()
+
+
+def compile_path(path):
+    """'detail.userIdentity.arn' 같은 경로를 미리 나눠 두고 값을 꺼내는 함수로 변환"""
+    keys = tuple(path.split('.'))
+
+    def get(event):
+        value = event
+        for key in keys:
+            if not isinstance(value, dict):
+                return MISSING
+            value = value.get(key, MISSING)
+            if value is MISSING:
+                return MISSING
+        return value
+    return get
+
+
+def _operator(item):
+    # EventBridge 패턴의 비교 연산자 중 탐지 규칙에서 쓰는 것만 지원
+    if 'prefix' in item:
+        prefix = item['prefix']
+        return lambda v: isinstance(v, str) and v.startswith(prefix)
+    if 'suffix' in item:
+        suffix = item['suffix']
+        return lambda v: isinstance(v, str) and v.endswith(suffix)
+    if 'equals-ignore-case' in item:
+        expected = item['equals-ignore-case'].lower()
+        return lambda v: isinstance(v, str) and v.lower() == expected
+    if 'anything-but' in item:
+        excluded = item['anything-but']
+        excluded = frozenset(excluded if isinstance(excluded, list) else [excluded])
+        return lambda v: v is not MISSING and v not in excluded
+    raise ValueError(f"unsupported pattern operator: {item}")
+
+
+def compile_values(values):
+    """패턴의 값 목록(OR)을 하나의 판별 함수로 변환 (이벤트 값이 배열이면 원소 중 하나만 맞으면 됨)"""
+    literals = frozenset(v for v in values if not isinstance(v, dict))
+    exists = [item['exists'] for item in values if isinstance(item, dict) and 'exists' in item]
+    checks = tuple(_operator(item) for item in values if isinstance(item, dict) and 'exists' not in item)
+
+    def match_one(value):
+        return value in literals or any(check(value) for check in checks)
+
+    def match(value):
+        if exists and (value is not MISSING) == exists[0]:
+            return True
+        if value is MISSING:
+            return False
+        if isinstance(value, list):
+            return any(match_one(v) for v in value if not isinstance(v, (dict, list)))
+        return not isinstance(value, dict) and match_one(value)
+    return match
+
+
+def compile_pattern(pattern, skip=(), prefix=''):
+    """중첩된 이벤트 패턴을 (값 추출 함수, 판별 함수) 목록으로 평탄화 (skip 경로는 인덱스가 이미 보장)"""
+    conditions = []
+    for key, value in pattern.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            conditions += compile_pattern(value, skip, path + '.')
+        elif path not in skip:
+            conditions.append((compile_path(path), compile_values(value)))
+    return conditions
+
+
+def _literals(values):
+    if isinstance(values, list) and values and all(isinstance(v, str) for v in values):
+        return values
+    return None
+
+
+def format_text(value):
+    return str(value)
+
+
+def format_kst(value):
+    # CloudTrail / EventBridge 시각(UTC, ISO 8601) → KST
+    try:
+        utc = datetime.strptime(str(value)[:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return f"{value} (UTC)"
+    return utc.astimezone(KST).strftime('%Y-%m-%d %H:%M:%S (KST)')
+
+
+def format_join(value):
+    return ", ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+
+
+def format_launch_permission(value):
+    # AMI launchPermission.add.items → 퍼블릭(group=all) / 공유 대상 계정 ID
+    items = value if isinstance(value, list) else []
+    exposure = ["Public"] if any(item.get("group") == "all" for item in items) else []
+    exposure += [item["userId"] for item in items if "userId" in item]
+    return ", ".join(exposure) if exposure else "Unknown"
+
+
+def format_threat(value):
+    # FireHOL 목록 등재 여부 (shared/threat_ip_matcher.py가 함께 패키징된 경우에만)
+    try:
+        import threat_ip_matcher
+    except ImportError:
+        return "N/A"
+    threat = threat_ip_matcher.lookup(str(value))
+    return f"등재 ({threat['match']})" if threat["listed"] else "미등재"
+
+
+FORMATTERS = {
+    'text': format_text,
+    'kst': format_kst,
+    'join': format_join,
+    'launch_permission': format_launch_permission,
+    'threat': format_threat,
+}
+
+
+class Rule:
+    def __init__(self, spec, skip=()):
+        self.id = spec['id']
+        self.title = spec.get('title', self.id)
+        self.pattern = spec['event_pattern']
+        self.conditions = compile_pattern(self.pattern, skip)
+        self.template = spec['template']
+        self.fields = []
+        for name, field in spec.get('fields', {}).items():
+            if isinstance(field, str):
+                field = {'path': field}
+            formatter = FORMATTERS[field.get('format', 'text')]
+            self.fields.append((name, compile_path(field['path']), formatter, field.get('default', 'N/A')))
+
+    def matches(self, event):
+        for get, match in self.conditions:
+            if not match(get(event)):
+                return False
+        return True
+
+    def render(self, event):
+        values = {}
+        for name, get, formatter, default in self.fields:
+            value = get(event)
+            values[name] = default if value is MISSING or value is None or value == '' else formatter(value)
+        return self.template.format_map(values)
+
+
+class RuleSet:
+    """규칙을 (eventSource, eventName) / detail-type 기준으로 색인해 이벤트마다 후보 규칙만 검사"""
+
+    def __init__(self, specs):
+        self.rules = []
+        self.by_name = {}        # (eventSource 또는 None, eventName) → 규칙 목록
+        self.by_type = {}        # detail-type → 규칙 목록 (CloudTrail API 호출이 아닌 이벤트)
+        self.catch_all = []
+        for spec in specs:
+            detail = spec['event_pattern'].get('detail', {})
+            names = _literals(detail.get('eventName'))
+            sources = _literals(detail.get('eventSource'))
+            types = _literals(spec['event_pattern'].get('detail-type'))
+            if names:
+                # 색인 키가 eventName / eventSource 일치를 보장하므로 매칭 시 다시 검사하지 않음
+                skip = ('detail.eventName', 'detail.eventSource') if sources else ('detail.eventName',)
+                rule = Rule(spec, skip)
+                for name in names:
+                    for source in sources or [None]:
+                        self.by_name.setdefault((source, name), []).append(rule)
+            elif types:
+                rule = Rule(spec, ('detail-type',))
+                for detail_type in types:
+                    self.by_type.setdefault(detail_type, []).append(rule)
+            else:
+                rule = Rule(spec)
+                self.catch_all.append(rule)
+            self.rules.append(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def candidates(self, event):
+        detail = event.get('detail')
+        if not isinstance(detail, dict):
+            detail = {}
+        name = detail.get('eventName')
+        source = detail.get('eventSource')
+        candidates = []
+        if name is not None:
+            if source is not None:
+                candidates += self.by_name.get((source, name), ())
+            candidates += self.by_name.get((None, name), ())
+        candidates += self.by_type.get(event.get('detail-type'), ())
+        return candidates + self.catch_all
+
+    def match(self, event):
+        """이벤트 하나를 모든 규칙에 대해 한 번에 평가해 일치한 규칙 목록을 반환"""
+        return [rule for rule in self.candidates(event) if rule.matches(event)]
+
+
+def load_specs(directory):
+    specs = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            specs.append(json.load(f))
+    return specs
+
+
+def load_rules(directory):
+    return RuleSet(load_specs(directory))
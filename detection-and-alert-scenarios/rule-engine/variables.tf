@@ -0,0 +1,36 @@
+# 해당 파일에서는 변수를 여기다가 모두 선언
+# terraform 실행 시 terraform.tfvars에 선언된 값을 바탕으로 값이 들어감
+
+# 배포 리전 (IAM 사용자 / Root 로그인 규칙은 us-east-1 배포에서만 이벤트가 들어옴)
+variable "aws_region" {
+  description = "AWS region to deploy the rule engine"
+  type        = string
+  default     = "ap-northeast-2"
+}
+
+# Discord Webhook 주소를 입력받기 위한 변수
+variable "discord_webhook_url" {
+  description = "Discord webhook URL"
+  type        = string
+}
+
+# 이메일 수신자 (빈 문자열이면 SNS 이메일 알림 생략)
+variable "notification_email" {
+  description = "Email address to receive alerts"
+  type        = string
+  default     = ""
+}
+
+# 리전에 CloudTrail 추적이 없을 때만 생성
+variable "create_trail" {
+  description = "Create a multi-region CloudTrail trail for API call events"
+  type        = bool
+  default     = true
+}
+
+# FireHOL 인덱스가 게시되는 버킷 (빈 문자열이면 threat 포맷 필드는 미등재로 표시)
+variable "threat_list_bucket" {
+  description = "S3 bucket holding the FireHOL index published by update_ip_list"
+  type        = string
+  default     = ""
+}
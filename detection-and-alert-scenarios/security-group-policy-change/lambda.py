@@ -1,12 +1,14 @@
 
-import os
 import json
-import urllib3
 
-http = urllib3.PoolManager()
-WEBHOOK = os.environ["DISCORD_WEBHOOK_URL"]
+import metrics
+import notifier
+import threat_ip_matcher
 
+
+@metrics.handler('security-group-policy-change')
 def lambda_handler(event, context):
+    dispatcher = notifier.get_notifier()
     for rec in event["Records"]:
         try:
             msg = json.loads(rec["Sns"]["Message"])
@@ -20,6 +22,9 @@ def lambda_handler(event, context):
         event_time_kst = event_time_utc.replace("T", " ").replace("Z", "") if event_time_utc != "N/A" else "N/A"
         user_arn = detail.get("userIdentity", {}).get("arn", "N/A")
         source_ip = detail.get("sourceIPAddress", "N/A")
+        # 서비스 주체(예: ec2.amazonaws.com)는 IP가 아니므로 미등재로 처리됨
+        threat = threat_ip_matcher.lookup(source_ip)
+        threat_status = f"등재 ({threat['match']})" if threat["listed"] else "미등재"
         aws_region = msg.get("region", "N/A")
         account_id = msg.get("account", "N/A")
         sg_id = "N/A"
@@ -36,12 +41,12 @@ def lambda_handler(event, context):
             f"• 발생 시간(KST): `{event_time_kst}`\n"
             f"• 사용자 ARN: `{user_arn}`\n"
             f"• 소스 IP: `{source_ip}`\n"
+            f"• FireHOL 목록: `{threat_status}`\n"
             f"• 리전: `{aws_region}`\n"
             f"• 계정 ID: `{account_id}`"
         )
 
-        http.request(
-            "POST", WEBHOOK,
-            body=json.dumps({"content": content}).encode(),
-            headers={"Content-Type": "application/json"}
-        )
+        dispatcher.add(content)
+
+    # 여러 건이면 embed로 묶어 한 번에 전송 (429 응답 시 retry_after만큼 대기 후 재전송)
+    dispatcher.flush(deadline=notifier.deadline_from(context))
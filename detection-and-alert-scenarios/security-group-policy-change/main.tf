@@ -112,11 +112,26 @@ resource "aws_lambda_function" "lambda_securitygroup_alarm" {
   environment {
     variables = {
       DISCORD_WEBHOOK_URL = var.discord_webhook_url
+      THREAT_LIST_BUCKET  = var.threat_list_bucket
     }
   }
   depends_on = [aws_iam_role_policy_attachment.lambda_basic_execution]
 }
 
+resource "aws_iam_role_policy" "lambda_threat_list_read" {
+  count = var.threat_list_bucket == "" ? 0 : 1
+  name  = "lambda-threat-list-read"
+  role  = aws_iam_role.lambda_exec.id
+  policy = jsonencode({
+    Version = "2012-10-17",
+    Statement = [{
+      Effect   = "Allow",
+      Action   = "s3:GetObject",
+      Resource = "arn:aws:s3:::${var.threat_list_bucket}/threat/*"
+    }]
+  })
+}
+
 resource "aws_lambda_permission" "allow_sns" {
   statement_id  = "AllowExecutionFromSNS"
   action        = "lambda:InvokeFunction"
@@ -9,3 +9,9 @@ variable "alert_email" {
   description = "Email for SNS alerts"
   type        = string
 }
+
+variable "threat_list_bucket" {
+  description = "FireHOL 인덱스(threat/malicious-ip-list.idx)가 저장된 S3 버킷 이름 (비우면 조회 안 함)"
+  type        = string
+  default     = ""
+}
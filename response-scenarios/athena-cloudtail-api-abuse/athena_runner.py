@@ -0,0 +1,94 @@
+import time
+
+
+class AthenaQueryError(Exception):
+    pass
+
+
+class AthenaRunner:
+    """Athena 쿼리 실행기
+
+    - 완료 대기: 고정 1초 대신 짧은 간격에서 시작해 지수적으로 늘리는 폴링.
+      직전 쿼리들의 실행 시간(EWMA)을 기억해 첫 폴링 시점을 조정한다.
+    - 결과 조회: get_query_results의 모든 페이지(NextToken)를 제너레이터로 한 행씩 넘겨
+      결과 전체를 메모리에 올리지 않는다.
+    """
+
+    def __init__(self, client, database, workgroup, output, initial_delay=0.2, max_delay=3.0,
+                 factor=1.6, page_size=1000, sleep=time.sleep, clock=time.monotonic):
+        self.client = client
+        self.database = database
+        self.workgroup = workgroup
+        self.output = output
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.page_size = page_size
+        self.sleep = sleep
+        self.clock = clock
+        self.expected = None     # 최근 쿼리 완료까지 걸린 시간(초)의 지수 이동 평균
+        self.polls = 0           # 누적 get_query_execution 호출 수
+
+    def start(self, query):
+        response = self.client.start_query_execution(
+            QueryString=query,
+            QueryExecutionContext={'Database': self.database},
+            ResultConfiguration={'OutputLocation': self.output},
+            WorkGroup=self.workgroup
+        )
+        return response['QueryExecutionId']
+
+    def wait(self, query_execution_id, timeout=None):
+        """완료될 때까지 폴링하고 QueryExecution을 반환 (실패/취소/시간 초과 시 AthenaQueryError)"""
+        started = self.clock()
+        delay = self.initial_delay
+        if self.expected:
+            # 보통 이 정도 걸리는 쿼리라면 그 절반까지는 확인하지 않음
+            delay = min(self.max_delay, max(delay, self.expected / 2))
+
+        while True:
+            execution = self.client.get_query_execution(QueryExecutionId=query_execution_id)['QueryExecution']
+            self.polls += 1
+            state = execution['Status']['State']
+            if state == 'SUCCEEDED':
+                elapsed = self.clock() - started
+                self.expected = elapsed if self.expected is None else 0.7 * self.expected + 0.3 * elapsed
+                return execution
+            if state in ('FAILED', 'CANCELLED'):
+                reason = execution['Status'].get('StateChangeReason', 'No reason provided')
+                raise AthenaQueryError(f"Athena query {state.lower()}. Reason: {reason}")
+
+            if timeout is not None and self.clock() - started + delay > timeout:
+                # Lambda 제한 시간 안에 끝나지 않으면 쿼리를 취소해 불필요한 스캔 비용을 막음
+                self.client.stop_query_execution(QueryExecutionId=query_execution_id)
+                raise AthenaQueryError(f"Athena query timed out after {timeout:.0f}s")
+            self.sleep(delay)
+            delay = min(self.max_delay, delay * self.factor)
+
+    def run(self, query, timeout=None):
+        return self.wait(self.start(query), timeout=timeout)
+
+    def rows(self, query_execution_id):
+        """결과 행을 문자열 리스트로 하나씩 반환 (첫 페이지의 헤더 행 제외)"""
+        kwargs = {'QueryExecutionId': query_execution_id, 'MaxResults': self.page_size}
+        first = True
+        while True:
+            page = self.client.get_query_results(**kwargs)
+            rows = page['ResultSet']['Rows']
+            for row in rows[1:] if first else rows:
+                yield [col.get('VarCharValue', '') for col in row['Data']]
+            first = False
+            token = page.get('NextToken')
+            if not token:
+                return
+            kwargs['NextToken'] = token
+
+
+def statistics(execution):
+    """QueryExecution에서 (스캔 바이트, 엔진 실행 시간 ms, 결과 CSV 위치)"""
+    stats = execution.get('Statistics', {})
+    return (
+        stats.get('DataScannedInBytes', 0),
+        stats.get('EngineExecutionTimeInMillis', 0),
+        execution.get('ResultConfiguration', {}).get('OutputLocation', '')
+    )
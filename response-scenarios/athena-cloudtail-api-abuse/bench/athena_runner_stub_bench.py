@@ -0,0 +1,223 @@
+"""AthenaRunner / 알림 분할 검증 스크립트 (stub Athena 클라이언트, AWS 호출 없음)
+
+1. 폴링: 실행 시간이 다른 쿼리들을 가짜 시계로 흘려 보내며 기존 고정 1초 폴링과
+   AthenaRunner의 적응형 폴링의 get_query_execution 호출 수 / 완료 감지 지연을 비교
+2. 결과 스트리밍: 10,000행(1,000행 × 10페이지 + 헤더)을 돌려주는 stub으로 lambda_handler를 실행해
+   모든 행이 읽히고, 모든 Discord 메시지가 2,000자 이하이며, 잘린 행 없이 순서대로 나뉘는지 확인
+3. 전송 실패: 429(retry_after)는 기다려 재전송하고, 끝내 전달하지 못하면 워터마크를 전진하지 않는지 확인
+
+    python bench/athena_runner_stub_bench.py [--rows 10000] [--queries 200]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+os.environ.setdefault("SNS_TOPIC_ARN", "arn:aws:sns:ap-northeast-2:000000000000:bench")
+os.environ.setdefault("DISCORD_WEBHOOK", "http://127.0.0.1/bench")
+
+import lambda_function as detector  # noqa: E402
+import notifier  # noqa: E402
+from athena_runner import AthenaRunner  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class StubAthena:
+    """쿼리마다 정해진 시간 뒤 SUCCEEDED가 되고, 결과를 page_size 단위 페이지로 돌려주는 stub"""
+
+    def __init__(self, clock, durations=(), rows=0, page_size=1000):
+        self.clock = clock
+        self.durations = list(durations)
+        self.rows = rows
+        self.page_size = page_size
+        self.queries = {}
+        self.result_calls = 0
+
+    def start_query_execution(self, **kwargs):
+        qid = f"q{len(self.queries)}"
+        duration = self.durations.pop(0) if self.durations else 1.0
+        self.queries[qid] = self.clock() + duration
+        return {'QueryExecutionId': qid}
+
+    def get_query_execution(self, QueryExecutionId):
+        done = self.clock() >= self.queries[QueryExecutionId]
+        return {'QueryExecution': {
+            'QueryExecutionId': QueryExecutionId,
+            'Status': {'State': 'SUCCEEDED' if done else 'RUNNING'},
+            'Statistics': {'DataScannedInBytes': 1024, 'EngineExecutionTimeInMillis': 10},
+            'ResultConfiguration': {'OutputLocation': f"s3://bench/output/{QueryExecutionId}.csv"},
+        }}
+
+    def stop_query_execution(self, QueryExecutionId):
+        pass
+
+    def get_query_results(self, QueryExecutionId, MaxResults, NextToken=None):
+        self.result_calls += 1
+        offset = int(NextToken or 0)
+        rows = []
+        if offset == 0:
+            rows.append({'Data': [{'VarCharValue': c} for c in ('eventTime', 'eventName', 'username', 'sourceIPAddress')]})
+        end = min(self.rows, offset + MaxResults)
+        for i in range(offset, end):
+            rows.append({'Data': [
+                {'VarCharValue': f"2025-01-01T{(i // 3600) % 24:02d}:{(i // 60) % 60:02d}:{i % 60:02d}Z"},
+                {'VarCharValue': 'ConsoleLogin'},
+                {'VarCharValue': f"user{i}"},
+                {'VarCharValue': f"203.0.113.{i % 256}"},
+            ]})
+        page = {'ResultSet': {'Rows': rows}}
+        if end < self.rows:
+            page['NextToken'] = str(end)
+        return page
+
+
+class Recorder:
+    """Discord stub (statuses 순서대로 응답, 소진하면 204) 겸 SNS stub"""
+
+    def __init__(self, statuses=()):
+        self.messages = []
+        self.statuses = list(statuses)
+        self.requests = 0
+
+    def request(self, method, url, body=None, headers=None):
+        self.requests += 1
+        status = self.statuses.pop(0) if self.statuses else 204
+
+        class Response:
+            headers = {}
+            data = b'{"retry_after": 0.5}' if status == 429 else b''
+        Response.status = status
+        if status < 300:
+            self.messages.append(json.loads(body)['content'])
+        return Response()
+
+    def publish(self, **kwargs):
+        self.messages.append(kwargs['Message'])
+
+
+def fixed_polling(athena, clock, qid):
+    # 변경 전 lambda_function의 대기 루프
+    polls = 0
+    while True:
+        polls += 1
+        status = athena.get_query_execution(QueryExecutionId=qid)['QueryExecution']['Status']['State']
+        if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
+            return polls
+        clock.sleep(1)
+
+
+def compare_polling(count, seed):
+    rng = random.Random(seed)
+    durations = [rng.choice((rng.uniform(0.3, 2), rng.uniform(2, 10), rng.uniform(10, 60))) for _ in range(count)]
+
+    results = {}
+    for label in ("fixed 1s", "adaptive"):
+        clock = FakeClock()
+        athena = StubAthena(clock, durations)
+        runner = AthenaRunner(athena, 'db', 'wg', 's3://bench/', sleep=clock.sleep, clock=clock)
+        polls = lag = 0.0
+        for duration in durations:
+            started = clock()
+            qid = runner.start("SELECT 1")
+            if label == "fixed 1s":
+                polls += fixed_polling(athena, clock, qid)
+            else:
+                before = runner.polls
+                runner.wait(qid)
+                polls += runner.polls - before
+            lag += clock() - started - duration
+        results[label] = (polls, lag)
+        print(f"  {label:<9} polls={polls:6.0f}  avg detection lag={lag / count:5.2f}s")
+    print(f"  poll reduction: {1 - results['adaptive'][0] / results['fixed 1s'][0]:.0%} "
+          f"over {count} queries (0.3s-60s)")
+
+
+def check_streaming(rows):
+    clock = FakeClock()
+    athena = StubAthena(clock, [2.5], rows=rows)
+    discord, sns = Recorder(), Recorder()
+    detector.runner = AthenaRunner(athena, 'db', 'wg', 's3://bench/', sleep=clock.sleep, clock=clock)
+    detector.dispatcher = notifier.Notifier(detector.DISCORD_WEBHOOK, topic_arn='', http=discord,
+                                            sleep=clock.sleep, clock=clock)
+    detector.sns = sns
+    detector.WATERMARK_BUCKET = ''
+
+    stats = detector.lambda_handler({}, None)
+    assert stats['rows'] == rows, stats
+    assert athena.result_calls == -(-rows // 1000), athena.result_calls
+    assert all(len(m) <= detector.DISCORD_LIMIT for m in discord.messages)
+    assert len(discord.messages) == detector.DISCORD_MAX_MESSAGES + 1   # 분할 메시지 + 전체 결과 안내
+    print(f"  handler: rows={stats['rows']} pages={athena.result_calls} polls={stats['polls']} "
+          f"discord_messages={len(discord.messages)} (max {max(len(m) for m in discord.messages)} chars) "
+          f"sns_bytes={len(sns.messages[0].encode())}")
+
+    # 제한 없이 나눴을 때 모든 행이 순서대로 한 번씩 담기는지 확인
+    lines = [detector.format_row(["2025-01-01T00:00:00Z", "ConsoleLogin", f"user{i}", "203.0.113.1"])
+             for i in range(rows)]
+    chunks = list(detector.chunk_messages(iter(lines), "**[ title ]**", "header\n"))
+    body = "".join(c.split("header\n", 1)[1][:-3] for c in chunks)
+    assert body == "".join(lines)
+    assert all(len(c) <= detector.DISCORD_LIMIT for c in chunks)
+    print(f"  chunking: {rows} rows → {len(chunks)} messages, all ≤ {detector.DISCORD_LIMIT} chars, no rows lost")
+
+
+def check_delivery(rows):
+    saved = []
+    detector.save_state = lambda state, stats: saved.append(dict(state))
+
+    def run(statuses):
+        clock = FakeClock()
+        discord, sns = Recorder(statuses), Recorder()
+        detector.runner = AthenaRunner(StubAthena(clock, [1.0], rows=rows), 'db', 'wg', 's3://bench/',
+                                       sleep=clock.sleep, clock=clock)
+        detector.dispatcher = notifier.Notifier(detector.DISCORD_WEBHOOK, topic_arn='', http=discord,
+                                                sleep=clock.sleep, clock=clock)
+        detector.sns = sns
+        del saved[:]
+        return detector.lambda_handler({}, None), discord, sns
+
+    # 429 두 번 → retry_after 후 재전송해 모두 전달, 워터마크 전진
+    stats, discord, sns = run([429, 429])
+    assert 'dropped' not in stats and discord.requests == len(discord.messages) + 2
+    assert len(sns.messages) == 1 and saved and saved[-1]['watermark'] is not None
+    print(f"  429 x2: retried, {len(discord.messages)} messages delivered, watermark advanced")
+
+    # 세 번째 메시지가 4xx로 거부 → 나머지 / SNS 생략, 워터마크 유지 (다음 실행에서 같은 구간 재알림)
+    stats, discord, sns = run([204, 204, 400])
+    assert stats['dropped'] == 1 and len(discord.messages) == 2 and discord.requests == 3, stats
+    assert not sns.messages and not saved
+    print("  rejected message: stopped after 2 delivered, SNS skipped, watermark kept")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print("[polling]")
+    compare_polling(args.queries, args.seed)
+    print("[paginated results]")
+    check_streaming(args.rows)
+    print("[delivery failures]")
+    check_delivery(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""API 남용 탐지 쿼리 스캔량/실행 시간 벤치마크 (DuckDB로 Athena를 대신함, AWS 호출 없음)
+
+CloudTrail과 같은 경로(AWSLogs/<계정>/CloudTrail/<리전>/yyyy/MM/dd/*.json.gz)에 합성 로그를 만든 뒤
+한 번의 시간 단위 실행을 세 가지 방식으로 비교한다.
+
+  before        : 기존 쿼리 - 테이블 전체(모든 날짜/리전 파일)를 읽고 eventTime만으로 거름
+  json+project  : 파티션 프로젝션 + 워터마크 - lambda_function이 만드는 region/dt 조건에 해당하는 파일만 읽음
+  parquet       : 새 구간만 Parquet로 적재(INSERT INTO 상당)한 뒤 Parquet에서 탐지 쿼리 실행
+
+스캔 바이트는 Athena 과금 기준과 같게 읽은 파일의 (압축) 크기 합으로 계산한다.
+Parquet는 필요한 컬럼만 읽으므로 파일 크기 합은 상한값이다.
+
+    python bench/athena_scan_bench.py [--days 30] [--regions 4] [--files-per-day 24] [--records 200]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import duckdb
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+os.environ.setdefault("SNS_TOPIC_ARN", "arn:aws:sns:ap-northeast-2:000000000000:bench")
+os.environ.setdefault("DISCORD_WEBHOOK", "http://127.0.0.1/bench")
+
+import lambda_function as detector  # noqa: E402
+
+ACCOUNT = "000000000000"
+REGIONS = ["ap-northeast-2", "us-east-1", "us-west-2", "eu-west-1", "ap-northeast-1", "eu-central-1"]
+EVENT_NAMES = ["DescribeInstances", "GetObject", "AssumeRole", "ListBuckets", "PutObject",
+               "ConsoleLogin", "CreateAccessKey", "CreateUser", "DeleteAccessKey"]
+RECORD_TYPE = ("STRUCT(eventTime VARCHAR, eventSource VARCHAR, eventName VARCHAR, awsRegion VARCHAR, "
+               "sourceIPAddress VARCHAR, userIdentity STRUCT(userName VARCHAR, arn VARCHAR))[]")
+
+
+def make_record(rng, when, region):
+    name = rng.choices(EVENT_NAMES, weights=(30, 30, 20, 10, 10, 2, 1, 1, 1))[0]
+    user = f"user{rng.randrange(50)}"
+    return {
+        "eventVersion": "1.08",
+        "userIdentity": {"type": "IAMUser", "principalId": "AIDA" + user.upper(),
+                         "arn": f"arn:aws:iam::{ACCOUNT}:user/{user}", "accountId": ACCOUNT, "userName": user},
+        "eventTime": when.strftime(detector.TIME_FORMAT),
+        "eventSource": "iam.amazonaws.com" if "User" in name or "Key" in name else "ec2.amazonaws.com",
+        "eventName": name,
+        "awsRegion": region,
+        "sourceIPAddress": f"203.0.113.{rng.randrange(256)}",
+        "userAgent": "aws-cli/2.15.0 Python/3.11",
+        "requestID": f"{rng.getrandbits(64):016x}",
+        "eventID": f"{rng.getrandbits(128):032x}",
+        "readOnly": name.startswith(("Describe", "Get", "List")),
+        "eventType": "AwsApiCall",
+        "managementEvent": True,
+        "recipientAccountId": ACCOUNT,
+        "eventCategory": "Management",
+    }
+
+
+def generate(root, now, days, regions, files_per_day, records, seed):
+    rng = random.Random(seed)
+    first = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0)
+    for region in REGIONS[:regions]:
+        for day in range(days):
+            base = first + timedelta(days=day)
+            folder = os.path.join(root, "AWSLogs", ACCOUNT, "CloudTrail", region, base.strftime("%Y/%m/%d"))
+            os.makedirs(folder, exist_ok=True)
+            for n in range(files_per_day):
+                slot = base + timedelta(seconds=86400 * n // files_per_day)
+                if slot > now:
+                    break
+                span = min(86400 // files_per_day, int((now - slot).total_seconds()) + 1)
+                body = {"Records": [make_record(rng, slot + timedelta(seconds=rng.randrange(span)), region)
+                                    for _ in range(records)]}
+                name = f"{ACCOUNT}_CloudTrail_{region}_{slot.strftime('%Y%m%dT%H%MZ')}_{n:04d}.json.gz"
+                with gzip.open(os.path.join(folder, name), "wt") as f:
+                    json.dump(body, f)
+
+
+def files_under(root, region=None, dt=None):
+    base = os.path.join(root, "AWSLogs", ACCOUNT, "CloudTrail")
+    result = []
+    for current, _, names in os.walk(base):
+        rel = os.path.relpath(current, base).split(os.sep)
+        if region and rel[0] != region:
+            continue
+        if dt and "/".join(rel[1:4]) not in dt:
+            continue
+        result.extend(os.path.join(current, name) for name in names if name.endswith(".json.gz"))
+    return sorted(result)
+
+
+def size(paths):
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def detect_sql(source, start, end, time_col, name_col, user_col, ip_col):
+    names = " OR ".join(f"{name_col} LIKE '%{e}%'" for e in detector.DETECT_EVENTS)
+    kst_hour = f"hour(CAST({time_col} AS TIMESTAMP) + INTERVAL 9 HOUR)"
+    return f"""
+        SELECT {time_col}, {name_col}, {user_col}, {ip_col}
+        FROM {source}
+        WHERE {time_col} > '{start.strftime(detector.TIME_FORMAT)}'
+          AND {time_col} <= '{end.strftime(detector.TIME_FORMAT)}'
+          AND ({names})
+          AND ({kst_hour} >= 22 OR {kst_hour} < 7)
+        ORDER BY 1
+    """
+
+
+def raw_source(paths):
+    listing = ", ".join(f"'{path}'" for path in paths)
+    return (f"(SELECT unnest(Records) AS r FROM read_json([{listing}], format='auto', "
+            f"columns={{'Records': '{RECORD_TYPE}'}}))")
+
+
+def report(label, scanned, elapsed, rows, files):
+    print(f"  {label:<14} scanned={scanned / 1024 / 1024:9.2f} MiB  files={files:6d}  "
+          f"runtime={elapsed * 1000:8.1f} ms  rows={rows}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--regions", type=int, default=4)
+    parser.add_argument("--files-per-day", type=int, default=24)
+    parser.add_argument("--records", type=int, default=200, help="파일당 레코드 수")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # 야간(KST) 탐지 결과가 나오도록 UTC 17시(KST 02시) 기준으로 실행
+    now = datetime.now(timezone.utc).replace(hour=17, minute=5, second=0, microsecond=0)
+    con = duckdb.connect()
+
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        generate(root, now, args.days, args.regions, args.files_per_day, args.records, args.seed)
+        all_files = files_under(root)
+        print(f"sample: {len(all_files)} files, {size(all_files) / 1024 / 1024:.1f} MiB gzip JSON, "
+              f"{len(all_files) * args.records} events ({time.perf_counter() - start:.1f}s to generate)")
+
+        # 시간 단위 스케줄: 직전 실행이 남긴 워터마크부터 조회
+        window_start, window_end = detector.query_window(now, now - timedelta(hours=1, minutes=detector.DELIVERY_DELAY_MINUTES))
+        print(f"window: {window_start.strftime(detector.TIME_FORMAT)} ~ {window_end.strftime(detector.TIME_FORMAT)} "
+              f"(dt IN {detector.partition_dates(window_start, window_end)})")
+
+        # before: 모든 파일을 읽고 최근 30분만 거름
+        start = time.perf_counter()
+        rows = con.execute(detect_sql(raw_source(all_files), now - timedelta(minutes=30), now,
+                                      "r.eventTime", "r.eventName", "r.userIdentity.userName", "r.sourceIPAddress")).fetchall()
+        report("before", size(all_files), time.perf_counter() - start, len(rows), len(all_files))
+
+        # json + 파티션 프로젝션 + 워터마크
+        partition = files_under(root, dt=detector.partition_dates(window_start, window_end))
+        start = time.perf_counter()
+        rows = con.execute(detect_sql(raw_source(partition), window_start, window_end,
+                                      "r.eventTime", "r.eventName", "r.userIdentity.userName", "r.sourceIPAddress")).fetchall()
+        report("json+project", size(partition), time.perf_counter() - start, len(rows), len(partition))
+
+        # parquet: 새 구간만 평탄화해 적재한 뒤 Parquet에서 탐지
+        target = os.path.join(root, "compacted")
+        start = time.perf_counter()
+        con.execute(f"""
+            COPY (
+                SELECT r.eventTime AS event_time, r.eventSource AS event_source, r.eventName AS event_name,
+                       r.userIdentity.userName AS username, r.userIdentity.arn AS user_arn,
+                       r.sourceIPAddress AS source_ip, r.awsRegion AS aws_region,
+                       substr(r.eventTime, 1, 10) AS dt
+                FROM {raw_source(partition)}
+                WHERE r.eventTime > '{window_start.strftime(detector.TIME_FORMAT)}'
+                  AND r.eventTime <= '{window_end.strftime(detector.TIME_FORMAT)}'
+            ) TO '{target}' (FORMAT PARQUET, PARTITION_BY (dt), COMPRESSION SNAPPY)
+        """)
+        compaction = time.perf_counter() - start
+        parquet_files = [os.path.join(d, n) for d, _, names in os.walk(target) for n in names]
+        start = time.perf_counter()
+        rows = con.execute(detect_sql(f"read_parquet('{target}/*/*.parquet', hive_partitioning=true)",
+                                      window_start, window_end,
+                                      "event_time", "event_name", "username", "source_ip")).fetchall()
+        query = time.perf_counter() - start
+        report("parquet load", size(partition), compaction, 0, len(partition))
+        report("parquet query", size(parquet_files), query, len(rows), len(parquet_files))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""실시간(스트리밍) CloudTrail 탐지 처리량 벤치마크 (로컬, S3 호출 없음)
+
+합성 CloudTrail 로그 파일(gzip JSON, {"Records": [...]})을 만들어 stream_detector.scan으로
+총 --size MB(압축 해제 기준, 기본 1GB)를 처리하고 초당 이벤트 수 / 처리량을 측정한다.
+최대 메모리는 파일 하나를 기준으로 tracemalloc으로 따로 측정해, 파일 전체를 json.loads 하는
+방식과 비교한다 (같은 파일에서 두 방식의 탐지 결과가 같은지도 확인).
+
+    python bench/cloudtrail_stream_bench.py [--size 1024] [--file-mb 8] [--files 4]
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+os.environ.setdefault("SNS_TOPIC_ARN", "arn:aws:sns:ap-northeast-2:000000000000:bench")
+os.environ.setdefault("DISCORD_WEBHOOK", "http://127.0.0.1/bench")
+
+import stream_detector  # noqa: E402
+
+ACCOUNT = "000000000000"
+EVENT_NAMES = ["DescribeInstances", "GetObject", "AssumeRole", "ListBuckets", "PutObject", "Decrypt",
+               "ConsoleLogin", "CreateAccessKey", "CreateUser", "DeleteAccessKey"]
+
+
+def make_file(rng, target_bytes):
+    records = []
+    size = 0
+    while size < target_bytes:
+        name = rng.choices(EVENT_NAMES, weights=(25, 25, 20, 10, 10, 6, 1, 1, 1, 1))[0]
+        user = f"user{rng.randrange(200)}"
+        record = {
+            "eventVersion": "1.08",
+            "userIdentity": {"type": "IAMUser", "principalId": f"AIDA{rng.getrandbits(60):015X}",
+                             "arn": f"arn:aws:iam::{ACCOUNT}:user/{user}", "accountId": ACCOUNT,
+                             "accessKeyId": f"AKIA{rng.getrandbits(60):016X}", "userName": user},
+            "eventTime": f"2025-03-{rng.randrange(1, 29):02d}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}Z",
+            "eventSource": "iam.amazonaws.com", "eventName": name, "awsRegion": "ap-northeast-2",
+            "sourceIPAddress": f"198.51.100.{rng.randrange(256)}",
+            "userAgent": "aws-cli/2.15.0 md/Botocore#1.34.0 ua/2.0 os/linux#6.1 md/arch#x86_64 lang/python#3.11.6",
+            "requestParameters": {"instancesSet": {"items": [{"instanceId": f"i-{rng.getrandbits(64):016x}"}]},
+                                  "filterSet": {}, "maxResults": 1000},
+            "responseElements": None,
+            "requestID": f"{rng.getrandbits(128):032x}", "eventID": f"{rng.getrandbits(128):032x}",
+            "readOnly": True, "eventType": "AwsApiCall", "managementEvent": True,
+            "recipientAccountId": ACCOUNT, "eventCategory": "Management",
+            "tlsDetails": {"tlsVersion": "TLSv1.3", "cipherSuite": "TLS_AES_128_GCM_SHA256",
+                           "clientProvidedHostHeader": "ec2.ap-northeast-2.amazonaws.com"},
+        }
+        records.append(record)
+        size += len(json.dumps(record))
+    raw = json.dumps({"Records": records}).encode()
+    return gzip.compress(raw, 6), len(raw), len(records)
+
+
+def baseline_scan(blob):
+    # 파일 전체를 풀어 한 번에 json.loads
+    records = json.loads(gzip.decompress(blob))["Records"]
+    return [r for r in records if stream_detector.matches(r)]
+
+
+def peak(fn, blob):
+    tracemalloc.start()
+    result = fn(blob)
+    _, used = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, used
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1024, help="처리할 총 크기(MB, 압축 해제 기준)")
+    parser.add_argument("--file-mb", type=float, default=8, help="로그 파일 하나의 크기(MB, 압축 해제 기준)")
+    parser.add_argument("--files", type=int, default=4, help="서로 다른 합성 파일 수 (돌려 가며 사용)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    files = [make_file(rng, int(args.file_mb * 1024 * 1024)) for _ in range(args.files)]
+    print(f"sample files: {args.files} x ~{args.file_mb:.0f} MB JSON "
+          f"({sum(len(f[0]) for f in files) / len(files) / 1024 / 1024:.1f} MB gzip each)")
+
+    # 1. 파일 하나 기준 최대 메모리 / 결과 비교
+    blob = files[0][0]
+    streamed, stream_peak = peak(lambda b: stream_detector.scan(io.BytesIO(b)), blob)
+    loaded, load_peak = peak(baseline_scan, blob)
+    assert [r["eventID"] for r in streamed] == [r["eventID"] for r in loaded]
+    print(f"peak memory per file: streaming={stream_peak / 1024 / 1024:6.1f} MiB  "
+          f"json.loads={load_peak / 1024 / 1024:6.1f} MiB  (same {len(streamed)} matches)")
+
+    # 2. 총 처리량
+    target = args.size * 1024 * 1024
+    processed = events = alerts = 0
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    i = 0
+    while processed < target:
+        blob, raw_size, count = files[i % len(files)]
+        alerts += len(stream_detector.scan(io.BytesIO(blob)))
+        processed += raw_size
+        events += count
+        i += 1
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"streamed {processed / 1024 / 1024:.0f} MB in {i} files: {elapsed:.1f}s  "
+          f"{events / elapsed:,.0f} events/s  {processed / 1024 / 1024 / elapsed:.1f} MB/s  "
+          f"alerts={alerts}  max RSS={rss_after / 1024:.0f} MiB (+{(rss_after - rss_before) / 1024:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
-import boto3
 import json
-import urllib3
-import time
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
 
-# AWS 클라이언트
-athena = boto3.client('athena')
-sns = boto3.client('sns')
-http = urllib3.PoolManager()
+import aws_clients
+import metrics
+import notifier
+from athena_runner import AthenaRunner, statistics
+
+# AWS 클라이언트 (첫 사용 때 생성 - stream_detector는 Athena 없이 SNS / Discord만 사용)
+athena = aws_clients.lazy('athena')
+sns = aws_clients.lazy('sns')
+s3 = aws_clients.lazy('s3')
 
 # 환경 변수 설정
 ATHENA_DB = os.environ.get('ATHENA_DB', 'athena_cloudtrail_db')
@@ -18,9 +21,104 @@ OUTPUT = os.environ.get('ATHENA_OUTPUT', 's3://s3-cloudtrail-logbucket/athena-re
 SNS_TOPIC_ARN = os.environ['SNS_TOPIC_ARN']
 DISCORD_WEBHOOK = os.environ['DISCORD_WEBHOOK']
 
-def lambda_handler(event, context):
-    # Athena 쿼리: 최근 30분 + 야간 시간대 + CreateUser/DeleteAccessKey 탐지
-    query = f"""
+# 조회 원본: json(원본 CloudTrail 테이블) / parquet(새 구간을 Parquet 테이블로 적재한 뒤 조회)
+QUERY_SOURCE = os.environ.get('QUERY_SOURCE', 'json')
+PARQUET_TABLE = os.environ.get('PARQUET_TABLE', 'cloudtrail_events_parquet')
+# 파티션 프로젝션 region 값 중 조회할 리전 (비우면 전체 리전)
+ATHENA_REGIONS = [r for r in os.environ.get('ATHENA_REGIONS', '').split(',') if r]
+
+# 마지막으로 처리한 eventTime 워터마크 저장 위치
+WATERMARK_BUCKET = os.environ.get('WATERMARK_BUCKET', '')
+WATERMARK_KEY = os.environ.get('WATERMARK_KEY', 'state/api-abuse-watermark.json')
+# 워터마크가 없을 때 조회할 구간 / 한 번에 조회할 최대 구간(분)
+LOOKBACK_MINUTES = int(os.environ.get('LOOKBACK_MINUTES', '30'))
+MAX_WINDOW_MINUTES = int(os.environ.get('MAX_WINDOW_MINUTES', str(24 * 60)))
+# CloudTrail 로그 전달 지연 - 이 시간보다 최근 구간은 다음 실행에서 조회
+DELIVERY_DELAY_MINUTES = int(os.environ.get('DELIVERY_DELAY_MINUTES', '15'))
+
+DETECT_EVENTS = ['ConsoleLogin', 'CreateAccessKey', 'CreateUser', 'DeleteAccessKey']
+# 야간 시간대 (KST NIGHT_START시 ~ NIGHT_END시)
+NIGHT_START = 22
+NIGHT_END = 7
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Discord 메시지 길이 제한 / 한 번 실행에 보낼 최대 메시지 수 (나머지는 결과 CSV 위치로 안내)
+DISCORD_LIMIT = 2000
+DISCORD_MAX_MESSAGES = int(os.environ.get('DISCORD_MAX_MESSAGES', '10'))
+# SNS 메시지 최대 256KB 중 본문 표에 사용할 크기
+SNS_BODY_LIMIT = 200 * 1024
+# 쿼리 대기 후 알림 전송에 남겨 둘 시간(초)
+NOTIFY_RESERVE_SECONDS = 15
+
+runner = AthenaRunner(athena, ATHENA_DB, WORKGROUP, OUTPUT)
+# Discord 발송기 (429 retry_after / 5xx 재시도, SNS는 표 전체를 한 번에 따로 발행)
+dispatcher = notifier.Notifier(DISCORD_WEBHOOK, topic_arn='')
+
+def load_state():
+    # 직전 실행이 끝까지 조회한(watermark) / Parquet로 적재한(compacted) 시각 (없으면 None)
+    state = {'watermark': None, 'compacted': None}
+    if not WATERMARK_BUCKET:
+        return state
+    try:
+        body = json.loads(s3.get_object(Bucket=WATERMARK_BUCKET, Key=WATERMARK_KEY)['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return state
+        raise
+    for key in state:
+        if body.get(key):
+            state[key] = datetime.strptime(body[key], TIME_FORMAT).replace(tzinfo=timezone.utc)
+    return state
+
+def save_state(state, stats):
+    if not WATERMARK_BUCKET:
+        return
+    body = {key: value.strftime(TIME_FORMAT) if value else None for key, value in state.items()}
+    body['last_run'] = stats
+    s3.put_object(
+        Bucket=WATERMARK_BUCKET,
+        Key=WATERMARK_KEY,
+        Body=json.dumps(body),
+        ContentType='application/json'
+    )
+
+def query_window(now, watermark):
+    """(시작, 끝] 조회 구간 - 워터마크 이후부터 전달 지연을 뺀 현재까지"""
+    end = now - timedelta(minutes=DELIVERY_DELAY_MINUTES)
+    start = watermark or end - timedelta(minutes=LOOKBACK_MINUTES)
+    # 오래 멈췄다 재개한 경우에도 한 번에 너무 넓은 구간을 스캔하지 않도록 제한
+    start = max(start, end - timedelta(minutes=MAX_WINDOW_MINUTES))
+    return start, end
+
+def partition_dates(start, end):
+    """구간이 걸치는 UTC 날짜 파티션 값 목록 (CloudTrail 경로 형식 yyyy/MM/dd)"""
+    dates = []
+    day = start.date()
+    while day <= end.date():
+        dates.append(day.strftime('%Y/%m/%d'))
+        day += timedelta(days=1)
+    return dates
+
+def partition_filter(start, end, column='dt'):
+    # 파티션 프로젝션이 경로를 계산할 수 있도록 파티션 컬럼을 상수 목록으로 한정
+    dates = ", ".join(f"'{d}'" for d in partition_dates(start, end))
+    clause = f"{column} IN ({dates})"
+    if ATHENA_REGIONS:
+        regions = ", ".join(f"'{r}'" for r in ATHENA_REGIONS)
+        clause += f" AND region IN ({regions})"
+    return clause
+
+def event_filter(name_column):
+    return "(" + " OR ".join(f"{name_column} LIKE '%{e}%'" for e in DETECT_EVENTS) + ")"
+
+def night_filter(time_expr):
+    # 야간 시간대 (KST 22시 ~ 07시)
+    return (f"(hour({time_expr} + interval '9' hour) >= {NIGHT_START}"
+            f" OR hour({time_expr} + interval '9' hour) < {NIGHT_END})")
+
+def build_json_query(start, end):
+    # eventTime은 ISO 8601 문자열이므로 행마다 변환하지 않고 문자열 비교로 구간을 거름
+    return f"""
     SELECT
       r.eventTime,
       r.eventName,
@@ -29,104 +127,195 @@ def lambda_handler(event, context):
     FROM {ATHENA_DB}.{ATHENA_TABLE}
     CROSS JOIN UNNEST(records) AS t(r)
     WHERE
-      (
-        r.eventName LIKE '%ConsoleLogin%'
-        OR r.eventName LIKE '%CreateAccessKey%'
-        OR r.eventName LIKE '%CreateUser%'
-        OR r.eventName LIKE '%DeleteAccessKey%'
-      )
-      AND from_iso8601_timestamp(r.eventTime) >= current_timestamp - interval '30' minute
-      AND (
-        hour(from_iso8601_timestamp(r.eventTime) + interval '9' hour) >= 22
-        OR hour(from_iso8601_timestamp(r.eventTime) + interval '9' hour) < 7
-      )
-    ORDER BY from_iso8601_timestamp(r.eventTime) ASC
+      {partition_filter(start, end)}
+      AND r.eventTime > '{start.strftime(TIME_FORMAT)}'
+      AND r.eventTime <= '{end.strftime(TIME_FORMAT)}'
+      AND {event_filter('r.eventName')}
+      AND {night_filter('from_iso8601_timestamp(r.eventTime)')}
+    ORDER BY r.eventTime ASC
+    """
+
+def build_compaction_query(start, end):
+    # 새 구간의 이벤트를 평탄화해 Parquet 테이블에 추가 (원본 JSON은 구간당 한 번만 스캔)
+    return f"""
+    INSERT INTO {ATHENA_DB}.{PARQUET_TABLE}
+    SELECT
+      r.eventTime AS event_time,
+      r.eventSource AS event_source,
+      r.eventName AS event_name,
+      r.userIdentity.userName AS username,
+      r.userIdentity.arn AS user_arn,
+      r.sourceIPAddress AS source_ip,
+      r.awsRegion AS aws_region,
+      substr(r.eventTime, 1, 10) AS dt
+    FROM {ATHENA_DB}.{ATHENA_TABLE}
+    CROSS JOIN UNNEST(records) AS t(r)
+    WHERE
+      {partition_filter(start, end)}
+      AND r.eventTime > '{start.strftime(TIME_FORMAT)}'
+      AND r.eventTime <= '{end.strftime(TIME_FORMAT)}'
     """
 
-    print("Athena 쿼리 실행 시작...")
+def build_parquet_query(start, end):
+    # Parquet 테이블의 dt 파티션은 yyyy-MM-dd 형식
+    dates = ", ".join(f"'{d.replace('/', '-')}'" for d in partition_dates(start, end))
+    return f"""
+    SELECT event_time, event_name, username, source_ip
+    FROM {ATHENA_DB}.{PARQUET_TABLE}
+    WHERE
+      dt IN ({dates})
+      AND event_time > '{start.strftime(TIME_FORMAT)}'
+      AND event_time <= '{end.strftime(TIME_FORMAT)}'
+      AND {event_filter('event_name')}
+      AND {night_filter('from_iso8601_timestamp(event_time)')}
+    ORDER BY event_time ASC
+    """
+
+def query_timeout(context):
+    # Lambda 남은 실행 시간에서 알림 전송 여유분을 뺀 만큼만 쿼리를 기다림
+    if context is None:
+        return None
+    return max(1, context.get_remaining_time_in_millis() / 1000 - NOTIFY_RESERVE_SECONDS)
+
+def run_query(query, context=None):
+    """쿼리를 실행해 완료까지 기다린 뒤 (실행 ID, 스캔 바이트, 엔진 실행 시간 ms, 결과 CSV 위치)를 반환"""
+    execution = runner.run(query, timeout=query_timeout(context))
+    return (execution['QueryExecutionId'],) + statistics(execution)
+
+def format_row(data):
+    # 시간 변환 (UTC → KST)
     try:
-        # Athena 쿼리 실행
-        response = athena.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={'Database': ATHENA_DB},
-            ResultConfiguration={'OutputLocation': OUTPUT},
-            WorkGroup=WORKGROUP
-        )
-        query_execution_id = response['QueryExecutionId']
-
-        # Athena 쿼리 완료 대기
-        while True:
-            result = athena.get_query_execution(QueryExecutionId=query_execution_id)
-            status = result['QueryExecution']['Status']['State']
-            if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                break
-            time.sleep(1)
-
-        if status != 'SUCCEEDED':
-            reason = result['QueryExecution']['Status'].get('StateChangeReason', 'No reason provided')
-            print(f"Athena query failed. Reason: {reason}")
-            return
-
-        print("Athena 쿼리 성공!")
-
-        # 쿼리 결과 가져오기
-        result_set = athena.get_query_results(QueryExecutionId=query_execution_id)
-        rows = result_set['ResultSet']['Rows'][1:]  # 첫 줄(헤더) 제외
-        if not rows:
-            print("30분 내 비정상 API 호출 없음.")
-            return
-
-        # 메시지 포맷팅
+        event_time_kst = datetime.strptime(data[0], TIME_FORMAT) + timedelta(hours=9)
+        time_str = event_time_kst.strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        time_str = data[0]
+    return "{:<22} {:<15} {:<20} {}\n".format(data[1], data[2], data[3], time_str)
+
+def chunk_messages(lines, title, header, limit=DISCORD_LIMIT):
+    """표 행을 받는 대로 Discord 코드블럭 메시지로 묶어, 한 메시지가 limit자를 넘지 않게 나눠 반환"""
+    prefix = f"{title}\n\n```text\n{header}"
+    next_prefix = f"{title} (계속)\n\n```text\n{header}"
+    suffix = "```"
+    room = limit - len(next_prefix) - len(suffix)
+    body = []
+    size = len(prefix) + len(suffix)
+    for line in lines:
+        if len(line) > room:
+            line = line[:room - 2] + "…\n"
+        if body and size + len(line) > limit:
+            yield prefix + "".join(body) + suffix
+            prefix = next_prefix
+            body = []
+            size = len(prefix) + len(suffix)
+        body.append(line)
+        size += len(line)
+    if body:
+        yield prefix + "".join(body) + suffix
+
+def send_discord(content, deadline=None):
+    """메시지 하나를 전송하고 전달 여부를 반환 (429는 retry_after만큼 기다려 재전송, deadline을 넘기면 포기)"""
+    return not dispatcher.send(content, deadline=deadline)['dropped']
+
+@metrics.handler('athena-cloudtrail-api-abuse')
+def lambda_handler(event, context):
+    # Athena 쿼리: 워터마크 이후 구간 + 야간 시간대 + CreateUser/DeleteAccessKey 탐지
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    state = load_state()
+    start, end = query_window(now, state['watermark'])
+    if start >= end:
+        print("새로 조회할 구간 없음.")
+        return
+
+    print(f"Athena 쿼리 실행 시작... ({start.strftime(TIME_FORMAT)} ~ {end.strftime(TIME_FORMAT)}, {QUERY_SOURCE})")
+    try:
+        polls = runner.polls
+        stats = {'window_start': start.strftime(TIME_FORMAT), 'window_end': end.strftime(TIME_FORMAT),
+                 'source': QUERY_SOURCE, 'bytes_scanned': 0, 'engine_ms': 0}
+
+        if QUERY_SOURCE == 'parquet':
+            # 이전 실행에서 이미 적재한 구간은 다시 넣지 않음 (알림 실패 후 재시도 시 중복 방지)
+            compact_start = max(start, state['compacted'] or start)
+            if compact_start < end:
+                _, scanned, engine_ms, _ = run_query(build_compaction_query(compact_start, end), context)
+                stats['compaction_bytes_scanned'] = scanned
+                stats['bytes_scanned'] += scanned
+                stats['engine_ms'] += engine_ms
+                state['compacted'] = end
+                save_state(state, stats)
+            query = build_parquet_query(start, end)
+        else:
+            query = build_json_query(start, end)
+
+        query_execution_id, scanned, engine_ms, result_location = run_query(query, context)
+        stats['bytes_scanned'] += scanned
+        stats['engine_ms'] += engine_ms
+        stats['polls'] = runner.polls - polls
+        print("Athena 쿼리 성공!", json.dumps(stats))
+
+        # 메시지 포맷팅 - 결과 페이지를 읽는 대로 표 행으로 변환
         bold_title = "**[ CloudTrail 비정상 API 탐지 ]**"
-        inner_header = "비정상 API 호출 {}건 감지 (최근 30분, 야간 시간대)\n".format(len(rows))
+        inner_header = "비정상 API 호출 감지 ({} 이후, 야간 시간대)\n".format(
+            (start + timedelta(hours=9)).strftime('%Y-%m-%d %H:%M'))
         table_header = "{:<22} {:<15} {:<20} {}\n".format("이벤트", "사용자", "IP", "시간")
         table_divider = "-" * 85 + "\n"
-        table_rows = ""
-
-        for row in rows:
-            data = [col.get('VarCharValue', '') for col in row['Data']]
-
-            # 시간 변환 (UTC → KST)
-            try:
-                event_time_kst = datetime.strptime(data[0], '%Y-%m-%dT%H:%M:%SZ') + timedelta(hours=9)
-                time_str = event_time_kst.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                time_str = data[0]
-
-            table_rows += "{:<22} {:<15} {:<20} {}\n".format(
-                data[1], data[2], data[3], time_str
-            )
-
-        # 최종 메시지 (Discord 코드블럭 형태)
-        discord_message = (
-            f"{bold_title}\n\n"  # 제목: 표 밖에 볼드 표시
-            "```text\n"
-            + inner_header  # 표 안에 감지 건수 출력
-            + table_header
-            + table_divider
-            + table_rows +
-            "```"
-        )
 
-        print("알람 메시지:\n", discord_message)
+        counts = {'rows': 0, 'chunks': 0, 'messages': 0, 'dropped': 0, 'sns_size': 0}
+        sns_rows = []
+        deadline = notifier.deadline_from(context)
+
+        def table_rows():
+            for data in runner.rows(query_execution_id):
+                line = format_row(data)
+                counts['rows'] += 1
+                # SNS 본문은 메시지 크기 제한 안쪽까지만 담음
+                if counts['sns_size'] + len(line) <= SNS_BODY_LIMIT:
+                    sns_rows.append(line)
+                    counts['sns_size'] += len(line)
+                yield line
+
+        # Discord Webhook 알림 전송 (2,000자 단위로 나눠 순서대로, 최대 DISCORD_MAX_MESSAGES개)
+        # 한 건이라도 전달하지 못하면 나머지는 보내지 않음 (워터마크를 그대로 두고 다음 실행에서 다시 보냄)
+        for message in chunk_messages(table_rows(), bold_title, inner_header + table_header + table_divider):
+            counts['chunks'] += 1
+            if counts['messages'] < DISCORD_MAX_MESSAGES and not counts['dropped']:
+                if send_discord(message, deadline):
+                    counts['messages'] += 1
+                else:
+                    counts['dropped'] += 1
+        stats['rows'] = counts['rows']
+
+        if not counts['rows']:
+            print("새 구간 내 비정상 API 호출 없음.")
+            state['watermark'] = end
+            save_state(state, stats)
+            return stats
+
+        summary = f"총 {counts['rows']}건 감지 - 전체 결과: {result_location}"
+        if counts['chunks'] > counts['messages'] and not counts['dropped']:
+            if not send_discord(f"{bold_title}\n{summary} (Discord에는 일부만 표시)", deadline):
+                counts['dropped'] += 1
+        if counts['dropped']:
+            stats['dropped'] = counts['dropped']
+            metrics.tag(outcome='failed')
+            print(f"Discord 알림 전송 실패 - 워터마크를 유지하고 다음 실행에서 같은 구간을 다시 알림 ({counts['messages']}개 전송)")
+            return stats
+        print(f"Discord 알림 전송 완료 ({counts['messages']}개 메시지)")
 
         # SNS 알림 전송
+        omitted = counts['rows'] - len(sns_rows)
         sns.publish(
             TopicArn=SNS_TOPIC_ARN,
-            Subject="[ALERT] 최근 30분 야간 비정상 API 호출 감지",
-            Message=bold_title + "\n\n" + inner_header + table_header + table_divider + table_rows
+            Subject="[ALERT] 야간 비정상 API 호출 감지",
+            Message="".join([bold_title, "\n\n", inner_header, table_header, table_divider] + sns_rows
+                            + ([f"... 외 {omitted}건\n"] if omitted else []) + [summary])
         )
         print("SNS 알림 전송 완료")
 
-        # Discord Webhook 알림 전송
-        http.request(
-            'POST',
-            DISCORD_WEBHOOK,
-            body=json.dumps({"content": discord_message}),
-            headers={'Content-Type': 'application/json'}
-        )
-        print("Discord 알림 전송 완료")
+        # 알림까지 끝난 뒤에만 워터마크 전진 (실패 시 다음 실행에서 같은 구간 재조회)
+        state['watermark'] = end
+        save_state(state, stats)
+        return stats
 
     except Exception as e:
+        metrics.tag(outcome='error')  # 예외를 삼키고 다음 실행에서 같은 구간을 재조회하므로 결과 태그만 지정
         print(f"Lambda 실행 중 오류 발생: {str(e)}")
-
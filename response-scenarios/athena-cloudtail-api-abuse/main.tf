@@ -89,56 +89,6 @@ resource "aws_cloudtrail" "audit" {
   depends_on = [aws_s3_bucket_policy.cloudtrail_logs_policy]
 }
 
-# ✅ Glue IAM Role
-resource "aws_iam_role" "glue" {
-  name               = var.glue_role_name
-  assume_role_policy = data.aws_iam_policy_document.glue_assume_role_policy.json
-}
-
-# Glue 서비스 AssumeRole 정책
-data "aws_iam_policy_document" "glue_assume_role_policy" {
-  statement {
-    actions = ["sts:AssumeRole"]
-    principals {
-      type        = "Service"
-      identifiers = ["glue.amazonaws.com"]
-    }
-  }
-}
-
-# Glue 서비스 기본 역할 정책 Attach
-resource "aws_iam_role_policy_attachment" "glue_attach" {
-  role       = aws_iam_role.glue.name
-  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSGlueServiceRole"
-}
-
-# Glue 서비스 역할에 S3 접근 정책 추가 (403 오류 방지)
-resource "aws_iam_policy" "glue_s3_access" {
-  name        = "GlueS3AccessPolicy"
-  description = "Allow Glue Crawler to access CloudTrail S3 bucket"
-  policy      = jsonencode({
-    Version = "2012-10-17"
-    Statement = [
-      {
-        Effect = "Allow"
-        Action = [
-          "s3:ListBucket",
-          "s3:GetObject"
-        ]
-        Resource = [
-          "arn:aws:s3:::${aws_s3_bucket.cloudtrail_logs.id}",
-          "arn:aws:s3:::${aws_s3_bucket.cloudtrail_logs.id}/*"
-        ]
-      }
-    ]
-  })
-}
-
-resource "aws_iam_role_policy_attachment" "glue_s3_access_attach" {
-  role       = aws_iam_role.glue.name
-  policy_arn = aws_iam_policy.glue_s3_access.arn
-}
-
 # ✅ Athena Database
 resource "aws_glue_catalog_database" "athena_db" {
   name = var.athena_db
@@ -154,6 +104,27 @@ resource "aws_glue_catalog_table" "cloudtrail_table" {
     "classification"  = "json"
     "compressionType"  = "none"
     "typeOfData"       = "file"
+
+    # 파티션 프로젝션: 크롤러 없이 쿼리의 region / dt 조건으로 S3 경로를 직접 계산
+    "projection.enabled"          = "true"
+    "projection.region.type"      = "enum"
+    "projection.region.values"    = join(",", var.cloudtrail_regions)
+    "projection.dt.type"          = "date"
+    "projection.dt.format"        = "yyyy/MM/dd"
+    "projection.dt.range"         = "${var.cloudtrail_projection_start},NOW"
+    "projection.dt.interval"      = "1"
+    "projection.dt.interval.unit" = "DAYS"
+    "storage.location.template"   = "s3://${var.s3_bucket_name}/AWSLogs/${var.account_id}/CloudTrail/$${region}/$${dt}"
+  }
+
+  partition_keys {
+    name = "region"
+    type = "string"
+  }
+
+  partition_keys {
+    name = "dt"
+    type = "string"
   }
 
   storage_descriptor {
@@ -176,6 +147,63 @@ resource "aws_glue_catalog_table" "cloudtrail_table" {
   }
 }
 
+# ✅ 탐지에 필요한 컬럼만 평탄화해 보관하는 Parquet 테이블 (QUERY_SOURCE = parquet 일 때 Lambda가 INSERT INTO로 적재)
+resource "aws_glue_catalog_table" "cloudtrail_events_parquet" {
+  name          = "${var.athena_table}_events_parquet"
+  database_name = aws_glue_catalog_database.athena_db.name
+  table_type    = "EXTERNAL_TABLE"
+
+  parameters = {
+    "classification"      = "parquet"
+    "parquet.compression" = "SNAPPY"
+  }
+
+  storage_descriptor {
+    location      = "s3://${aws_s3_bucket.athena_results.bucket}/compacted/cloudtrail_events/"
+    input_format  = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat"
+    output_format = "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat"
+
+    ser_de_info {
+      name                  = "parquet"
+      serialization_library = "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+    }
+
+    columns {
+      name = "event_time"
+      type = "string"
+    }
+    columns {
+      name = "event_source"
+      type = "string"
+    }
+    columns {
+      name = "event_name"
+      type = "string"
+    }
+    columns {
+      name = "username"
+      type = "string"
+    }
+    columns {
+      name = "user_arn"
+      type = "string"
+    }
+    columns {
+      name = "source_ip"
+      type = "string"
+    }
+    columns {
+      name = "aws_region"
+      type = "string"
+    }
+  }
+
+  partition_keys {
+    name = "dt"
+    type = "string"
+  }
+}
+
 # ✅ Athena 쿼리 결과 저장용 S3 버킷
 resource "aws_s3_bucket" "athena_results" {
   bucket        = "${var.s3_bucket_name}-athena-results"
@@ -200,26 +228,6 @@ resource "aws_athena_workgroup" "athena_monitoring" {
   }
 }
 
-# ✅ Glue Crawler
-resource "aws_glue_crawler" "cloudtrail" {
-  name          = "cloudtrail-crawler"
-  role          = aws_iam_role.glue.arn
-  database_name = aws_glue_catalog_database.athena_db.name
-
-  s3_target {
-    path = "s3://${var.s3_bucket_name}/AWSLogs/${var.account_id}/CloudTrail/"
-  }
-
-  schedule = "cron(0 * * * ? *)"
-
-  configuration = jsonencode({
-    Version = 1.0
-    CrawlerOutput = {
-      Partitions = { AddOrUpdateBehavior = "InheritFromTable" }
-    }
-  })
-}
-
 # ✅ SNS Topic
 resource "aws_sns_topic" "alarm_notifications" {
   name = "sns-athena-alarm"
@@ -289,16 +297,19 @@ resource "aws_lambda_function" "secmonitor" {
 
   environment {
     variables = {
-      SNS_TOPIC_ARN   = aws_sns_topic.alarm_notifications.arn
-      DISCORD_WEBHOOK = var.discord_webhook_url
-      ATHENA_DB       = var.athena_db
-      ATHENA_TABLE    = var.athena_table
-      WORKGROUP       = aws_athena_workgroup.athena_monitoring.name
-      ATHENA_OUTPUT   = "s3://${aws_s3_bucket.athena_results.bucket}/output/"
+      SNS_TOPIC_ARN    = aws_sns_topic.alarm_notifications.arn
+      DISCORD_WEBHOOK  = var.discord_webhook_url
+      ATHENA_DB        = var.athena_db
+      ATHENA_TABLE     = var.athena_table
+      WORKGROUP        = aws_athena_workgroup.athena_monitoring.name
+      ATHENA_OUTPUT    = "s3://${aws_s3_bucket.athena_results.bucket}/output/"
+      QUERY_SOURCE     = var.athena_query_source                              # json / parquet
+      PARQUET_TABLE    = aws_glue_catalog_table.cloudtrail_events_parquet.name
+      WATERMARK_BUCKET = aws_s3_bucket.athena_results.bucket                  # 마지막 조회 시각 저장
     }
   }
 
-  timeout = 60
+  timeout = 120
 }
 
 # ✅ EventBridge
@@ -306,6 +317,7 @@ resource "aws_cloudwatch_event_rule" "schedule" {
   name                = var.eventbridge_rule_name
   description         = "Periodic Athena Lambda trigger"
   schedule_expression = "rate(1 hour)"
+  is_enabled          = !var.streaming_enabled  # 실시간 탐지를 켜면 Athena 정기 조회는 중지 (중복 알림 방지)
 }
 
 resource "aws_cloudwatch_event_target" "lambda" {
@@ -322,3 +334,47 @@ resource "aws_lambda_permission" "allow_eventbridge" {
   source_arn    = aws_cloudwatch_event_rule.schedule.arn
 }
 
+# ✅ 실시간 탐지: CloudTrail 로그 파일이 S3에 저장될 때마다 Lambda가 직접 파싱 (Athena 미사용)
+resource "aws_lambda_function" "secmonitor_stream" {
+  count         = var.streaming_enabled ? 1 : 0
+  function_name = "${var.lambda_function_name}-stream"
+  handler       = "stream_detector.lambda_handler"
+  runtime       = "python3.13"
+  role          = aws_iam_role.lambda.arn
+
+  filename         = "lambda_function.zip"
+  source_code_hash = filebase64sha256("lambda_function.zip")
+
+  environment {
+    variables = {
+      SNS_TOPIC_ARN   = aws_sns_topic.alarm_notifications.arn
+      DISCORD_WEBHOOK = var.discord_webhook_url
+    }
+  }
+
+  memory_size = 256
+  timeout     = 60
+}
+
+resource "aws_lambda_permission" "allow_s3" {
+  count         = var.streaming_enabled ? 1 : 0
+  statement_id  = "AllowExecutionFromS3"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.secmonitor_stream[0].function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = aws_s3_bucket.cloudtrail_logs.arn
+}
+
+resource "aws_s3_bucket_notification" "cloudtrail_logs_stream" {
+  count  = var.streaming_enabled ? 1 : 0
+  bucket = aws_s3_bucket.cloudtrail_logs.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.secmonitor_stream[0].arn
+    events              = ["s3:ObjectCreated:*"]
+    filter_prefix       = "AWSLogs/${var.account_id}/CloudTrail/"  # CloudTrail-Digest 제외
+    filter_suffix       = ".json.gz"
+  }
+
+  depends_on = [aws_lambda_permission.allow_s3]
+}
@@ -0,0 +1,144 @@
+import codecs
+import json
+import re
+import zlib
+from urllib.parse import unquote_plus
+
+import aws_clients
+import metrics
+import notifier
+import lambda_function as detector
+
+s3 = aws_clients.lazy('s3')
+
+READ_SIZE = 64 * 1024
+
+# Athena 쿼리와 같은 조건을 컨테이너당 한 번만 컴파일
+# eventName LIKE '%ConsoleLogin%' OR ... → 정규식 하나 / KST 야간 시각 → UTC 시(hour) 문자열 집합
+EVENT_PATTERN = re.compile("|".join(re.escape(name) for name in detector.DETECT_EVENTS))
+NIGHT_HOURS_UTC = frozenset(
+    f"{(hour - 9) % 24:02d}" for hour in range(24)
+    if hour >= detector.NIGHT_START or hour < detector.NIGHT_END
+)
+
+
+def decompressed_chunks(body, size=READ_SIZE):
+    """gzip 스트림을 최대 size 단위로 풀어 문자열 조각으로 반환 (파일 전체를 메모리에 올리지 않음)"""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        data = body.read(size)
+        if not data:
+            break
+        while data:
+            # 압축률이 높아도 한 번에 size 바이트까지만 풀고 나머지는 unconsumed_tail로 이어서 처리
+            yield decoder.decode(inflater.decompress(data, size))
+            data = inflater.unconsumed_tail
+            if not data and inflater.eof and inflater.unused_data:
+                # 여러 gzip 멤버가 이어진 파일 처리
+                data = inflater.unused_data
+                inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    yield decoder.decode(inflater.flush(), final=True)
+
+
+def iter_records(chunks):
+    """{"Records": [...]} 문서의 각 레코드를 조각이 도착하는 대로 하나씩 파싱해 반환"""
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:] + chunk
+        pos = 0
+        if not started:
+            key = buf.find('"Records"')
+            start = buf.find('[', key) if key >= 0 else -1
+            if start < 0:
+                continue
+            pos = start + 1
+            started = True
+        length = len(buf)
+        while True:
+            while pos < length and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= length:
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break                  # 레코드가 다음 조각까지 이어짐
+            yield record
+            pos = end
+
+
+def matches(record):
+    # 야간 시각 비교는 eventTime 문자열의 시(hour) 부분만 사용 (datetime 변환 없음)
+    name = record.get('eventName') or ''
+    return bool(EVENT_PATTERN.search(name)) and (record.get('eventTime') or '')[11:13] in NIGHT_HOURS_UTC
+
+
+def scan(body):
+    """CloudTrail 로그 파일 하나에서 탐지 조건에 맞는 레코드를 반환"""
+    return [record for record in iter_records(decompressed_chunks(body)) if matches(record)]
+
+
+def to_row(record):
+    return [
+        record.get('eventTime', ''),
+        record.get('eventName', ''),
+        (record.get('userIdentity') or {}).get('userName', ''),
+        record.get('sourceIPAddress', '')
+    ]
+
+
+@metrics.handler('cloudtrail-stream-detector')
+def lambda_handler(event, context):
+    # CloudTrail 로그 파일이 S3에 저장될 때마다 호출되어 바로 탐지 (Athena 조회 없음)
+    hits = []
+    for s3_record in event.get('Records', []):
+        bucket = s3_record['s3']['bucket']['name']
+        key = unquote_plus(s3_record['s3']['object']['key'])
+        if '/CloudTrail/' not in key or not key.endswith('.json.gz'):
+            continue
+        body = s3.get_object(Bucket=bucket, Key=key)['Body']
+        with metrics.timer('stream.scan'):
+            found = scan(body)
+        print(f"{key}: {len(found)}건 탐지")
+        hits.extend(found)
+
+    metrics.count('stream.alerts', len(hits))
+    if not hits:
+        return {'alerts': 0}
+
+    hits.sort(key=lambda record: record.get('eventTime', ''))
+    bold_title = "**[ CloudTrail 비정상 API 탐지 (실시간) ]**"
+    inner_header = f"비정상 API 호출 {len(hits)}건 감지 (야간 시간대)\n"
+    table_header = "{:<22} {:<15} {:<20} {}\n".format("이벤트", "사용자", "IP", "시간")
+    table_divider = "-" * 85 + "\n"
+    lines = [detector.format_row(to_row(record)) for record in hits]
+
+    # 429는 retry_after만큼 기다려 재전송 (남은 실행 시간 안에서만), 전달하지 못하면 나머지 메시지는 생략
+    deadline = notifier.deadline_from(context)
+    sent = dropped = 0
+    for i, message in enumerate(detector.chunk_messages(iter(lines), bold_title, inner_header + table_header + table_divider)):
+        if i >= detector.DISCORD_MAX_MESSAGES:
+            break
+        if not detector.send_discord(message, deadline):
+            dropped += 1
+            break
+        sent += 1
+
+    detector.sns.publish(
+        TopicArn=detector.SNS_TOPIC_ARN,
+        Subject="[ALERT] 야간 비정상 API 호출 감지",
+        Message=bold_title + "\n\n" + inner_header + table_header + table_divider + "".join(lines)[:detector.SNS_BODY_LIMIT]
+    )
+    if dropped:
+        # SNS 메일에는 표 전체가 있으므로 재시도(같은 로그 파일 재처리 → 메일 중복)하지 않고 실패로만 기록
+        metrics.tag(outcome='failed')
+        print(f"Discord 알림 전송 실패 ({sent}개 전송 후 중단), SNS 발행 완료 ({len(hits)}건)")
+        return {'alerts': len(hits), 'dropped': dropped}
+    print(f"알림 전송 완료 ({len(hits)}건)")
+    return {'alerts': len(hits)}
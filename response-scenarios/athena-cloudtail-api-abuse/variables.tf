@@ -16,7 +16,25 @@ variable "sns_topic_name" { default = "sns-athena-alarm" }
 variable "eventbridge_rule_name" { default = "eventbridge-athena-schedule" }
 variable "athena_db" { default = "athena_cloudtrail_db" }
 variable "athena_table" { default = "cloudtrail_table" }
-variable "glue_role_name" { default = "AWSGlueServiceRole-ct" }
+
+# 파티션 프로젝션 범위 (CloudTrail 로그가 쌓이기 시작한 날짜, yyyy/MM/dd)
+variable "cloudtrail_projection_start" { default = "2025/01/01" }
+
+variable "cloudtrail_regions" {
+  description = "파티션 프로젝션에 사용할 CloudTrail 리전 목록 (멀티 리전 트레일이 로그를 남기는 리전)"
+  type        = list(string)
+  default = [
+    "us-east-1", "us-east-2", "us-west-1", "us-west-2", "ca-central-1", "sa-east-1",
+    "eu-west-1", "eu-west-2", "eu-west-3", "eu-central-1", "eu-north-1",
+    "ap-northeast-1", "ap-northeast-2", "ap-northeast-3", "ap-southeast-1", "ap-southeast-2", "ap-south-1"
+  ]
+}
+
+variable "athena_query_source" {
+  description = "탐지 쿼리 원본 (json: 원본 CloudTrail 테이블, parquet: 새 구간을 Parquet 테이블로 적재한 뒤 조회)"
+  type        = string
+  default     = "json"
+}
 
 variable "discord_webhook_url" {
   description = "Discord Webhook URL"
@@ -28,3 +46,8 @@ variable "sns_email" {
   type        = string
 }
 
+variable "streaming_enabled" {
+  description = "CloudTrail 로그 파일 저장 즉시 Lambda로 탐지 (true면 Athena 정기 조회 스케줄은 비활성화)"
+  type        = bool
+  default     = false
+}
@@ -1,21 +1,89 @@
 import json
-import urllib3
 import os
-import boto3
 from datetime import datetime, timedelta
 
-http = urllib3.PoolManager()
-HOOK_URL = os.environ['DISCORD_WEBHOOK_URL']
-INSTANCE_ID = os.environ['EC2_ID']  # 환경 변수에서 EC2 ID를 가져옴
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import ebs_snapshot  # 다중 볼륨 스냅샷 공용 모듈 (shared/ebs_snapshot.py, 패키징 시 함께 포함)
+import ec2_isolation  # 다중 인스턴스 격리 공용 모듈 (shared/ec2_isolation.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import notifier  # Discord 전송 공용 모듈 (shared/notifier.py, 패키징 시 함께 포함)
+
+dispatcher = notifier.Notifier(os.environ['DISCORD_WEBHOOK_URL'], topic_arn='')
+INSTANCE_ID = os.environ.get('EC2_ID', '')  # 알람에 InstanceId 차원이 없고 선택자도 없을 때의 기본 대상
+ISOLATION_TAG_SELECTOR = os.environ.get('ISOLATION_TAG_SELECTOR', '')  # 예: 'aws:autoscaling:groupName=web-asg'
 ISOLATED_SG_ID = os.environ['ISOLATED_SG_ID']  # 격리용 보안 그룹 ID
 
-ec2 = boto3.client('ec2')
+ec2 = aws_clients.lazy('ec2')
+
+def alarm_instance_ids(message):
+    """알람 차원(Trigger.Dimensions)의 InstanceId 목록 - 로그 메트릭 필터 알람처럼 차원이 없으면 빈 목록"""
+    dimensions = message.get("Trigger", {}).get("Dimensions", [])
+    return [d['value'] for d in dimensions if d.get('name') == 'InstanceId' and d.get('value')]
 
+@metrics.handler('ec2-bash-history-tampering')
 def lambda_handler(event, context):
     try:
+        # 1) 알람별 격리 대상 결정 (알람 차원 → 태그 선택자 → EC2_ID)
+        alarms = []
         for record in event['Records']:
             message = json.loads(record['Sns']['Message'])
+            ids = alarm_instance_ids(message)
+            alarms.append((message, ids or ([] if ISOLATION_TAG_SELECTOR else [INSTANCE_ID])))
+        use_selector = bool(ISOLATION_TAG_SELECTOR) and any(not alarm_instance_ids(m) for m, _ in alarms)
+
+        # 2) 대상 인스턴스를 한 번에 조회 (ID는 페이지 조회로 묶고, 선택자는 태그 필터로)
+        isolator = ec2_isolation.Isolator(ec2, ISOLATED_SG_ID)
+        target_ids = list(dict.fromkeys(i for _, ids in alarms for i in ids))
+        instances, describe_error = {}, ""
+        try:
+            for instance in isolator.describe(target_ids) if target_ids else []:
+                instances.setdefault(instance['InstanceId'], instance)
+        except Exception as e:
+            describe_error = f"인스턴스 조회 실패: {str(e)}"
+        if use_selector:
+            # '=' 없는 선택자는 ValueError - 계정 전체를 조회하지 않고 알림에 오류만 남김
+            try:
+                for instance in isolator.describe(selector=ISOLATION_TAG_SELECTOR):
+                    instances.setdefault(instance['InstanceId'], instance)
+            except Exception as e:
+                describe_error = f"태그 선택자 조회 실패: {str(e)}"
+        selected = [i for i in instances if i not in target_ids] if use_selector else []
+
+        # 3) 격리 전에 인스턴스마다 EBS 스냅샷 생성 (증거 보존)
+        snapshot_results = {}
+        for instance_id, instance in instances.items():
+            try:
+                # 모든 볼륨을 한 번의 요청으로 같은 시점에 스냅샷 (crash-consistent)
+                snapshots = ebs_snapshot.create_instance_snapshots(
+                    ec2, instance, description=f"Auto Snapshot from alarm on {instance_id}"
+                )
+                snapshot_results[instance_id] = [
+                    f"-EBS Snapshot 생성됨: {snap['volume_id']} → {snap['snapshot_id']}" for snap in snapshots
+                ]
+            except Exception as e:
+                snapshot_results[instance_id] = [f"스냅샷 생성 실패: {str(e)}"]
+
+        # 4) 모든 대상을 한 번에 격리 보안 그룹으로 변경 (ENI 동시 전환 + quarantined 태그 일괄 지정)
+        sg_results = {}
+        if instances:
+            try:
+                result = isolator.isolate(instances=list(instances.values()))
+                for inst in result['instances']:
+                    if inst['status'] == 'failed':
+                        sg_results[inst['instance_id']] = f"보안 그룹 변경 실패: {inst.get('error', '')}"
+                    else:
+                        sg_results[inst['instance_id']] = (
+                            f" EC2 인스턴스 {inst['instance_id']}의 보안 그룹이 격리 그룹({ISOLATED_SG_ID})으로 변경됨"
+                            f"{' (일부 ENI 실패)' if inst['status'] == 'partial' else ''} - {inst['seconds']}s"
+                        )
+                metrics.since_trace('TimeToContain')
+                metrics.count('isolate.instances', result['isolated'] + result['partial'])
+                print(f"[격리] isolated={result['isolated']} partial={result['partial']} "
+                      f"failed={result['failed']} seconds={result['seconds']} api={result['api_calls']}")
+            except Exception as e:
+                sg_results = {i: f"보안 그룹 변경 실패: {str(e)}" for i in instances}
 
+        for message, ids in alarms:
             alarm_name = message.get("AlarmName", "Unknown Alarm")
             new_state = message.get("NewStateValue", "Unknown")
             reason = message.get("NewStateReason", "No reason provided")
@@ -28,56 +96,33 @@ def lambda_handler(event, context):
             except:
                 time_str = 'Unknown'
 
-            snapshot_results = []
-            sg_result = ""
-
-            # EBS 스냅샷 생성
-            try:
-                volumes = ec2.describe_instances(InstanceIds=[INSTANCE_ID])['Reservations'][0]['Instances'][0]['BlockDeviceMappings']
-                for v in volumes:
-                    vol_id = v['Ebs']['VolumeId']
-                    snap = ec2.create_snapshot(
-                        VolumeId=vol_id,
-                        Description=f"Auto Snapshot from alarm {alarm_name} on {INSTANCE_ID}"
-                    )
-                    snapshot_results.append(f"-EBS Snapshot 생성됨: {vol_id} → {snap['SnapshotId']}")
-            except Exception as e:
-                snapshot_results.append(f"스냅샷 생성 실패: {str(e)}")
-
-            # EC2 인스턴스를 격리 보안 그룹으로 변경
-            try:
-                ec2.modify_instance_attribute(
-                    InstanceId=INSTANCE_ID,
-                    Groups=[ISOLATED_SG_ID]
-                )
-                sg_result = f" EC2 인스턴스 {INSTANCE_ID}의 보안 그룹이 격리 그룹({ISOLATED_SG_ID})으로 변경됨"
-            except Exception as e:
-                sg_result = f"보안 그룹 변경 실패: {str(e)}"
+            targets = ids or selected
+            lines = [describe_error] if describe_error else []
+            for instance_id in targets:
+                if instance_id not in instances:
+                    lines.append(f"인스턴스 {instance_id}를 찾을 수 없음")
+                    continue
+                lines += snapshot_results.get(instance_id, [])
+                lines.append(sg_results.get(instance_id, ""))
 
             # Discord 메시지 구성
-            discord_msg = {
-                "content": f"**[ bash_history 조작 탐지 알람 발생 ]**\n"
-                           f"- 알람 이름: {alarm_name}\n"
-                           f"- 상태: {new_state}\n"
-                           f"- 이유: {reason}\n"
-                           f"- 시간: {time_str}\n"
-                           f"- EC2 인스턴스 ID: {INSTANCE_ID}\n\n"
-                           f"{chr(10).join(snapshot_results)}\n"
-                           f"{sg_result}"
-            }
-
-            encoded_msg = json.dumps(discord_msg).encode("utf-8")
-            response = http.request(
-                "POST",
-                HOOK_URL,
-                body=encoded_msg,
-                headers={"Content-Type": "application/json"}
+            dispatcher.add(
+                f"**[ bash_history 조작 탐지 알람 발생 ]**\n"
+                f"- 알람 이름: {alarm_name}\n"
+                f"- 상태: {new_state}\n"
+                f"- 이유: {reason}\n"
+                f"- 시간: {time_str}\n"
+                f"- EC2 인스턴스 ID: {', '.join(targets) or '없음'}\n\n"
+                f"{chr(10).join(lines)}"
             )
 
-            print(f"[Discord 응답] 상태 코드: {response.status}")
+        # 알람이 여러 건이면 embed로 묶어 한 번에 전송 (429 응답 시 retry_after만큼 대기 후 재전송)
+        result = dispatcher.flush(deadline=notifier.deadline_from(context))
+        print(f"[Discord 전송] {result}")
 
         return {"statusCode": 200, "body": "Success"}
 
     except Exception as e:
+        metrics.tag(outcome='error')  # 예외를 500 응답으로 바꿔 반환하므로 결과 태그를 직접 지정
         print(f"[에러] {str(e)}")
         return {"statusCode": 500, "body": f"Error: {str(e)}"}
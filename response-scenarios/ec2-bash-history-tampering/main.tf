@@ -271,7 +271,10 @@ resource "aws_iam_role_policy" "lambda_ec2_sg" {
       Action = [
         "ec2:DescribeInstances",        # EC2 인스턴스 조회 권한
         "ec2:ModifyInstanceAttribute",  # 인스턴스 속성 수정 권한 (보안 그룹 변경 등)
-        "ec2:CreateSnapshot"            # EBS 스냅샷 생성 권한
+        "ec2:ModifyNetworkInterfaceAttribute",  # ENI 보안 그룹 변경 권한 (다중 인스턴스 격리)
+        "ec2:CreateTags",               # 격리 인스턴스 quarantined 태그 지정 권한
+        "ec2:CreateSnapshot",           # EBS 스냅샷 생성 권한
+        "ec2:CreateSnapshots"           # 다중 볼륨 스냅샷 생성 권한
       ]
       Resource = "*"
     }]
@@ -288,12 +291,14 @@ resource "aws_lambda_function" "bash_history_responder" {
   role          = aws_iam_role.lambda_exec.arn
   handler       = "lambda_function.lambda_handler"  # 진입점 핸들러
   runtime       = "python3.8"
+  timeout       = 300  # 다수 인스턴스 스냅샷 + 격리 시 EC2 변경 API 한도(초당 5개)에 맞춰 진행
 
   environment {   # Lambda 실행 시점 환경 변수
     variables = {
       DISCORD_WEBHOOK_URL = var.discord_webhook_url  # 디스코드 웹훅 URL
-      EC2_ID              = aws_instance.monitored_ec2.id
+      EC2_ID              = aws_instance.monitored_ec2.id  # 알람에 InstanceId 차원이 없을 때의 기본 대상
       ISOLATED_SG_ID      = aws_security_group.isolated_sg.id
+      ISOLATION_TAG_SELECTOR = var.isolation_tag_selector  # 비어 있지 않으면 EC2_ID 대신 태그로 대상 선택
     }
   }
 }
@@ -26,4 +26,12 @@ variable "discord_webhook_url" {
 variable "sns_email" {
   description = "Email address for SNS subscription"
   type        = string
+}
+
+# 알람 발생 시 함께 격리할 인스턴스 태그 선택자 ('Key=Value,Key2=v1|v2')
+# 비어 있으면 알람 차원의 InstanceId 또는 모니터링 대상 EC2 한 대만 격리
+variable "isolation_tag_selector" {
+  description = "Tag selector of instances to isolate together (e.g. aws:autoscaling:groupName=web-asg)"
+  type        = string
+  default     = ""
 }
\ No newline at end of file
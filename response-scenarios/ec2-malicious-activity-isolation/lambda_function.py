@@ -1,47 +1,82 @@
 import json
 import os
-import boto3
-import urllib3
 
-ec2 = boto3.client('ec2')
-http = urllib3.PoolManager()
+import alert_dedup  # finding 중복 제거 / 폭주 억제 공용 모듈 (shared/alert_dedup.py, 패키징 시 함께 포함)
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ec2_isolation  # 다중 인스턴스 격리 공용 모듈 (shared/ec2_isolation.py, 패키징 시 함께 포함)
+import notifier  # Discord 전송 공용 모듈 (shared/notifier.py, 패키징 시 함께 포함)
 
+ec2 = aws_clients.lazy('ec2')  # 중복 / 폭주로 모두 걸러진 실행에서는 만들지 않음
+
+@metrics.handler('ec2-malicious-activity-isolation')
 def lambda_handler(event, context):
-    webhook_url = os.environ['DISCORD_WEBHOOK_URL']
-    quarantine_sg_id = os.environ['QUARANTINE_SG_ID']
+    dispatcher = notifier.get_notifier()
+    dedup = alert_dedup.get_deduplicator()
+    # main.tf는 ISOLATED_SG_ID로 전달 (이전 이름 QUARANTINE_SG_ID도 허용)
+    quarantine_sg_id = os.environ.get('QUARANTINE_SG_ID') or os.environ['ISOLATED_SG_ID']
 
+    findings = []
+    targets = []
     for record in event['Records']:
         try:
             message = json.loads(record['Sns']['Message'])
             detail = message.get("detail", {})
+            detail.setdefault("region", message.get("region", "Unknown"))
             instance_id = detail.get("resource", {}).get("instanceDetails", {}).get("instanceId")
-            finding_type = detail.get("type", "Unknown")
-            severity = detail.get("severity", "N/A")
-            region = message.get("region", "Unknown")
-
-            # Discord 메시지 내용 생성
-            content = f"🚨 **GuardDuty Alert**\n" \
-                      f"- Type: `{finding_type}`\n" \
-                      f"- Severity: `{severity}`\n" \
-                      f"- Region: `{region}`\n" \
-                      f"- Instance ID: `{instance_id}`"
-
-            # EC2 인스턴스 격리
-            if instance_id:
-                ec2.create_tags(Resources=[instance_id], Tags=[{'Key': 'quarantined', 'Value': 'true'}])
-                ec2.modify_instance_attribute(InstanceId=instance_id, Groups=[quarantine_sg_id])
-                content += "\n🛡️ EC2 instance has been isolated using the quarantine security group."
+
+            # 격리 대상 수집 (알림 중복 제거와 무관하게 record의 모든 인스턴스)
+            if instance_id and instance_id not in targets:
+                targets.append(instance_id)
+            findings.append(detail)
 
         except Exception as e:
-            content = f"❌ Error processing GuardDuty event: {e}"
+            dispatcher.add(f"❌ Error processing GuardDuty event: {e}")
 
-        # Discord Webhook 전송
+    # 모은 인스턴스를 한 번에 격리 (ENI 동시 전환 + quarantined 태그 일괄 지정)
+    isolated = set()
+    if targets:
         try:
-            http.request(
-                "POST",
-                webhook_url,
-                body=json.dumps({"content": content}).encode("utf-8"),
-                headers={"Content-Type": "application/json"}
-            )
+            result = ec2_isolation.Isolator(ec2, quarantine_sg_id).isolate(instance_ids=targets)
+            isolated = {i['instance_id'] for i in result['instances'] if i['status'] != 'failed'}
+            for inst in result['instances']:
+                if inst['status'] != 'isolated':
+                    dispatcher.add(f"❌ Failed to isolate `{inst['instance_id']}` ({inst['status']}): "
+                                   f"{inst.get('error', '')}")
+            # 호출 시작 → 격리 완료 (time-to-contain)
+            metrics.since_trace('TimeToContain')
+            metrics.count('isolate.instances', len(isolated))
+            if len(isolated) < len(targets):
+                metrics.tag(outcome='partial')
+            print(f"isolated={len(isolated)}/{len(targets)} not_found={result['not_found']} "
+                  f"seconds={result['seconds']}")
         except Exception as e:
-            print(f"❌ Failed to send message to Discord: {e}")
+            metrics.tag(outcome='failed')
+            dispatcher.add(f"❌ Error isolating instances {targets}: {e}")
+
+    # 같은 (유형, 리소스, 원격 IP) finding은 한 번만 알리고, 폭주 시에는 요약 안내로 대체
+    alerts, notices = dedup.filter(findings)
+    for alert in alerts:
+        detail = alert.detail
+        instance_id = detail.get("resource", {}).get("instanceDetails", {}).get("instanceId")
+
+        # Discord 메시지 내용 생성
+        content = f"🚨 **GuardDuty Alert**\n" \
+                  f"- Type: `{detail.get('type', 'Unknown')}`\n" \
+                  f"- Severity: `{detail.get('severity', 'N/A')}`\n" \
+                  f"- Region: `{detail['region']}`\n" \
+                  f"- Instance ID: `{instance_id}`"
+        if instance_id in isolated:
+            content += "\n🛡️ EC2 instance has been isolated using the quarantine security group."
+        if alert.summary():
+            content += f"\n🔁 {alert.summary()}"
+
+        # Discord 알림은 모아 두었다가 한 번에 전송 (embed 최대 10개씩 묶음)
+        dispatcher.add(content)
+    for notice in notices:
+        dispatcher.add(alert_dedup.storm_message(notice))
+
+    result = dispatcher.flush(deadline=notifier.deadline_from(context))
+    if result["dropped"]:
+        print(f"❌ Failed to send {result['dropped']} message(s) to Discord")
+    print(f"findings={len(findings)} alerts={len(alerts)} storm_notices={len(notices)}")
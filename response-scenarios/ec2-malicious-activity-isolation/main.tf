@@ -250,6 +250,15 @@ resource "aws_iam_role_policy" "lambda_ec2_sg" {
         ],
         "Resource": "*"
       },
+      {
+        "Sid": "AlertDedupTableAccess",
+        "Effect": "Allow",
+        "Action": [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ],
+        "Resource": aws_dynamodb_table.alert_dedup.arn
+      },
       {
         "Sid": "SNSPublishAccessIfUsed",
         "Effect": "Allow",
@@ -262,19 +271,38 @@ resource "aws_iam_role_policy" "lambda_ec2_sg" {
   })
 }
 
+# 알림 중복 제거 상태 테이블 (fingerprint별 마지막 알림 시각 / 생략 건수, expires_at 지나면 자동 삭제)
+resource "aws_dynamodb_table" "alert_dedup" {
+  name         = "guardduty-alert-dedup"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "fingerprint"
+
+  attribute {
+    name = "fingerprint"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
+
 # Lambda 함수 정의 (디스코드에 알림 전송, EC2 조작)
 resource "aws_lambda_function" "guardduty_function" {
-  filename      = "lambda_function.zip"
+  filename      = "lambda_function.zip" # lambda_function.py + ../../shared/aws_clients.py + ../../shared/metrics.py + ../../shared/notifier.py + ../../shared/alert_dedup.py + ../../shared/ec2_isolation.py + ../../shared/rate_limit.py
   function_name = "sns-guardduty-alarm"
   role          = aws_iam_role.lambda_exec.arn
   handler       = "lambda_function.lambda_handler"
   runtime       = "python3.8"
+  timeout       = 300  # 다수 인스턴스 격리 시 EC2 변경 API 한도(초당 5개)에 맞춰 진행
 
   environment {
     variables = {
       DISCORD_WEBHOOK_URL = var.discord_webhook_url
       # EC2_ID              = aws_instance.monitored_ec2.id
       ISOLATED_SG_ID      = aws_security_group.isolated_sg.id
+      DEDUP_TABLE         = aws_dynamodb_table.alert_dedup.name  # 동시 실행 간 중복 제거 상태 공유
     }
   }
 }
\ No newline at end of file
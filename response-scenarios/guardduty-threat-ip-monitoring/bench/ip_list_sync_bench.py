@@ -0,0 +1,149 @@
+"""FireHOL 목록 동기화 벤치마크 (로컬 stub, 실제 다운로드/S3 호출 없음)
+
+기존 방식(매번 전체 다운로드 → 디코딩 → 재업로드)과 증분 동기화(update_ip_list)의
+실행 시간과 최대 메모리(tracemalloc peak)를 시나리오별로 비교한다.
+시간은 tracemalloc을 켠 상태로 측정되므로 실제보다 크게 나온다 (상대 비교용).
+
+    python bench/ip_list_sync_bench.py [--entries 50000]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from botocore.exceptions import ClientError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'lambda', 'update_ip_list'))
+sys.path.insert(0, os.path.join(HERE, '..', '..', '..', 'shared'))
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+
+import lambda_function as sync  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status, body=b'', headers=None):
+        self.status = status
+        self.data = body
+        self.headers = headers or {}
+
+    def stream(self, size):
+        for i in range(0, len(self.data), size):
+            yield self.data[i:i + size]
+
+    def release_conn(self):
+        pass
+
+
+class FakeFireHOL:
+    """ETag 기반 조건부 GET을 지원하는 원격 목록 stub"""
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self.bytes_sent = 0
+
+    def request(self, method, url, headers=None, preload_content=True):
+        if (headers or {}).get('If-None-Match') == self.etag:
+            return FakeResponse(304)
+        self.bytes_sent += len(self.body)
+        return FakeResponse(200, self.body, {'ETag': self.etag, 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+
+
+class FakeBody(io.BytesIO):
+    def iter_lines(self):
+        for line in self.read().split(b'\n'):
+            yield line
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.bytes_uploaded = 0
+
+    def _missing(self):
+        return ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        return {'Metadata': dict(self.objects[Key][1])}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self._missing()
+        return {'Body': FakeBody(self.objects[Key][0])}
+
+    def put_object(self, Bucket, Key, Body, Metadata=None, **kwargs):
+        body = Body.encode() if isinstance(Body, str) else Body
+        self.bytes_uploaded += len(body)
+        self.objects[Key] = (body, Metadata or {})
+
+    def copy_object(self, Bucket, Key, CopySource, Metadata, **kwargs):
+        self.objects[Key] = (self.objects[CopySource['Key']][0], Metadata)
+
+
+def synthetic_netset(entries, seed):
+    rng = random.Random(seed)
+    lines = [b"#", b"# firehol_level1 (synthetic)", b"#"]
+    for _ in range(entries):
+        ip = rng.randrange(1 << 24, 0xDFFFFFFF)
+        prefix = rng.choice((32, 32, 32, 24, 22, 16))
+        ip &= ~((1 << (32 - prefix)) - 1)
+        text = f"{ip >> 24}.{(ip >> 16) & 255}.{(ip >> 8) & 255}.{ip & 255}".encode()
+        lines.append(text if prefix == 32 else text + b"/" + str(prefix).encode())
+    return b"\n".join(lines) + b"\n"
+
+
+def legacy_handler(http, s3):
+    # 변경 전 update_ip_list 동작
+    response = http.request('GET', sync.FIREHOL_URL)
+    ip_list = response.data.decode('utf-8')
+    lines = [line for line in ip_list.split('\n') if line and not line.startswith('#')]
+    result = '\n'.join(lines)
+    s3.put_object(Bucket=sync.S3_BUCKET, Key=sync.S3_KEY, Body=result, ContentType='text/plain')
+
+
+def measure(label, fn, remote, s3):
+    sent, uploaded = remote.bytes_sent, s3.bytes_uploaded
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<34} {elapsed * 1000:9.1f} ms  peak={peak / 1024:9.1f} KiB  "
+          f"downloaded={(remote.bytes_sent - sent) / 1024:8.1f} KiB  uploaded={(s3.bytes_uploaded - uploaded) / 1024:8.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    body = synthetic_netset(args.entries, args.seed)
+    print(f"netset: {args.entries} entries, {len(body) / 1024:.1f} KiB")
+
+    remote, s3 = FakeFireHOL(body, '"v1"'), FakeS3()
+    print("[current behaviour]")
+    measure("full run (no change upstream)", lambda: legacy_handler(remote, s3), remote, s3)
+
+    remote, s3 = FakeFireHOL(body, '"v1"'), FakeS3()
+    sync.http, sync.s3 = remote, s3
+    print("[incremental sync]")
+    measure("first run (no previous state)", lambda: sync.lambda_handler({}, None), remote, s3)
+    measure("no-change run (304)", lambda: sync.lambda_handler({}, None), remote, s3)
+    remote.etag = '"v2"'
+    measure("new ETag, identical content", lambda: sync.lambda_handler({}, None), remote, s3)
+    lines = body.split(b"\n")
+    remote.body = b"\n".join(lines[:-11] + [b"198.51.100.%d" % i for i in range(10)]) + b"\n"
+    remote.etag = '"v3"'
+    measure("changed content (+10 -10)", lambda: sync.lambda_handler({}, None), remote, s3)
+
+
+if __name__ == "__main__":
+    main()
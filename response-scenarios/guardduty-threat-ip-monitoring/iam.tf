@@ -32,8 +32,16 @@ resource "aws_iam_role_policy" "lambda_update_ip_list_policy" {
       },
       {
         Effect = "Allow",
-        Action = ["s3:PutObject"], # S3에 악성 IP 파일을 업로드하기 위한 권한
+        Action = [
+          "s3:PutObject", # S3에 악성 IP 파일 / 인덱스 / diff를 업로드하기 위한 권한
+          "s3:GetObject"  # 직전 버전 메타데이터(ETag 등)와 목록을 읽어 diff를 계산하기 위한 권한
+        ],
         Resource = "${aws_s3_bucket.ip_list_bucket.arn}/*"
+      },
+      {
+        Effect = "Allow",
+        Action = ["s3:ListBucket"], # 첫 실행 시 객체가 없으면 403 대신 404를 받기 위한 권한
+        Resource = aws_s3_bucket.ip_list_bucket.arn
       }
     ]
   })
@@ -78,9 +86,20 @@ resource "aws_iam_role_policy" "discord_and_ec2_alarm_policy" {
           "ec2:DescribeInstances",  # EC2 인스턴스 정보 확인
           "ec2:StopInstances",      # EC2 인스턴스 중지
           "ec2:DescribeVolumes",    # EBS 볼륨 정보 확인
-          "ec2:CreateSnapshot"      # 스냅샷 생성
+          "ec2:CreateSnapshot",     # 스냅샷 생성
+          "ec2:CreateSnapshots"     # 다중 볼륨 스냅샷 생성 (한 번의 요청)
         ],
         Resource = "*"
+      },
+      {
+        Effect = "Allow",
+        Action = ["s3:GetObject"],  # FireHOL 인덱스(threat/malicious-ip-list.idx) 조회
+        Resource = "${aws_s3_bucket.ip_list_bucket.arn}/threat/*"
+      },
+      {
+        Effect = "Allow",
+        Action = ["dynamodb:GetItem", "dynamodb:PutItem"],  # 알림 중복 제거 상태 조회 / 갱신
+        Resource = aws_dynamodb_table.alert_dedup.arn
       }
     ]
   })
@@ -1,19 +1,26 @@
 import os  # 운영체제 환경 변수 등을 사용하기 위한 os 모듈 임포트
-import json  # JSON 데이터 처리를 위한 json 모듈 임포트
-import boto3  # AWS 서비스와 상호작용하기 위한 boto3 라이브러리 임포트
-import urllib3  # HTTP 요청을 보내기 위한 urllib3 라이브러리 임포트
 from datetime import datetime, timezone, timedelta  # 날짜 및 시간 처리를 위한 datetime 관련 모듈 임포트
 
-http = urllib3.PoolManager()  # HTTP 연결을 관리하는 PoolManager 객체 생성
-WEBHOOK = os.environ["DISCORD_WEBHOOK_URL"]  # 환경 변수에서 Discord Webhook URL을 불러옴
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import ebs_snapshot  # 다중 볼륨 스냅샷 공용 모듈 (shared/ebs_snapshot.py, 패키징 시 함께 포함)
+import alert_dedup  # finding 중복 제거 / 폭주 억제 공용 모듈 (shared/alert_dedup.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, API 호출 / Discord 전송 시간 기록)
+import notifier  # Discord 전송 공용 모듈 (shared/notifier.py, 연결 재사용 / 429 재시도)
+import threat_ip_matcher  # FireHOL 인덱스 조회 공용 모듈 (shared/threat_ip_matcher.py, 패키징 시 함께 포함)
 
-def send_discord_message(content):
-    http.request(
-        "POST", WEBHOOK,  # Discord Webhook URL로 POST 요청 전송
-        body=json.dumps({"content": content}).encode(),  # 메시지 내용을 JSON 형태로 인코딩하여 전송
-        headers={"Content-Type": "application/json"}  # Content-Type 헤더를 JSON으로 지정
-    )
+dispatcher = notifier.Notifier(os.environ["DISCORD_WEBHOOK_URL"], topic_arn="")  # 컨테이너당 하나의 발송기
+dedup = alert_dedup.get_deduplicator()  # DEDUP_TABLE이 있으면 DynamoDB로 동시 실행 간 상태 공유
+ec2 = aws_clients.lazy('ec2')  # EC2 대상 finding을 처음 처리할 때 생성하고 warm 호출에서 재사용
 
+def send_discord_message(content, context=None, notices=()):
+    dispatcher.add(content)
+    for notice in notices:
+        dispatcher.add(alert_dedup.storm_message(notice))  # 폭주 시작 / 직전 폭주 기간 생략 건수 안내
+    result = dispatcher.flush(deadline=notifier.deadline_from(context))  # 레이트 리밋 시 retry_after만큼 대기 후 재전송
+    if result["dropped"]:
+        print("Discord 전송 실패")  # 재시도 후에도 실패하면 로그만 남김
+
+@metrics.handler('discord_and_ec2_alarm')
 def lambda_handler(event, context):
     # 이벤트 정보 파싱
     region = event.get("region", "Unknown")  # 이벤트에서 region 정보를 가져오고 없으면 'Unknown' 사용
@@ -35,28 +42,21 @@ def lambda_handler(event, context):
     resource = detail.get("resource", {})  # 리소스 정보 파싱
     resource_type = resource.get("resourceType", "Unknown")  # 리소스 유형 파싱
     instance_id = resource.get("instanceDetails", {}).get("instanceId", "N/A")  # 인스턴스 ID 파싱
-    src_ip = "N/A"  # 공격 IP 기본값 설정
-    try:
-        src_ip = detail["service"]["action"]["remoteIpDetails"]["ipAddressV4"]  # 공격 원본 IP 파싱
-    except Exception:
-        pass  # 값이 없거나 오류가 나면 기본값 유지
+    # 공격 원본 IP (networkConnectionAction / awsApiCallAction / portProbeAction 등 액션 종류별 위치에서 찾음)
+    src_ip = alert_dedup.remote_ip(detail) or "N/A"  # 없으면 기본값 유지
+    threat = threat_ip_matcher.lookup(src_ip)  # FireHOL 목록 등재 여부 (컨테이너당 한 번 로드, O(log n) 조회)
+    threat_msg = f"등재 (`{threat['match']}`)" if threat["listed"] else "미등재"
 
     # 1. EC2 스냅샷 생성 및 인스턴스 중단
     snapshot_ids = []  # 생성된 스냅샷 ID를 저장할 리스트
     ec2_result_msg = ""  # EC2 조치 결과 메시지
     if instance_id != "N/A":
-        ec2 = boto3.client('ec2')  # EC2 클라이언트 객체 생성
         try:
-            volumes = ec2.describe_volumes(
-                Filters=[{'Name': 'attachment.instance-id', 'Values': [instance_id]}]
-            )['Volumes']  # 해당 인스턴스에 연결된 볼륨 목록 조회
-            for volume in volumes:
-                volume_id = volume['VolumeId']  # 볼륨 ID 추출
-                response = ec2.create_snapshot(
-                    VolumeId=volume_id,
-                    Description=f"GuardDuty auto snapshot for {instance_id} ({volume_id})"
-                )  # 볼륨의 스냅샷 생성
-                snapshot_ids.append(response['SnapshotId'])  # 생성된 스냅샷 ID 저장
+            instance = ec2.describe_instances(InstanceIds=[instance_id])['Reservations'][0]['Instances'][0]  # 연결된 볼륨 확인용
+            snapshots = ebs_snapshot.create_instance_snapshots(
+                ec2, instance, description=f"GuardDuty auto snapshot for {instance_id}"
+            )  # 모든 볼륨을 한 번의 요청으로 같은 시점에 스냅샷 (crash-consistent)
+            snapshot_ids = [s['snapshot_id'] for s in snapshots]  # 생성된 스냅샷 ID 저장
             ec2.stop_instances(InstanceIds=[instance_id])  # 인스턴스 중단
             ec2_result_msg = (
                 f"\n\n**EC2 조치 결과**\n"
@@ -67,7 +67,17 @@ def lambda_handler(event, context):
         except Exception as e:
             ec2_result_msg = f"\n\n EC2 조치 중 오류 발생: {str(e)}"  # 오류 발생 시 메시지 저장
 
-    # 2. Discord 메시지 전송
+    # 2. Discord 메시지 전송 (같은 유형 / 인스턴스 / 공격 IP는 DEDUP_WINDOW_SECONDS 동안 한 번만 알림)
+    alerts, notices = dedup.filter([detail])
+    if not alerts:
+        metrics.tag(outcome='suppressed')
+        if notices:
+            send_discord_message(alert_dedup.storm_message(notices[0]), context, notices[1:])
+        return {
+            'statusCode': 200,
+            'body': f'Snapshots: {snapshot_ids}, Instance stopped: {instance_id}, notification suppressed'
+        }  # EC2 조치는 완료, 알림만 생략
+    repeat_msg = f"\n**•중복:** {alerts[0].summary()}" if alerts[0].summary() else ""
     content = (
         "**[ GuardDuty 탐지 알림 ]**\n"
         f"**•Type:** `{finding_type}`\n"
@@ -78,10 +88,12 @@ def lambda_handler(event, context):
         f"**•계정:** {account}\n"
         f"**•리소스:** {resource_type} / {instance_id}\n"
         f"**•공격 IP:** {src_ip}\n"
+        f"**•FireHOL:** {threat_msg}\n"
         f"**•탐지 시각:** {time}"
+        f"{repeat_msg}"
         f"{ec2_result_msg}"
     )  # Discord로 전송할 메시지 내용 구성
-    send_discord_message(content)  # Discord로 메시지 전송
+    send_discord_message(content, context, notices)  # Discord로 메시지 전송
 
     return {
         'statusCode': 200,
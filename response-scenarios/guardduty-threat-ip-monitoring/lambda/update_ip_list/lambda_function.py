@@ -1,43 +1,141 @@
-import urllib3       # HTTP 요청을 전송하기 위한 urllib3 모듈 임포트
-import boto3         # AWS 서비스(S3 등)와 상호작용하기 위한 boto3 모듈 임포트
+import hashlib      # 목록 내용 변경 여부를 판단하기 위한 해시 모듈 임포트
+import json         # diff 결과를 JSON으로 저장하기 위한 json 모듈 임포트
+from botocore.exceptions import ClientError
+
+import aws_clients  # 지연 생성 클라이언트 / 연결 풀 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics      # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+import ip_index     # CIDR 목록을 바이너리 인덱스로 변환하는 공용 모듈 (shared/ip_index.py, 패키징 시 함께 포함)
 
 # 악성 IP 리스트를 저장할 S3 버킷 이름과 오브젝트 키 정의
 S3_BUCKET = "s3-ip-list-bucket-tf"                      # 저장 대상 S3 버킷 이름
 S3_KEY = "threat/malicious-ip-list.txt"                # S3 객체(파일)의 키 (경로 및 파일명)
+INDEX_KEY = "threat/malicious-ip-list.idx"             # 바이너리 구간 인덱스 (다른 Lambda에서 O(log n) 조회용)
+DIFF_KEY = "threat/malicious-ip-list.diff.json"        # 직전 버전 대비 추가/삭제 목록
 
 # FireHOL에서 제공하는 IP 블랙리스트의 URL
 FIREHOL_URL = "https://raw.githubusercontent.com/firehol/blocklist-ipsets/master/firehol_level1.netset"
+CHUNK_SIZE = 64 * 1024                                 # 스트리밍 파싱 단위 (64KB)
+
+# 컨테이너 재사용 시 연결을 재활용 (첫 사용 때 생성)
+http = aws_clients.lazy_http()
+s3 = aws_clients.lazy('s3')
+
+def load_sync_state():
+    # 직전 업로드 시 객체 메타데이터에 남긴 ETag / Last-Modified / 내용 해시를 조회
+    try:
+        return s3.head_object(Bucket=S3_BUCKET, Key=S3_KEY).get('Metadata', {})
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return {}
+        raise
+
+def stream_entries(response):
+    # 본문 전체를 문자열로 디코딩하지 않고 청크 단위로 줄을 나눠 파싱
+    lines = []
+    digest = hashlib.sha256()
+    rest = b''
+    for chunk in response.stream(CHUNK_SIZE):
+        parts = (rest + chunk).split(b'\n')
+        rest = parts.pop()
+        for line in parts:
+            line = line.strip()
+            if line and not line.startswith(b'#'):   # 공백 줄이나 주석(#)은 제외
+                lines.append(line)
+    rest = rest.strip()
+    if rest and not rest.startswith(b'#'):
+        lines.append(rest)
+    for line in lines:
+        digest.update(line + b'\n')
+    return lines, digest.hexdigest()
+
+def load_previous_lines():
+    # 직전 버전 목록을 줄 단위 스트리밍으로 읽어 집합으로 반환 (없으면 빈 집합)
+    try:
+        body = s3.get_object(Bucket=S3_BUCKET, Key=S3_KEY)['Body']
+    except ClientError:
+        return set()
+    return set(line.strip() for line in body.iter_lines() if line.strip())
 
 # AWS Lambda 핸들러 함수: 이벤트 발생 시 Lambda가 실행하는 함수
+@metrics.handler('update_ip_list')
 def lambda_handler(event, context):
-    # HTTP 연결을 위한 PoolManager 객체 생성
-    http = urllib3.PoolManager()
-    
-    # 블랙리스트 IP 데이터를 FireHOL 원격 URL에서 GET 방식으로 가져옴
-    response = http.request('GET', FIREHOL_URL)
+    state = load_sync_state()
 
-    # 바이너리 데이터를 UTF-8 문자열로 디코딩
-    ip_list = response.data.decode('utf-8')
+    # 조건부 GET: 원본이 바뀌지 않았으면 304만 받고 종료
+    headers = {}
+    if state.get('source-etag'):
+        headers['If-None-Match'] = state['source-etag']
+    if state.get('source-last-modified'):
+        headers['If-Modified-Since'] = state['source-last-modified']
 
-    # 줄 단위로 나눈 후, 공백 줄이나 주석(#)이 있는 줄은 제외한 실제 IP만 필터링함
-    lines = [line for line in ip_list.split('\n') if line and not line.startswith('#')]
+    response = http.request('GET', FIREHOL_URL, headers=headers, preload_content=False)
+    try:
+        if response.status == 304:
+            metrics.tag(outcome='not_modified')
+            print("Threat list not modified (304)")
+            return {'statusCode': 200, 'body': 'Threat list not modified'}
+        if response.status != 200:
+            raise Exception(f"Failed to download threat list: HTTP {response.status}")
+        lines, content_hash = stream_entries(response)
+        metadata = {
+            'source-etag': response.headers.get('ETag', ''),
+            'source-last-modified': response.headers.get('Last-Modified', ''),
+            'content-sha256': content_hash,
+            'count': str(len(lines))
+        }
+    finally:
+        response.release_conn()
+
+    try:
+        # 원본 ETag만 바뀌고 내용은 같으면 메타데이터만 갱신 (서버 측 복사, 본문 재업로드 없음)
+        if state.get('content-sha256') == content_hash:
+            s3.copy_object(
+                Bucket=S3_BUCKET,
+                Key=S3_KEY,
+                CopySource={'Bucket': S3_BUCKET, 'Key': S3_KEY},
+                Metadata=metadata,
+                MetadataDirective='REPLACE',
+                ContentType='text/plain'
+            )
+            metrics.tag(outcome='unchanged')
+            print("Threat list content unchanged, metadata refreshed")
+            return {'statusCode': 200, 'body': 'Threat list content unchanged'}
 
-    # 필터링된 IP 리스트를 줄바꿈으로 연결하여 하나의 문자열로 만듦
-    result = '\n'.join(lines)
+        # 직전 버전과 비교해 추가/삭제 목록 계산
+        previous = load_previous_lines() if state else set()
+        current = set(lines)
+        added = sorted(line.decode() for line in current - previous)
+        removed = sorted(line.decode() for line in previous - current)
 
-    # S3 클라이언트 생성
-    s3 = boto3.client('s3')
+        # 정렬·병합된 정수 구간 + prefix별 네트워크 배열 인덱스 생성
+        networks = [network for network in (ip_index.parse_cidr(line.decode()) for line in lines) if network]
+        index = ip_index.dumps(networks)
 
-    try:
-        # S3에 IP 리스트 업로드 (text 파일로 저장)
-        response = s3.put_object(
-            Bucket=S3_BUCKET,     # 대상 S3 버킷명
-            Key=S3_KEY,           # 대상 객체 키
-            Body=result,          # 파일 내용: 필터링된 IP 문자열
-            ContentType='text/plain'  # 콘텐츠 타입 지정
+        # 인덱스 / diff를 먼저 업로드 (다른 Lambda는 인덱스만 읽음)
+        s3.put_object(
+            Bucket=S3_BUCKET,
+            Key=INDEX_KEY,
+            Body=index,
+            ContentType='application/octet-stream',
+            Metadata={'content-sha256': content_hash, 'networks': str(len(networks))}
+        )
+        s3.put_object(
+            Bucket=S3_BUCKET,
+            Key=DIFF_KEY,
+            Body=json.dumps({'added': added, 'removed': removed, 'content-sha256': content_hash}),
+            ContentType='application/json'
+        )
+        # S3에 IP 리스트 업로드 (text 파일로 저장) - content-sha256 메타데이터를 싣는 객체라 마지막에 업로드
+        # (인덱스 / diff 업로드가 실패하면 해시가 갱신되지 않아 다음 실행에서 다시 게시)
+        s3.put_object(
+            Bucket=S3_BUCKET,
+            Key=S3_KEY,
+            Body=b'\n'.join(lines),
+            ContentType='text/plain',
+            Metadata=metadata
         )
         # 업로드 성공 로그 출력
-        print("Upload successful:", response)
+        print(f"Upload successful: {len(lines)} entries, {len(index)} index bytes, +{len(added)} -{len(removed)}")
 
     except Exception as e:
         # 업로드 실패 시 예외 메시지 출력 후 예외 발생시킴
@@ -47,6 +145,5 @@ def lambda_handler(event, context):
     # Lambda 함수의 실행 결과 반환
     return {
         'statusCode': 200,  # HTTP 상태 코드
-        'body': f'Uploaded {len(lines)} IPs to s3://{S3_BUCKET}/{S3_KEY}'  # 업로드 완료 메시지
+        'body': f'Uploaded {len(lines)} IPs to s3://{S3_BUCKET}/{S3_KEY} (+{len(added)} -{len(removed)})'  # 업로드 완료 메시지
     }
-
@@ -132,6 +132,26 @@ resource "aws_sns_topic_subscription" "email" {
   endpoint  = var.notification_email  # 예: "user@example.com"
 }
 
+#--------------------------------------
+# DynamoDB: 알림 중복 제거 상태 (fingerprint별 마지막 알림 시각 / 생략 건수)
+#--------------------------------------
+resource "aws_dynamodb_table" "alert_dedup" {
+  name         = "guardduty-threat-ip-alert-dedup"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "fingerprint"
+
+  attribute {
+    name = "fingerprint"
+    type = "S"
+  }
+
+  # expires_at(epoch 초)이 지난 항목은 자동 삭제
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
+
 #--------------------------------------
 # Lambda: Discord 알림 + EC2 대응 (스냅샷, 중단)
 #--------------------------------------
@@ -147,6 +167,8 @@ resource "aws_lambda_function" "discord_and_ec2_alarm" {
   environment {
     variables = {
       DISCORD_WEBHOOK_URL = var.discord_webhook_url
+      THREAT_LIST_BUCKET  = aws_s3_bucket.ip_list_bucket.id  # update_ip_list가 게시한 FireHOL 인덱스 조회용
+      DEDUP_TABLE         = aws_dynamodb_table.alert_dedup.name  # 알림 중복 제거 상태 (동시 실행 간 공유)
     }
   }
 }
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+
+# 같은 fingerprint를 다시 알리기까지의 간격(초) - 그 사이 재발생은 건수만 누적
+WINDOW = int(os.environ.get('DEDUP_WINDOW_SECONDS', '3600'))
+# 폭주 판단: STORM_WINDOW초 동안 STORM_LIMIT건을 넘는 알림은 개별 전송 대신 폭주 안내로
+STORM_LIMIT = int(os.environ.get('DEDUP_STORM_LIMIT', '20'))
+STORM_WINDOW = int(os.environ.get('DEDUP_STORM_WINDOW_SECONDS', '60'))
+# 상태 저장소: DEDUP_TABLE(DynamoDB, 컨테이너 간 공유) > DEDUP_DB_PATH(SQLite) > 컨테이너 내 메모리
+DEDUP_TABLE = os.environ.get('DEDUP_TABLE', '')
+DEDUP_DB_PATH = os.environ.get('DEDUP_DB_PATH', '')
+# 메모리 / SQLite 저장소의 최대 fingerprint 수 (초과 시 가장 오래 갱신되지 않은 항목부터 제거)
+MAX_ENTRIES = 10000
+
+STORM_KEY = '__storm__'
+# 'end' 안내를 아직 보내지 않은 폭주 기록의 보존 기간 (다음 finding이 들어와 안내를 보낼 때까지 유지)
+STORM_RETENTION = 7 * 24 * 3600
+# DynamoDB 조건부 쓰기 충돌 시 재시도 횟수
+UPDATE_ATTEMPTS = 10
+
+
+def remote_ip(detail):
+    """GuardDuty finding의 원격 IP (액션 종류마다 위치가 다름, 없으면 None)"""
+    action = detail.get('service', {}).get('action', {})
+    for name in ('networkConnectionAction', 'awsApiCallAction', 'dnsRequestAction', 'kubernetesApiCallAction'):
+        ip = action.get(name, {}).get('remoteIpDetails', {}).get('ipAddressV4')
+        if ip:
+            return ip
+    for probe in action.get('portProbeAction', {}).get('portProbeDetails', []):
+        ip = probe.get('remoteIpDetails', {}).get('ipAddressV4')
+        if ip:
+            return ip
+    return action.get('remoteIpDetails', {}).get('ipAddressV4')
+
+
+def resource_id(detail):
+    resource = detail.get('resource', {})
+    if resource.get('instanceDetails', {}).get('instanceId'):
+        return resource['instanceDetails']['instanceId']
+    if resource.get('accessKeyDetails', {}).get('accessKeyId'):
+        return resource['accessKeyDetails']['accessKeyId']
+    buckets = resource.get('s3BucketDetails') or []
+    if buckets and buckets[0].get('name'):
+        return buckets[0]['name']
+    return resource.get('resourceType', 'Unknown')
+
+
+def finding_key(detail):
+    """(탐지 유형, 리소스, 원격 IP) - GuardDuty가 같은 finding을 갱신해 다시 보내도 같은 값"""
+    return detail.get('type', 'Unknown'), resource_id(detail), remote_ip(detail) or '-'
+
+
+def fingerprint(key):
+    return hashlib.sha1('|'.join(key).encode()).hexdigest()[:20]
+
+
+class MemoryStore:
+    """컨테이너 내 상태 저장소 (TTL + 크기 제한 LRU)"""
+
+    def __init__(self, maxsize=MAX_ENTRIES, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def _put(self, key, value, ttl):
+        self._data[key] = (value, self.clock() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def update(self, key, fn):
+        """읽기 → fn(값) → 쓰기를 원자적으로 (fn은 (새 값, ttl, 결과)를 반환, 결과를 돌려줌)"""
+        with self._lock:
+            item = self._data.get(key)
+            current = item[0] if item is not None and item[1] > self.clock() else None
+            value, ttl, result = fn(current)
+            self._put(key, value, ttl)
+            return result
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore:
+    """파일 기반 상태 저장소 (로컬 재생 / 여러 프로세스 공유용, 크기 제한 시 오래된 항목부터 삭제)"""
+
+    def __init__(self, path, maxsize=MAX_ENTRIES, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS dedup '
+                        '(key TEXT PRIMARY KEY, data TEXT, expires_at REAL, used_at REAL)')
+        self._lock = threading.Lock()
+        self.writes = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self.db.execute('SELECT data, expires_at FROM dedup WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] <= self.clock():
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._put(key, value, ttl)
+
+    def _put(self, key, value, ttl):
+        now = self.clock()
+        self.db.execute('INSERT OR REPLACE INTO dedup VALUES (?, ?, ?, ?)',
+                        (key, json.dumps(value), now + ttl, now))
+        self.writes += 1
+        if self.writes % 1000 == 0:
+            # 만료 항목 정리 후 그래도 많으면 가장 오래 갱신되지 않은 항목 삭제
+            self.db.execute('DELETE FROM dedup WHERE expires_at <= ?', (now,))
+            self.db.execute('DELETE FROM dedup WHERE key IN (SELECT key FROM dedup ORDER BY used_at DESC '
+                            'LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def update(self, key, fn):
+        """읽기 → fn(값) → 쓰기를 한 쓰기 트랜잭션으로 (같은 파일을 쓰는 다른 프로세스와도 직렬화)"""
+        with self._lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.db.execute('SELECT data, expires_at FROM dedup WHERE key = ?', (key,)).fetchone()
+                current = json.loads(row[0]) if row is not None and row[1] > self.clock() else None
+                value, ttl, result = fn(current)
+                self._put(key, value, ttl)
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+            return result
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM dedup').fetchone()[0]
+
+
+class DynamoDBStore:
+    """DynamoDB TTL 테이블 기반 상태 저장소 (여러 컨테이너 / 동시 실행 간 공유, expires_at으로 자동 만료)"""
+
+    def __init__(self, dynamodb, table, clock=time.time):
+        self.dynamodb = dynamodb
+        self.table = table
+        self.clock = clock
+
+    def get(self, key):
+        item = self.dynamodb.get_item(TableName=self.table, Key={'fingerprint': {'S': key}}).get('Item')
+        # TTL 삭제는 지연될 수 있으므로 만료 시각을 직접 확인
+        if not item or int(item['expires_at']['N']) <= self.clock():
+            return None
+        return json.loads(item['data']['S'])
+
+    def put(self, key, value, ttl):
+        self.dynamodb.put_item(
+            TableName=self.table,
+            Item={
+                'fingerprint': {'S': key},
+                'data': {'S': json.dumps(value)},
+                'expires_at': {'N': str(int(self.clock() + ttl) + 1)}
+            }
+        )
+
+    def update(self, key, fn):
+        """읽기 → fn(값) → 조건부 쓰기 (version이 읽은 값과 같을 때만 - 다른 컨테이너가 먼저 쓰면 다시 읽어 재시도)
+
+        fn은 재시도마다 다시 불릴 수 있으므로 외부 상태를 바꾸지 않아야 한다.
+        """
+        for _ in range(UPDATE_ATTEMPTS):
+            item = self.dynamodb.get_item(TableName=self.table, Key={'fingerprint': {'S': key}},
+                                          ConsistentRead=True).get('Item')
+            version = int(item['version']['N']) if item and 'version' in item else 0
+            current = None
+            if item and int(item['expires_at']['N']) > self.clock():
+                current = json.loads(item['data']['S'])
+            value, ttl, result = fn(current)
+            condition = 'attribute_not_exists(fingerprint)'
+            values = {}
+            if item:
+                condition = 'version = :version' if 'version' in item else 'attribute_not_exists(version)'
+                values = {':version': {'N': str(version)}} if 'version' in item else {}
+            try:
+                self.dynamodb.put_item(
+                    TableName=self.table,
+                    Item={
+                        'fingerprint': {'S': key},
+                        'data': {'S': json.dumps(value)},
+                        'expires_at': {'N': str(int(self.clock() + ttl) + 1)},
+                        'version': {'N': str(version + 1)}
+                    },
+                    ConditionExpression=condition,
+                    **({'ExpressionAttributeValues': values} if values else {})
+                )
+            except self.dynamodb.exceptions.ConditionalCheckFailedException:
+                continue
+            return result
+        raise RuntimeError(f"dedup state {key}: too many concurrent updates")
+
+
+class Alert:
+    """전송할 알림 하나: 대표 finding + 이번 호출에서 묶인 건수 + 직전 알림 이후 생략된 건수"""
+
+    def __init__(self, key, detail, count, suppressed):
+        self.key = key
+        self.detail = detail
+        self.count = count
+        self.suppressed = suppressed
+
+    def summary(self):
+        """중복 건수 안내 문구 (중복이 없으면 빈 문자열)"""
+        parts = []
+        if self.count > 1:
+            parts.append(f"이번 {self.count}건")
+        if self.suppressed:
+            parts.append(f"직전 알림 이후 {self.suppressed}건 생략")
+        return ", ".join(parts)
+
+
+class AlertDeduplicator:
+    """finding fingerprint 기준 중복 제거 / 폭주 억제
+
+    - 한 번의 호출 안에서 같은 fingerprint는 하나로 묶는다 (건수만 기록).
+    - 마지막 알림 후 window초 안에 다시 들어온 fingerprint는 보내지 않고 건수만 누적하며,
+      window가 지난 뒤 다시 발생하면 누적 건수와 함께 한 번 알린다.
+    - storm_window초 동안 보낸 알림이 storm_limit건을 넘으면 나머지는 개별 전송 대신
+      filter()가 돌려주는 폭주 안내로 모은다. 전송 한도는 저장소의 원자적 갱신(update)으로 차감하므로
+      DynamoDB 저장소를 쓰는 동시 실행들이 함께 한도를 넘기지 않는다.
+    - 'end' 안내를 보내지 않은 폭주 기록은 STORM_RETENTION 동안 남겨 두고, 창이 끝난 뒤 처음 호출되는
+      filter()가 안내한다 (finding 없이 filter([])만 불러도 됨).
+    """
+
+    def __init__(self, store=None, window=WINDOW, storm_limit=STORM_LIMIT, storm_window=STORM_WINDOW,
+                 clock=time.time):
+        self.store = store if store is not None else MemoryStore(clock=clock)
+        self.window = window
+        self.storm_limit = storm_limit
+        self.storm_window = storm_window
+        self.clock = clock
+        self.stats = {'findings': 0, 'alerts': 0, 'suppressed': 0, 'storm_suppressed': 0}
+
+    def filter(self, details):
+        """finding 목록 → (보낼 Alert 목록, 폭주 안내 목록)
+
+        폭주 안내는 창마다 시작 시 한 번('start')만 만들고, 그 뒤 같은 창에서 더 생략된 건수는
+        다음 창이 시작될 때 'end' 안내로 한 번에 알린다 (폭주 중 안내 메시지가 또 폭주하지 않도록).
+        """
+        groups = OrderedDict()
+        for detail in details:
+            key = finding_key(detail)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [detail, 1]
+            else:
+                group[0] = detail          # 같은 finding이면 가장 최근 내용으로 알림
+                group[1] += 1
+
+        now = self.clock()
+        candidates = []
+        # 폭주 한도 안에서는 심각도가 높은 finding부터 개별 알림
+        ordered = sorted(groups.items(), key=lambda item: -float(item[1][0].get('severity') or 0))
+        for key, (detail, count) in ordered:
+            fp = fingerprint(key)
+            state = self.store.get(fp)
+            self.stats['findings'] += count
+            if state is not None and now - state['sent_at'] < self.window:
+                def add(state, count=count):
+                    # 읽은 뒤 다른 실행이 쓴 건수를 덮어쓰지 않도록 원자적으로 누적
+                    state = state or {'sent_at': 0, 'suppressed': 0}
+                    return dict(state, suppressed=state['suppressed'] + count), self.window, None
+                self.store.update(fp, add)
+                self.stats['suppressed'] += count
+                continue
+            candidates.append((key, fp, detail, count))
+
+        def reserve(storm):
+            # 폭주 기록에서 전송 한도를 차감 (동시 실행 충돌 시 다시 불릴 수 있으므로 storm은 복사해서 사용)
+            notices = []
+            if storm is None or now - storm['start'] >= self.storm_window:
+                if storm and storm['suppressed'] > storm['reported']:
+                    notices.append({'kind': 'end', 'suppressed': storm['suppressed'] - storm['reported'],
+                                    'top': Counter(storm['top']).most_common(5), 'window': self.storm_window})
+                storm = {'start': now, 'sent': 0, 'suppressed': 0, 'reported': 0, 'top': {}}
+            else:
+                storm = dict(storm)
+            granted = min(len(candidates), max(0, self.storm_limit - storm['sent']))
+            storm['sent'] += granted
+            top = Counter(storm['top'])
+            for key, _, _, count in candidates[granted:]:
+                # 폭주 중: 개별 알림 대신 안내에 포함하고, 창이 끝난 뒤 다시 알릴 수 있도록 상태는 남기지 않음
+                storm['suppressed'] += count
+                top['|'.join(key)] += count
+            storm['top'] = dict(top.most_common(20))
+            if storm['suppressed'] and not storm['reported']:
+                notices.append({'kind': 'start', 'suppressed': storm['suppressed'], 'top': top.most_common(5),
+                                'window': self.storm_window})
+                storm['reported'] = storm['suppressed']
+            # 'end' 안내로 알릴 생략 건수가 남아 있으면 안내를 보낼 때까지 기록을 유지
+            ttl = STORM_RETENTION if storm['suppressed'] > storm['reported'] else self.storm_window * 2
+            return storm, ttl, (granted, notices)
+
+        granted, notices = self.store.update(STORM_KEY, reserve)
+
+        def claim(state):
+            # window 안에 다른 실행이 먼저 보냈으면 건수만 누적, 아니면 지금 보낸 것으로 기록
+            # (원자적 갱신이라 같은 fingerprint를 동시에 본 실행 중 하나만 알림)
+            if state is not None and now - state['sent_at'] < self.window:
+                return dict(state, suppressed=state['suppressed'] + count), self.window, None
+            return {'sent_at': now, 'suppressed': 0}, self.window, (state['suppressed'] if state else 0)
+
+        alerts = []
+        for key, fp, detail, count in candidates[:granted]:
+            suppressed = self.store.update(fp, claim)
+            if suppressed is None:
+                self.stats['suppressed'] += count
+                continue
+            alerts.append(Alert(key, detail, count, suppressed))
+            self.stats['alerts'] += 1
+        self.stats['storm_suppressed'] += sum(c[3] for c in candidates[granted:])
+        return alerts, notices
+
+
+def storm_message(notice, title="GuardDuty 탐지 폭주"):
+    if notice['kind'] == 'start':
+        lines = [f"**[ {title} ]**",
+                 f"최근 {notice['window']}초 동안 알림이 너무 많아 {notice['suppressed']}건을 개별 전송하지 않았습니다. "
+                 f"이 기간에 추가로 생략되는 건수는 다음 안내에 함께 표시합니다."]
+    else:
+        lines = [f"**[ {title} - 추가 생략 건수 ]**",
+                 f"직전 폭주 기간에 안내 이후 {notice['suppressed']}건이 추가로 생략되었습니다."]
+    lines.append("상위 항목:")
+    for key, count in notice['top']:
+        finding_type, resource, ip = key.split('|')
+        lines.append(f"• `{finding_type}` / `{resource}` / `{ip}` × {count}")
+    return "\n".join(lines)
+
+
+_deduplicator = None
+
+
+def get_deduplicator():
+    """컨테이너당 하나의 중복 제거기 (환경 변수로 저장소 선택)"""
+    global _deduplicator
+    if _deduplicator is None:
+        if DEDUP_TABLE:
+            store = DynamoDBStore(aws_clients.client('dynamodb'), DEDUP_TABLE)
+        elif DEDUP_DB_PATH:
+            store = SQLiteStore(DEDUP_DB_PATH)
+        else:
+            store = MemoryStore()
+        _deduplicator = AlertDeduplicator(store)
+    return _deduplicator
@@ -0,0 +1,99 @@
+import threading
+
+# 컨테이너당 하나씩 만들어 warm 호출에서 재사용하는 AWS 클라이언트 / HTTP 연결 풀
+# - boto3 / urllib3 는 처음 필요할 때 import (쓰지 않는 경로는 초기화 시간에 포함되지 않음)
+# - 스레드 풀에서 동시에 처음 사용해도 클라이언트는 하나만 생성 (boto3 기본 세션은 생성이 스레드 안전하지 않음)
+_clients = {}
+_pools = {}
+_lock = threading.Lock()
+# 클라이언트 생성 직후 호출할 함수 (metrics가 API 호출 시간 훅을 등록)
+_hooks = []
+
+
+def _key(service, region_name, config):
+    return service, region_name, tuple(sorted(config.items()))
+
+
+def client(service, region_name=None, **config):
+    """서비스별 boto3 클라이언트 (첫 호출 때 생성, config 인자는 botocore Config로 전달)"""
+    key = _key(service, region_name, config)
+    found = _clients.get(key)
+    if found is None:
+        with _lock:
+            found = _clients.get(key)
+            if found is None:
+                import boto3
+                kwargs = {'region_name': region_name} if region_name else {}
+                if config:
+                    from botocore.config import Config
+                    kwargs['config'] = Config(**config)
+                found = boto3.client(service, **kwargs)
+                for hook in _hooks:
+                    hook(found)
+                _clients[key] = found
+    return found
+
+
+def on_create(hook):
+    """생성되는 (이미 생성된 것 포함) 모든 클라이언트에 hook(client) 적용"""
+    with _lock:
+        if hook not in _hooks:
+            _hooks.append(hook)
+            for found in _clients.values():
+                hook(found)
+
+
+class Lazy:
+    """모듈 전역에 두는 지연 객체 - 첫 속성 접근(API 호출, .exceptions 등) 때 factory()로 만들어 위임"""
+
+    def __init__(self, factory, label):
+        self._factory = factory
+        self._label = label
+        self._target = None
+
+    def __getattr__(self, name):
+        if name in ('_factory', '_label', '_target'):
+            # __init__ 전(copy / pickle) 조회 시 무한 재귀 방지
+            raise AttributeError(name)
+        if self._target is None:
+            self._target = self._factory()
+        return getattr(self._target, name)
+
+    def __repr__(self):
+        state = 'created' if self._target is not None else 'not created'
+        return f"<Lazy {self._label} ({state})>"
+
+
+def lazy(service, region_name=None, **config):
+    """client(service, ...)를 첫 사용 때 만드는 지연 클라이언트"""
+    return Lazy(lambda: client(service, region_name, **config), service)
+
+
+def lazy_http(**kwargs):
+    """http(**kwargs)를 첫 요청 때 만드는 지연 연결 풀"""
+    return Lazy(lambda: http(**kwargs), 'http')
+
+
+def http(**kwargs):
+    """urllib3 PoolManager (같은 인자면 같은 풀, 연결 재사용)"""
+    key = tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(key)
+            if pool is None:
+                import urllib3
+                pool = _pools[key] = urllib3.PoolManager(**kwargs)
+    return pool
+
+
+def created():
+    """지금까지 생성된 클라이언트 서비스 이름 (벤치마크 / 로그용)"""
+    return sorted({key[0] for key in _clients})
+
+
+def reset():
+    """캐시 비우기 (테스트 / 벤치마크에서 cold 상태 재현용)"""
+    with _lock:
+        _clients.clear()
+        _pools.clear()
@@ -0,0 +1,151 @@
+"""GuardDuty finding 폭주 재생: 중복 제거 / 폭주 억제로 줄어드는 웹훅 호출 수 측정 (AWS / Discord 호출 없음)
+
+인스턴스 --instances 대에서 --findings 건(기본 10,000)의 finding이 --minutes 분 동안 쏟아지는 상황을 만든다.
+같은 finding이 GuardDuty에 의해 갱신되어 반복 전달되고, 포트 스캔처럼 한 IP가 여러 인스턴스를 두드리는 경우를 섞는다.
+가짜 시계로 시간을 흘리면서 SNS 묶음(--batch 건씩) 단위로 다음 방식의 웹훅 호출 수를 비교한다.
+
+  legacy          : 기존 핸들러처럼 record마다 Discord 메시지 한 건
+  dedup (memory)  : AlertDeduplicator + MemoryStore (크기 제한 LRU)
+  dedup (sqlite)  : 같은 로직 + SQLiteStore (임시 파일)
+  + notifier      : dedup 결과를 notifier처럼 embed 10개씩 묶었을 때의 요청 수
+
+모든 finding이 알림 / 중복 누적 / 폭주 안내 중 하나로 집계되는지(건수 합계 일치)도 확인한다.
+
+    python shared/bench/alert_dedup_bench.py [--findings 10000] [--instances 200] [--batch 50]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import alert_dedup  # noqa: E402
+
+TYPES = ["UnauthorizedAccess:EC2/SSHBruteForce", "Recon:EC2/PortProbeUnprotectedPort",
+         "CryptoCurrency:EC2/BitcoinTool.B!DNS", "Backdoor:EC2/C&CActivity.B!DNS",
+         "UnauthorizedAccess:EC2/MaliciousIPCaller.Custom", "Trojan:EC2/DNSDataExfiltration"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_burst(rng, findings, instances, minutes):
+    """(도착 시각, finding detail) 목록 - 고유 finding 일부가 갱신되어 여러 번 다시 전달됨"""
+    attackers = [f"198.51.100.{i}" for i in range(40)] + [f"203.0.113.{i}" for i in range(40)]
+    unique = []
+    for _ in range(max(1, findings // 12)):
+        unique.append({
+            "type": rng.choice(TYPES),
+            "severity": rng.choice([2, 5, 8]),
+            "resource": {"resourceType": "Instance",
+                         "instanceDetails": {"instanceId": f"i-{rng.randrange(instances):017x}"}},
+            "service": {"action": {"networkConnectionAction": {
+                "remoteIpDetails": {"ipAddressV4": rng.choice(attackers)}}}},
+        })
+    events = []
+    for _ in range(findings):
+        detail = dict(rng.choice(unique))
+        events.append((rng.uniform(0, minutes * 60), detail))
+    events.sort(key=lambda e: e[0])
+    return events, len(unique)
+
+
+def replay(events, batch, store_factory, args):
+    clock = FakeClock()
+    start = clock.now
+    dedup = alert_dedup.AlertDeduplicator(store_factory(clock), window=args.window, storm_limit=args.storm_limit,
+                                          storm_window=args.storm_window, clock=clock)
+    alerts = notices = requests = 0
+    counted = 0
+    alerted = set()
+    elapsed = time.perf_counter()
+    for i in range(0, len(events), batch):
+        chunk = events[i:i + batch]
+        clock.now = start + chunk[-1][0]
+        sent, storm = dedup.filter([detail for _, detail in chunk])
+        alerts += len(sent)
+        alerted.update((a.key, a.detail['severity']) for a in sent)
+        notices += len(storm)
+        counted += sum(a.count for a in sent)
+        messages = len(sent) + len(storm)
+        requests += -(-messages // 10)          # notifier: embed 10개씩 한 요청
+    # 마지막 폭주 창 이후 한 번 더 호출되면 남은 생략 건수가 'end' 안내로 나옴
+    clock.now += args.storm_window
+    _, storm = dedup.filter([])
+    notices += len(storm)
+    elapsed = time.perf_counter() - elapsed
+    stats = dedup.stats
+    assert counted + stats['suppressed'] + stats['storm_suppressed'] == stats['findings'] == len(events), stats
+    return alerts, notices, requests, elapsed, stats, dedup.store, alerted
+
+
+def check_concurrent_claim(detail, factory):
+    """두 실행이 같은 finding을 동시에 처리: 한쪽이 상태를 읽은 직후 다른 쪽이 알림을 보내도 알림은 한 번"""
+    clock = FakeClock()
+    store = factory(clock)
+    first = alert_dedup.AlertDeduplicator(store, clock=clock)
+    second = alert_dedup.AlertDeduplicator(store, clock=clock)
+    read = store.get
+
+    def get(key):
+        state = read(key)
+        store.get = read            # 끼어드는 실행은 한 번만
+        raced.extend(second.filter([detail])[0])
+        return state
+    raced = []
+    store.get = get
+    alerts, _ = first.filter([detail])
+    assert len(raced) == 1 and alerts == [], (raced, alerts)
+    assert store.get(alert_dedup.fingerprint(alert_dedup.finding_key(detail)))['suppressed'] == 1
+    assert first.stats['suppressed'] == 1 and first.stats['alerts'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--findings", type=int, default=10000)
+    parser.add_argument("--instances", type=int, default=200)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--batch", type=int, default=50, help="Lambda 호출 한 번에 들어오는 SNS record 수")
+    parser.add_argument("--window", type=int, default=3600)
+    parser.add_argument("--storm-limit", type=int, default=20)
+    parser.add_argument("--storm-window", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    events, unique = make_burst(random.Random(args.seed), args.findings, args.instances, args.minutes)
+    print(f"burst: {len(events):,} findings ({unique:,} distinct) from {args.instances} instances over "
+          f"{args.minutes:.0f} min, {args.batch} records per invocation")
+    print(f"  legacy         : webhook calls={len(events):6,}")
+
+    tmp = tempfile.mkdtemp()
+    backends = [
+        ("memory", lambda clock: alert_dedup.MemoryStore(clock=clock)),
+        ("memory, 256", lambda clock: alert_dedup.MemoryStore(maxsize=256, clock=clock)),
+        ("sqlite", lambda clock: alert_dedup.SQLiteStore(os.path.join(tmp, "dedup.sqlite"), clock=clock)),
+    ]
+    check_concurrent_claim(events[0][1], lambda clock: alert_dedup.MemoryStore(clock=clock))
+    check_concurrent_claim(events[0][1],
+                           lambda clock: alert_dedup.SQLiteStore(os.path.join(tmp, "race.sqlite"), clock=clock))
+    for label, factory in backends:
+        alerts, notices, requests, elapsed, stats, store, alerted = replay(events, args.batch, factory, args)
+        high = {alert_dedup.finding_key(d) for _, d in events if d['severity'] >= 7}
+        calls = alerts + notices
+        print(f"  dedup ({label:<11}): webhook calls={calls:6,} (alerts={alerts}, storm notices={notices})  "
+              f"suppressed={len(events) - calls:,} ({1 - calls / len(events):.1%})  "
+              f"+notifier requests={requests:,}  entries={len(store):,}  {len(events) / elapsed:,.0f} findings/s")
+        print(f"      duplicates={stats['suppressed']:,}  storm_suppressed={stats['storm_suppressed']:,}  "
+              f"distinct alerted individually={len({k for k, _ in alerted}):,}/{unique:,}  "
+              f"high severity={len(high & {k for k, _ in alerted})}/{len(high)}")
+
+
+if __name__ == "__main__":
+    main()
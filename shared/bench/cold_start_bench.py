@@ -0,0 +1,171 @@
+"""Lambda 핸들러 초기화(INIT) 시간 측정 (AWS 호출 없음)
+
+핸들러마다 새 인터프리터를 띄워 Lambda INIT 단계처럼 모듈 import만 하고 소요 시간을 잰다.
+  init     : 핸들러 모듈 import 시간 (중앙값, --repeat 회)
+  +clients : import 후 모듈 전역의 지연 클라이언트 / 연결 풀(aws_clients.Lazy)까지 모두 만든 시간
+             (매 실행 AWS를 호출하는 함수는 첫 호출에서 이만큼을 치르게 됨)
+  loaded   : import 직후 올라와 있는 무거운 패키지 (boto3 / urllib3 / requests)
+  clients  : import 중에 만들어진 boto3 클라이언트 수
+
+--ref를 주면 같은 핸들러를 해당 git 리비전(예: 변경 전 커밋)에서 꺼내 같은 방식으로 측정해 나란히 보여준다.
+실제 클라이언트 생성에는 자격 증명이 필요 없으므로 AWS_DEFAULT_REGION과 환경 변수 더미 값만 설정한다.
+
+    python shared/bench/cold_start_bench.py [--repeat 7] [--ref HEAD~1] [--only discord]
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, '..', '..'))
+
+WAF = 'advanced-detection-and-response-scenarios/aws-waf-overblocking-mitigation/lambda_zip'
+GD = 'advanced-detection-and-response-scenarios/guardduty-malware-protection/lambda_zips'
+
+# (표시 이름, 핸들러 디렉터리, 모듈 이름) - 공용 모듈은 shared/ 에서 찾음 (패키징 시 zip에 함께 들어가는 것과 같음)
+HANDLERS = [
+    ('waf/lambda-discord', WAF, 'lambda-discord'),
+    ('waf/lambda-ebs', WAF, 'lambda-ebs'),
+    ('waf/lambda-ebs-status', WAF, 'lambda-ebs-status'),
+    ('waf/lambda-ebs-attach', WAF, 'lambda-ebs-attach'),
+    ('waf/lambda-isolated-sg', WAF, 'lambda-isolated-sg'),
+    ('waf/lambda-ssm', WAF, 'lambda-ssm'),
+    ('waf/lambda-ssm-status', WAF, 'lambda-ssm-status'),
+    ('waf/lambda-upload-findings-to-s3', WAF, 'lambda-upload-findings-to-s3'),
+    ('waf/lambda-compact-findings', WAF, 'lambda-compact-findings'),
+    ('gd/abuseipdb_lookup_lambda', GD, 'abuseipdb_lookup_lambda'),
+    ('gd/discord_notify_lambda', GD, 'discord_notify_lambda'),
+    ('gd/gateway_trigger_lambda', GD, 'gateway_trigger_lambda'),
+    ('gd/ipset_add_lambda', GD, 'ipset_add_lambda'),
+    ('gd/ipset_flush_lambda', GD, 'ipset_flush_lambda'),
+    ('gd/waf_log_analyzer_lambda', GD, 'waf_log_analyzer_lambda'),
+    ('rule-engine', 'detection-and-alert-scenarios/rule-engine', 'lambda_function'),
+    ('security-group-policy-change', 'detection-and-alert-scenarios/security-group-policy-change', 'lambda'),
+    ('log-group-change-detect', 'detection-and-alert-scenarios/log-group-change-detect', 'lambda_function'),
+    ('athena/lambda_function', 'response-scenarios/athena-cloudtail-api-abuse', 'lambda_function'),
+    ('athena/stream_detector', 'response-scenarios/athena-cloudtail-api-abuse', 'stream_detector'),
+    ('ec2-bash-history-tampering', 'response-scenarios/ec2-bash-history-tampering', 'lambda_function'),
+    ('ec2-malicious-activity-isolation', 'response-scenarios/ec2-malicious-activity-isolation', 'lambda_function'),
+    ('threat-ip/discord_and_ec2_alarm',
+     'response-scenarios/guardduty-threat-ip-monitoring/lambda/discord_and_ec2_alarm', 'lambda_function'),
+    ('threat-ip/update_ip_list', 'response-scenarios/guardduty-threat-ip-monitoring/lambda/update_ip_list',
+     'lambda_function'),
+]
+
+# 핸들러가 import 시점에 읽는 필수 환경 변수 (값은 더미)
+ENV = {
+    'AWS_DEFAULT_REGION': 'ap-northeast-2', 'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+    'WEBHOOK_URL': 'http://127.0.0.1:9/webhook', 'DISCORD_WEBHOOK_URL': 'http://127.0.0.1:9/webhook',
+    'DISCORD_WEBHOOK': 'http://127.0.0.1:9/webhook', 'HOOK_URL': 'http://127.0.0.1:9/webhook',
+    'SNS_TOPIC_ARN': 'arn:aws:sns:ap-northeast-2:123456789012:alerts',
+    'STEP_FUNCTION_ARN': 'arn:aws:states:ap-northeast-2:123456789012:stateMachine:sfn',
+    'TARGET_INSTANCE_ID': 'i-0123456789abcdef0', 'ISOLATION_SG_ID': 'sg-0123456789abcdef0',
+    'ISOLATED_SG_ID': 'sg-0123456789abcdef0', 'COLLECTOR_DOCUMENT': 'collector',
+    'IPSET_NAME': 'blocked', 'IPSET_ID': '00000000-0000-0000-0000-000000000000', 'S3_BUCKET_NAME': 'forensic',
+}
+HEAVY = ('boto3', 'urllib3', 'requests')
+
+
+def child(directory, module_name, shared):
+    """자식 프로세스: 모듈 import 시간 / 지연 객체 생성 시간 측정 후 JSON 출력"""
+    sys.path[:0] = [directory, shared]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    init = time.perf_counter() - start
+    loaded = [name for name in HEAVY if name in sys.modules]
+    eager = sum(1 for value in vars(module).values() if type(value).__module__ == 'botocore.client')
+
+    start = time.perf_counter()
+    lazy = 0
+    for value in list(vars(module).values()):
+        if type(value).__name__ == 'Lazy' and type(value).__module__ == 'aws_clients':
+            if value._target is None:
+                value._target = value._factory()
+            lazy += 1
+    created = time.perf_counter() - start
+    print(json.dumps({'init': init, 'clients_ms': created, 'loaded': loaded, 'eager': eager, 'lazy': lazy}))
+
+
+def measure(root, directory, module_name, repeat):
+    env = dict(os.environ, **ENV, PYTHONDONTWRITEBYTECODE='1')
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(
+            [os.path.join(root, directory), module_name, os.path.join(root, 'shared')])],
+            env=env, capture_output=True, text=True, cwd=tempfile.gettempdir())
+        if out.returncode:
+            return {'error': (out.stderr.strip().splitlines() or ['?'])[-1]}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))   # import 중 출력된 로그는 건너뜀
+    result = dict(runs[-1])
+    result['init'] = statistics.median(r['init'] for r in runs) * 1000
+    result['clients_ms'] = statistics.median(r['clients_ms'] for r in runs) * 1000
+    return result
+
+
+def extract(ref, destination):
+    """git 리비전의 핸들러 / 공용 모듈을 임시 디렉터리에 풀기"""
+    paths = sorted({directory for _, directory, _ in HANDLERS} | {'shared'})
+    archive = subprocess.run(['git', '-C', ROOT, 'archive', '--format=tar', ref, '--', *paths],
+                             check=True, capture_output=True).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            tar.extractall(destination)
+
+
+def row(result):
+    if 'error' in result:
+        return f"{'error: ' + result['error'][:44]:<50}"
+    clients = (f"{result['eager']} eager" if result['eager'] else
+               f"{result['lazy']} lazy" if result['lazy'] else '-')
+    return (f"{result['init']:7.1f} {result['init'] + result['clients_ms']:9.1f}  "
+            f"{','.join(result['loaded']) or '-':<22} {clients:<8}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=7, help='핸들러당 새 프로세스 실행 횟수 (중앙값 사용)')
+    parser.add_argument('--ref', help='함께 측정할 git 리비전 (예: HEAD~1)')
+    parser.add_argument('--only', help='이름에 이 문자열이 들어간 핸들러만')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*json.loads(args.child))
+
+    handlers = [h for h in HANDLERS if not args.only or args.only in h[0]]
+    roots = [('current', ROOT)]
+    tmp = None
+    if args.ref:
+        tmp = tempfile.TemporaryDirectory()
+        extract(args.ref, tmp.name)
+        roots.insert(0, (args.ref, tmp.name))
+
+    header = f"{'init ms':>7} {'+clients':>9}  {'loaded at init':<22} {'clients':<8}"
+    print(f"{'function':<36} " + " | ".join(f"{label:^50}" for label, _ in roots))
+    print(f"{'':<36} " + " | ".join(header for _ in roots))
+    totals = {label: [0.0, 0.0] for label, _ in roots}
+    for name, directory, module_name in handlers:
+        cells = []
+        for label, root in roots:
+            result = measure(root, directory, module_name, args.repeat)
+            if 'error' not in result:
+                totals[label][0] += result['init']
+                totals[label][1] += result['init'] + result['clients_ms']
+            cells.append(row(result))
+        print(f"{name:<36} " + " | ".join(cells))
+    print(f"{'total':<36} " + " | ".join(f"{totals[label][0]:7.1f} {totals[label][1]:9.1f}{'':<33}"
+                                         for label, _ in roots))
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""포렌식 스냅샷 오케스트레이션 비교 (stub EC2 + 가짜 시계, AWS 호출 없음)
+
+스냅샷 소요 시간 = 볼륨 크기 / --rate(MiB/s) 인 stub EC2로 다음 세 흐름을 재생한다.
+
+  legacy : lambda-ebs가 루트 볼륨만 create_snapshot → lambda-ebs-attach가 snapshot_completed waiter
+           (15초 간격 조회)로 Lambda 안에서 대기. timeout(300초)을 넘기면 Lambda 실패.
+  waiter : 같은 방식으로 모든 볼륨을 스냅샷하고 waiter로 기다렸을 때
+  new    : create_snapshots로 모든 볼륨을 한 번에 → Step Functions Wait / lambda-ebs-status / Choice 루프
+           (update_progress의 wait_seconds 사용). Lambda는 조회할 때만 잠깐 실행된다.
+
+시나리오별로 증거 확보 시간(마지막 스냅샷 완료를 확인한 시각), Lambda 점유 시간, 조회 횟수,
+Step Functions 상태 전이 수와 볼륨별 소요 시간을 출력한다. create_snapshots를 쓸 수 없는 경우의
+볼륨별 동시 create_snapshot 대체 경로도 실제 스레드로 호출 지연을 측정한다.
+
+    python shared/bench/ebs_snapshot_bench.py [--rate 80] [--api-latency 0.05]
+"""
+import argparse
+import datetime
+import os
+import sys
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import ebs_snapshot  # noqa: E402
+
+SCENARIOS = {
+    "root only (8 GiB)": [8],
+    "web (8 + 30 GiB)": [8, 30],
+    "db (8 + 100 + 500 GiB)": [8, 100, 500],
+    "fileserver (8 + 4 x 250 GiB)": [8, 250, 250, 250, 250],
+}
+LAMBDA_TIMEOUT = 300           # 기존 lambda-ebs-attach timeout
+WAITER_DELAY = 15              # boto3 snapshot_completed waiter 조회 간격
+INVOKE_SECONDS = 0.3           # 조회 Lambda 한 번의 실행 시간 (콜드 스타트 제외 가정)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubEC2:
+    """볼륨 크기에 비례해 완료되는 스냅샷을 흉내 내는 EC2 stub"""
+
+    def __init__(self, sizes, rate, clock, latency=0.0, multi=True):
+        self.clock = clock
+        self.rate = rate
+        self.latency = latency
+        self.multi = multi
+        self.volumes = {f"vol-{i:04x}": size for i, size in enumerate(sizes)}
+        self.snapshots = {}
+        self.calls = {'create_snapshots': 0, 'create_snapshot': 0, 'describe_snapshots': 0}
+        self.lock = threading.Lock()
+
+    def instance(self):
+        return {
+            'InstanceId': 'i-0123456789abcdef0',
+            'RootDeviceName': '/dev/xvda',
+            'BlockDeviceMappings': [
+                {'DeviceName': '/dev/xvda' if i == 0 else f"/dev/sd{chr(ord('f') + i - 1)}",
+                 'Ebs': {'VolumeId': vid}}
+                for i, vid in enumerate(self.volumes)
+            ]
+        }
+
+    def _start(self, volume_id):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            snapshot_id = f"snap-{len(self.snapshots):04x}"
+            size = self.volumes[volume_id]
+            self.snapshots[snapshot_id] = (volume_id, self.clock(), size * 1024 / self.rate)
+        return {'SnapshotId': snapshot_id, 'VolumeId': volume_id, 'VolumeSize': size, 'State': 'pending',
+                'Progress': '', 'StartTime': datetime.datetime.fromtimestamp(self.clock(), datetime.timezone.utc)}
+
+    def create_snapshots(self, InstanceSpecification, **kwargs):
+        self.calls['create_snapshots'] += 1
+        if not self.multi:
+            raise ClientError({'Error': {'Code': 'UnauthorizedOperation', 'Message': 'stub'}}, 'CreateSnapshots')
+        if self.latency:
+            time.sleep(self.latency)
+        latency, self.latency = self.latency, 0.0
+        try:
+            return {'Snapshots': [self._start(vid) for vid in self.volumes]}
+        finally:
+            self.latency = latency
+
+    def create_snapshot(self, VolumeId, **kwargs):
+        self.calls['create_snapshot'] += 1
+        return self._start(VolumeId)
+
+    def describe_snapshots(self, SnapshotIds):
+        self.calls['describe_snapshots'] += 1
+        now = self.clock()
+        result = []
+        for snapshot_id in SnapshotIds:
+            volume_id, started, duration = self.snapshots[snapshot_id]
+            done = now - started >= duration
+            item = {'SnapshotId': snapshot_id, 'VolumeId': volume_id, 'State': 'completed' if done else 'pending',
+                    'Progress': '100%' if done else f"{int((now - started) / duration * 100)}%"}
+            if done:
+                item['CompletionTime'] = datetime.datetime.fromtimestamp(started + duration, datetime.timezone.utc)
+            result.append(item)
+        return {'Snapshots': result}
+
+
+def legacy(sizes, rate):
+    """볼륨마다 create_snapshot + Lambda 안의 waiter 대기 (기존 lambda-ebs는 sizes=[루트]만)"""
+    duration = max(sizes) * 1024 / rate
+    waited = -(-duration // WAITER_DELAY) * WAITER_DELAY
+    if waited > LAMBDA_TIMEOUT:
+        return {'evidence': None, 'lambda_seconds': LAMBDA_TIMEOUT, 'volumes': len(sizes)}
+    return {'evidence': waited, 'lambda_seconds': waited, 'volumes': len(sizes)}
+
+
+def orchestrated(sizes, rate):
+    """create_snapshots + Wait/status/Choice 루프 (Step Functions 정의와 같은 순서)"""
+    clock = FakeClock()
+    start = clock.now
+    ec2 = StubEC2(sizes, rate, clock)
+    snapshots = ebs_snapshot.create_instance_snapshots(ec2, ec2.instance(), "bench", clock=clock)
+    state = ebs_snapshot.update_progress(ec2, snapshots, clock=clock)
+    lambda_seconds = 2 * INVOKE_SECONDS
+    transitions = 2                                     # lambda-ebs, snapshot-complete
+    polls = 0
+    while not state['complete']:
+        assert not state['failed']
+        clock.now += state['wait_seconds']              # wait-snapshot
+        state = ebs_snapshot.update_progress(ec2, state['snapshots'], clock=clock)
+        clock.now += INVOKE_SECONDS                     # lambda-ebs-status
+        lambda_seconds += INVOKE_SECONDS
+        polls += 1
+        transitions += 3                                # wait-snapshot, lambda-ebs-status, snapshot-complete
+    longest = max(size * 1024 / rate for size in sizes)
+    return {'evidence': clock.now - start, 'lambda_seconds': lambda_seconds, 'volumes': len(snapshots),
+            'polls': polls, 'transitions': transitions, 'ideal': longest, 'snapshots': state['snapshots'],
+            'describe_calls': ec2.calls['describe_snapshots']}
+
+
+def issue_latency(volumes, latency):
+    """스냅샷 요청 발행 시간: 기존 순차 create_snapshot vs create_snapshots vs 동시 create_snapshot 대체 경로"""
+    sizes = [8] * volumes
+    ec2 = StubEC2(sizes, 80, time.time, latency=latency)
+    start = time.perf_counter()
+    for vid in ec2.volumes:
+        ec2.create_snapshot(VolumeId=vid)
+    serial = time.perf_counter() - start
+
+    ec2 = StubEC2(sizes, 80, time.time, latency=latency)
+    start = time.perf_counter()
+    multi = ebs_snapshot.create_instance_snapshots(ec2, ec2.instance(), "bench")
+    batched = time.perf_counter() - start
+    assert len(multi) == volumes and ec2.calls['create_snapshots'] == 1
+
+    ec2 = StubEC2(sizes, 80, time.time, latency=latency, multi=False)
+    start = time.perf_counter()
+    fallback = ebs_snapshot.create_instance_snapshots(ec2, ec2.instance(), "bench")
+    concurrent = time.perf_counter() - start
+    assert len(fallback) == volumes and ec2.calls['create_snapshot'] == volumes and fallback[0]['root']
+    return serial, batched, concurrent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=80, help="스냅샷 처리 속도 (MiB/s, 최초 전체 스냅샷 기준)")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="create_snapshot 호출 지연(초)")
+    parser.add_argument("--volumes", type=int, default=8)
+    args = parser.parse_args()
+
+    for name, sizes in SCENARIOS.items():
+        new = orchestrated(sizes, args.rate)
+        print(f"{name}")
+        for label, old in (("legacy ", legacy(sizes[:1], args.rate)), ("waiter ", legacy(sizes, args.rate))):
+            old_evidence = f"{old['evidence']:.0f}s" if old['evidence'] is not None else "Lambda timeout"
+            print(f"  {label}: volumes={old['volumes']}/{len(sizes)}  evidence={old_evidence:>14}  "
+                  f"lambda={old['lambda_seconds']:.0f}s")
+        print(f"  new    : volumes={new['volumes']}/{len(sizes)}  evidence={new['evidence']:13.0f}s  "
+              f"lambda={new['lambda_seconds']:.1f}s  polls={new['polls']}  transitions={new['transitions']}  "
+              f"poll lag={new['evidence'] - new['ideal']:.0f}s")
+        for line in ebs_snapshot.summary_lines(new['snapshots']):
+            print(f"           {line}")
+        assert new['volumes'] == len(sizes)
+        assert all(s['state'] == 'completed' for s in new['snapshots'])
+        assert new['describe_calls'] == new['polls'] + 1
+        # 조회 간격은 남은 시간의 절반 이하이므로 완료 확인 지연은 최대 조회 간격을 넘지 않음
+        assert new['evidence'] - new['ideal'] <= ebs_snapshot.MAX_POLL_SECONDS + INVOKE_SECONDS * (new['polls'] + 1)
+
+    serial, batched, concurrent = issue_latency(args.volumes, args.api_latency)
+    print(f"issue {args.volumes} snapshots ({args.api_latency * 1000:.0f} ms/call): serial create_snapshot "
+          f"{serial:.2f}s, create_snapshots {batched:.2f}s, concurrent fallback {concurrent:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""다중 인스턴스 격리 비교 (EC2 API 한도를 흉내 내는 로컬 stub, AWS 호출 없음)
+
+stub EC2는 인스턴스 --instances개(ENI 1~2개)를 갖고, 호출마다 --latency 초가 걸리며 계정 단위 토큰 버킷
+(변경 API 50개 / 초당 5개, 조회 API 100개 / 초당 20개)을 넘으면 RequestLimitExceeded를 돌려준다.
+
+  serial  : 기존 lambda-isolated-sg를 인스턴스마다 차례로 실행 (describe_instances → ENI별 modify)
+  fan-out : 인스턴스마다 Lambda가 따로 실행된 경우 (위 흐름을 동시에 --instances개)
+  batch   : ec2_isolation.Isolator - 페이지 조회 + 한도 안에서 동시 modify + create_tags 한 번
+
+기존 흐름의 재시도는 botocore legacy 모드(최대 4회, rand * 2^n초)를 따른다. 실제 시간을 --speedup배로
+줄여 실행하고(지연 / 한도 / 백오프 모두 같은 비율) 결과는 AWS 기준 초로 환산해 출력한다.
+
+    python shared/bench/ec2_isolation_bench.py [--instances 200] [--latency 0.08] [--speedup 10]
+"""
+import argparse
+import random
+import statistics
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import ec2_isolation  # noqa: E402
+
+ISOLATION_SG = "sg-isolation"
+
+
+class ServerBucket:
+    """서버 쪽 토큰 버킷 - 토큰이 없으면 기다리지 않고 거절"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class StubEC2:
+    def __init__(self, count, latency, speedup, seed=1):
+        rng = random.Random(seed)
+        self.latency = latency / speedup
+        self.mutate = ServerBucket(ec2_isolation.MUTATE_RATE * speedup, ec2_isolation.MUTATE_BURST)
+        self.read = ServerBucket(ec2_isolation.DESCRIBE_RATE * speedup, ec2_isolation.DESCRIBE_BURST)
+        self.instances = {}
+        self.enis = {}
+        self.tags = {}
+        self.isolated_at = {}
+        self.calls = {'describe_instances': 0, 'modify_network_interface_attribute': 0, 'create_tags': 0}
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        for i in range(count):
+            instance_id = f"i-{i:017x}"
+            enis = []
+            for n in range(1 if rng.random() < 0.7 else 2):
+                eni_id = f"eni-{i:08x}{n}"
+                self.enis[eni_id] = {'instance': instance_id, 'groups': ["sg-web"]}
+                enis.append(eni_id)
+            self.instances[instance_id] = {'enis': enis, 'tags': {'aws:autoscaling:groupName': 'web-asg'},
+                                           'state': 'running'}
+
+    def _enter(self, name, bucket):
+        with self.lock:
+            self.calls[name] += 1
+        time.sleep(self.latency)
+        if not bucket.take():
+            with self.lock:
+                self.throttled += 1
+            raise ClientError({'Error': {'Code': 'RequestLimitExceeded', 'Message': 'Request limit exceeded.'}}, name)
+
+    def _describe(self, instance_id):
+        inst = self.instances[instance_id]
+        return {
+            'InstanceId': instance_id,
+            'State': {'Name': inst['state']},
+            'Tags': [{'Key': k, 'Value': v} for k, v in inst['tags'].items()],
+            'NetworkInterfaces': [
+                {'NetworkInterfaceId': e, 'Groups': [{'GroupId': g} for g in self.enis[e]['groups']]}
+                for e in inst['enis']
+            ]
+        }
+
+    def describe_instances(self, InstanceIds=None, Filters=None, MaxResults=None, NextToken=None):
+        self._enter('describe_instances', self.read)
+        if InstanceIds and MaxResults:
+            raise ClientError({'Error': {'Code': 'InvalidParameterCombination', 'Message': 'stub'}}, 'Describe')
+        ids = list(self.instances)
+        if InstanceIds:
+            missing = [i for i in InstanceIds if i not in self.instances]
+            if missing:
+                raise ClientError({'Error': {'Code': 'InvalidInstanceID.NotFound', 'Message': str(missing)}},
+                                  'DescribeInstances')
+            ids = list(InstanceIds)
+        for f in Filters or []:
+            assert len(f['Values']) <= ec2_isolation.FILTER_VALUES_LIMIT
+            if f['Name'] == 'instance-id':
+                ids = [i for i in ids if i in f['Values']]
+            elif f['Name'] == 'instance-state-name':
+                ids = [i for i in ids if self.instances[i]['state'] in f['Values']]
+            elif f['Name'].startswith('tag:'):
+                key = f['Name'][4:]
+                ids = [i for i in ids if self.instances[i]['tags'].get(key) in f['Values']]
+        start = int(NextToken or 0)
+        page = ids[start:start + MaxResults] if MaxResults else ids
+        response = {'Reservations': [{'Instances': [self._describe(i) for i in page]}]}
+        if MaxResults and start + MaxResults < len(ids):
+            response['NextToken'] = str(start + MaxResults)
+        return response
+
+    def modify_network_interface_attribute(self, NetworkInterfaceId, Groups):
+        self._enter('modify_network_interface_attribute', self.mutate)
+        eni = self.enis[NetworkInterfaceId]
+        eni['groups'] = list(Groups)
+        instance = self.instances[eni['instance']]
+        if all(self.enis[e]['groups'] == [ISOLATION_SG] for e in instance['enis']):
+            with self.lock:
+                self.isolated_at.setdefault(eni['instance'], time.monotonic() - self.start)
+
+    def create_tags(self, Resources, Tags):
+        self._enter('create_tags', self.mutate)
+        assert len(Resources) <= ec2_isolation.CREATE_TAGS_LIMIT
+        for r in Resources:
+            self.instances[r]['tags'].update({t['Key']: t['Value'] for t in Tags})
+
+
+def legacy_call(fn, speedup, **kwargs):
+    """botocore legacy 재시도 모드: 최대 4회 재시도, rand * 2^(n-1)초 대기"""
+    for attempt in range(5):
+        try:
+            return fn(**kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'RequestLimitExceeded' or attempt == 4:
+                raise
+            time.sleep(random.random() * 2 ** attempt / speedup)
+
+
+def legacy_isolate(ec2, instance_id, speedup):
+    """기존 lambda-isolated-sg.py 한 번의 실행"""
+    try:
+        response = legacy_call(ec2.describe_instances, speedup, InstanceIds=[instance_id])
+        for ni in response['Reservations'][0]['Instances'][0]['NetworkInterfaces']:
+            legacy_call(ec2.modify_network_interface_attribute, speedup,
+                        NetworkInterfaceId=ni['NetworkInterfaceId'], Groups=[ISOLATION_SG])
+        return True
+    except ClientError:
+        return False
+
+
+def report(name, ec2, seconds, failed, speedup, total):
+    times = sorted(t * speedup for t in ec2.isolated_at.values())
+    calls = sum(ec2.calls.values())
+    p50 = f"{statistics.median(times):6.1f}s" if times else "     -"
+    last = f"{times[-1]:6.1f}s" if times else "     -"
+    print(f"  {name:8}: all done {seconds * speedup:6.1f}s  isolated {len(times):3d}/{total}  failed {failed:3d}  "
+          f"time-to-isolation p50 {p50} max {last}  api calls {calls:4d}  throttled {ec2.throttled:4d}  "
+          f"tagged {sum(1 for i in ec2.instances.values() if i['tags'].get('quarantined') == 'true')}")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.08, help="EC2 API 호출 한 번의 지연(초, AWS 기준)")
+    parser.add_argument("--speedup", type=float, default=10, help="실행 시간 축소 배율")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+    s = args.speedup
+    print(f"{args.instances} instances, {args.latency * 1000:.0f} ms/call, mutating bucket "
+          f"{ec2_isolation.MUTATE_BURST} + {ec2_isolation.MUTATE_RATE:.0f}/s (times in AWS seconds)")
+
+    ec2 = StubEC2(args.instances, args.latency, s)
+    ids = list(ec2.instances)
+    start = time.monotonic()
+    failed = sum(not legacy_isolate(ec2, i, s) for i in ids)
+    report("serial", ec2, time.monotonic() - start, failed, s, len(ids))
+
+    ec2 = StubEC2(args.instances, args.latency, s)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(ids)) as pool:
+        failed = sum(not ok for ok in pool.map(lambda i: legacy_isolate(ec2, i, s), ids))
+    report("fan-out", ec2, time.monotonic() - start, failed, s, len(ids))
+    enis = len(ec2.enis)
+    print(f"  (floor for {enis} ENI modifies: ({enis} - {ec2_isolation.MUTATE_BURST}) / "
+          f"{ec2_isolation.MUTATE_RATE:.0f}/s = {(enis - ec2_isolation.MUTATE_BURST) / ec2_isolation.MUTATE_RATE:.1f}s)")
+
+    for label, kwargs in (("batch", {'instance_ids': ids + ["i-doesnotexist"]}),
+                          ("selector", {'selector': "aws:autoscaling:groupName=web-asg"})):
+        ec2 = StubEC2(args.instances, args.latency, s)
+        isolator = ec2_isolation.Isolator(ec2, ISOLATION_SG, workers=args.workers,
+                                          rate=ec2_isolation.MUTATE_RATE * s,
+                                          describe_rate=ec2_isolation.DESCRIBE_RATE * s,
+                                          backoff=0.25 / s, max_backoff=8.0 / s)
+        start = time.monotonic()
+        result = isolator.isolate(**kwargs)
+        times = report(label, ec2, time.monotonic() - start, result['failed'], s, len(ids))
+        assert result['isolated'] == len(ids) and result['failed'] == 0 and result['tagged'] == len(ids)
+        assert len(times) == len(ids)
+        targets = kwargs.get('instance_ids', [])
+        assert ec2.calls['create_tags'] == 1
+        assert ec2.calls['describe_instances'] == max(1, -(-len(targets) // ec2_isolation.FILTER_VALUES_LIMIT))
+        assert result['not_found'] == (["i-doesnotexist"] if label == "batch" else [])
+        assert all(e['groups'] == [ISOLATION_SG] for e in ec2.enis.values())
+        # 같은 대상을 다시 격리하면 이미 격리된 ENI는 modify 없이 건너뜀
+        again = isolator.isolate(instance_ids=ids[:10])
+        assert again['api_calls']['skipped_enis'] >= 10 and again['isolated'] == 10
+        print(f"            per-instance result: {result['instances'][0]['instance_id']} "
+              f"{result['instances'][0]['status']} {result['instances'][0]['seconds'] * s:.2f}s ... "
+              f"{result['instances'][-1]['instance_id']} {result['instances'][-1]['seconds'] * s:.2f}s")
+
+    # '=' 없는 선택자 / 대상 없음은 조회 전에 거부 (상태 필터만으로 조회하면 계정의 모든 인스턴스가 격리됨)
+    ec2 = StubEC2(args.instances, args.latency, s)
+    isolator = ec2_isolation.Isolator(ec2, ISOLATION_SG)
+    for kwargs in ({'selector': "web-asg"}, {'selector': " , "}, {'selector': "=web-asg"},
+                   {'selector': "Name=web,web-asg"}, {'selector': {}}, {}):
+        try:
+            isolator.isolate(**kwargs)
+        except ValueError as e:
+            print(f"  rejected {kwargs}: {e}")
+        else:
+            raise AssertionError(f"isolate({kwargs}) should raise ValueError")
+    assert ec2.calls['describe_instances'] == 0 and ec2.calls['modify_network_interface_attribute'] == 0
+
+
+if __name__ == "__main__":
+    main()
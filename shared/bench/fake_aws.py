@@ -0,0 +1,593 @@
+"""로컬 벤치마크용 가짜 AWS 서비스 / HTTP 엔드포인트 (실제 AWS / 외부 호출 없음)
+
+FakeAWS
+  aws_clients로 만든 실제 boto3 클라이언트에 botocore 이벤트 훅을 걸어 요청을 메모리 상태로 처리한다.
+  botocore Stubber와 같은 방식이라 파라미터 검증 / 요청 직렬화 / 응답 후 이벤트(metrics 훅)는 실제로 거치고
+  HTTP 전송만 대신 응답한다. 응답은 (서비스, API)별 첫 응답을 출력 모델로 검증해 실제 형식과 어긋나지 않게 한다.
+  상태: S3 객체, EC2 인스턴스(처음 조회될 때 볼륨 1~3개 / ENI 1~2개로 생성, "i-0dead"로 시작하면 없는 인스턴스),
+  볼륨 / 스냅샷, WAF IPSet(LockToken 검사), Step Functions 실행 이름 중복, SQS 큐, SSM 명령, Athena 쿼리 결과.
+  구현하지 않은 API는 NotImplementedError를 내고 missing에 남는다.
+
+MockHTTP
+  Discord 웹훅(POST → 204), AbuseIPDB check API(GET → IP별 고정 평판), FireHOL 목록(GET → 요청마다 버전이 바뀌는
+  netset, ETag 포함)을 흉내 내는 로컬 HTTP 서버. latency 인자로 응답 지연을 줄 수 있다.
+"""
+import collections
+import datetime
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from botocore import xform_name
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+from botocore.validate import validate_parameters
+
+import aws_clients
+import ip_index
+
+REGION = 'ap-northeast-2'
+ACCOUNT = '123456789012'
+MISSING_PREFIX = 'i-0dead'
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _digest(value):
+    return int.from_bytes(hashlib.sha256(value.encode()).digest()[:8], 'big')
+
+
+def firehol_lines(count=2000, version=0, seed=1):
+    """합성 FireHOL level1 목록 (CIDR + 단일 IP, 버전마다 일부 항목이 바뀜)
+
+    203.0.113.0/25 와 198.51.100.128/25 는 항상 포함 (합성 이벤트의 공격 IP 일부가 등재되도록)
+    """
+    rng = random.Random(seed)
+    lines = ["203.0.113.0/25", "198.51.100.128/25"]
+    for i in range(count - 2):
+        a, b, c = rng.randrange(1, 223), rng.randrange(256), rng.randrange(256)
+        if a in (10, 127, 198, 203):
+            a += 1
+        lines.append(f"{a}.{b}.{c}.0/{rng.choice((16, 20, 24))}" if i % 3 else f"{a}.{b}.{c}.{rng.randrange(1, 255)}")
+    # 버전마다 앞쪽 1%를 다른 항목으로 교체 (diff / 재업로드 경로)
+    for i in range(2, 2 + count // 100):
+        lines[i] = f"100.{64 + version % 64}.{i % 256}.0/24"
+    return lines
+
+
+class FakeError(Exception):
+    def __init__(self, code, message='', status=400):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message or code
+        self.status = status
+
+
+class FakeAWS:
+    def __init__(self, latency=0.0, athena_rows=40, seed=1):
+        self.latency = latency
+        self.athena_rows = athena_rows
+        self.rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.calls = collections.Counter()
+        self.missing = set()
+        self._validated = set()
+        self._ids = itertools.count(1)
+
+        self.objects = {}           # (bucket, key) → {'body', 'metadata', 'content_type', 'etag', 'modified'}
+        self.instances = {}
+        self.enis = {}              # ENI ID → ENI (인스턴스 정보 안의 같은 dict)
+        self.volumes = {}
+        self.snapshots = {}
+        self.fast_restores = {}     # (스냅샷 ID, AZ) → FSR 상태
+        self.ip_sets = {}           # IPSet ID → {'name', 'addresses', 'token'}
+        self.executions = {}        # 실행 이름 → input
+        self.queues = collections.defaultdict(list)
+        self.commands = {}
+        self.queries = {}
+
+    def install(self):
+        """이미 만들어졌거나 이후 만들어질 aws_clients 클라이언트 모두에 적용"""
+        aws_clients.on_create(self.attach)
+        return self
+
+    def attach(self, client):
+        events = client.meta.events
+        events.register('before-parameter-build.*.*', self._capture, unique_id='fake-aws-params')
+        events.register('before-call.*.*', self._respond, unique_id='fake-aws-respond')
+        return client
+
+    @staticmethod
+    def _capture(params, context=None, **kwargs):
+        # before-call에는 직렬화된 요청만 오므로 API 인자를 요청 컨텍스트에 보관
+        if context is not None:
+            context['fake_aws_params'] = dict(params)
+
+    def _respond(self, model, context=None, **kwargs):
+        service = model.service_model.endpoint_prefix
+        name = f"{service}.{model.name}"
+        params = (context or {}).pop('fake_aws_params', {})
+        handler = getattr(self, f"_{service}_{xform_name(model.name)}", None)
+        with self.lock:
+            self.calls[name] += 1
+            if handler is None:
+                self.missing.add(name)
+        if handler is None:
+            raise NotImplementedError(f"FakeAWS: {name} is not implemented")
+        if self.latency:
+            time.sleep(self.latency)
+
+        status = 200
+        try:
+            with self.lock:
+                parsed = handler(params) or {}
+        except FakeError as e:
+            status = e.status
+            parsed = {'Error': {'Code': e.code, 'Message': e.message}}
+        if status < 300 and name not in self._validated:
+            # Stubber처럼 응답을 출력 모델로 검증 (API별 첫 응답만 - 반복 호출 비용 제외)
+            if model.output_shape is not None:
+                validate_parameters(parsed, model.output_shape)
+            self._validated.add(name)
+        parsed['ResponseMetadata'] = {'HTTPStatusCode': status, 'RequestId': uuid.uuid4().hex,
+                                      'HTTPHeaders': {}, 'RetryAttempts': 0}
+        return AWSResponse(None, status, {}, None), parsed
+
+    def _id(self, prefix, width=17):
+        return f"{prefix}-{next(self._ids):0{width}x}"
+
+    #--------------------------------------
+    # S3
+    #--------------------------------------
+    def put(self, bucket, key, body, metadata=None, content_type='binary/octet-stream'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        elif hasattr(body, 'read'):
+            body = body.read()
+        with self.lock:
+            self.objects[(bucket, key)] = {'body': bytes(body), 'metadata': dict(metadata or {}),
+                                           'content_type': content_type, 'modified': _now(),
+                                           'etag': f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def _object(self, p, code='NoSuchKey'):
+        found = self.objects.get((p['Bucket'], p['Key']))
+        if found is None:
+            raise FakeError(code, 'The specified key does not exist.', 404)
+        return found
+
+    def _s3_put_object(self, p):
+        self.put(p['Bucket'], p['Key'], p.get('Body', b''), p.get('Metadata'),
+                 p.get('ContentType', 'binary/octet-stream'))
+        return {'ETag': self.objects[(p['Bucket'], p['Key'])]['etag']}
+
+    def _s3_get_object(self, p):
+        obj = self._object(p)
+        return {'Body': StreamingBody(io.BytesIO(obj['body']), len(obj['body'])), 'ContentLength': len(obj['body']),
+                'ETag': obj['etag'], 'Metadata': obj['metadata'], 'ContentType': obj['content_type'],
+                'LastModified': obj['modified']}
+
+    def _s3_head_object(self, p):
+        obj = self._object(p, code='404')
+        return {'ContentLength': len(obj['body']), 'ETag': obj['etag'], 'Metadata': obj['metadata'],
+                'ContentType': obj['content_type'], 'LastModified': obj['modified']}
+
+    def _s3_copy_object(self, p):
+        source = p['CopySource']
+        if isinstance(source, str):
+            bucket, key = source.lstrip('/').split('/', 1)
+            source = {'Bucket': bucket, 'Key': key}
+        obj = self._object(source)
+        metadata = p.get('Metadata', {}) if p.get('MetadataDirective') == 'REPLACE' else obj['metadata']
+        self.put(p['Bucket'], p['Key'], obj['body'], metadata, p.get('ContentType', obj['content_type']))
+        return {'CopyObjectResult': {'ETag': obj['etag'], 'LastModified': _now()}}
+
+    def _s3_list_objects_v2(self, p):
+        prefix, delimiter = p.get('Prefix', ''), p.get('Delimiter')
+        keys = sorted(k for b, k in self.objects if b == p['Bucket'] and k.startswith(prefix))
+        if delimiter:
+            # Delimiter 뒤가 더 있는 키는 CommonPrefix 하나로 묶음
+            keys = sorted(dict.fromkeys(k[:k.index(delimiter, len(prefix)) + len(delimiter)]
+                                        if delimiter in k[len(prefix):] else k for k in keys))
+        start = int(p.get('ContinuationToken') or 0)
+        entries = keys[start:start + min(p.get('MaxKeys', 1000), 1000)]
+        common = [k for k in entries if delimiter and k.endswith(delimiter) and (p['Bucket'], k) not in self.objects]
+        page = [k for k in entries if not common or k not in common]
+        result = {'Name': p['Bucket'], 'Prefix': prefix, 'KeyCount': len(entries),
+                  'IsTruncated': start + len(entries) < len(keys),
+                  'Contents': [{'Key': k, 'Size': len(self.objects[(p['Bucket'], k)]['body']),
+                                'ETag': self.objects[(p['Bucket'], k)]['etag'],
+                                'LastModified': self.objects[(p['Bucket'], k)]['modified']} for k in page]}
+        if common:
+            result['CommonPrefixes'] = [{'Prefix': k} for k in common]
+        if result['IsTruncated']:
+            result['NextContinuationToken'] = str(start + len(entries))
+        return result
+
+    def _s3_delete_objects(self, p):
+        deleted = []
+        for item in p['Delete']['Objects']:
+            self.objects.pop((p['Bucket'], item['Key']), None)
+            deleted.append({'Key': item['Key']})
+        return {} if p['Delete'].get('Quiet') else {'Deleted': deleted}
+
+    #--------------------------------------
+    # EC2
+    #--------------------------------------
+    def instance(self, instance_id):
+        """인스턴스 정보 (처음 조회될 때 ID 해시로 볼륨 / ENI 수를 정해 생성, 없는 인스턴스면 None)"""
+        if instance_id.startswith(MISSING_PREFIX):
+            return None
+        found = self.instances.get(instance_id)
+        if found is None:
+            h = _digest(instance_id)
+            devices = ['/dev/xvda'] + [f"/dev/sd{c}" for c in 'fg'][:h % 3]
+            mappings = []
+            for device in devices:
+                volume_id = self._id('vol')
+                self.volumes[volume_id] = {'VolumeId': volume_id, 'Size': 8 if device == '/dev/xvda' else 100,
+                                           'State': 'in-use', 'AvailabilityZone': f"{REGION}a",
+                                           'Attachments': [{'InstanceId': instance_id, 'Device': device,
+                                                            'State': 'attached', 'VolumeId': volume_id}]}
+                mappings.append({'DeviceName': device, 'Ebs': {'VolumeId': volume_id, 'Status': 'attached',
+                                                               'DeleteOnTermination': device == '/dev/xvda'}})
+            enis = []
+            for _ in range(1 + (h >> 8) % 2):
+                eni = {'NetworkInterfaceId': self._id('eni'), 'Groups': [{'GroupId': 'sg-0a1b2c3d4e5f60718',
+                                                                        'GroupName': 'web'}]}
+                self.enis[eni['NetworkInterfaceId']] = eni
+                enis.append(eni)
+            found = self.instances[instance_id] = {
+                'InstanceId': instance_id, 'ImageId': 'ami-0c9c942bd7bf113a2', 'InstanceType': 't3.medium',
+                'State': {'Code': 16, 'Name': 'running'}, 'Placement': {'AvailabilityZone': f"{REGION}a"},
+                'RootDeviceName': '/dev/xvda', 'BlockDeviceMappings': mappings, 'NetworkInterfaces': enis,
+                'Tags': [{'Key': 'Name', 'Value': f"web-{instance_id[-4:]}"}]
+            }
+        return found
+
+    def _ec2_describe_instances(self, p):
+        ids = list(p.get('InstanceIds', []))
+        for f in p.get('Filters', []):
+            if f['Name'] == 'instance-id':
+                ids += f['Values']
+        if p.get('InstanceIds') and any(self.instance(i) is None for i in ids):
+            raise FakeError('InvalidInstanceID.NotFound', f"The instance IDs '{ids}' do not exist")
+        found = [self.instance(i) for i in dict.fromkeys(ids)]
+        return {'Reservations': [{'ReservationId': self._id('r'), 'OwnerId': ACCOUNT, 'Instances': [i]}
+                                 for i in found if i is not None]}
+
+    def _snapshot(self, volume_id, description=''):
+        volume = self.volumes.get(volume_id, {'Size': 8})
+        snapshot = {'SnapshotId': self._id('snap'), 'VolumeId': volume_id, 'VolumeSize': volume['Size'],
+                    'State': 'pending', 'Progress': '0%', 'StartTime': _now(), 'Description': description,
+                    'OwnerId': ACCOUNT, 'Encrypted': False}
+        self.snapshots[snapshot['SnapshotId']] = snapshot
+        return dict(snapshot)
+
+    def _ec2_create_snapshots(self, p):
+        instance = self.instance(p['InstanceSpecification']['InstanceId'])
+        if instance is None:
+            raise FakeError('InvalidInstanceID.NotFound', p['InstanceSpecification']['InstanceId'])
+        return {'Snapshots': [self._snapshot(m['Ebs']['VolumeId'], p.get('Description', ''))
+                              for m in instance['BlockDeviceMappings']]}
+
+    def _ec2_create_snapshot(self, p):
+        return self._snapshot(p['VolumeId'], p.get('Description', ''))
+
+    def _ec2_describe_snapshots(self, p):
+        # 조회 시점에는 모두 완료된 것으로 응답 (처음 보는 ID도 완료된 스냅샷으로)
+        result = []
+        for snapshot_id in p.get('SnapshotIds', []):
+            snapshot = self.snapshots.setdefault(snapshot_id, {
+                'SnapshotId': snapshot_id, 'VolumeId': self._id('vol'), 'VolumeSize': 8, 'StartTime': _now(),
+                'OwnerId': ACCOUNT, 'Encrypted': False})
+            snapshot.update(State='completed', Progress='100%', CompletionTime=_now())
+            result.append(dict(snapshot))
+        return {'Snapshots': result}
+
+    def _ec2_create_volume(self, p):
+        volume_id = self._id('vol')
+        self.volumes[volume_id] = {'VolumeId': volume_id, 'Size': 8, 'SnapshotId': p.get('SnapshotId', ''),
+                                   'AvailabilityZone': p['AvailabilityZone'], 'VolumeType': p.get('VolumeType', 'gp3'),
+                                   'State': 'available', 'CreateTime': _now(), 'Attachments': []}
+        return dict(self.volumes[volume_id], State='creating')
+
+    def _ec2_describe_volumes(self, p):
+        return {'Volumes': [dict(self.volumes[v]) for v in p.get('VolumeIds', []) if v in self.volumes]}
+
+    def _ec2_attach_volume(self, p):
+        volume = self.volumes.get(p['VolumeId'])
+        if volume is None:
+            raise FakeError('InvalidVolume.NotFound', p['VolumeId'])
+        volume['State'] = 'in-use'
+        volume['Attachments'] = [{'InstanceId': p['InstanceId'], 'Device': p['Device'], 'State': 'attached',
+                                  'VolumeId': p['VolumeId'], 'AttachTime': _now()}]
+        return {'VolumeId': p['VolumeId'], 'InstanceId': p['InstanceId'], 'Device': p['Device'],
+                'State': 'attaching', 'AttachTime': _now()}
+
+    def _ec2_detach_volume(self, p):
+        # 처음 보는 ID도 분석 인스턴스에 연결된 볼륨으로 (수집을 마친 조사의 볼륨)
+        volume = self.volumes.setdefault(p['VolumeId'], {
+            'VolumeId': p['VolumeId'], 'Size': 8, 'AvailabilityZone': f"{REGION}a", 'VolumeType': 'gp3',
+            'CreateTime': _now(), 'Attachments': [{'InstanceId': 'i-0fa1afa1afa1afa1a', 'Device': '/dev/sdf',
+                                                   'State': 'attached', 'VolumeId': p['VolumeId']}]})
+        if not volume['Attachments']:
+            raise FakeError('IncorrectState', f"Volume '{p['VolumeId']}' is in the 'available' state.")
+        attachment = dict(volume['Attachments'][0], State='detaching')
+        volume.update(State='available', Attachments=[])
+        return attachment
+
+    def _ec2_delete_volume(self, p):
+        if self.volumes.pop(p['VolumeId'], None) is None:
+            raise FakeError('InvalidVolume.NotFound', p['VolumeId'])
+        return {}
+
+    def _fast_restore(self, p, state):
+        items = []
+        for az in p['AvailabilityZones']:
+            for snapshot_id in p['SourceSnapshotIds']:
+                self.fast_restores[(snapshot_id, az)] = state
+                items.append({'SnapshotId': snapshot_id, 'AvailabilityZone': az, 'State': state, 'OwnerId': ACCOUNT})
+        return {'Successful': items, 'Unsuccessful': []}
+
+    def _ec2_enable_fast_snapshot_restores(self, p):
+        return self._fast_restore(p, 'enabling')
+
+    def _ec2_disable_fast_snapshot_restores(self, p):
+        return self._fast_restore(p, 'disabling')
+
+    def _ec2_describe_fast_snapshot_restores(self, p):
+        # 다음 조회 때는 optimizing으로 넘어간 것으로 응답
+        filters = {f['Name']: set(f['Values']) for f in p.get('Filters', [])}
+        items = []
+        for (snapshot_id, az), state in self.fast_restores.items():
+            if snapshot_id in filters.get('snapshot-id', {snapshot_id}) and az in filters.get('availability-zone', {az}):
+                if state == 'enabling':
+                    state = self.fast_restores[(snapshot_id, az)] = 'optimizing'
+                items.append({'SnapshotId': snapshot_id, 'AvailabilityZone': az, 'State': state, 'OwnerId': ACCOUNT})
+        return {'FastSnapshotRestores': items}
+
+    def _ec2_modify_network_interface_attribute(self, p):
+        eni = self.enis.get(p['NetworkInterfaceId'])
+        if eni is None:
+            raise FakeError('InvalidNetworkInterfaceID.NotFound', p['NetworkInterfaceId'])
+        eni['Groups'] = [{'GroupId': g, 'GroupName': g} for g in p.get('Groups', [])]
+        return {}
+
+    def _ec2_create_tags(self, p):
+        return {}
+
+    def _ec2_stop_instances(self, p):
+        return {'StoppingInstances': [{'InstanceId': i, 'CurrentState': {'Code': 64, 'Name': 'stopping'},
+                                       'PreviousState': {'Code': 16, 'Name': 'running'}}
+                                      for i in p['InstanceIds']]}
+
+    #--------------------------------------
+    # SSM
+    #--------------------------------------
+    def _ssm_send_command(self, p):
+        command_id = str(uuid.uuid4())
+        self.commands[command_id] = {'sent': time.time(), 'instances': p.get('InstanceIds', [])}
+        return {'Command': {'CommandId': command_id, 'DocumentName': p['DocumentName'], 'Status': 'Pending',
+                            'InstanceIds': p.get('InstanceIds', [])}}
+
+    def _ssm_get_command_invocation(self, p):
+        # 처음 보는 명령 ID도 완료된 명령으로 응답 (기록된 이벤트 재생용), "missing"이 들어가면 아직 기록 없음
+        if 'missing' in p['CommandId']:
+            raise FakeError('InvocationDoesNotExist', p['CommandId'])
+        sent = self.commands.get(p['CommandId'], {}).get('sent', time.time() - 40)
+        start, end = datetime.datetime.utcfromtimestamp(sent + 3), datetime.datetime.utcfromtimestamp(sent + 35)
+        summary = {'artifacts': {name: 'ok' for name in ('bash_history', 'auth_log', 'crontab', 'processes',
+                                                         'network', 'hashes')},
+                   'hash_deviations': 2, 'bytes': 48213954}
+        return {'CommandId': p['CommandId'], 'InstanceId': p['InstanceId'], 'Status': 'Success',
+                'StatusDetails': 'Success', 'ResponseCode': 0,
+                'ExecutionStartDateTime': start.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+                'ExecutionEndDateTime': end.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+                'StandardOutputContent': "mounted /dev/sdf1 at /mnt/forensic\n" * 20 + json.dumps(summary),
+                'StandardErrorContent': ''}
+
+    #--------------------------------------
+    # SNS / SQS / Step Functions
+    #--------------------------------------
+    def _sns_publish(self, p):
+        return {'MessageId': str(uuid.uuid4())}
+
+    def _sqs_send_message(self, p):
+        self.queues[p['QueueUrl']].append(p['MessageBody'])
+        return {'MessageId': str(uuid.uuid4()), 'MD5OfMessageBody': hashlib.md5(p['MessageBody'].encode()).hexdigest()}
+
+    def _sqs_get_queue_attributes(self, p):
+        return {'Attributes': {'ApproximateNumberOfMessages': str(len(self.queues[p['QueueUrl']]))}}
+
+    def _states_start_execution(self, p):
+        name = p.get('name') or str(uuid.uuid4())
+        arn = f"{p['stateMachineArn'].replace(':stateMachine:', ':execution:')}:{name}"
+        if name in self.executions and self.executions[name] != p.get('input'):
+            raise FakeError('ExecutionAlreadyExists', f"Execution Already Exists: '{arn}'")
+        self.executions[name] = p.get('input')
+        return {'executionArn': arn, 'startDate': _now()}
+
+    def _states_list_executions(self, p):
+        # 실행은 시작 즉시 끝난 것으로 봄 (적체 없음)
+        return {'executions': []}
+
+    #--------------------------------------
+    # WAF IPSet
+    #--------------------------------------
+    def ip_set(self, ip_set_id, name='blocked', addresses=()):
+        found = self.ip_sets.get(ip_set_id)
+        if found is None:
+            found = self.ip_sets[ip_set_id] = {'name': name, 'addresses': list(addresses), 'token': str(uuid.uuid4())}
+        return found
+
+    def _wafv2_get_ip_set(self, p):
+        ip_set = self.ip_set(p['Id'], p['Name'])
+        return {'IPSet': {'Name': p['Name'], 'Id': p['Id'], 'IPAddressVersion': 'IPV4',
+                          'ARN': f"arn:aws:wafv2:{REGION}:{ACCOUNT}:regional/ipset/{p['Name']}/{p['Id']}",
+                          'Addresses': list(ip_set['addresses'])},
+                'LockToken': ip_set['token']}
+
+    def _wafv2_update_ip_set(self, p):
+        ip_set = self.ip_set(p['Id'], p['Name'])
+        if p['LockToken'] != ip_set['token']:
+            raise FakeError('WAFOptimisticLockException', 'The lock token is stale')
+        if len(p['Addresses']) > 10000:
+            raise FakeError('WAFLimitsExceededException', 'IPSet address limit exceeded')
+        ip_set['addresses'] = list(p['Addresses'])
+        ip_set['token'] = str(uuid.uuid4())
+        return {'NextLockToken': ip_set['token']}
+
+    #--------------------------------------
+    # Athena
+    #--------------------------------------
+    def _athena_start_query_execution(self, p):
+        query_id = str(uuid.uuid4())
+        self.queries[query_id] = {'query': p['QueryString'], 'output': p.get('ResultConfiguration', {}).get(
+            'OutputLocation', 's3://athena-results/'), 'submitted': _now()}
+        return {'QueryExecutionId': query_id}
+
+    def _athena_get_query_execution(self, p):
+        query = self.queries.get(p['QueryExecutionId'])
+        if query is None:
+            raise FakeError('InvalidRequestException', 'QueryExecution not found')
+        return {'QueryExecution': {
+            'QueryExecutionId': p['QueryExecutionId'], 'Query': query['query'],
+            'Status': {'State': 'SUCCEEDED', 'SubmissionDateTime': query['submitted'], 'CompletionDateTime': _now()},
+            'Statistics': {'DataScannedInBytes': 183500800, 'EngineExecutionTimeInMillis': 2350},
+            'ResultConfiguration': {'OutputLocation': f"{query['output']}{p['QueryExecutionId']}.csv"}}}
+
+    def _athena_get_query_results(self, p):
+        # 헤더 행 + athena_rows개 (eventTime, eventName, userName, sourceIPAddress), MaxResults 단위 페이지
+        start = int(p.get('NextToken') or 0)
+        size = min(p.get('MaxResults', 1000), 1000)
+        rows = [] if start else [{'Data': [{'VarCharValue': v} for v in ('eventTime', 'eventName', 'username',
+                                                                             'sourceIPAddress')]}]
+        rng = random.Random(_digest(p['QueryExecutionId']) + start)
+        for i in range(start, min(start + size - len(rows), self.athena_rows)):
+            values = (f"2025-01-0{1 + i % 9}T{14 + i % 8:02d}:{i % 60:02d}:00Z",
+                      rng.choice(('ConsoleLogin', 'CreateAccessKey', 'CreateUser', 'DeleteAccessKey')),
+                      f"user-{rng.randrange(40)}", f"203.0.113.{rng.randrange(1, 255)}")
+            rows.append({'Data': [{'VarCharValue': v} for v in values]})
+        end = start + len(rows) - (0 if start else 1)
+        result = {'ResultSet': {'Rows': rows}}
+        if end < self.athena_rows:
+            result['NextToken'] = str(end)
+        return result
+
+
+def threat_index(count=2000, seed=1):
+    """update_ip_list가 게시하는 것과 같은 바이너리 인덱스 (threat_ip_matcher 입력)"""
+    networks = [n for n in (ip_index.parse_cidr(line) for line in firehol_lines(count, seed=seed)) if n]
+    return ip_index.dumps(networks)
+
+
+#--------------------------------------
+# 로컬 HTTP 엔드포인트
+#--------------------------------------
+class MockHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, firehol_size=2000):
+        super().__init__(('127.0.0.1', 0), MockHandler)
+        self.latency = latency
+        self.firehol_size = firehol_size
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.versions = itertools.count()
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        with self.lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        return counts
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'       # keep-alive (연결 재사용 확인)
+    # 헤더 / 본문을 한 번에 전송 (나눠 쓰면 Nagle + delayed ACK로 요청마다 40ms 지연)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.path.startswith('/webhook'):
+            return self._reply(404)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(400, b'{"message": "Cannot send an empty message", "code": 50006}')
+        server.count('webhook')
+        server.count('embeds', len(payload.get('embeds', [])))
+        self._reply(204)
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlparse(self.path)
+        if url.path == '/abuseipdb':
+            server.count('abuseipdb')
+            ip = parse_qs(url.query).get('ipAddress', [''])[0]
+            h = _digest(ip)
+            data = {'ipAddress': ip, 'abuseConfidenceScore': h % 101, 'countryCode': ('KR', 'US', 'CN', 'RU', 'NL')[h % 5],
+                    'usageType': ('Data Center/Web Hosting/Transit', 'Fixed Line ISP', 'Mobile ISP')[h % 3],
+                    'isp': f"ISP {h % 97}", 'domain': f"as{h % 6000}.example.net", 'hostnames': [],
+                    'totalReports': h % 500, 'numDistinctUsers': h % 50, 'lastReportedAt': '2025-01-01T00:00:00+00:00'}
+            return self._reply(200, json.dumps({'data': data}).encode(), {'Content-Type': 'application/json'})
+        if url.path == '/firehol':
+            server.count('firehol')
+            version = next(server.versions) % 2
+            etag = f'"firehol-v{version}"'
+            if self.headers.get('If-None-Match') == etag:
+                return self._reply(304, headers={'ETag': etag})
+            text = "# firehol_level1 (synthetic)\n#\n" + "\n".join(firehol_lines(server.firehol_size, version)) + "\n"
+            return self._reply(200, text.encode(), {'Content-Type': 'text/plain', 'ETag': etag,
+                                                    'Last-Modified': 'Wed, 01 Jan 2025 00:00:00 GMT'})
+        self._reply(404)
+
+
+def gzip_json_lines(records):
+    return gzip.compress("".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records).encode(), 6)
@@ -0,0 +1,310 @@
+"""GuardDuty finding 아카이브 비교 (메모리 S3 stub, AWS 호출 없음)
+
+합성 finding --findings개(계정 3 x 리전 4 x 유형 12, --days일에 고르게 분포)를 세 가지 방식으로 저장하고
+객체 수, 저장 바이트, PUT 요청 수, 조회 스캔 시간을 비교한다.
+
+  legacy    : 기존 lambda-upload-findings-to-s3 - finding마다 indent=2 JSON 객체 하나 (평평한 prefix)
+  batched   : SQS 배치 윈도우(--window초, 최대 10000건 / 6MB)마다 업로드 Lambda가 파티션별 gzip NDJSON 저장
+  compacted : batched 결과에 날짜별 lambda-compact-findings 실행 (파티션마다 객체 하나로 합침)
+
+batched에는 SQS 중복 전달(--duplicates건)을 섞어 compaction이 (id, updatedAt) 기준으로 걸러내는지 확인한다.
+
+조회는 두 가지 (세 방식 모두 결과가 같아야 함):
+  full  : 전체 finding 중 severity >= 7 인 유형별 건수 (전체 스캔)
+  day   : 하루 / 유형 하나의 finding 목록 (파티션이 있으면 해당 prefix만 읽음)
+
+스캔 시간 = 로컬에서 실제로 LIST + GET + 압축 해제 + JSON 파싱에 걸린 시간
+          + GET 요청당 --get-latency초를 --readers개가 병렬로 읽는다고 본 요청 대기 시간(모델)
+
+    python shared/bench/finding_archive_bench.py [--findings 100000] [--days 7] [--window 300]
+"""
+import argparse
+import bisect
+import datetime
+import importlib.util
+import io
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+LAMBDA_DIR = os.path.join(HERE, '..', '..', 'advanced-detection-and-response-scenarios',
+                          'aws-waf-overblocking-mitigation', 'lambda_zip')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+
+import finding_archive  # noqa: E402
+
+BUCKET = "guardduty-events"
+LEGACY_PREFIX = "guardduty/finding-logs/"
+PREFIX = "guardduty/findings/"
+PUT_PRICE_PER_1000 = 0.005
+SQS_BATCH_BYTES = 6 * 1024 * 1024
+
+ACCOUNTS = ["111122223333", "444455556666", "777788889999"]
+REGIONS = ["ap-northeast-2", "us-east-1", "eu-west-1", "ap-southeast-1"]
+TYPES = ["Execution:EC2/MaliciousFile", "Recon:EC2/PortProbeUnprotectedPort", "UnauthorizedAccess:EC2/SSHBruteForce",
+         "Backdoor:EC2/C&CActivity.B!DNS", "CryptoCurrency:EC2/BitcoinTool.B!DNS", "Trojan:EC2/DNSDataExfiltration",
+         "Recon:IAMUser/MaliciousIPCaller", "Policy:S3/BucketBlockPublicAccessDisabled",
+         "UnauthorizedAccess:IAMUser/InstanceCredentialExfiltration.OutsideAWS", "Impact:EC2/WinRMBruteForce",
+         "Discovery:S3/MaliciousIPCaller", "Stealth:IAMUser/CloudTrailLoggingDisabled"]
+
+
+class MemoryS3:
+    def __init__(self):
+        self.objects = {}
+        self.keys = []             # 정렬된 키 (list_objects_v2용)
+        self.calls = {'put_object': 0, 'get_object': 0, 'list_objects_v2': 0, 'delete_objects': 0}
+        self.get_bytes = 0
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls['put_object'] += 1
+        body = Body.encode('utf-8') if isinstance(Body, str) else bytes(Body)
+        if Key not in self.objects:
+            bisect.insort(self.keys, Key)
+        self.objects[Key] = body
+
+    def get_object(self, Bucket, Key):
+        self.calls['get_object'] += 1
+        body = self.objects[Key]
+        self.get_bytes += len(body)
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None, MaxKeys=1000, Delimiter=None):
+        self.calls['list_objects_v2'] += 1
+        start = int(ContinuationToken) if ContinuationToken else bisect.bisect_left(self.keys, Prefix)
+        page, common = [], []
+        i = start
+        while i < len(self.keys) and len(page) + len(common) < MaxKeys and self.keys[i].startswith(Prefix):
+            cut = self.keys[i].find(Delimiter, len(Prefix)) if Delimiter else -1
+            if cut >= 0:
+                # 같은 CommonPrefix 아래 키는 한 항목으로 묶고 건너뜀
+                directory = self.keys[i][:cut + len(Delimiter)]
+                common.append({'Prefix': directory})
+                while i < len(self.keys) and self.keys[i].startswith(directory):
+                    i += 1
+                continue
+            page.append({'Key': self.keys[i], 'Size': len(self.objects[self.keys[i]])})
+            i += 1
+        response = {'Contents': page, 'CommonPrefixes': common,
+                    'IsTruncated': i < len(self.keys) and self.keys[i].startswith(Prefix)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(i)
+        return response
+
+    def delete_objects(self, Bucket, Delete):
+        self.calls['delete_objects'] += 1
+        assert len(Delete['Objects']) <= finding_archive.DELETE_BATCH
+        gone = {o['Key'] for o in Delete['Objects']}
+        for key in gone:
+            del self.objects[key]
+        self.keys = [k for k in self.keys if k not in gone]
+
+    def stored(self, prefix):
+        keys = [k for k in self.keys if k.startswith(prefix)]
+        return len(keys), sum(len(self.objects[k]) for k in keys)
+
+
+def load_lambda(name, s3):
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), os.path.join(LAMBDA_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.s3 = s3
+    module.BUCKET = BUCKET
+    module.PREFIX = PREFIX
+    module.print = lambda *a, **k: None
+    return module
+
+
+def synthetic_events(count, days, seed):
+    """EventBridge 'GuardDuty Finding' 이벤트 (detail은 실제 finding 구조를 줄인 형태)"""
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 10, 1)
+    events = []
+    for n in range(count):
+        when = start + datetime.timedelta(seconds=rng.uniform(0, days * 86400))
+        account, region = rng.choice(ACCOUNTS), rng.choice(REGIONS)
+        finding_type = TYPES[min(int(rng.expovariate(0.35)), len(TYPES) - 1)]
+        instance = f"i-{rng.getrandbits(68):017x}"
+        stamp = when.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        detail = {
+            "schemaVersion": "2.0", "accountId": account, "region": region, "partition": "aws",
+            "id": f"{rng.getrandbits(128):032x}", "arn": f"arn:aws:guardduty:{region}:{account}:detector/d/finding/{n}",
+            "type": finding_type, "severity": round(rng.choice([2, 5, 5, 8, 8.5]) + rng.random() / 2, 1),
+            "createdAt": stamp, "updatedAt": stamp, "title": f"{finding_type} detected on {instance}",
+            "description": f"EC2 instance {instance} is associated with activity matching {finding_type}.",
+            "resource": {"resourceType": "Instance", "instanceDetails": {
+                "instanceId": instance, "instanceType": rng.choice(["t3.micro", "m5.large", "c6i.xlarge"]),
+                "imageId": f"ami-{rng.getrandbits(64):016x}", "availabilityZone": region + "a",
+                "networkInterfaces": [{"networkInterfaceId": f"eni-{rng.getrandbits(64):016x}",
+                                       "privateIpAddress": f"10.0.{rng.randrange(256)}.{rng.randrange(256)}",
+                                       "subnetId": f"subnet-{rng.getrandbits(32):08x}", "vpcId": "vpc-0a1b2c3d",
+                                       "securityGroups": [{"groupId": "sg-0123456789abcdef0", "groupName": "web"}]}],
+                "tags": [{"key": "Name", "value": f"web-{rng.randrange(500)}"}, {"key": "env", "value": "prod"}]}},
+            "service": {"serviceName": "guardduty", "detectorId": "d", "archived": False, "count": rng.randint(1, 20),
+                        "eventFirstSeen": stamp, "eventLastSeen": stamp, "resourceRole": "TARGET",
+                        "action": {"actionType": "NETWORK_CONNECTION", "networkConnectionAction": {
+                            "connectionDirection": "OUTBOUND", "protocol": "TCP", "blocked": False,
+                            "remoteIpDetails": {"ipAddressV4": f"203.0.113.{rng.randrange(256)}",
+                                                "country": {"countryName": rng.choice(["Russia", "China", "Brazil"])},
+                                                "organization": {"asn": str(rng.randrange(64512, 65535))}},
+                            "remotePortDetails": {"port": rng.choice([22, 443, 3389, 6667])}}}}
+        }
+        events.append({"version": "0", "id": f"{rng.getrandbits(128):032x}", "detail-type": "GuardDuty Finding",
+                       "source": "aws.guardduty", "account": account, "time": stamp[:19] + "Z", "region": region,
+                       "resources": [], "detail": detail})
+    events.sort(key=lambda e: e['time'])
+    return events
+
+
+def sqs_batches(events, window, duplicates, rng):
+    """배치 윈도우(초) / 10000건 / 6MB 중 먼저 도달하는 기준으로 나눈 SQS 배치 (일부 메시지는 중복 전달)"""
+    redelivered = set(rng.sample(range(len(events)), duplicates))
+    batch, batch_bytes, batch_start = [], 0, None
+    for n, event in enumerate(events):
+        body = json.dumps(event)
+        when = datetime.datetime.strptime(event['time'], "%Y-%m-%dT%H:%M:%SZ")
+        if batch and ((when - batch_start).total_seconds() >= window or len(batch) >= 10000
+                      or batch_bytes + len(body) > SQS_BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        if not batch:
+            batch_start = when
+        batch.append({'messageId': str(n), 'body': body})
+        batch_bytes += len(body)
+        if n in redelivered:
+            batch.append({'messageId': f"{n}-again", 'body': body})
+    if batch:
+        yield batch
+
+
+def scan(s3, prefix, decode):
+    """prefix 아래 모든 객체를 읽어 finding 목록으로 (LIST + GET + 파싱)"""
+    token, findings, gets = None, [], 0
+    while True:
+        kwargs = {'Bucket': BUCKET, 'Prefix': prefix}
+        if token:
+            kwargs['ContinuationToken'] = token
+        page = s3.list_objects_v2(**kwargs)
+        for obj in page['Contents']:
+            findings.extend(decode(s3.get_object(Bucket=BUCKET, Key=obj['Key'])['Body'].read()))
+            gets += 1
+        if not page['IsTruncated']:
+            return findings, gets
+        token = page['NextContinuationToken']
+
+
+def run_queries(s3, layout, day, finding_type, args):
+    if layout == "legacy":
+        decode = lambda body: [json.loads(body)['detail']]                           # noqa: E731
+        full_prefix, day_prefixes = LEGACY_PREFIX, [LEGACY_PREFIX]
+    else:
+        decode = finding_archive.decode                                              # noqa: E731
+        full_prefix = PREFIX
+        day_prefixes = [finding_archive.partition({'accountId': a, 'region': r, 'type': finding_type,
+                                                   'updatedAt': f"{day}T00:00:00"}, PREFIX)
+                        for a in ACCOUNTS for r in REGIONS]
+    results = {}
+    for name, prefixes, select in (
+            ("full", [full_prefix], lambda fs: sorted((t, sum(1 for f in fs if f['type'] == t and f['severity'] >= 7))
+                                                      for t in {f['type'] for f in fs})),
+            ("day", day_prefixes, lambda fs: sorted(f['id'] for f in fs
+                                                    if f['type'] == finding_type and f['updatedAt'].startswith(day)))):
+        s3.get_bytes = 0
+        start = time.perf_counter()
+        findings, gets = [], 0
+        for prefix in prefixes:
+            part, n = scan(s3, prefix, decode)
+            findings.extend(part)
+            gets += n
+        if layout == "batched":
+            # 압축 전에는 중복 전달된 finding이 남아 있으므로 id 기준으로 한 번만 셈 (Athena에서는 DISTINCT 필요)
+            findings = list({(f['id'], f['updatedAt']): f for f in findings}.values())
+        answer = select(findings)
+        local = time.perf_counter() - start
+        modeled = gets * args.get_latency / args.readers
+        results[name] = {'answer': answer, 'gets': gets, 'bytes': s3.get_bytes, 'local': local,
+                         'total': local + modeled}
+    return results
+
+
+def report(label, s3, prefix, queries, puts):
+    objects, stored = s3.stored(prefix)
+    print(f"  {label:9} | objects {objects:7d} | stored {stored / 1e6:8.1f} MB | PUT {puts:7d} "
+          f"(${puts / 1000 * PUT_PRICE_PER_1000:6.3f}) | "
+          + " | ".join(f"{name} scan {q['gets']:6d} GET {q['bytes'] / 1e6:7.1f} MB {q['total']:7.2f}s"
+                       f" (local {q['local']:5.2f}s)" for name, q in queries.items()))
+    return objects, stored
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--findings", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--window", type=float, default=300, help="SQS 배치 윈도우(초)")
+    parser.add_argument("--duplicates", type=int, default=200, help="SQS 중복 전달로 두 번 들어오는 finding 수")
+    parser.add_argument("--get-latency", type=float, default=0.02, help="GET 요청 한 번의 대기 시간(초, 모델)")
+    parser.add_argument("--readers", type=int, default=64, help="스캔 시 병렬로 읽는 수(모델)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    events = synthetic_events(args.findings, args.days, args.seed)
+    day = events[len(events) // 2]['time'][:10]
+    finding_type = TYPES[0]
+    print(f"{len(events)} findings over {args.days} days, {len(ACCOUNTS)} accounts x {len(REGIONS)} regions x "
+          f"{len(TYPES)} types, batch window {args.window:.0f}s; day query = {day} / {finding_type}")
+
+    # legacy: 기존 핸들러와 같은 방식 (finding마다 indent=2 JSON 객체)
+    s3 = MemoryS3()
+    for n, event in enumerate(events):
+        s3.put_object(Bucket=BUCKET, Key=f"{LEGACY_PREFIX}{event['time'].replace('-', '').replace(':', '')}_{n:08d}.json",
+                      Body=json.dumps(event, ensure_ascii=False, indent=2), ContentType='application/json')
+    legacy_puts = s3.calls['put_object']
+    legacy_queries = run_queries(s3, "legacy", day, finding_type, args)
+    legacy = report("legacy", s3, LEGACY_PREFIX, legacy_queries, legacy_puts)
+
+    # batched: SQS 배치마다 업로드 Lambda 한 번
+    s3 = MemoryS3()
+    upload = load_lambda("lambda-upload-findings-to-s3", s3)
+    invocations = 0
+    for batch in sqs_batches(events, args.window, args.duplicates, rng):
+        assert upload.lambda_handler({'Records': batch}, None) == {'batchItemFailures': []}
+        invocations += 1
+    batched_puts = s3.calls['put_object']
+    batched_queries = run_queries(s3, "batched", day, finding_type, args)
+    report("batched", s3, PREFIX, batched_queries, batched_puts)
+
+    # compacted: 날짜마다 compaction Lambda 한 번
+    compact = load_lambda("lambda-compact-findings", s3)
+    merged = 0
+    first = datetime.date.fromisoformat(events[0]['time'][:10])
+    for offset in range(args.days + 1):
+        result = compact.lambda_handler({'day': (first + datetime.timedelta(days=offset)).isoformat()}, None)
+        merged += result['merged']
+    compact_puts = s3.calls['put_object'] - batched_puts
+    compacted_queries = run_queries(s3, "compacted", day, finding_type, args)
+    compacted = report("compacted", s3, PREFIX, compacted_queries, compact_puts)
+
+    print(f"  upload invocations {invocations}, compaction merged {merged} objects "
+          f"(compaction PUT {compact_puts}, DELETE requests {s3.calls['delete_objects']})")
+    print(f"  compacted vs legacy: objects {legacy[0] / compacted[0]:.0f}x fewer, bytes {legacy[1] / compacted[1]:.1f}x "
+          f"smaller, full scan {legacy_queries['full']['total'] / compacted_queries['full']['total']:.1f}x faster, "
+          f"day scan {legacy_queries['day']['total'] / compacted_queries['day']['total']:.1f}x faster")
+
+    # 세 방식의 조회 결과가 같고, compaction 후에는 중복 없이 finding 수가 정확히 같아야 함
+    for name in ("full", "day"):
+        assert legacy_queries[name]['answer'] == batched_queries[name]['answer'] == compacted_queries[name]['answer']
+    all_findings, _ = scan(s3, PREFIX, finding_archive.decode)
+    assert len(all_findings) == len(events), (len(all_findings), len(events))
+    assert all(k.split('/')[-1].startswith(finding_archive.COMPACTED_MARK) for k in s3.keys)
+    # 파티션 하나가 COMPACT_TARGET_BYTES보다 작으면 compaction 후 파티션마다 객체 하나
+    partitions = {finding_archive.partition(finding_archive.unwrap(e), PREFIX) for e in events}
+    assert compacted[0] == len(partitions) and compacted[1] < legacy[1] / 5
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""EMF 지표 기록 오버헤드 마이크로벤치마크 + 출력 형식 / trace 전달 확인 (AWS 호출 없음)
+
+shared/metrics.py가 핸들러 실행 경로에 더하는 비용을 연산별로 잰다 (--n 회 반복, 최솟값 기준 ns/회).
+
+  span (active)     : 호출 진행 중 with metrics.timer(...) 구간 하나
+  span (inactive)   : 진행 중 호출이 없을 때 (Lambda 밖 / 비활성화)
+  timed decorator   : @metrics.timed 함수 호출 (빈 함수 대비 추가 시간)
+  count             : metrics.count(...)
+  boto3 API hook    : before/after-call 훅 함수 한 쌍 (API 호출 하나당 추가되는 기록 비용)
+  boto3 call delta  : Stubber 응답 API 호출을 훅 있는 클라이언트(aws_clients) / 없는 클라이언트로 비교 (참고값, 잡음 큼)
+  handler           : @metrics.handler 호출 하나 (Invocation 생성 + EMF 직렬화 + 출력 대체 함수)
+
+함께 확인하는 것
+  - EMF 문서: 지표 이름마다 값이 있고 값 배열 100개 이하, 차원 키 존재, 로그 이벤트 크기 한도(256KB) 이하
+  - 스레드 풀에서 동시에 기록해도 값이 빠지지 않음
+  - propagate=True 단계의 결과에 trace가 실려 다음 단계(InputPath / Map 결과)로 이어짐, ISO 8601 시작 시각 해석
+
+    python shared/bench/metrics_bench.py [--n 200000] [--max-span-us 5]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-2')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+import aws_clients  # noqa: E402
+import metrics  # noqa: E402
+
+LOG_EVENT_LIMIT = 256 * 1024
+
+
+def per_call(stmt, n, repeat=5, setup='pass', env=None):
+    """n회 실행 시간의 최솟값 → 1회당 ns"""
+    return min(timeit.repeat(stmt, setup=setup, number=n, repeat=repeat, globals=env)) / n * 1e9
+
+
+def active(function='bench'):
+    metrics._current = metrics.Invocation(function, metrics.new_trace())
+    return metrics._current
+
+
+def check_documents(docs):
+    for doc in docs:
+        directives = doc['_aws']['CloudWatchMetrics']
+        assert isinstance(doc['_aws']['Timestamp'], int)
+        for directive in directives:
+            assert len(directive['Metrics']) <= metrics.MAX_METRICS
+            for dimension_set in directive['Dimensions']:
+                assert all(key in doc for key in dimension_set), dimension_set
+            for metric in directive['Metrics']:
+                value = doc[metric['Name']]
+                assert not isinstance(value, list) or len(value) <= metrics.MAX_VALUES
+        assert len(json.dumps(doc, separators=(',', ':'))) < LOG_EVENT_LIMIT
+
+
+def bench_overhead(args, lines):
+    results = {}
+    env = {'metrics': metrics}
+    active()
+    results['span (active)'] = per_call("with metrics.timer('ec2.DescribeInstances'):\n    pass", args.n, env=env)
+    results['count'] = per_call("metrics.count('lookup.cache')", args.n, env=env)
+
+    def noop():
+        return None
+    timed = metrics.timed('stage')(noop)
+    results['timed decorator'] = per_call(timed, args.n) - per_call(noop, args.n)
+    metrics._current = None
+    results['span (inactive)'] = per_call("with metrics.timer('ec2.DescribeInstances'):\n    pass", args.n, env=env)
+
+    # boto3 API 훅: 훅 함수 한 쌍 직접 호출 + 같은 Stubber 응답을 훅 있는 / 없는 클라이언트로 번갈아 호출
+    import boto3
+    from botocore.stub import Stubber
+    hooked, plain = aws_clients.client('ec2'), boto3.client('ec2')
+    model = hooked.meta.service_model.operation_model('DescribeInstances')
+    response = type('Response', (), {'status_code': 200})()
+    env = dict(env, model=model, response=response, context={})
+    active()
+    results['boto3 API hook'] = per_call(
+        "metrics._before_call(model=model, context=context)\n"
+        "metrics._after_call(context=context, http_response=response)", args.n // 4, env=env)
+    metrics._current = None
+
+    calls = min(args.n // 20, 5000)
+    timings = {'plain': float('inf'), 'hooked': float('inf')}
+    for _ in range(5):
+        for label, client in (('plain', plain), ('hooked', hooked)):
+            with Stubber(client) as stub:
+                for _ in range(calls):
+                    stub.add_response('describe_instances', {'Reservations': []})
+                active()
+                start = time.perf_counter()
+                for _ in range(calls):
+                    client.describe_instances(InstanceIds=['i-0123456789abcdef0'])
+                timings[label] = min(timings[label], (time.perf_counter() - start) / calls * 1e9)
+                recorded = len(metrics._current.values.get('ec2.DescribeInstances', []))
+                metrics._current = None
+            assert recorded == (calls if label == 'hooked' else 0), (label, recorded)
+    results['boto3 call delta'] = timings['hooked'] - timings['plain']
+
+    @metrics.handler('bench-stage', propagate=True)
+    def stage(event, context):
+        with metrics.timer('ec2.DescribeInstances'):
+            pass
+        metrics.count('isolate.instances')
+        return {'status': 'ok'}
+    event = {'trace': {'id': 'exec-1', 'start': '2025-01-01T00:00:00.000Z'}}
+    handler_n = max(1, args.n // 20)
+    results['handler'] = per_call(lambda: stage(event, None), handler_n)
+    del lines[:]
+    return results, timings['plain']
+
+
+def check_format(lines):
+    invocation = metrics.Invocation('lambda-isolated-sg', {'id': 'exec-1', 'start': time.time() - 1.5}, 'req-1')
+    for i in range(250):
+        invocation.record('ec2.ModifyNetworkInterfaceAttribute', 10 + i % 7)
+    for i in range(120):
+        invocation.record(f"custom.metric{i}", i)
+    invocation.record('isolate.instances', 40, metrics.COUNT)
+    invocation.outcome = 'partial'
+    metrics._current = invocation
+    assert 1400 < metrics.since_trace('TimeToContain') < 60000
+    metrics._current = None
+    docs = invocation.documents()
+    check_documents(docs)
+    assert len(docs) == 3                                           # 값 250개 → 문서 3개
+    assert sum(len(d['ec2.ModifyNetworkInterfaceAttribute']) for d in docs) == 250
+    assert docs[0]['isolate.instances'] == 40 and 'isolate.instances' not in docs[1]
+    assert len(docs[0]['_aws']['CloudWatchMetrics']) == 2           # 지표 123개 → 지시자 2개
+    assert docs[0]['Outcome'] == 'partial' and docs[0]['TraceId'] == 'exec-1' and docs[0]['RequestId'] == 'req-1'
+
+    start = time.perf_counter()
+    metrics.flush(invocation)
+    flush_us = (time.perf_counter() - start) * 1e6
+    assert len(lines) == 3
+    del lines[:]
+    return flush_us
+
+
+def check_threads(workers=8, per_thread=20000):
+    invocation = active()
+    barrier = threading.Barrier(workers)
+
+    def work():
+        barrier.wait()
+        for _ in range(per_thread):
+            with metrics.timer('parallel.span'):
+                pass
+            metrics.count('parallel.count')
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    metrics._current = None
+    assert len(invocation.values['parallel.span']) == workers * per_thread
+    assert sum(invocation.values['parallel.count']) == workers * per_thread
+
+
+def check_trace(lines):
+    """상태 머신 단계 흉내: 컨텍스트 trace → propagate 결과 → InputPath 단계 / Map 결과 목록"""
+    @metrics.handler('lambda-ssm', propagate=True)
+    def ssm(event, context):
+        return {'command_id': 'c-1', 'instance_id': event['instance_id']}
+
+    @metrics.handler('lambda-ssm-status', propagate=True)
+    def ssm_status(event, context):
+        return dict(event, status='Success')
+
+    @metrics.handler('discord_notify_lambda')
+    def notify(event, context):
+        metrics.since_trace('TimeToNotify')
+        return {'statusCode': 200}
+
+    started = time.time() - 2
+    iso = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(started)) + f".{int(started % 1 * 1000):03d}Z"
+    trace = {'id': 'malware-step-exec-42', 'start': iso}
+    first = ssm({'instance_id': 'i-1', 'trace': trace}, None)
+    second = ssm_status(first, None)                                # InputPath = $.ssm
+    notify({'results': [dict(second, ip='203.0.113.7')]}, None)     # Map 결과 목록 첫 항목의 trace
+    docs = [json.loads(line) for line in lines]
+    del lines[:]
+    assert [d['TraceId'] for d in docs] == ['malware-step-exec-42'] * 3, docs
+    assert 1900 < docs[-1]['TimeToNotify'] < 10000, docs[-1]
+    assert metrics.trace_of({'x': 1}) is None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=200000, help='연산별 반복 횟수')
+    parser.add_argument('--max-span-us', type=float, default=5.0, help='구간 하나 / API 훅 허용 오버헤드(µs)')
+    args = parser.parse_args()
+
+    lines = []
+    metrics.ENABLED, metrics.emit = True, lines.append
+
+    results, plain_call = bench_overhead(args, lines)
+    flush_us = check_format(lines)
+    check_threads()
+    check_trace(lines)
+
+    print(f"EMF instrumentation overhead (best of 5, ns per operation, n={args.n})")
+    for name, ns in results.items():
+        print(f"  {name:18} {ns:10.0f} ns")
+    print(f"  {'(stubbed boto3 call)':18} {plain_call:10.0f} ns  ← API 호출 자체 (네트워크 제외)")
+    print(f"  {'flush 250 values':18} {flush_us * 1000:10.0f} ns  (3 EMF documents, handler end only)")
+    print("format: values ≤ 100 per metric, ≤ 100 metrics per directive, dimension keys present, < 256KB")
+    print("threads: 8 x 20000 concurrent spans / counts recorded without loss")
+    print("trace: propagate result → InputPath stage → Map results share one TraceId, ISO start parsed")
+
+    limit = args.max_span_us * 1000
+    for name in ('span (active)', 'span (inactive)', 'timed decorator', 'count', 'boto3 API hook'):
+        assert results[name] < limit, f"{name}: {results[name]:.0f} ns > {limit:.0f} ns"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""notifier 전송 검증 스크립트 (로컬 mock Discord 웹훅 서버, AWS 호출 없음)
+
+mock 서버는 Discord처럼 웹훅별 버킷(--limit 요청 / --window 초)을 두고 초과 시 429 + retry_after를 돌려주며,
+--inject 비율만큼은 버킷과 무관하게 429를 섞는다. 같은 알림 --alerts 개를 다음 두 방식으로 보내
+전달된 알림 수 / 초당 전달 수 / 웹훅 요청 수를 비교한다.
+
+  legacy   : 기존 핸들러처럼 알림마다 POST 한 번 (재시도 없음 → 429는 유실)
+  notifier : Notifier.add() 후 flush() - embed 10개씩 묶음 + retry_after / Reset-After 준수
+
+SNS는 호출당 --sns-latency 초가 걸리는 stub으로 순차 발행과 Notifier의 병렬 발행 시간을 비교한다.
+
+    python shared/bench/notifier_bench.py [--alerts 500] [--inject 0.1]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import urllib3
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import notifier  # noqa: E402
+
+
+class MockDiscord(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, limit, window, inject, seed):
+        super().__init__(('127.0.0.1', 0), MockHandler)
+        self.limit = limit
+        self.window = window
+        self.inject = inject
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.requests = self.accepted = self.rejected = self.alerts = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/webhooks/1/token"
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            now = time.monotonic()
+            if now - server.window_start >= server.window:
+                server.window_start, server.used = now, 0
+            reset_after = server.window - (now - server.window_start)
+            if server.used >= server.limit or server.rng.random() < server.inject:
+                server.rejected += 1
+                retry_after = reset_after if server.used >= server.limit else server.rng.uniform(0.05, 0.2)
+                payload = json.dumps({"message": "You are being rate limited.", "retry_after": round(retry_after, 3),
+                                      "global": False}).encode()
+                self.send_response(429)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Retry-After', str(max(1, round(retry_after))))
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+            server.used += 1
+            server.accepted += 1
+            server.alerts += len(body.get('embeds', [])) or 1
+            assert len(body.get('embeds', [])) <= notifier.MAX_EMBEDS
+            assert len(body.get('content') or '') <= notifier.CONTENT_LIMIT
+            remaining = server.limit - server.used
+        self.send_response(204)
+        self.send_header('X-RateLimit-Limit', str(server.limit))
+        self.send_header('X-RateLimit-Remaining', str(remaining))
+        self.send_header('X-RateLimit-Reset-After', f"{reset_after:.3f}")
+        self.end_headers()
+
+
+class StubSNS:
+    def __init__(self, latency):
+        self.latency = latency
+        self.published = 0
+        self.lock = threading.Lock()
+
+    def publish(self, **kwargs):
+        assert '\n' not in kwargs['Subject'] and len(kwargs['Subject']) <= notifier.SUBJECT_LIMIT
+        time.sleep(self.latency)
+        with self.lock:
+            self.published += 1
+
+
+def alert(i):
+    return (
+        "**[ GuardDuty 탐지 알림 ]**\n"
+        f"**•Type:** `UnauthorizedAccess:EC2/SSHBruteForce`\n"
+        f"**•심각도:** 5\n"
+        f"**•리소스:** Instance / i-{i:017x}\n"
+        f"**•공격 IP:** 198.51.100.{i % 256}"
+    )
+
+
+def legacy(server, alerts):
+    http = urllib3.PoolManager()
+    delivered = 0
+    for i in range(alerts):
+        response = http.request('POST', server.url, body=json.dumps({"content": alert(i)}).encode(),
+                                headers={"Content-Type": "application/json"})
+        delivered += response.status < 300
+    return delivered
+
+
+def dispatched(server, alerts, sns=None):
+    sender = notifier.Notifier(server.url, topic_arn='arn:aws:sns:ap-northeast-2:000000000000:bench' if sns else '',
+                               sns=sns)
+    for i in range(alerts):
+        sender.add(alert(i), subject="[ALERT] GuardDuty finding")
+    return sender.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--alerts", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=5, help="윈도우당 허용 요청 수")
+    parser.add_argument("--window", type=float, default=1.0, help="레이트 리밋 윈도우(초)")
+    parser.add_argument("--inject", type=float, default=0.1, help="버킷과 무관하게 429를 돌려줄 비율")
+    parser.add_argument("--sns-latency", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = MockDiscord(args.limit, args.window, args.inject, args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"mock webhook: {args.limit} req / {args.window}s per bucket, {args.inject:.0%} injected 429s, "
+          f"{args.alerts} alerts")
+
+    start = time.perf_counter()
+    delivered = legacy(server, args.alerts)
+    elapsed = time.perf_counter() - start
+    print(f"  legacy   : delivered {delivered:4d}/{args.alerts} in {elapsed:5.2f}s "
+          f"({delivered / elapsed:7.1f} alerts/s)  requests={server.requests} 429={server.rejected}")
+    assert server.alerts == delivered
+
+    server.reset()
+    start = time.perf_counter()
+    stats = dispatched(server, args.alerts)
+    elapsed = time.perf_counter() - start
+    print(f"  notifier : delivered {stats['delivered']:4d}/{args.alerts} in {elapsed:5.2f}s "
+          f"({stats['delivered'] / elapsed:7.1f} alerts/s)  requests={server.requests} 429={server.rejected}")
+    assert stats['delivered'] == server.alerts == args.alerts and stats['dropped'] == 0
+
+    # SNS 팬아웃: 순차 발행 vs Notifier 병렬 발행 (Discord 전송과 동시 진행)
+    sns = StubSNS(args.sns_latency)
+    start = time.perf_counter()
+    for i in range(50):
+        sns.publish(Subject="[ALERT] GuardDuty finding", Message=alert(i))
+    sequential = time.perf_counter() - start
+    server.reset()
+    sns = StubSNS(args.sns_latency)
+    start = time.perf_counter()
+    stats = dispatched(server, 50, sns)
+    parallel = time.perf_counter() - start
+    assert sns.published == stats['sns'] == 50
+    print(f"  sns fan-out (50 alerts, {args.sns_latency * 1000:.0f} ms/publish): sequential {sequential:.2f}s, "
+          f"notifier with discord {parallel:.2f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,716 @@
+"""시나리오 Lambda 전체 오프라인 재생 / 부하 테스트 (실제 AWS / Discord / 외부 API 호출 없음)
+
+핸들러마다 합성(또는 --events-dir의 기록된) 이벤트를 lambda_handler에 그대로 넣어 실행한다.
+  - AWS: aws_clients로 만든 실제 boto3 클라이언트 + fake_aws.FakeAWS (botocore 이벤트 훅으로 메모리 상태 응답,
+         파라미터 검증 / 직렬화 / 오류 → 모델 예외 변환은 실제 경로 그대로). 구현되지 않은 API를 부르면 실패로 보고.
+  - HTTP: fake_aws.MockHTTP (Discord 웹훅 204 / AbuseIPDB / FireHOL) - 모든 컨테이너가 같은 서버를 공유
+  - 컨테이너: --concurrency개의 프로세스 (spawn, 프로세스 하나 = Lambda 컨테이너 하나, 호출은 순차 처리)
+    이벤트는 컨테이너에 나눠 넣고, 모듈 import(INIT)와 첫 호출(cold)은 따로 잰다.
+
+이벤트 형식: SNS로 감싼 GuardDuty finding / CloudTrail EventBridge 이벤트 / CloudWatch 알람 메시지,
+  API Gateway 프록시 요청, SQS 배치, S3 ObjectCreated 알림, Step Functions 단계 입력.
+
+출력 (핸들러별)
+  init / cold : 모듈 import 시간 / 첫 호출 시간 (ms, 컨테이너 중앙값)
+  p50 / p99   : 첫 호출을 제외한 호출 지연 (ms)
+  ev/s        : warm 처리량 - 첫 호출을 제외한 이벤트 수 / (가장 늦은 종료 - 첫 호출이 끝난 가장 이른 시각)
+  peak MB     : 컨테이너 최대 RSS (ru_maxrss 최댓값)
+  grow MB     : 첫 호출 이후 마지막 호출까지 RSS 증가 (컨테이너 최댓값 - warm 호출 누수 확인)
+  aws / http  : 이벤트당 AWS API 호출 / HTTP 요청 수
+
+--save로 결과를 JSON으로 남기고, --compare로 이전 결과 대비 p99 증가 / 처리량 감소가 --tolerance를 넘으면
+실패(종료 코드 1)로 본다. 오류 / 구현되지 않은 API 호출이 있어도 종료 코드 1.
+--events-dir에는 "<이름의 / 를 __로>.json"(이벤트 목록) 또는 ".jsonl" 파일을 두면 합성 이벤트 대신 사용한다.
+aws-waf-policy-monitoring은 저장소에 zip만 있고 소스가 없어 제외.
+
+    python shared/bench/replay_bench.py [--events 200] [--concurrency 4] [--only gd/] [--metrics]
+        [--aws-latency 0.02] [--http-latency 0.05] [--events-dir DIR] [--save out.json] [--compare base.json]
+"""
+import argparse
+import contextlib
+import datetime
+import gzip
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHARED = os.path.abspath(os.path.join(HERE, '..'))
+ROOT = os.path.abspath(os.path.join(SHARED, '..'))
+
+WAF = 'advanced-detection-and-response-scenarios/aws-waf-overblocking-mitigation/lambda_zip'
+GD = 'advanced-detection-and-response-scenarios/guardduty-malware-protection/lambda_zips'
+
+REGION = 'ap-northeast-2'
+ACCOUNT = '123456789012'
+TOPIC = f"arn:aws:sns:{REGION}:{ACCOUNT}:security-alerts"
+TARGET = 'i-0f0e0d0c0b0a09080'           # 포렌식 분석 인스턴스
+THREAT_BUCKET = 'threat-intel'
+ARCHIVE_BUCKET = 'guardduty-archive'
+WAF_LOG_BUCKET = 'aws-waf-logs-dvwa'
+TRAIL_BUCKET = 's3-cloudtrail-logbucket'
+BASE_TIME = datetime.datetime(2025, 1, 6, 14, 0, tzinfo=datetime.timezone.utc)   # 23:00 KST (야간 탐지 시간대)
+
+# 모든 컨테이너 공통 환경 변수 ({webhook} 등은 MockHTTP 주소로 치환)
+ENV = {
+    'AWS_DEFAULT_REGION': REGION, 'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+    'METRICS_ENABLED': 'false',
+    'DISCORD_WEBHOOK_URL': '{webhook}', 'SNS_TOPIC_ARN': TOPIC,
+}
+
+GUARDDUTY_TYPES = ['UnauthorizedAccess:EC2/SSHBruteForce', 'Recon:EC2/PortProbeUnprotectedPort',
+                   'CryptoCurrency:EC2/BitcoinTool.B!DNS', 'Backdoor:EC2/C&CActivity.B',
+                   'Trojan:EC2/BlackholeTraffic', 'UnauthorizedAccess:EC2/MaliciousIPCaller.Custom']
+
+
+#--------------------------------------
+# 합성 이벤트
+#--------------------------------------
+def instance_id(rng, missing=0.02):
+    prefix = 'i-0dead' if rng.random() < missing else 'i-0'
+    return prefix + f"{rng.getrandbits(64):016x}"[:19 - len(prefix)]
+
+
+def attacker_ip(rng):
+    """일부는 FireHOL 합성 목록에 등재된 대역 (203.0.113.0/25, 198.51.100.128/25), 나머지는 임의 공인 IP"""
+    roll = rng.random()
+    if roll < 0.3:
+        return f"203.0.113.{rng.randrange(1, 255)}"
+    if roll < 0.5:
+        return f"198.51.100.{rng.randrange(1, 255)}"
+    return f"{rng.choice((45, 61, 89, 103, 185, 194))}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+
+
+def iso(offset_seconds=0, fmt='%Y-%m-%dT%H:%M:%SZ'):
+    return (BASE_TIME + datetime.timedelta(seconds=offset_seconds)).strftime(fmt)
+
+
+def guardduty_event(rng, instance=None):
+    """EventBridge "GuardDuty Finding" 이벤트"""
+    ip = attacker_ip(rng)
+    finding_type = rng.choice(GUARDDUTY_TYPES)
+    instance = instance or instance_id(rng)
+    when = iso(rng.randrange(86400), '%Y-%m-%dT%H:%M:%S.000Z')
+    remote = {'ipAddressV4': ip, 'organization': {'asn': str(rng.randrange(64512)), 'isp': 'Example Hosting'},
+              'country': {'countryName': rng.choice(('Netherlands', 'Russia', 'China', 'United States'))}}
+    detail = {
+        'schemaVersion': '2.0', 'accountId': ACCOUNT, 'region': REGION, 'partition': 'aws',
+        'id': uuid.UUID(int=rng.getrandbits(128)).hex, 'type': finding_type,
+        'arn': f"arn:aws:guardduty:{REGION}:{ACCOUNT}:detector/12abc34d/finding/{rng.getrandbits(128):032x}",
+        'resource': {'resourceType': 'Instance', 'instanceDetails': {
+            'instanceId': instance, 'instanceType': 't3.medium', 'imageId': 'ami-0c9c942bd7bf113a2',
+            'networkInterfaces': [{'privateIpAddress': f"10.0.{rng.randrange(256)}.{rng.randrange(1, 255)}"}]}},
+        'service': {'serviceName': 'guardduty', 'count': rng.randrange(1, 50), 'archived': False,
+                    'eventFirstSeen': when, 'eventLastSeen': when,
+                    'action': {'actionType': 'NETWORK_CONNECTION', 'remoteIpDetails': remote,
+                               'networkConnectionAction': {'connectionDirection': 'INBOUND', 'protocol': 'TCP',
+                                                           'remoteIpDetails': remote,
+                                                           'localPortDetails': {'port': 22, 'portName': 'SSH'}}}},
+        'severity': rng.choice((2, 5, 5.3, 8)), 'createdAt': when, 'updatedAt': when,
+        'title': f"{finding_type} activity on {instance}",
+        'description': f"{ip} is performing {finding_type} against {instance}."
+    }
+    return {'version': '0', 'id': str(uuid.UUID(int=rng.getrandbits(128))), 'detail-type': 'GuardDuty Finding',
+            'source': 'aws.guardduty', 'account': ACCOUNT, 'time': when[:19] + 'Z', 'region': REGION,
+            'resources': [], 'detail': detail}
+
+
+def cloudtrail_event(rng, source, event_name, parameters=None, identity_type='IAMUser', detail_type=None):
+    """EventBridge "AWS API Call via CloudTrail" 이벤트"""
+    user = f"user-{rng.randrange(40)}"
+    when = iso(rng.randrange(86400))
+    arn = f"arn:aws:iam::{ACCOUNT}:root" if identity_type == 'Root' else f"arn:aws:iam::{ACCOUNT}:user/{user}"
+    return {'version': '0', 'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'detail-type': detail_type or 'AWS API Call via CloudTrail', 'source': f"aws.{source}",
+            'account': ACCOUNT, 'time': when, 'region': REGION, 'resources': [],
+            'detail': {'eventVersion': '1.08', 'eventTime': when, 'eventSource': f"{source}.amazonaws.com",
+                       'eventName': event_name, 'awsRegion': REGION, 'sourceIPAddress': attacker_ip(rng),
+                       'userAgent': 'aws-cli/2.15.0', 'recipientAccountId': ACCOUNT, 'eventType': 'AwsApiCall',
+                       'eventID': str(uuid.UUID(int=rng.getrandbits(128))), 'requestParameters': parameters or {},
+                       'responseElements': None,
+                       'userIdentity': {'type': identity_type, 'arn': arn, 'accountId': ACCOUNT,
+                                        'userName': user, 'principalId': f"AIDA{rng.getrandbits(64):016X}"}}}
+
+
+def rule_engine_event(rng):
+    """탐지 규칙 8종 + 탐지 대상이 아닌 일반 API 호출 섞음"""
+    kind = rng.randrange(10)
+    sg = f"sg-0{rng.getrandbits(64):016x}"
+    if kind == 0:
+        event = cloudtrail_event(rng, 'signin', 'ConsoleLogin', identity_type='Root',
+                                 detail_type='AWS Console Sign In via CloudTrail')
+        event['detail']['responseElements'] = {'ConsoleLogin': 'Success'}
+        return event
+    if kind == 1:
+        return cloudtrail_event(rng, 'ec2', 'AuthorizeSecurityGroupIngress', {'groupId': sg, 'ipPermissions': {
+            'items': [{'ipProtocol': 'tcp', 'fromPort': 22, 'toPort': 22,
+                       'ipRanges': {'items': [{'cidrIp': '0.0.0.0/0'}]}}]}})
+    if kind == 2:
+        return cloudtrail_event(rng, 'cloudtrail', 'StopLogging', {'name': 'management-trail'})
+    if kind == 3:
+        return cloudtrail_event(rng, 'iam', rng.choice(('CreateUser', 'DeleteUser')), {'userName': 'backdoor'})
+    if kind == 4:
+        return cloudtrail_event(rng, 'logs', 'DeleteLogGroup', {'logGroupName': '/var/log/secure'})
+    if kind == 5:
+        return cloudtrail_event(rng, 'ec2', 'ModifySnapshotAttribute', {
+            'snapshotId': f"snap-0{rng.getrandbits(64):016x}", 'attributeType': 'CREATE_VOLUME_PERMISSION',
+            'createVolumePermission': {'add': {'items': [{'userId': '210987654321'}]}}})
+    if kind == 6:
+        return cloudtrail_event(rng, 'ec2', 'ModifyImageAttribute', {
+            'imageId': 'ami-0c9c942bd7bf113a2', 'attributeType': 'launchPermission',
+            'launchPermission': {'add': {'items': [{'group': 'all'}]}}})
+    if kind == 7:
+        return {'version': '0', 'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'detail-type': 'Config Rules Compliance Change', 'source': 'aws.config', 'account': ACCOUNT,
+                'time': iso(rng.randrange(86400)), 'region': REGION, 'resources': [],
+                'detail': {'configRuleName': 's3-bucket-public-read-prohibited',
+                           'messageType': 'ComplianceChangeNotification', 'resourceId': f"bucket-{rng.randrange(99)}",
+                           'resourceType': 'AWS::S3::Bucket', 'awsRegion': REGION, 'awsAccountId': ACCOUNT,
+                           'newEvaluationResult': {'complianceType': 'NON_COMPLIANT'},
+                           'oldEvaluationResult': {'complianceType': 'COMPLIANT'}}}
+    return cloudtrail_event(rng, 'ec2', 'DescribeInstances')
+
+
+def alarm_message(rng, instance=None):
+    """CloudWatch 알람 상태 변경 SNS 메시지 (InstanceId 차원 포함)"""
+    instance = instance or instance_id(rng)
+    return {'AlarmName': 'bash-history-tampering', 'AlarmDescription': '.bash_history 삭제 / 변조 탐지',
+            'AWSAccountId': ACCOUNT, 'NewStateValue': 'ALARM', 'OldStateValue': 'OK', 'Region': 'Asia Pacific (Seoul)',
+            'NewStateReason': 'Threshold Crossed: 1 datapoint [1.0] was greater than or equal to the threshold (1.0).',
+            'StateChangeTime': iso(rng.randrange(86400), '%Y-%m-%dT%H:%M:%S.000+0000'),
+            'Trigger': {'MetricName': 'BashHistoryTampering', 'Namespace': 'Security', 'StatisticType': 'Statistic',
+                        'Statistic': 'SUM', 'Period': 60, 'EvaluationPeriods': 1, 'Threshold': 1.0,
+                        'ComparisonOperator': 'GreaterThanOrEqualToThreshold',
+                        'Dimensions': [{'name': 'InstanceId', 'value': instance}]}}
+
+
+def sns(messages, rng):
+    """SNS → Lambda 이벤트 (메시지 여러 건이면 Records 여러 개)"""
+    return {'Records': [{
+        'EventSource': 'aws:sns', 'EventVersion': '1.0',
+        'EventSubscriptionArn': f"{TOPIC}:{uuid.UUID(int=rng.getrandbits(128))}",
+        'Sns': {'Type': 'Notification', 'MessageId': str(uuid.UUID(int=rng.getrandbits(128))), 'TopicArn': TOPIC,
+                'Subject': None, 'Message': json.dumps(message), 'Timestamp': iso(), 'SignatureVersion': '1',
+                'MessageAttributes': {}}} for message in messages]}
+
+
+def sqs(bodies, rng, queue='ingest'):
+    return {'Records': [{
+        'messageId': str(uuid.UUID(int=rng.getrandbits(128))), 'receiptHandle': f"AQEB{rng.getrandbits(128):032x}",
+        'body': body if isinstance(body, str) else json.dumps(body), 'md5OfBody': '',
+        'attributes': {'ApproximateReceiveCount': '1', 'SentTimestamp': str(int(BASE_TIME.timestamp() * 1000))},
+        'messageAttributes': {}, 'eventSource': 'aws:sqs', 'awsRegion': REGION,
+        'eventSourceARN': f"arn:aws:sqs:{REGION}:{ACCOUNT}:{queue}"} for body in bodies]}
+
+
+def s3_event(bucket, key, size=0):
+    return {'Records': [{'eventVersion': '2.1', 'eventSource': 'aws:s3', 'awsRegion': REGION, 'eventTime': iso(),
+                         'eventName': 'ObjectCreated:Put',
+                         's3': {'s3SchemaVersion': '1.0', 'bucket': {'name': bucket, 'arn': f"arn:aws:s3:::{bucket}"},
+                                'object': {'key': key, 'size': size, 'eTag': uuid.uuid4().hex}}}]}
+
+
+def api_gateway(payload, rng):
+    """API Gateway REST 프록시 통합 요청"""
+    return {'resource': '/block', 'path': '/block', 'httpMethod': 'POST', 'isBase64Encoded': False,
+            'headers': {'Content-Type': 'application/json', 'User-Agent': 'waf-detector/1.0'},
+            'queryStringParameters': None, 'pathParameters': None,
+            'requestContext': {'requestId': str(uuid.UUID(int=rng.getrandbits(128))), 'stage': 'prod',
+                               'identity': {'sourceIp': '10.0.0.15'}},
+            'body': json.dumps(payload)}
+
+
+def block_request(rng):
+    count = 1 if rng.random() < 0.7 else rng.randrange(2, 20)
+    return {'ips': [attacker_ip(rng) for _ in range(count)], 'rule_id': 'sqli-burst',
+            'event_count': rng.randrange(1, 500), 'timestamp': iso(rng.randrange(86400))}
+
+
+def trace(rng):
+    return {'id': f"exec-{rng.getrandbits(32):08x}", 'start': time.time() - rng.uniform(1, 30)}
+
+
+def snapshot_stage(rng, instance):
+    started = time.time() - rng.uniform(10, 300)
+    volumes = [('/dev/xvda', True)] + [(f"/dev/sd{c}", False) for c in 'fg'[:rng.randrange(3)]]
+    snapshots = [{'volume_id': f"vol-0{rng.getrandbits(64):016x}", 'snapshot_id': f"snap-0{rng.getrandbits(64):016x}",
+                  'device': device, 'root': root, 'size_gib': 8 if root else 100, 'state': 'pending',
+                  'progress': f"{rng.randrange(100)}%", 'started_at': started, 'elapsed_seconds': 0.0}
+                 for device, root in volumes]
+    return {'snapshots': snapshots, 'snapshot_id': snapshots[0]['snapshot_id'],
+            'snapshot_ids': [s['snapshot_id'] for s in snapshots], 'instance_id': instance,
+            'image_id': 'ami-0c9c942bd7bf113a2', 'polls': rng.randrange(4), 'trace': trace(rng)}
+
+
+def discord_stage(rng):
+    instance = instance_id(rng, missing=0)
+    stage = snapshot_stage(rng, instance)
+    return dict(stage, s3_bucket='forensic-artifacts', s3_key_prefix=instance, isolation_status='격리 완료',
+                provision_seconds={'create_volume': 3.2, 'available': 6.8, 'attach': 2.1},
+                collection_seconds={'queued': 1.2, 'execution': 32.4, 'detection_lag': 4.9},
+                collection_summary={'artifacts': {name: 'ok' for name in ('bash_history', 'auth_log', 'crontab',
+                                                                          'processes', 'network', 'hashes')},
+                                    'hash_deviations': rng.randrange(5), 'bytes': 48213954})
+
+
+def waf_log_key(index):
+    return f"waf/2025/01/06/14/aws-waf-logs-dvwa-1-2025-01-06-14-{index:06d}.gz"
+
+
+def trail_key(index):
+    return f"AWSLogs/{ACCOUNT}/CloudTrail/{REGION}/2025/01/06/{ACCOUNT}_CloudTrail_{REGION}_{index:06d}.json.gz"
+
+
+def compact_day(index):
+    return (datetime.date(2024, 1, 1) + datetime.timedelta(days=index)).isoformat()
+
+
+#--------------------------------------
+# 컨테이너 준비 (이벤트가 가리키는 S3 객체 / 위협 인덱스 / IPSet 등을 가짜 AWS에 미리 넣음)
+#--------------------------------------
+def seed_threat_index(fake, events):
+    import fake_aws
+    fake.put(THREAT_BUCKET, 'threat/malicious-ip-list.idx', fake_aws.threat_index())
+
+
+def seed_waf_logs(fake, events, lines=500):
+    """로그 객체마다 1분 분량 (정상 허용 / 공격 차단 / 일부 과차단 룰)"""
+    import fake_aws
+    for event in events:
+        key = event['Records'][0]['s3']['object']['key']
+        index = int(key.rsplit('-', 1)[1].split('.')[0])
+        rng = random.Random(index)
+        start = int(BASE_TIME.timestamp()) + index * 60
+        records = []
+        for i in range(lines):
+            blocked = rng.random() < 0.15
+            rule = rng.choice(('managed-core', 'rate-limit', 'sqli')) if blocked else 'Default_Action'
+            request = {'clientIp': attacker_ip(rng) if blocked else f"211.{rng.randrange(40)}.{rng.randrange(256)}.9",
+                       'country': 'KR', 'headers': [{'name': 'Host', 'value': 'alb-dvwa.example.com'}],
+                       'uri': rng.choice(('/', '/login.php', '/vulnerabilities/sqli/', '/index.php')),
+                       'args': '', 'httpVersion': 'HTTP/1.1', 'httpMethod': 'GET',
+                       'requestId': f"1-{rng.getrandbits(32):08x}-{rng.getrandbits(96):024x}"}
+            records.append({
+                'timestamp': (start + i * 60 // lines) * 1000 + rng.randrange(1000), 'formatVersion': 1,
+                'webaclId': f"arn:aws:wafv2:{REGION}:{ACCOUNT}:regional/webacl/waf-dvwa/0f1e2d3c",
+                'terminatingRuleId': rule,
+                'terminatingRuleType': 'MANAGED_RULE_GROUP' if rule == 'managed-core' else
+                ('REGULAR' if blocked else 'DEFAULT'),
+                'action': 'BLOCK' if blocked else 'ALLOW', 'terminatingRuleMatchDetails': [],
+                'httpSourceName': 'ALB', 'httpSourceId': f"{ACCOUNT}-app/alb-dvwa/50dc6c495c0c9188",
+                'ruleGroupList': [{'ruleGroupId': 'AWS#AWSManagedRulesCommonRuleSet',
+                                   'terminatingRule': {'ruleId': 'SizeRestrictions_BODY', 'action': 'BLOCK'}
+                                   if rule == 'managed-core' else None}],
+                'rateBasedRuleList': [], 'nonTerminatingMatchingRules': [], 'httpRequest': request, 'labels': []})
+        fake.put(WAF_LOG_BUCKET, key, fake_aws.gzip_json_lines(records))
+
+
+def seed_trails(fake, events, records=200):
+    """CloudTrail 로그 파일 ({"Records": [...]} gzip) - 일부는 야간 탐지 대상 API"""
+    for event in events:
+        key = event['Records'][0]['s3']['object']['key']
+        rng = random.Random(key)
+        items = []
+        for _ in range(records):
+            name = rng.choice(('DescribeInstances', 'GetObject', 'AssumeRole', 'ListBuckets', 'ConsoleLogin'))
+            if rng.random() < 0.02:
+                name = rng.choice(('CreateAccessKey', 'CreateUser', 'DeleteAccessKey'))
+            items.append(cloudtrail_event(rng, 'iam', name)['detail'])
+        fake.put(TRAIL_BUCKET, key, gzip.compress(json.dumps({'Records': items}).encode(), 6))
+
+
+def seed_archive(fake, events, partitions=2, objects=4, findings=5):
+    """날짜마다 파티션 여러 개에 작은 NDJSON 객체 (업로드 Lambda가 배치마다 쓴 것과 같은 형식)"""
+    import finding_archive
+    prefix = 'guardduty/findings/'
+    for event in events:
+        rng = random.Random(event['day'])
+        for p in range(partitions):
+            items = []
+            for _ in range(objects * findings):
+                finding = finding_archive.unwrap(guardduty_event(rng))
+                finding['type'] = GUARDDUTY_TYPES[p]
+                finding['updatedAt'] = f"{event['day']}T{rng.randrange(24):02d}:00:00.000Z"
+                items.append(finding)
+            directory = finding_archive.partition(items[0], prefix)
+            for o in range(objects):
+                body = finding_archive.encode(items[o * findings:(o + 1) * findings])
+                fake.put(ARCHIVE_BUCKET, f"{directory}{uuid.UUID(int=rng.getrandbits(128)).hex}.ndjson.gz", body)
+
+
+def seed_firehol(fake, events):
+    """직전 실행이 올린 목록 (diff 대상)"""
+    import fake_aws
+    text = "\n".join(fake_aws.firehol_lines(version=1)) + "\n"
+    fake.put('s3-ip-list-bucket-tf', 'malicious-ip-list.txt', text, content_type='text/plain')
+
+
+#--------------------------------------
+# 시나리오
+#--------------------------------------
+def scenario(name, directory, module, events, handler='lambda_handler', env=None, prepare=None, patch=None,
+             check=None):
+    """events(rng, index) → 이벤트 하나, prepare(fake, events): import 전 상태 준비,
+    patch(module, urls): 모듈 상수(외부 URL) 교체, check(result): 결과가 정상이면 True"""
+    return {'name': name, 'dir': directory, 'module': module, 'handler': handler, 'events': events,
+            'env': env or {}, 'prepare': prepare, 'patch': patch, 'check': check}
+
+
+def ok_status(result):
+    return isinstance(result, dict) and result.get('statusCode', 200) < 300
+
+
+def no_failures(result):
+    return isinstance(result, dict) and not result.get('batchItemFailures')
+
+
+def patch_abuseipdb(module, urls):
+    module.ABUSEIPDB_URL = urls['abuseipdb']
+
+
+def patch_firehol(module, urls):
+    module.FIREHOL_URL = urls['firehol']
+
+
+THREAT_ENV = {'THREAT_LIST_BUCKET': THREAT_BUCKET}
+IPSET_ENV = {'IPSET_NAME': 'blocked-ips', 'IPSET_ID': '0a1b2c3d-4e5f-6071-8293-a4b5c6d7e8f9'}
+
+SCENARIOS = [
+    scenario('waf/lambda-discord', WAF, 'lambda-discord', lambda rng, i: discord_stage(rng),
+             env={'WEBHOOK_URL': '{webhook}'}),
+    scenario('waf/lambda-discord:failure', WAF, 'lambda-discord',
+             lambda rng, i: {'failure': rng.choice(['snapshot', 'collection']), 'instance_id': instance_id(rng, missing=0),
+                             'snapshot_id': f"snap-0{rng.getrandbits(64):016x}", 'isolation_status': '격리 완료',
+                             'status': 'Failed', 'error': 'mount: wrong fs type', 'trace': trace(rng)},
+             env={'WEBHOOK_URL': '{webhook}'}, check=lambda r: r.get('status') == 'failed'),
+    scenario('waf/lambda-ebs', WAF, 'lambda-ebs',
+             lambda rng, i: {'instance_id': instance_id(rng, missing=0), 'trace': trace(rng)},
+             check=lambda r: bool(r.get('snapshot_ids'))),
+    scenario('waf/lambda-ebs-status', WAF, 'lambda-ebs-status',
+             lambda rng, i: snapshot_stage(rng, instance_id(rng, missing=0)), check=lambda r: r.get('complete')),
+    scenario('waf/lambda-ebs-attach', WAF, 'lambda-ebs-attach',
+             lambda rng, i: {'snapshot_id': f"snap-0{rng.getrandbits(64):016x}", 'trace': trace(rng)},
+             env={'TARGET_INSTANCE_ID': TARGET}, check=lambda r: bool(r.get('attached_volume_id'))),
+    scenario('waf/lambda-ebs-attach:fsr', WAF, 'lambda-ebs-attach',
+             lambda rng, i: {'snapshot_id': f"snap-0{rng.getrandbits(64):016x}", 'trace': trace(rng)},
+             env={'TARGET_INSTANCE_ID': TARGET, 'FAST_SNAPSHOT_RESTORE': 'true'},
+             check=lambda r: r.get('ready') is False and r.get('fsr', {}).get('state') == 'enabling'),
+    scenario('waf/lambda-ebs-cleanup', WAF, 'lambda-ebs-cleanup',
+             lambda rng, i: {'volume_id': f"vol-0{rng.getrandbits(64):016x}", 'collection_failed': rng.random() < 0.1,
+                             'trace': trace(rng)},
+             check=lambda r: r.get('detached') and not r.get('deleted')),
+    scenario('waf/lambda-ebs-cleanup:delete', WAF, 'lambda-ebs-cleanup',
+             lambda rng, i: {'volume_id': f"vol-0{rng.getrandbits(64):016x}", 'collection_failed': rng.random() < 0.1,
+                             'trace': trace(rng)},
+             env={'DELETE_VOLUME': 'true'}, check=lambda r: r.get('deleted')),
+    scenario('waf/lambda-isolated-sg', WAF, 'lambda-isolated-sg',
+             lambda rng, i: ({'instance_id': instance_id(rng, missing=0)} if rng.random() < 0.8 else
+                             {'instance_ids': [instance_id(rng) for _ in range(rng.randrange(2, 8))]}),
+             env={'ISOLATION_SG_ID': 'sg-0badc0ffee0ddf00d'}),
+    scenario('waf/lambda-ssm', WAF, 'lambda-ssm',
+             lambda rng, i: {'volume_id': f"vol-0{rng.getrandbits(64):016x}", 'device': '/dev/sdf',
+                             'instance_id': instance_id(rng, missing=0), 'provisioned_at': time.time(),
+                             'image_id': 'ami-0c9c942bd7bf113a2', 'trace': trace(rng)},
+             env={'TARGET_INSTANCE_ID': TARGET, 'COLLECTOR_DOCUMENT': 'forensic-collector',
+                  'S3_BUCKET_NAME': 'forensic-artifacts'}),
+    scenario('waf/lambda-ssm-status', WAF, 'lambda-ssm-status',
+             lambda rng, i: {'command_id': (f"missing-{rng.getrandbits(112):028x}" if rng.random() < 0.1 else
+                                            str(uuid.UUID(int=rng.getrandbits(128)))),
+                             'instance_id': TARGET, 'sent_at': time.time() - rng.uniform(5, 60),
+                             'polls': rng.randrange(5), 'trace': trace(rng)}),
+    # 호출 기록이 끝내 생기지 않는 명령: MAX_POLLS번째 조회에서 실패로 끝나 상태 머신 루프를 빠져나감
+    scenario('waf/lambda-ssm-status:stuck', WAF, 'lambda-ssm-status',
+             lambda rng, i: {'command_id': f"missing-{rng.getrandbits(112):028x}", 'instance_id': TARGET,
+                             'sent_at': time.time() - 3600, 'polls': 239, 'trace': trace(rng)},
+             check=lambda r: r.get('failed') and 'polls' in r.get('error', '')),
+    scenario('waf/lambda-upload-findings-to-s3', WAF, 'lambda-upload-findings-to-s3',
+             lambda rng, i: sqs([guardduty_event(rng) for _ in range(rng.randrange(1, 11))], rng, 'findings'),
+             env={'S3_BUCKET': ARCHIVE_BUCKET}, check=no_failures),
+    scenario('waf/lambda-compact-findings', WAF, 'lambda-compact-findings', lambda rng, i: {'day': compact_day(i)},
+             env={'S3_BUCKET': ARCHIVE_BUCKET}, prepare=seed_archive, check=lambda r: r.get('merged')),
+    scenario('gd/abuseipdb_lookup_lambda', GD, 'abuseipdb_lookup_lambda',
+             lambda rng, i: {'ip': attacker_ip(rng), 'rule_id': 'sqli-burst', 'trace': trace(rng)},
+             env=dict(THREAT_ENV, ABUSEIPDB_API_KEY='testing', ABUSEIPDB_RATE_PER_SEC='1000'),
+             prepare=seed_threat_index, patch=patch_abuseipdb, check=lambda r: 'abuse_score' in r),
+    scenario('gd/abuseipdb_lookup_lambda:batch', GD, 'abuseipdb_lookup_lambda',
+             lambda rng, i: {'ips': [attacker_ip(rng) for _ in range(rng.randrange(5, 40))]}, handler='batch_handler',
+             env=dict(THREAT_ENV, ABUSEIPDB_API_KEY='testing', ABUSEIPDB_RATE_PER_SEC='1000'),
+             prepare=seed_threat_index, patch=patch_abuseipdb, check=lambda r: bool(r.get('results'))),
+    scenario('gd/discord_notify_lambda', GD, 'discord_notify_lambda',
+             lambda rng, i: {'results': [{'ip': attacker_ip(rng), 'abuse_score': str(rng.randrange(101)),
+                                          'isp': 'Example Hosting', 'countryCode': 'NL', 'domain': 'example.net',
+                                          'total_reports': str(rng.randrange(500)), 'is_hosting': True,
+                                          'usage_type': 'Data Center/Web Hosting/Transit', 'trace': trace(rng)}
+                                         for _ in range(rng.randrange(1, 6))]}),
+    scenario('gd/gateway_trigger_lambda', GD, 'gateway_trigger_lambda',
+             lambda rng, i: api_gateway(block_request(rng), rng),
+             env=dict(THREAT_ENV, STEP_FUNCTION_ARN=f"arn:aws:states:{REGION}:{ACCOUNT}:stateMachine:waf-block"),
+             prepare=seed_threat_index, check=ok_status),
+    scenario('gd/gateway_trigger_lambda:batch', GD, 'gateway_trigger_lambda',
+             lambda rng, i: sqs([dict(block_request(rng)) for _ in range(rng.randrange(1, 11))], rng),
+             handler='batch_handler',
+             env=dict(THREAT_ENV, STEP_FUNCTION_ARN=f"arn:aws:states:{REGION}:{ACCOUNT}:stateMachine:waf-block"),
+             prepare=seed_threat_index, check=no_failures),
+    scenario('gd/ipset_add_lambda', GD, 'ipset_add_lambda',
+             lambda rng, i: ({'ip': attacker_ip(rng), 'trace': trace(rng)} if rng.random() < 0.7 else
+                             {'ips': [attacker_ip(rng) for _ in range(rng.randrange(2, 30))], 'trace': trace(rng)}),
+             env=IPSET_ENV, check=lambda r: r.get('status') not in ('error', 'failed')),
+    scenario('gd/ipset_flush_lambda', GD, 'ipset_flush_lambda',
+             lambda rng, i: sqs([{'ip': attacker_ip(rng), 'trace': trace(rng)} if rng.random() < 0.8 else
+                                 {'ips': [attacker_ip(rng) for _ in range(5)]} for _ in range(rng.randrange(1, 11))],
+                                rng, 'ipset-updates'),
+             env=IPSET_ENV, check=no_failures),
+    scenario('gd/waf_log_analyzer_lambda', GD, 'waf_log_analyzer_lambda',
+             lambda rng, i: s3_event(WAF_LOG_BUCKET, waf_log_key(i)),
+             env={'ANALYTICS_BUCKET': 'waf-analytics'}, prepare=seed_waf_logs,
+             check=lambda r: r.get('records', 0) > 0),
+    scenario('rule-engine', 'detection-and-alert-scenarios/rule-engine', 'lambda_function',
+             lambda rng, i: sns([rule_engine_event(rng) for _ in range(rng.randrange(1, 4))], rng), check=ok_status),
+    scenario('security-group-policy-change', 'detection-and-alert-scenarios/security-group-policy-change', 'lambda',
+             lambda rng, i: sns([cloudtrail_event(rng, 'ec2', rng.choice((
+                 'AuthorizeSecurityGroupIngress', 'RevokeSecurityGroupIngress', 'DeleteSecurityGroup')),
+                 {'groupId': f"sg-0{rng.getrandbits(64):016x}"}) for _ in range(rng.randrange(1, 4))], rng),
+             env=THREAT_ENV, prepare=seed_threat_index),
+    scenario('log-group-change-detect', 'detection-and-alert-scenarios/log-group-change-detect', 'lambda_function',
+             lambda rng, i: sns([cloudtrail_event(rng, 'logs', rng.choice(('DeleteLogGroup', 'PutRetentionPolicy')),
+                                                  {'logGroupName': '/aws/lambda/security'})], rng),
+             env={'HOOK_URL': '{webhook}'}),
+    scenario('athena/lambda_function', 'response-scenarios/athena-cloudtail-api-abuse', 'lambda_function',
+             lambda rng, i: {'version': '0', 'detail-type': 'Scheduled Event', 'source': 'aws.events',
+                             'account': ACCOUNT, 'time': iso(), 'region': REGION, 'detail': {}},
+             env={'DISCORD_WEBHOOK': '{webhook}'}),      # 워터마크 없음 → 매 호출 LOOKBACK 구간 조회
+    scenario('athena/stream_detector', 'response-scenarios/athena-cloudtail-api-abuse', 'stream_detector',
+             lambda rng, i: s3_event(TRAIL_BUCKET, trail_key(i)),
+             env={'DISCORD_WEBHOOK': '{webhook}'}, prepare=seed_trails),
+    scenario('ec2-bash-history-tampering', 'response-scenarios/ec2-bash-history-tampering', 'lambda_function',
+             lambda rng, i: sns([alarm_message(rng) for _ in range(rng.randrange(1, 3))], rng),
+             env={'ISOLATED_SG_ID': 'sg-0badc0ffee0ddf00d', 'EC2_ID': TARGET}, check=ok_status),
+    scenario('ec2-malicious-activity-isolation', 'response-scenarios/ec2-malicious-activity-isolation',
+             'lambda_function', lambda rng, i: sns([guardduty_event(rng) for _ in range(rng.randrange(1, 4))], rng),
+             env={'ISOLATED_SG_ID': 'sg-0badc0ffee0ddf00d'}),
+    scenario('threat-ip/discord_and_ec2_alarm',
+             'response-scenarios/guardduty-threat-ip-monitoring/lambda/discord_and_ec2_alarm', 'lambda_function',
+             lambda rng, i: guardduty_event(rng), env=THREAT_ENV, prepare=seed_threat_index, check=ok_status),
+    scenario('threat-ip/update_ip_list', 'response-scenarios/guardduty-threat-ip-monitoring/lambda/update_ip_list',
+             'lambda_function', lambda rng, i: {'version': '0', 'detail-type': 'Scheduled Event',
+                                                'source': 'aws.events', 'time': iso(), 'detail': {}},
+             prepare=seed_firehol, patch=patch_firehol),
+]
+
+
+#--------------------------------------
+# 컨테이너 (자식 프로세스)
+#--------------------------------------
+class FakeContext:
+    """Lambda 컨텍스트 객체 (notifier.deadline_from 등이 쓰는 속성만)"""
+
+    def __init__(self, name, timeout=60.0):
+        self.function_name = name
+        self.aws_request_id = str(uuid.uuid4())
+        self.invoked_function_arn = f"arn:aws:lambda:{REGION}:{ACCOUNT}:function:{name}"
+        self.memory_limit_in_mb = 512
+        self._deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return int((self._deadline - time.monotonic()) * 1000)
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+
+
+def container(name, events, env, urls, options, barrier, results):
+    spec = next(s for s in SCENARIOS if s['name'] == name)
+    os.environ.update(env)
+    sys.path[:0] = [os.path.join(ROOT, spec['dir']), SHARED, HERE]
+    import fake_aws
+
+    fake = fake_aws.FakeAWS(latency=options['aws_latency']).install()
+    if spec['prepare']:
+        spec['prepare'](fake, events)
+    report = {'latencies': [], 'errors': 0, 'error': None}
+    # 핸들러 로그(print / EMF)는 버림 - 출력 비용은 CloudWatch Logs 쪽이라 측정에서 제외
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        module = importlib.import_module(spec['module'])
+        report['init'] = time.perf_counter() - start
+        if spec['patch']:
+            spec['patch'](module, urls)
+        handler = getattr(module, spec['handler'])
+        fake.calls.clear()
+        barrier.wait()
+
+        for i, event in enumerate(events):
+            start = time.perf_counter()
+            try:
+                result = handler(event, FakeContext(name.split('/')[-1]))
+                if spec['check'] and not spec['check'](result):
+                    raise AssertionError(f"unexpected result: {json.dumps(result, default=str)[:300]}")
+            except Exception as e:
+                report['errors'] += 1
+                report['error'] = report['error'] or f"{type(e).__name__}: {e}"[:300]
+            report['latencies'].append(time.perf_counter() - start)
+            if i == 0:
+                warm_rss = rss_mb()
+                report['start'] = time.time()
+        report['end'] = time.time()
+    report['growth'] = rss_mb() - warm_rss if events else 0.0
+    report['peak'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    report['aws_calls'] = sum(fake.calls.values())
+    report['missing'] = sorted(fake.missing)
+    results.put(report)
+
+
+#--------------------------------------
+# 실행 / 집계
+#--------------------------------------
+def load_events(spec, args, rng):
+    if args.events_dir:
+        base = os.path.join(args.events_dir, spec['name'].replace('/', '__').replace(':', '_'))
+        if os.path.exists(base + '.json'):
+            with open(base + '.json') as f:
+                return json.load(f)
+        if os.path.exists(base + '.jsonl'):
+            with open(base + '.jsonl') as f:
+                return [json.loads(line) for line in f if line.strip()]
+    return [spec['events'](rng, i) for i in range(args.events)]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def run(spec, args, server):
+    rng = random.Random(f"{args.seed}:{spec['name']}")
+    events = load_events(spec, args, rng)
+    urls = {'webhook': f"{server.url}/webhook/{spec['name']}", 'abuseipdb': f"{server.url}/abuseipdb",
+            'firehol': f"{server.url}/firehol"}
+    env = {k: v.format(**urls) for k, v in dict(ENV, **spec['env']).items()}
+    if args.metrics:
+        env['METRICS_ENABLED'] = 'true'
+
+    containers = max(1, min(args.concurrency, len(events)))
+    ctx = multiprocessing.get_context('spawn')
+    barrier, results = ctx.Barrier(containers), ctx.Queue()
+    options = {'aws_latency': args.aws_latency}
+    server.reset()
+    procs = [ctx.Process(target=container, args=(spec['name'], events[c::containers], env, urls, options,
+                                                  barrier, results)) for c in range(containers)]
+    for proc in procs:
+        proc.start()
+    reports = []
+    for proc in procs:
+        try:
+            reports.append(results.get(timeout=args.timeout))
+        except Exception:
+            break
+    for proc in procs:
+        proc.join(5)
+        if proc.is_alive():
+            proc.kill()
+    if len(reports) < containers:
+        codes = [proc.exitcode for proc in procs]
+        return {'name': spec['name'], 'events': len(events), 'errors': len(events),
+                'error': f"container exited without a report (exit codes {codes})", 'missing': []}
+
+    http = server.reset()
+    warm = [t for r in reports for t in r['latencies'][1:]] or [t for r in reports for t in r['latencies']]
+    elapsed = max(r['end'] for r in reports) - min(r['start'] for r in reports)
+    warm_events = len(events) - len(reports)
+    return {
+        'name': spec['name'], 'events': len(events), 'containers': containers,
+        'init_ms': statistics.median(r['init'] for r in reports) * 1000,
+        'cold_ms': statistics.median(r['latencies'][0] for r in reports) * 1000,
+        'p50_ms': percentile(warm, 0.50) * 1000, 'p99_ms': percentile(warm, 0.99) * 1000,
+        'throughput': warm_events / max(elapsed, 1e-9) if warm_events else 0.0,
+        'peak_mb': max(r['peak'] for r in reports), 'growth_mb': max(r['growth'] for r in reports),
+        'aws_per_event': sum(r['aws_calls'] for r in reports) / len(events),
+        'http_per_event': sum(v for k, v in http.items() if k != 'embeds') / len(events),
+        'errors': sum(r['errors'] for r in reports),
+        'error': next((r['error'] for r in reports if r['error']), None),
+        'missing': sorted({m for r in reports for m in r['missing']}),
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    for r in results:
+        base = previous.get(r['name'])
+        if not base or 'p99_ms' not in base or 'p99_ms' not in r:
+            continue
+        if r['p99_ms'] > base['p99_ms'] * (1 + tolerance) and r['p99_ms'] - base['p99_ms'] > 1.0:
+            found.append(f"{r['name']}: p99 {base['p99_ms']:.1f} → {r['p99_ms']:.1f} ms")
+        if r['throughput'] < base['throughput'] * (1 - tolerance):
+            found.append(f"{r['name']}: ev/s {base['throughput']:.0f} → {r['throughput']:.0f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=200, help='핸들러당 합성 이벤트 수')
+    parser.add_argument('--concurrency', type=int, default=4, help='동시 컨테이너(프로세스) 수')
+    parser.add_argument('--only', help='이름에 이 문자열이 들어간 핸들러만')
+    parser.add_argument('--events-dir', help='기록된 이벤트 디렉터리 (<이름>.json / .jsonl, 이름의 / 는 __)')
+    parser.add_argument('--metrics', action='store_true', help='EMF 지표 기록 켜기 (METRICS_ENABLED=true)')
+    parser.add_argument('--aws-latency', type=float, default=0.0, help='AWS API 호출마다 더할 지연(초)')
+    parser.add_argument('--http-latency', type=float, default=0.0, help='웹훅 / 외부 API 응답 지연(초)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=600, help='핸들러당 최대 실행 시간(초)')
+    parser.add_argument('--save', help='결과 JSON 저장 경로')
+    parser.add_argument('--compare', help='이전 --save 결과 (p99 / 처리량 회귀 확인)')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='회귀로 보는 비율 (작은 값은 잡음에 걸림)')
+    args = parser.parse_args()
+
+    specs = [s for s in SCENARIOS if not args.only or args.only in s['name']]
+    sys.path.insert(0, SHARED)
+    import fake_aws
+    server = fake_aws.MockHTTP(latency=args.http_latency).start()
+
+    print(f"replay: {args.events} events/handler, {args.concurrency} containers, aws latency {args.aws_latency}s, "
+          f"http latency {args.http_latency}s, metrics {'on' if args.metrics else 'off'}")
+    print(f"{'handler':<36} {'init':>6} {'cold':>7} {'p50':>7} {'p99':>7} {'ev/s':>8} {'peak MB':>8} "
+          f"{'grow MB':>8} {'aws':>5} {'http':>5}  errors")
+    results = []
+    try:
+        for spec in specs:
+            r = run(spec, args, server)
+            results.append(r)
+            if 'p99_ms' not in r:
+                print(f"{r['name']:<36} {r['error']}")
+                continue
+            print(f"{r['name']:<36} {r['init_ms']:6.0f} {r['cold_ms']:7.1f} {r['p50_ms']:7.2f} {r['p99_ms']:7.2f} "
+                  f"{r['throughput']:8.0f} {r['peak_mb']:8.1f} {r['growth_mb']:8.1f} {r['aws_per_event']:5.1f} "
+                  f"{r['http_per_event']:5.1f}  {r['errors']}" + (f"  ({r['error']})" if r['error'] else ''))
+            if r['missing']:
+                print(f"{'':<36} not implemented in FakeAWS: {', '.join(r['missing'])}")
+    finally:
+        server.stop()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+    failed = [r['name'] for r in results if r['errors'] or r['missing']]
+    found = []
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"regression: {line}")
+    if failed:
+        print(f"failed: {', '.join(failed)}")
+    if failed or found:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""SSM 명령 완료 추적 비교 (stub SSM + 가짜 시계, AWS 호출 없음)
+
+수집 명령마다 전송 → 실행 시작 지연, 실행 시간, 최종 상태를 정해 두고 다음 방식을 재생한다.
+
+  fire-and-forget : 기존처럼 send_command 직후 다음 단계로 진행 (완료 전에 알림 → 결과 누락)
+  padded wait     : 최악의 경우에 맞춘 고정 Wait(--padded초) 후 다음 단계 (실패 / 초과도 알 수 없음)
+  fixed poll      : 15초 고정 간격 조회
+  tracker         : ssm_command.update_progress의 wait_seconds (2초부터 경과 시간의 절반, 최대 30초)
+
+명령별로 다음 단계 시작 시각, 완료를 늦게 알아챈 시간, 조회 횟수, 최종 상태를 출력하고
+tracker가 실패 / 시간 초과 / 아직 등록되지 않은 호출(InvocationDoesNotExist)을 올바르게 처리하는지 확인한다.
+
+    python shared/bench/ssm_command_bench.py [--padded 300]
+"""
+import argparse
+import datetime
+import os
+import sys
+
+from botocore.exceptions import ClientError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+import ssm_command  # noqa: E402
+
+# (이름, 호출 등록 지연, 실행 시작 지연, 실행 시간, 최종 상태, StatusDetails)
+COMMANDS = [
+    ("fast collect", 0.5, 1, 8, 'Success', 'Success'),
+    ("typical collect", 0.5, 2, 45, 'Success', 'Success'),
+    ("large volume", 1, 3, 420, 'Success', 'Success'),
+    ("script failure", 0.5, 2, 20, 'Failed', 'Failed'),
+    ("execution timeout", 0.5, 2, 900, 'TimedOut', 'ExecutionTimedOut'),
+    ("agent offline", 3, None, 180, 'TimedOut', 'DeliveryTimedOut'),
+]
+INVOKE_SECONDS = 0.3
+FIXED_POLL = 15
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def iso(epoch):
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class StubSSM:
+    """명령 하나를 정해진 일정대로 진행시키는 SSM stub"""
+
+    def __init__(self, clock, sent_at, register, start, duration, final, details):
+        self.clock = clock
+        self.sent_at = sent_at
+        self.register = register
+        self.start = start
+        self.duration = duration
+        self.final = final
+        self.details = details
+        self.calls = 0
+
+    def end_time(self):
+        return self.sent_at + (self.start or 0) + self.duration
+
+    def get_command_invocation(self, CommandId, InstanceId):
+        self.calls += 1
+        elapsed = self.clock() - self.sent_at
+        if elapsed < self.register:
+            raise ClientError({'Error': {'Code': 'InvocationDoesNotExist', 'Message': 'stub'}}, 'GetCommandInvocation')
+        response = {'CommandId': CommandId, 'InstanceId': InstanceId, 'Status': 'Pending', 'StatusDetails': 'Pending',
+                    'ResponseCode': -1, 'ExecutionStartDateTime': '', 'ExecutionEndDateTime': '',
+                    'StandardOutputContent': '', 'StandardErrorContent': ''}
+        if self.start is None:                          # 에이전트가 명령을 받지 못함
+            if self.clock() >= self.end_time():
+                response.update(Status=self.final, StatusDetails=self.details)
+            return response
+        started = self.sent_at + self.start
+        if self.clock() < started:
+            return response
+        response.update(Status='InProgress', StatusDetails='InProgress', ExecutionStartDateTime=iso(started))
+        if self.clock() >= self.end_time():
+            response.update(Status=self.final, StatusDetails=self.details, ExecutionEndDateTime=iso(self.end_time()),
+                            ResponseCode=0 if self.final == 'Success' else 1,
+                            StandardOutputContent='collecting...\n{"artifacts": {"hosts.txt": "ok"}, '
+                                                  '"hash_deviations": 2}\n',
+                            StandardErrorContent='' if self.final == 'Success' else 'mount: wrong fs type')
+        return response
+
+
+def tracker(spec):
+    """lambda-ssm → (collection-complete → wait-collection → lambda-ssm-status)* 루프 재생"""
+    _, register, start, duration, final, details = spec
+    clock = FakeClock()
+    state = ssm_command.started("cmd-1", "i-analysis", clock=clock)
+    ssm = StubSSM(clock, state['sent_at'], register, start, duration, final, details)
+    clock.now += INVOKE_SECONDS
+    while not (state['complete'] or state['failed']):
+        clock.now += state['wait_seconds']
+        state = ssm_command.update_progress(ssm, state, clock=clock)
+        clock.now += INVOKE_SECONDS
+    return state, clock.now - state['sent_at'], ssm
+
+
+def fixed_poll(spec):
+    _, register, start, duration, final, _ = spec
+    end = (start or 0) + duration
+    polls = -(-end // FIXED_POLL)
+    return polls * FIXED_POLL + polls * INVOKE_SECONDS, polls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--padded", type=float, default=300, help="고정 Wait 상태 길이(초)")
+    args = parser.parse_args()
+
+    print("(!) = 명령이 끝나기 전에 다음 단계로 진행, (early) = 고정 Wait가 실행 시간보다 짧음")
+    print(f"{'command':18} {'actual':>7} | {'f&f':>9} | {'padded':>14} | {'fixed 15s':>15} | "
+          f"{'tracker':>26} | status")
+    for spec in COMMANDS:
+        name, register, start, duration, final, details = spec
+        actual = (start or 0) + duration
+        state, observed, ssm = tracker(spec)
+        fixed_s, fixed_polls = fixed_poll(spec)
+        padded = f"{args.padded:.0f}s" + (" (early)" if args.padded < actual else "")
+        print(f"{name:18} {actual:6.0f}s | {INVOKE_SECONDS:4.1f}s (!) | {padded:>14} | "
+              f"{fixed_s:5.0f}s {fixed_polls:3.0f} polls | "
+              f"{observed:6.1f}s {state['polls']:3d} polls lag {observed - actual:4.1f}s | "
+              f"{state['status']}/{state['status_details']} {state['durations']}")
+
+        # 완료 / 실패를 정확히 구분
+        assert state['complete'] == (final == 'Success') and state['failed'] == (final != 'Success'), state
+        assert state['status_details'] == details
+        assert ssm.calls == state['polls']
+        if final == 'Success':
+            assert state['output']['hash_deviations'] == 2
+            assert abs(state['durations']['execution'] - duration) < 0.01
+        if final == 'Failed':
+            assert 'wrong fs type' in state['error']
+        # 늦게 알아채는 시간은 경과 시간의 절반(최대 30초) + 조회 실행 시간 이하
+        assert observed - actual <= min(ssm_command.MAX_POLL_SECONDS, actual / 2 + ssm_command.MIN_POLL_SECONDS) + 1
+
+    # 조회 루프 없이 Lambda 안에서 기다리는 경우 (같은 간격) + 추적 시간 초과
+    clock = FakeClock()
+
+    def sleep(seconds):
+        clock.now += seconds
+
+    state = ssm_command.started("cmd-2", "i-analysis", clock=clock)
+    ssm = StubSSM(clock, state['sent_at'], 0.5, 2, 45, 'Success', 'Success')
+    done = ssm_command.wait(ssm, state, timeout=600, clock=clock, sleep=sleep)
+    assert done['complete'] and clock.now - state['sent_at'] < 47 + 23
+    state = ssm_command.started("cmd-3", "i-analysis", clock=clock)
+    ssm = StubSSM(clock, state['sent_at'], 0.5, 2, 400, 'Success', 'Success')
+    timed_out = ssm_command.wait(ssm, state, timeout=60, clock=clock, sleep=sleep)
+    assert timed_out['failed'] and timed_out['status_details'] == 'TrackerTimeout'
+    print("in-Lambda wait(): completes in time, reports TrackerTimeout past its own deadline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""FireHOL 목록 IP 조회 마이크로벤치마크 (로컬, S3 호출 없음)
+
+level1과 비슷한 규모(약 4.5k 항목, /32~/8 혼합)의 합성 목록 또는 실제 netset 파일로
+ThreatIPMatcher(contains / match)의 초당 조회 수를 측정하고, 기존 방식
+(ipaddress 네트워크 목록 선형 탐색)은 일부 질의만 측정해 같은 질의 수로 환산한다.
+
+    python shared/bench/threat_ip_matcher_bench.py [--queries 1000000] [--netset firehol_level1.netset]
+"""
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import ip_index  # noqa: E402
+from threat_ip_matcher import ThreatIPMatcher  # noqa: E402
+
+
+def synthetic_lines(entries, seed):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(entries):
+        prefix = rng.choices((32, 24, 22, 20, 16, 8), weights=(70, 15, 5, 5, 4, 1))[0]
+        ip = rng.randrange(1 << 24, 0xDFFFFFFF) & (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+        text = f"{ip >> 24}.{(ip >> 16) & 255}.{(ip >> 8) & 255}.{ip & 255}"
+        lines.append(text if prefix == 32 else f"{text}/{prefix}")
+    return lines
+
+
+def queries(count, lines, hit_ratio, seed):
+    # 일부는 목록 안의 주소, 나머지는 임의 주소
+    rng = random.Random(seed)
+    listed = [ip_index.parse_cidr(line) for line in lines]
+    listed = [network for network in listed if network]
+    result = []
+    for _ in range(count):
+        if rng.random() < hit_ratio:
+            network, prefixlen = rng.choice(listed)
+            value = network + rng.randrange(1 << (32 - prefixlen))
+        else:
+            value = rng.randrange(1 << 32)
+        result.append(f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}")
+    return result
+
+
+def rate(label, fn, ips, total=None):
+    start = time.perf_counter()
+    hits = sum(1 for ip in ips if fn(ip))
+    elapsed = time.perf_counter() - start
+    per_sec = len(ips) / elapsed
+    projected = f"  (~{(total or len(ips)) / per_sec:8.1f}s for {total or len(ips)} queries)"
+    print(f"  {label:<30} {per_sec:12,.0f} lookups/s  hits={hits}{projected}")
+    return per_sec
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=1000000)
+    parser.add_argument("--entries", type=int, default=4500, help="합성 목록 항목 수")
+    parser.add_argument("--netset", help="실제 FireHOL netset 파일 경로 (지정 시 합성 목록 대신 사용)")
+    parser.add_argument("--hit-ratio", type=float, default=0.1)
+    parser.add_argument("--naive-sample", type=int, default=2000, help="선형 탐색으로 측정할 질의 수")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.netset:
+        with open(args.netset) as f:
+            lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        lines = synthetic_lines(args.entries, args.seed)
+
+    start = time.perf_counter()
+    networks = [network for network in (ip_index.parse_cidr(line) for line in lines) if network]
+    index = ip_index.dumps(networks)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    matcher = ThreatIPMatcher(bucket='')
+    matcher.load_bytes(index)
+    load = time.perf_counter() - start
+    print(f"list: {len(lines)} entries → {len(matcher)} merged ranges, {len(matcher.groups)} prefix groups, "
+          f"{len(index) / 1024:.1f} KiB index (build {build * 1000:.1f} ms, load {load * 1000:.2f} ms)")
+
+    ips = queries(args.queries, lines, args.hit_ratio, args.seed)
+    print(f"queries: {len(ips)} ({args.hit_ratio:.0%} drawn from the list)")
+
+    indexed = rate("ThreatIPMatcher.contains", matcher.contains, ips)
+    rate("ThreatIPMatcher.match", matcher.match, ips)
+
+    # 기존 방식: ipaddress 네트워크 목록을 매 질의마다 선형 탐색
+    nets = [ipaddress.ip_network(line, strict=False) for line in lines]
+    sample = ips[:args.naive_sample]
+    naive = rate("ipaddress linear scan", lambda ip: any(ipaddress.ip_address(ip) in net for net in nets),
+                 sample, total=len(ips))
+    print(f"speedup: {indexed / naive:,.0f}x")
+
+    # 두 방식의 결과가 같은지 확인
+    mismatches = sum(1 for ip in sample
+                     if matcher.contains(ip) != any(ipaddress.ip_address(ip) in net for net in nets))
+    print(f"mismatches on sample: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
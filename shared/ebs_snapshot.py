@@ -0,0 +1,131 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+# 진행 상황 조회 간격(초) 범위 - Step Functions Wait 상태의 SecondsPath로 사용
+MIN_POLL_SECONDS = 10
+MAX_POLL_SECONDS = 120
+
+
+def attached_volumes(instance):
+    """describe_instances의 인스턴스 정보 → 연결된 EBS 볼륨 목록 (루트 볼륨 먼저)"""
+    root_device = instance.get('RootDeviceName')
+    volumes = [
+        {
+            'volume_id': mapping['Ebs']['VolumeId'],
+            'device': mapping['DeviceName'],
+            'root': mapping['DeviceName'] == root_device
+        }
+        for mapping in instance.get('BlockDeviceMappings', []) if 'Ebs' in mapping
+    ]
+    return sorted(volumes, key=lambda v: not v['root'])
+
+
+def _epoch(value):
+    return value.timestamp() if hasattr(value, 'timestamp') else float(value)
+
+
+def create_instance_snapshots(ec2, instance, description, tags=None, clock=time.time, workers=8):
+    """인스턴스에 연결된 모든 볼륨의 스냅샷을 한 번에 생성
+
+    create_snapshots(InstanceSpecification)로 모든 볼륨을 같은 시점에 멈춘 crash-consistent 세트로 만든다.
+    이 API를 쓸 수 없는 경우(권한 / 지원되지 않는 인스턴스 상태)에는 볼륨별 create_snapshot을 동시에 호출한다.
+    반환값은 Step Functions 상태로 그대로 넘길 수 있는 dict 목록 (시간은 epoch 초).
+    """
+    instance_id = instance['InstanceId']
+    volumes = attached_volumes(instance)
+    if not volumes:
+        raise Exception(f"No EBS volumes attached to {instance_id}")
+    devices = {v['volume_id']: v for v in volumes}
+    tag_specs = [{'ResourceType': 'snapshot', 'Tags': tags}] if tags else []
+
+    try:
+        response = ec2.create_snapshots(
+            InstanceSpecification={'InstanceId': instance_id, 'ExcludeBootVolume': False},
+            Description=description,
+            TagSpecifications=tag_specs,
+            CopyTagsFromSource='volume'
+        )
+        created = response['Snapshots']
+    except ClientError as e:
+        print(f"create_snapshots 실패, 볼륨별 동시 생성으로 전환: {e}")
+
+        def create(volume):
+            return ec2.create_snapshot(
+                VolumeId=volume['volume_id'],
+                Description=f"{description} ({volume['volume_id']})",
+                TagSpecifications=tag_specs
+            )
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(volumes))) as pool:
+            created = list(pool.map(create, volumes))
+
+    now = clock()
+    snapshots = []
+    for snap in created:
+        volume = devices.get(snap['VolumeId'], {'device': 'unknown', 'root': False})
+        snapshots.append({
+            'volume_id': snap['VolumeId'],
+            'snapshot_id': snap['SnapshotId'],
+            'device': volume['device'],
+            'root': volume['root'],
+            'size_gib': snap.get('VolumeSize'),
+            'state': snap.get('State', 'pending'),
+            'progress': snap.get('Progress') or '0%',
+            'started_at': _epoch(snap['StartTime']) if snap.get('StartTime') else now,
+            'elapsed_seconds': 0.0
+        })
+    return sorted(snapshots, key=lambda s: not s['root'])
+
+
+def update_progress(ec2, snapshots, clock=time.time):
+    """아직 끝나지 않은 스냅샷만 describe_snapshots로 조회해 상태 / 진행률 / 볼륨별 소요 시간을 갱신
+
+    반환값: {'complete', 'failed', 'snapshots', 'wait_seconds'} - wait_seconds는 가장 느린 볼륨의
+    진행 속도로 추정한 다음 조회까지의 대기 시간.
+    """
+    pending = {s['snapshot_id']: s for s in snapshots if s['state'] == 'pending'}
+    now = clock()
+    if pending:
+        response = ec2.describe_snapshots(SnapshotIds=list(pending))
+        for snap in response['Snapshots']:
+            item = pending[snap['SnapshotId']]
+            item['state'] = snap['State']
+            item['progress'] = snap.get('Progress') or item['progress']
+            finished = snap.get('CompletionTime') if snap['State'] != 'pending' else None
+            item['elapsed_seconds'] = round((_epoch(finished) if finished else now) - item['started_at'], 1)
+
+    failed = [s['snapshot_id'] for s in snapshots if s['state'] == 'error']
+    complete = all(s['state'] == 'completed' for s in snapshots)
+    return {
+        'complete': complete,
+        'failed': bool(failed),
+        'failed_snapshots': failed,
+        'snapshots': snapshots,
+        'wait_seconds': _next_poll(snapshots)
+    }
+
+
+def _next_poll(snapshots):
+    # 진행률 / 경과 시간으로 남은 시간을 추정해 절반만큼 기다림 (너무 잦거나 뜸한 조회 방지)
+    remaining = 0.0
+    for s in snapshots:
+        if s['state'] != 'pending':
+            continue
+        percent = float(str(s['progress']).rstrip('%') or 0)
+        if percent <= 0 or s['elapsed_seconds'] <= 0:
+            remaining = max(remaining, MIN_POLL_SECONDS)
+            continue
+        remaining = max(remaining, s['elapsed_seconds'] * (100 - percent) / percent)
+    return int(min(MAX_POLL_SECONDS, max(MIN_POLL_SECONDS, remaining / 2)))
+
+
+def summary_lines(snapshots):
+    """볼륨별 결과 문구 (알림 메시지용)"""
+    lines = []
+    for s in snapshots:
+        root = " (root)" if s.get('root') else ""
+        elapsed = f", {s['elapsed_seconds']:.0f}s" if s.get('elapsed_seconds') else ""
+        lines.append(f"{s['device']}{root} {s['volume_id']} → {s['snapshot_id']} [{s['state']} {s['progress']}{elapsed}]")
+    return lines
@@ -0,0 +1,184 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from rate_limit import TokenBucket  # 토큰 버킷 공용 모듈 (shared/rate_limit.py, 패키징 시 함께 포함)
+
+# EC2 API 요청 토큰 버킷 기본값 (계정 / 리전 단위, AWS 문서의 기본 한도)
+# 변경 API(ModifyNetworkInterfaceAttribute, CreateTags): 최대 50개, 초당 5개 충전
+# 조회 API(DescribeInstances): 최대 100개, 초당 20개 충전
+MUTATE_RATE, MUTATE_BURST = 5.0, 50
+DESCRIBE_RATE, DESCRIBE_BURST = 20.0, 100
+
+THROTTLE_CODES = {'RequestLimitExceeded', 'Throttling', 'ThrottlingException'}
+FILTER_VALUES_LIMIT = 200      # describe_instances 필터 값 개수 한도
+CREATE_TAGS_LIMIT = 1000       # create_tags 한 번에 지정할 리소스 수
+ACTIVE_STATES = ['pending', 'running', 'stopping', 'stopped']
+DEFAULT_TAGS = [{'Key': 'quarantined', 'Value': 'true'}]
+
+
+def parse_selector(selector):
+    """'Key=Value,Key2=Value2' 또는 dict → describe_instances 태그 필터 (값은 | 로 여러 개)
+
+    선택자를 줬는데 태그 필터가 하나도 나오지 않으면(예: '=' 없는 'web-asg') ValueError
+    - 그대로 조회하면 실행 중인 모든 인스턴스가 격리 대상이 됨.
+    """
+    if not selector:
+        return []
+    original = selector
+    if isinstance(selector, str):
+        items = [item for item in selector.split(',') if item.strip()]
+        malformed = [item for item in items if '=' not in item or not item.split('=', 1)[0].strip()]
+        if malformed:
+            raise ValueError(f"invalid tag selector {selector!r}: expected 'Key=Value[,Key2=Value2]'")
+        selector = dict(item.split('=', 1) for item in items)
+    filters = [{'Name': f"tag:{key.strip()}", 'Values': [v.strip() for v in str(value).split('|')]}
+               for key, value in selector.items() if str(key).strip()]
+    if not filters:
+        raise ValueError(f"tag selector {original!r} has no Key=Value filter")
+    return filters
+
+
+class Isolator:
+    """여러 인스턴스를 한 번에 격리 보안 그룹으로 전환
+
+    - 인스턴스 ID 목록 또는 태그 선택자로 대상을 찾는다 (instance-id 필터 + 페이지네이션, 없는 ID는 not_found).
+    - ENI별 modify_network_interface_attribute를 스레드 풀에서 동시에 호출하되, 토큰 버킷으로 EC2 API 한도
+      안에서 보내고 RequestLimitExceeded는 지수 백오프(지터)로 재시도한다. 이미 격리된 ENI는 건너뜀.
+    - 격리된 인스턴스 전체에 create_tags를 한 번에 호출한다.
+    - 인스턴스별 결과와 격리 완료까지 걸린 시간(배치 시작 기준)을 반환한다.
+    """
+
+    def __init__(self, ec2, isolation_sg_id, workers=16, rate=MUTATE_RATE, burst=MUTATE_BURST,
+                 describe_rate=DESCRIBE_RATE, describe_burst=DESCRIBE_BURST, max_retries=6, backoff=0.25,
+                 max_backoff=8.0, clock=time.monotonic, sleep=time.sleep):
+        self.ec2 = ec2
+        self.isolation_sg_id = isolation_sg_id
+        self.workers = workers
+        self.mutate = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.describe_bucket = TokenBucket(describe_rate, describe_burst, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = {'describe': 0, 'modify': 0, 'create_tags': 0, 'throttled': 0, 'skipped_enis': 0}
+        self._lock = threading.Lock()
+
+    def _call(self, bucket, name, fn, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            with self._lock:
+                self.stats[name] += 1
+            try:
+                return fn(**kwargs)
+            except ClientError as e:
+                if e.response['Error']['Code'] not in THROTTLE_CODES or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.stats['throttled'] += 1
+                self.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def describe(self, instance_ids=(), selector=None):
+        """대상 인스턴스 정보 목록 (describe_instances 페이지네이션, ID는 200개씩 필터로 묶음)
+
+        ID도 태그 필터도 없으면 ValueError (상태 필터만으로 조회하면 계정 전체 인스턴스가 나옴)
+        """
+        tag_filters = parse_selector(selector)
+        ids = list(dict.fromkeys(instance_ids))
+        if not ids and not tag_filters:
+            raise ValueError("instance_ids or a tag selector is required")
+        filters = [{'Name': 'instance-state-name', 'Values': ACTIVE_STATES}] + tag_filters
+        batches = [ids[i:i + FILTER_VALUES_LIMIT] for i in range(0, len(ids), FILTER_VALUES_LIMIT)] or [None]
+        instances = []
+        for batch in batches:
+            batch_filters = filters + ([{'Name': 'instance-id', 'Values': batch}] if batch else [])
+            token = None
+            while True:
+                kwargs = {'Filters': batch_filters, 'MaxResults': 1000}
+                if token:
+                    kwargs['NextToken'] = token
+                page = self._call(self.describe_bucket, 'describe', self.ec2.describe_instances, **kwargs)
+                for reservation in page.get('Reservations', []):
+                    instances.extend(reservation['Instances'])
+                token = page.get('NextToken')
+                if not token:
+                    break
+        return instances
+
+    def _isolate_eni(self, eni, started):
+        groups = [g['GroupId'] for g in eni.get('Groups', [])]
+        if groups == [self.isolation_sg_id]:
+            with self._lock:
+                self.stats['skipped_enis'] += 1
+            return {'eni_id': eni['NetworkInterfaceId'], 'status': 'already_isolated', 'previous_groups': groups,
+                    'seconds': round(self.clock() - started, 3)}
+        try:
+            self._call(self.mutate, 'modify', self.ec2.modify_network_interface_attribute,
+                       NetworkInterfaceId=eni['NetworkInterfaceId'], Groups=[self.isolation_sg_id])
+            status, error = 'isolated', None
+        except Exception as e:
+            status, error = 'failed', str(e)
+        result = {'eni_id': eni['NetworkInterfaceId'], 'status': status, 'previous_groups': groups,
+                  'seconds': round(self.clock() - started, 3)}
+        if error:
+            result['error'] = error
+        return result
+
+    def isolate(self, instance_ids=(), selector=None, tags=None, instances=None):
+        """instances를 넘기면(스냅샷 등으로 이미 조회한 describe 결과) 다시 조회하지 않음"""
+        started = self.clock()
+        if instances is None:
+            instances = self.describe(instance_ids, selector)
+        found = {i['InstanceId'] for i in instances}
+        not_found = [i for i in dict.fromkeys(instance_ids) if i not in found]
+
+        # 모든 인스턴스의 ENI를 한 작업 목록으로 펼쳐 동시에 처리
+        jobs = [(inst['InstanceId'], eni) for inst in instances for eni in inst.get('NetworkInterfaces', [])]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(jobs)))) as pool:
+            eni_results = list(pool.map(lambda job: (job[0], self._isolate_eni(job[1], started)), jobs))
+
+        results = {inst['InstanceId']: {'instance_id': inst['InstanceId'], 'enis': []} for inst in instances}
+        for instance_id, eni in eni_results:
+            results[instance_id]['enis'].append(eni)
+        for result in results.values():
+            statuses = {e['status'] for e in result['enis']}
+            if not result['enis'] or statuses == {'failed'}:
+                result['status'] = 'failed'
+            elif 'failed' in statuses:
+                result['status'] = 'partial'
+            else:
+                result['status'] = 'isolated'
+            result['seconds'] = max((e['seconds'] for e in result['enis']), default=0.0)
+            errors = [e['error'] for e in result['enis'] if e.get('error')]
+            if not result['enis']:
+                errors.append('no network interfaces')
+            if errors:
+                result['error'] = errors[0]
+
+        # 격리된 인스턴스 전체에 한 번에 태그 (리소스 1000개씩)
+        isolated = [r['instance_id'] for r in results.values() if r['status'] != 'failed']
+        tagged = 0
+        for i in range(0, len(isolated), CREATE_TAGS_LIMIT):
+            chunk = isolated[i:i + CREATE_TAGS_LIMIT]
+            try:
+                self._call(self.mutate, 'create_tags', self.ec2.create_tags,
+                           Resources=chunk, Tags=tags or DEFAULT_TAGS)
+                tagged += len(chunk)
+            except Exception as e:
+                print(f"create_tags 실패 ({len(chunk)}개): {e}")
+
+        ordered = sorted(results.values(), key=lambda r: r['seconds'])
+        return {
+            'instances': ordered,
+            'isolated': sum(1 for r in ordered if r['status'] == 'isolated'),
+            'partial': sum(1 for r in ordered if r['status'] == 'partial'),
+            'failed': sum(1 for r in ordered if r['status'] == 'failed'),
+            'not_found': not_found,
+            'tagged': tagged,
+            'seconds': round(self.clock() - started, 3),
+            'api_calls': dict(self.stats)
+        }
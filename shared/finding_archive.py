@@ -0,0 +1,218 @@
+import datetime
+import gzip
+import io
+import json
+import re
+import uuid
+import zlib
+
+# 파티션 경로: {prefix}{account}/{region}/{finding_type}/{yyyy}/{mm}/{dd}/
+# (finding_type의 '/' 와 ':' 는 경로 구분자와 겹치므로 '.' / '-'로 바꿈)
+PARTITION_FORMAT = "{prefix}{account}/{region}/{finding_type}/{date:%Y/%m/%d}/"
+OBJECT_SUFFIX = ".ndjson.gz"
+COMPACTED_MARK = "compacted-"
+
+# 쓰기 버퍼 파티션당 최대 비압축 크기 / 압축(compaction) 결과 객체의 목표 크기(gzip 기준)
+MAX_OBJECT_BYTES = 64 * 1024 * 1024
+COMPACT_TARGET_BYTES = 128 * 1024 * 1024
+DELETE_BATCH = 1000            # delete_objects 한 번에 지울 수 있는 키 수
+GZIP_LEVEL = 6
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._=-]")
+
+
+def _segment(value, default="unknown"):
+    value = str(value or default).replace('/', '.').replace(':', '-')
+    return _UNSAFE.sub('_', value) or default
+
+
+def _finding_time(finding):
+    raw = finding.get('updatedAt') or finding.get('createdAt') or ""
+    try:
+        return datetime.datetime.strptime(raw[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return datetime.datetime.utcnow()
+
+
+def unwrap(event):
+    """EventBridge 이벤트(detail-type: GuardDuty Finding)면 detail, 이미 finding이면 그대로"""
+    if isinstance(event, dict) and isinstance(event.get('detail'), dict) and event.get('source') == 'aws.guardduty':
+        finding = dict(event['detail'])
+        finding.setdefault('accountId', event.get('account'))
+        finding.setdefault('region', event.get('region'))
+        return finding
+    return event
+
+
+def partition(finding, prefix):
+    """finding → 파티션 경로 (account / region / finding_type / yyyy / mm / dd)"""
+    return PARTITION_FORMAT.format(prefix=prefix, account=_segment(finding.get('accountId')),
+                                   region=_segment(finding.get('region')),
+                                   finding_type=_segment(finding.get('type')), date=_finding_time(finding))
+
+
+def encode(findings):
+    """finding 목록 → gzip 압축 NDJSON (한 줄에 하나, 공백 없는 JSON)"""
+    lines = "".join(json.dumps(f, ensure_ascii=False, separators=(',', ':')) + "\n" for f in findings)
+    return gzip.compress(lines.encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decode(body):
+    """gzip NDJSON 본문 → finding 목록 (여러 gzip 멤버가 이어 붙은 경우도 처리)"""
+    return [json.loads(line) for line in gzip.decompress(body).decode('utf-8').splitlines() if line]
+
+
+class ArchiveWriter:
+    """GuardDuty finding을 파티션별로 모아 gzip NDJSON 객체로 쓰는 버퍼
+
+    - add()는 finding을 파티션별 버퍼에 넣고, 파티션의 비압축 크기가 max_bytes를 넘으면 그 파티션만 바로 쓴다.
+    - flush()는 남은 버퍼를 파티션마다 객체 하나로 쓰고, 쓰기에 실패한 파티션의 ref(SQS messageId 등) 목록을 반환한다.
+    - 객체 키는 {partition}{yyyymmddTHHMMSSZ}-{uuid}.ndjson.gz (같은 파티션의 작은 객체는 compact()가 합침)
+    """
+
+    def __init__(self, s3, bucket, prefix, max_bytes=MAX_OBJECT_BYTES, clock=datetime.datetime.utcnow):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.buffers = {}          # partition → {'findings': [...], 'refs': set(), 'bytes': n}
+        self.failed = set()
+        self.stats = {'findings': 0, 'objects': 0, 'bytes': 0, 'raw_bytes': 0}
+
+    def add(self, event, ref=None):
+        finding = unwrap(event)
+        key = partition(finding, self.prefix)
+        buf = self.buffers.setdefault(key, {'findings': [], 'refs': set(), 'bytes': 0})
+        buf['findings'].append(finding)
+        buf['bytes'] += len(json.dumps(finding, separators=(',', ':'))) + 1
+        if ref is not None:
+            buf['refs'].add(ref)
+        if buf['bytes'] >= self.max_bytes:
+            self._write(key, self.buffers.pop(key))
+
+    def _write(self, key, buf):
+        body = encode(buf['findings'])
+        object_key = f"{key}{self.clock():%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:12]}{OBJECT_SUFFIX}"
+        try:
+            self.s3.put_object(Bucket=self.bucket, Key=object_key, Body=body, ContentType='application/x-ndjson',
+                               Metadata={'records': str(len(buf['findings']))})
+        except Exception as e:
+            print(f"[ERROR] {object_key} 쓰기 실패 ({len(buf['findings'])}건): {e}")
+            self.failed.update(buf['refs'])
+            return None
+        self.stats['findings'] += len(buf['findings'])
+        self.stats['objects'] += 1
+        self.stats['bytes'] += len(body)
+        self.stats['raw_bytes'] += buf['bytes']
+        return object_key
+
+    def flush(self):
+        buffers, self.buffers = self.buffers, {}
+        for key, buf in buffers.items():
+            self._write(key, buf)
+        failed, self.failed = self.failed, set()
+        return sorted(failed)
+
+
+def _list(s3, bucket, prefix, delimiter=None):
+    """prefix 아래 목록 페이지 (delimiter를 주면 그 아래 한 단계의 CommonPrefixes도 함께 옴)"""
+    token = None
+    while True:
+        kwargs = {'Bucket': bucket, 'Prefix': prefix}
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        if token:
+            kwargs['ContinuationToken'] = token
+        page = s3.list_objects_v2(**kwargs)
+        yield page
+        if not page.get('IsTruncated'):
+            return
+        token = page.get('NextContinuationToken')
+
+
+def _children(s3, bucket, prefix):
+    """prefix 바로 아래 '디렉터리' 목록 (Delimiter='/' - 그 아래 객체는 나열하지 않음)"""
+    for page in _list(s3, bucket, prefix, delimiter='/'):
+        for common in page.get('CommonPrefixes', []):
+            yield common['Prefix']
+
+
+def partitions_for_day(s3, bucket, prefix, day):
+    """prefix 아래에서 날짜가 day인 파티션 → 객체 목록
+
+    account / region / type 은 Delimiter='/' 목록으로 한 단계씩 찾고, 객체는 .../yyyy/mm/dd/ 아래만 나열한다
+    (보관 기간이 길어져도 매일 실행의 목록 비용은 그날 객체 수 + 파티션 종류 수에 비례).
+    """
+    suffix = f"{day:%Y/%m/%d}/"
+    found = {}
+    for account in _children(s3, bucket, prefix):
+        for region in _children(s3, bucket, account):
+            for finding_type in _children(s3, bucket, region):
+                directory = finding_type + suffix
+                for page in _list(s3, bucket, directory, delimiter='/'):
+                    objects = [o for o in page.get('Contents', []) if o['Key'].endswith(OBJECT_SUFFIX)]
+                    if objects:
+                        found.setdefault(directory, []).extend(objects)
+    return found
+
+
+def _lines(body):
+    """gzip NDJSON 본문 → 줄(bytes) 단위로 풀면서 읽기 (본문 전체를 풀어 두거나 dict로 들고 있지 않음)"""
+    with gzip.GzipFile(fileobj=io.BytesIO(body)) as stream:
+        for line in stream:
+            line = line.rstrip(b"\n")
+            if line:
+                yield line
+
+
+def compact(s3, bucket, objects, partition_key, target_bytes=COMPACT_TARGET_BYTES):
+    """한 파티션의 작은 객체들을 target_bytes 안팎의 compacted-*.ndjson.gz로 합치고 원본 삭제
+
+    같은 finding(id + updatedAt)이 여러 객체에 있으면 한 번만 남긴다 (재시도 / 이전 압축 중단으로 생긴 중복).
+    원본 줄은 dict로 모아 두지 않고 바로 gzip 스트림에 넣으며, 압축 결과가 target_bytes가 되면 객체 하나로 쓴다
+    (메모리에는 압축된 출력 하나 + 읽고 있는 원본 객체 하나만 남음).
+    새 객체를 모두 쓴 뒤에 원본을 지우므로 중간에 실패해도 데이터는 남는다(다음 실행에서 중복 제거).
+    """
+    small = [o for o in objects if o['Size'] < target_bytes // 2]
+    # 이미 합친 객체 하나뿐이면 건너뜀 (업로드 객체 하나뿐이어도 중복 제거를 위해 다시 씀)
+    if not small or (len(small) == 1 and small[0]['Key'].rsplit('/', 1)[-1].startswith(COMPACTED_MARK)):
+        return {'partition': partition_key, 'merged': 0, 'written': 0, 'findings': 0}
+
+    seen, written, findings = set(), [], 0
+    chunk = None               # {'compressor', 'parts': 압축된 조각, 'bytes': 압축 크기, 'records'}
+
+    def write(chunk):
+        chunk['parts'].append(chunk['compressor'].flush())
+        key = f"{partition_key}{COMPACTED_MARK}{uuid.uuid4().hex[:12]}{OBJECT_SUFFIX}"
+        s3.put_object(Bucket=bucket, Key=key, Body=b"".join(chunk['parts']), ContentType='application/x-ndjson',
+                      Metadata={'records': str(chunk['records'])})
+        written.append(key)
+
+    for obj in sorted(small, key=lambda o: o['Key']):
+        for line in _lines(s3.get_object(Bucket=bucket, Key=obj['Key'])['Body'].read()):
+            finding = json.loads(line)
+            identity = (finding.get('id'), finding.get('updatedAt'))
+            if identity[0] is not None and identity in seen:
+                continue
+            seen.add(identity)
+            if chunk is None:
+                chunk = {'compressor': zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31), 'parts': [], 'bytes': 0,
+                         'records': 0}
+            part = chunk['compressor'].compress(line + b"\n")
+            if part:
+                chunk['parts'].append(part)
+                chunk['bytes'] += len(part)
+            chunk['records'] += 1
+            findings += 1
+            if chunk['bytes'] >= target_bytes:
+                write(chunk)
+                chunk = None
+    if chunk is not None:
+        write(chunk)
+
+    keys = [o['Key'] for o in small]
+    for i in range(0, len(keys), DELETE_BATCH):
+        s3.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': k} for k in keys[i:i + DELETE_BATCH]],
+                                                 'Quiet': True})
+    return {'partition': partition_key, 'merged': len(small), 'written': len(written), 'findings': findings}
@@ -0,0 +1,122 @@
+import socket
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+
+# 바이너리 IP 인덱스 포맷 (리틀 엔디언, 모든 정수는 uint32)
+#   헤더 : magic(4B) "IPIX" | version(uint16) | 구간 수 n(uint32) | prefix 그룹 수 g(uint32)
+#   구간 : 시작 주소 × n | 끝 주소 × n            (병합된 구간, 시작 주소 오름차순) → 포함 여부
+#   그룹 : (prefix 길이, 개수 c, 네트워크 주소 × c) × g (prefix 길이 내림차순) → 최장 prefix 일치
+MAGIC = b'IPIX'
+VERSION = 2
+HEADER = struct.Struct('<4sHII')
+GROUP = struct.Struct('<II')
+
+
+def ip_to_int(ip):
+    """IPv4 문자열을 정수로 변환 (IPv4가 아니면 None)"""
+    if ip.count('.') != 3:
+        return None
+    try:
+        return int.from_bytes(socket.inet_aton(ip), 'big')
+    except (OSError, ValueError):
+        return None
+
+
+def parse_cidr(line):
+    """'1.2.3.4' 또는 '1.2.3.0/24' 한 줄을 (네트워크 주소, prefix 길이)로 변환 (잘못된 값은 None)"""
+    addr, _, prefixlen = line.strip().partition('/')
+    try:
+        prefixlen = int(prefixlen) if prefixlen else 32
+    except ValueError:
+        return None
+    start = ip_to_int(addr)
+    if start is None or not 0 <= prefixlen <= 32:
+        return None
+    return start & (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF, prefixlen
+
+
+def merge_intervals(networks):
+    """(네트워크 주소, prefix 길이) 목록을 병합된 (시작 배열, 끝 배열)로 변환"""
+    starts, ends = array('I'), array('I')
+    for start, prefixlen in sorted(networks):
+        end = start + (1 << (32 - prefixlen)) - 1
+        if ends and start <= ends[-1] + 1:
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def group_by_prefix(networks):
+    """prefix 길이별로 정렬된 네트워크 주소 배열 {prefix 길이: array}"""
+    groups = {}
+    for start, prefixlen in networks:
+        groups.setdefault(prefixlen, set()).add(start)
+    return {prefixlen: array('I', sorted(groups[prefixlen])) for prefixlen in sorted(groups, reverse=True)}
+
+
+def _le(values):
+    values = array('I', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def dumps(networks):
+    """(네트워크 주소, prefix 길이) 목록을 바이너리 인덱스로 직렬화"""
+    networks = list(networks)
+    starts, ends = merge_intervals(networks)
+    groups = group_by_prefix(networks)
+    parts = [HEADER.pack(MAGIC, VERSION, len(starts), len(groups)), _le(starts), _le(ends)]
+    for prefixlen, addresses in groups.items():
+        parts.append(GROUP.pack(prefixlen, len(addresses)))
+        parts.append(_le(addresses))
+    return b''.join(parts)
+
+
+def _words(buf, offset, count):
+    view = memoryview(buf)[offset:offset + 4 * count]
+    if sys.byteorder == 'little':
+        return view.cast('I')           # 복사 없이 원본 버퍼(bytes / mmap)를 그대로 참조
+    values = array('I', view.tobytes())
+    values.byteswap()
+    return values
+
+
+def loads(buf):
+    """bytes / mmap에서 (시작, 끝, {prefix 길이: 네트워크 주소}) 시퀀스를 읽음"""
+    magic, version, count, group_count = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not an IP index (or unsupported version)")
+    offset = HEADER.size
+    starts = _words(buf, offset, count)
+    ends = _words(buf, offset + 4 * count, count)
+    offset += 8 * count
+
+    groups = {}
+    for _ in range(group_count):
+        prefixlen, size = GROUP.unpack_from(buf, offset)
+        offset += GROUP.size
+        groups[prefixlen] = _words(buf, offset, size)
+        offset += 4 * size
+    return starts, ends, groups
+
+
+def contains(starts, ends, value):
+    """정수 IP가 병합 구간에 포함되는지 O(log n)으로 확인"""
+    i = bisect_right(starts, value) - 1
+    return i >= 0 and value <= ends[i]
+
+
+def longest_match(groups, value):
+    """정수 IP를 포함하는 가장 긴 prefix의 (네트워크 주소, prefix 길이), 없으면 None"""
+    for prefixlen, addresses in groups.items():
+        network = value & (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+        i = bisect_right(addresses, network) - 1
+        if i >= 0 and addresses[i] == network:
+            return network, prefixlen
+    return None
@@ -0,0 +1,269 @@
+import functools
+import json
+import os
+import time
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+
+# CloudWatch Embedded Metric Format(EMF) 지표 기록기
+# - 호출(invocation) 동안 구간 시간 / 카운터를 메모리에 모았다가 핸들러가 끝날 때 EMF 한 줄을 stdout으로 출력
+#   (CloudWatch Logs가 지표로 추출 - PutMetricData 동기 호출 없음)
+# - aws_clients로 만든 boto3 클라이언트는 모든 API 호출 시간이 "<서비스>.<API>" 지표로 자동 기록됨
+# - trace: 상태 머신 실행 하나의 모든 단계가 같은 id / 시작 시각을 공유 (단계 입력의 "trace" 필드)
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'SecurityAutomation')
+# Lambda 밖(로컬 벤치마크 등)에서는 기본적으로 출력하지 않음 (METRICS_ENABLED=true로 켬)
+ENABLED = os.environ.get('METRICS_ENABLED', 'true' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'false') \
+    .lower() in ('1', 'true', 'yes')
+
+# EMF 제한: 지표 하나의 값 배열 100개, 지시자(directive) 하나의 지표 100개
+MAX_VALUES = 100
+MAX_METRICS = 100
+
+MILLISECONDS = 'Milliseconds'
+COUNT = 'Count'
+
+# 진행 중인 호출 - handler()가 설정, 없으면 timer / count는 아무것도 기록하지 않음
+# (Lambda 컨테이너는 한 번에 호출 하나만 처리하므로 프로세스 전역 - 핸들러가 띄운 스레드 풀에서도 그대로 보임)
+_current = None
+_perf = time.perf_counter
+
+
+class Invocation:
+    """핸들러 호출 하나의 지표 값 (스레드 풀에서 동시에 기록해도 됨 - list.append / dict.setdefault만 사용)"""
+
+    def __init__(self, function, trace, request_id=None):
+        self.function = function
+        self.trace = trace
+        self.request_id = request_id
+        self.values = {}
+        self.units = {}
+        self.properties = {}
+        self.outcome = None
+
+    def record(self, name, value, unit=MILLISECONDS):
+        self.values.setdefault(name, []).append(value)
+        self.units[name] = unit
+
+    def documents(self, timestamp=None):
+        """EMF 문서 목록 (값이 100개를 넘는 지표는 여러 문서로 나눔, 카운터는 합계 한 번)"""
+        timestamp = int((timestamp or time.time()) * 1000)
+        dimensions = [['Function'], ['Function', 'Outcome']] if self.outcome else [['Function']]
+        base = dict(self.properties, Function=self.function, TraceId=self.trace['id'])
+        if self.outcome:
+            base['Outcome'] = self.outcome
+        if self.request_id:
+            base['RequestId'] = self.request_id
+
+        docs = []
+        rounds = max((len(v) for n, v in self.values.items() if self.units[n] != COUNT), default=1)
+        for offset in range(0, max(rounds, 1), MAX_VALUES):
+            doc = dict(base)
+            names = []
+            for name, values in self.values.items():
+                if self.units[name] == COUNT:
+                    if offset == 0:
+                        doc[name] = sum(values)
+                        names.append(name)
+                elif offset < len(values):
+                    chunk = values[offset:offset + MAX_VALUES]
+                    doc[name] = [round(v, 3) for v in chunk] if len(chunk) > 1 else round(chunk[0], 3)
+                    names.append(name)
+            doc['_aws'] = {'Timestamp': timestamp, 'CloudWatchMetrics': [
+                {'Namespace': NAMESPACE, 'Dimensions': dimensions,
+                 'Metrics': [{'Name': n, 'Unit': self.units[n]} for n in names[i:i + MAX_METRICS]]}
+                for i in range(0, len(names), MAX_METRICS)
+            ]}
+            docs.append(doc)
+        return docs
+
+
+class _Span:
+    """timer() 구간 (with 문) - 예외로 끝나면 "<이름>.errors" 카운터도 기록"""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = _perf()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        invocation = _current
+        if invocation is not None:
+            invocation.record(self.name, (_perf() - self.start) * 1000)
+            if exc_type is not None:
+                invocation.record(self.name + '.errors', 1, COUNT)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL = _NullSpan()
+
+
+def timer(name):
+    """구간 시간(ms) 기록: with metrics.timer('discord.webhook'): ..."""
+    return _Span(name) if _current is not None else _NULL
+
+
+def timed(name):
+    """함수 실행 시간을 name 지표로 기록하는 데코레이터"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current is None:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    invocation = _current
+    if invocation is not None:
+        invocation.record(name, value, COUNT)
+
+
+def tag(outcome=None, **properties):
+    """결과 태그(Outcome 차원, 값 종류는 적게) / 로그 검색용 속성(지표 아님)"""
+    invocation = _current
+    if invocation is not None:
+        if outcome is not None:
+            invocation.outcome = outcome
+        invocation.properties.update(properties)
+
+
+def current_trace():
+    """진행 중인 호출의 trace (큐 메시지 등으로 다음 단계에 넘길 때)"""
+    return _current.trace if _current is not None else None
+
+
+def new_trace():
+    return {'id': os.urandom(8).hex(), 'start': time.time()}
+
+
+def trace_of(event):
+    """이벤트에 실린 trace - 최상위 "trace", 또는 이전 단계 결과 / Map 결과 목록 첫 항목 아래"""
+    if not isinstance(event, dict):
+        return None
+    trace = event.get('trace')
+    if isinstance(trace, dict) and trace.get('id'):
+        return trace
+    for value in event.values():
+        if isinstance(value, list) and value:
+            value = value[0]
+        if isinstance(value, dict) and isinstance(value.get('trace'), dict) and value['trace'].get('id'):
+            return value['trace']
+    return None
+
+
+def _epoch(value):
+    # 상태 머신 컨텍스트의 $$.Execution.StartTime은 ISO 8601 문자열 (예: 2025-01-01T00:00:00.123Z)
+    if isinstance(value, (int, float)):
+        return float(value)
+    import datetime  # SLO 지표를 기록하는 호출에서만 필요 (초기화 시간에서 제외)
+    try:
+        return datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def since_trace(name, trace=None):
+    """trace 시작(실행 시작)부터 지금까지의 시간(ms) 기록 - time-to-contain / time-to-notify SLO 지표
+
+    trace를 주면 그 trace 기준 (큐 메시지로 넘어온 요청 등), 없으면 진행 중인 호출의 trace 기준.
+    """
+    invocation = _current
+    if invocation is None:
+        return None
+    start = _epoch((trace or invocation.trace).get('start'))
+    if start is None:
+        return None
+    elapsed = (time.time() - start) * 1000
+    invocation.record(name, elapsed)
+    return elapsed
+
+
+def emit(line):
+    """EMF 한 줄 출력 (Lambda stdout → CloudWatch Logs, 벤치마크에서는 교체)"""
+    print(line)
+
+
+def flush(invocation):
+    for doc in invocation.documents():
+        emit(json.dumps(doc, separators=(',', ':'), default=str))
+
+
+def handler(function, propagate=False):
+    """Lambda 핸들러 데코레이터 - 호출 시간(Duration) / Outcome(success, error 또는 tag 값) 기록 후 EMF 출력
+
+    propagate=True면 dict 결과에 trace를 넣어 다음 상태 머신 단계로 넘긴다
+    (API Gateway 프록시 응답 / SQS 배치 응답처럼 형식이 정해진 결과에는 쓰지 않음).
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(event, context):
+            global _current
+            if not ENABLED:
+                return fn(event, context)
+            invocation = _current = Invocation(function, trace_of(event) or new_trace(),
+                                               getattr(context, 'aws_request_id', None))
+            start = _perf()
+            try:
+                result = fn(event, context)
+            except Exception:
+                invocation.outcome = 'error'
+                raise
+            else:
+                invocation.outcome = invocation.outcome or 'success'
+                if propagate and isinstance(result, dict) and 'trace' not in result:
+                    result['trace'] = invocation.trace
+                return result
+            finally:
+                invocation.record('Duration', (_perf() - start) * 1000)
+                _current = None
+                flush(invocation)
+        return wrapper
+    return decorate
+
+
+#--------------------------------------
+# boto3 API 호출 시간 (aws_clients로 만든 모든 클라이언트)
+#--------------------------------------
+def _before_call(model=None, context=None, **kwargs):
+    if context is not None and _current is not None:
+        context['metrics_call'] = (f"{model.service_model.endpoint_prefix}.{model.name}", _perf())
+
+
+def _after_call(context=None, http_response=None, **kwargs):
+    # after-call: 응답 수신(오류 응답 포함), after-call-error: 연결 오류 등 예외 (http_response 없음)
+    invocation = _current
+    if invocation is None or context is None or 'metrics_call' not in context:
+        return
+    name, start = context.pop('metrics_call')
+    invocation.record(name, (_perf() - start) * 1000)
+    if http_response is None or http_response.status_code >= 300:
+        invocation.record(name + '.errors', 1, COUNT)
+
+
+def instrument(client):
+    """boto3 클라이언트의 모든 API 호출(재시도 포함) 시간을 기록 - botocore 이벤트 훅"""
+    events = client.meta.events
+    # 구체적인 이벤트 이름에 등록한 핸들러가 먼저 불리므로 "*.*" 수준에 등록 (응답을 대신 주는 핸들러보다 앞)
+    events.register_first('before-call.*.*', _before_call, unique_id='metrics-before-call')
+    events.register_last('after-call.*.*', _after_call, unique_id='metrics-after-call')
+    events.register_last('after-call-error.*.*', _after_call, unique_id='metrics-after-call-error')
+    return client
+
+
+aws_clients.on_create(instrument)
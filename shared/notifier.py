@@ -0,0 +1,208 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aws_clients  # 지연 생성 클라이언트 / 연결 풀 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import metrics  # EMF 지표 공용 모듈 (shared/metrics.py, 패키징 시 함께 포함)
+
+DISCORD_WEBHOOK_URL = os.environ.get('DISCORD_WEBHOOK_URL', '')
+SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN', '')
+
+# Discord 웹훅 제한: 요청당 content 2000자, embed 10개 (embed 설명 4096자, embed 합계 6000자)
+CONTENT_LIMIT = 2000
+MAX_EMBEDS = 10
+DESCRIPTION_LIMIT = 4096
+EMBEDS_TOTAL_LIMIT = 6000
+# SNS 제목: 줄바꿈 없이 100자 미만
+SUBJECT_LIMIT = 99
+
+# 웹훅 (연결, 응답) 타임아웃(초)
+CONNECT_TIMEOUT, READ_TIMEOUT = 2.0, 5.0
+
+
+def _embed_size(embed):
+    size = len(embed.get('title', '')) + len(embed.get('description', ''))
+    size += len(embed.get('footer', {}).get('text', ''))
+    return size + sum(len(f.get('name', '')) + len(f.get('value', '')) for f in embed.get('fields', []))
+
+
+def _embed_text(embed):
+    # 이메일 본문용: embed 제목 / 설명 / 필드를 줄 단위 텍스트로
+    lines = [embed[key] for key in ('title', 'description') if embed.get(key)]
+    lines += [f"{f.get('name', '')}: {f.get('value', '')}" for f in embed.get('fields', [])]
+    return '\n'.join(lines)
+
+
+def _subject(subject):
+    subject = ' '.join((subject or '').split()) or 'AWS Security Alert'
+    return subject[:SUBJECT_LIMIT]
+
+
+class Notifier:
+    """Discord / SNS 알림 발송기
+
+    - 컨테이너당 하나의 PoolManager(연결 재사용, 타임아웃 지정)로 웹훅을 호출한다.
+      PoolManager / SNS 클라이언트는 처음 보낼 때 만든다 (urllib3 / boto3 import 포함).
+    - add()로 쌓아 둔 알림을 flush()에서 embed 최대 10개씩 묶어 요청 수를 줄인다
+      (알림이 하나뿐이고 content만 있으면 기존과 같은 일반 메시지로 보냄).
+    - 429 응답의 retry_after(초)와 X-RateLimit-Remaining / Reset-After 헤더를 따르고,
+      5xx / 연결 오류는 지수 백오프로 재시도한다. 남은 실행 시간(deadline)을 넘기면 포기.
+    - SNS 발행은 스레드 풀에서 Discord 전송과 동시에 진행한다.
+    """
+
+    def __init__(self, webhook_url=DISCORD_WEBHOOK_URL, topic_arn=SNS_TOPIC_ARN, http=None, sns=None,
+                 max_retries=5, backoff=0.5, max_backoff=8.0, workers=4, sleep=time.sleep, clock=time.monotonic):
+        self.webhook_url = webhook_url
+        self.topic_arn = topic_arn
+        self._http = http
+        self._sns = sns
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.workers = workers
+        self.sleep = sleep
+        self.clock = clock
+        self.queue = []
+        self.blocked_until = 0.0      # 버킷 잔여 요청이 0이면 Reset-After까지 대기
+        self.stats = {'requests': 0, 'delivered': 0, 'dropped': 0, 'rate_limited': 0, 'sns': 0}
+
+    @property
+    def http(self):
+        if self._http is None:
+            import urllib3
+            self._http = aws_clients.http(timeout=urllib3.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT),
+                                          retries=False, maxsize=self.workers)
+        return self._http
+
+    @property
+    def sns(self):
+        if self._sns is None:
+            self._sns = aws_clients.client('sns')
+        return self._sns
+
+    def add(self, content=None, embed=None, subject=None, email=None):
+        """알림 하나를 대기열에 추가 (embed가 없으면 content를 embed 설명으로 사용해 묶음 전송)"""
+        self.queue.append({'content': content, 'embed': embed, 'subject': subject, 'email': email})
+
+    def flush(self, deadline=None):
+        """대기 중인 알림을 모두 보내고 이번 전송 결과를 반환 (deadline: clock 기준 마감 시각)"""
+        queue, self.queue = self.queue, []
+        result = {'delivered': 0, 'dropped': 0, 'sns': 0}
+        if not queue:
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = []
+            if self.topic_arn:
+                futures = [pool.submit(self._publish, item) for item in queue]
+            if self.webhook_url:
+                for payload, count in self._payloads(queue):
+                    result['delivered' if self._post(payload, deadline) else 'dropped'] += count
+            for future in futures:
+                try:
+                    future.result()
+                    result['sns'] += 1
+                except Exception as e:
+                    print(f"[SNS] 발행 실패: {e}")
+        for key, value in result.items():
+            self.stats[key] += value
+            metrics.count(f"notify.{key}", value)
+        return result
+
+    def send(self, content=None, embed=None, subject=None, email=None, deadline=None):
+        self.add(content, embed, subject, email)
+        return self.flush(deadline)
+
+    def _payloads(self, queue):
+        # 알림 하나 + content만 있는 경우는 기존 메시지 형식 유지
+        if len(queue) == 1 and queue[0]['embed'] is None and len(queue[0]['content'] or '') <= CONTENT_LIMIT:
+            yield {'content': queue[0]['content']}, 1
+            return
+
+        embeds, total = [], 0
+        for item in queue:
+            embed = item['embed'] or {'description': (item['content'] or '')[:DESCRIPTION_LIMIT]}
+            size = _embed_size(embed)
+            if embeds and (len(embeds) == MAX_EMBEDS or total + size > EMBEDS_TOTAL_LIMIT):
+                yield {'embeds': embeds}, len(embeds)
+                embeds, total = [], 0
+            embeds.append(embed)
+            total += size
+        if embeds:
+            yield {'embeds': embeds}, len(embeds)
+
+    def _post(self, payload, deadline):
+        import urllib3
+        body = json.dumps(payload).encode('utf-8')
+        delay = self.backoff
+        for _ in range(self.max_retries + 1):
+            wait = self.blocked_until - self.clock()
+            if wait > 0:
+                if deadline is not None and self.clock() + wait > deadline:
+                    return False
+                self.sleep(wait)
+
+            self.stats['requests'] += 1
+            try:
+                with metrics.timer('discord.webhook'):
+                    response = self.http.request(
+                        'POST', self.webhook_url, body=body,
+                        headers={'Content-Type': 'application/json', 'User-Agent': 'aws-lambda-discord/1.0'}
+                    )
+                status, headers = response.status, response.headers
+            except urllib3.exceptions.HTTPError as e:
+                print(f"Discord 전송 실패: {e}")
+                status, headers = None, {}
+
+            if headers.get('X-RateLimit-Remaining') == '0':
+                # 다음 요청이 429가 될 것을 미리 알고 있으므로 초기화 시각까지 대기
+                self.blocked_until = self.clock() + float(headers.get('X-RateLimit-Reset-After', 0))
+            if status is not None and status < 300:
+                return True
+            if status == 429:
+                self.stats['rate_limited'] += 1
+                metrics.count('discord.rate_limited')
+                wait = self._retry_after(response)
+                self.blocked_until = max(self.blocked_until, self.clock() + wait)
+            elif status is None or status >= 500:
+                metrics.count('discord.server_errors')
+                self.blocked_until = max(self.blocked_until, self.clock() + delay)
+                delay = min(self.max_backoff, delay * 2)
+            else:
+                print(f"Discord 응답 오류: {status} {response.data[:200]!r}")
+                return False
+        return False
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(json.loads(response.data)['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            return float(response.headers.get('Retry-After', 1))
+
+    def _publish(self, item):
+        text = item['email'] or item['content'] or _embed_text(item['embed'] or {})
+        self.sns.publish(
+            TopicArn=self.topic_arn,
+            Subject=_subject(item['subject']),
+            Message=text.replace('**', '')       # 이메일에는 굵은 글씨 표시 제거
+        )
+
+
+_notifier = None
+
+
+def get_notifier():
+    """컨테이너당 하나의 발송기 (환경 변수 DISCORD_WEBHOOK_URL / SNS_TOPIC_ARN 사용)"""
+    global _notifier
+    if _notifier is None:
+        _notifier = Notifier()
+    return _notifier
+
+
+def deadline_from(context, reserve=2.0):
+    """Lambda 남은 실행 시간에서 reserve초를 뺀 마감 시각 (context가 없으면 None)"""
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return None
+    return time.monotonic() + context.get_remaining_time_in_millis() / 1000 - reserve
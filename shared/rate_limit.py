@@ -0,0 +1,30 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """초당 rate개 토큰을 채우는 토큰 버킷 (여러 스레드가 공유)
+
+    EC2 격리(ec2_isolation.py)의 API 한도 조절과 AbuseIPDB 조회 Lambda의 외부 API 호출 한도에 함께 쓴다.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
@@ -0,0 +1,115 @@
+import datetime
+import json
+import time
+
+from botocore.exceptions import ClientError
+
+# 완료 조회 간격(초) 범위 - Step Functions Wait 상태의 SecondsPath로 사용
+MIN_POLL_SECONDS = 2
+MAX_POLL_SECONDS = 30
+
+# get_command_invocation Status 중 더 이상 바뀌지 않는 상태
+SUCCESS_STATES = {'Success'}
+FAILED_STATES = {'Failed', 'Cancelled', 'TimedOut', 'Cancelling'}
+
+
+def _epoch(value):
+    """ExecutionStartDateTime / ExecutionEndDateTime('2025-01-01T00:00:00.123Z', 비어 있을 수 있음) → epoch 초"""
+    if not value:
+        return None
+    if hasattr(value, 'timestamp'):
+        return value.timestamp()
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def next_wait(elapsed):
+    """실행 중인 명령의 다음 조회까지 대기 시간
+
+    짧은 명령은 2초 간격으로 바로 확인하고, 오래 걸리는 명령일수록 간격을 늘려(경과 시간의 절반, 최대 30초)
+    조회 횟수를 줄인다. 완료를 늦게 알아채는 시간은 경과 시간의 절반 또는 30초를 넘지 않는다.
+    """
+    return int(min(MAX_POLL_SECONDS, max(MIN_POLL_SECONDS, elapsed / 2)))
+
+
+def started(command_id, instance_id, clock=time.time):
+    """send_command 직후 상태 (Step Functions 루프의 첫 입력)"""
+    return {
+        'command_id': command_id,
+        'instance_id': instance_id,
+        'status': 'Pending',
+        'status_details': 'Pending',
+        'complete': False,
+        'failed': False,
+        'sent_at': clock(),
+        'wait_seconds': MIN_POLL_SECONDS,
+        'polls': 0
+    }
+
+
+def update_progress(ssm, state, clock=time.time):
+    """get_command_invocation으로 상태를 갱신하고 단계별 소요 시간을 계산
+
+    반환값: 입력 state + {status, complete, failed, response_code, durations, output, wait_seconds, polls}
+    durations: queued(전송 → 실행 시작) / execution(실행 시작 → 종료) / detection_lag(종료 → 완료 확인)
+    """
+    now = clock()
+    result = dict(state)
+    result['polls'] = state.get('polls', 0) + 1
+    try:
+        invocation = ssm.get_command_invocation(CommandId=state['command_id'], InstanceId=state['instance_id'])
+    except ClientError as e:
+        # 전송 직후에는 호출 기록이 아직 없을 수 있음
+        if e.response['Error']['Code'] != 'InvocationDoesNotExist':
+            raise
+        invocation = {'Status': 'Pending', 'StatusDetails': 'InvocationDoesNotExist'}
+
+    status = invocation.get('Status', 'Pending')
+    exec_start = _epoch(invocation.get('ExecutionStartDateTime'))
+    exec_end = _epoch(invocation.get('ExecutionEndDateTime'))
+    durations = {}
+    if exec_start:
+        durations['queued'] = round(exec_start - state['sent_at'], 1)
+    if exec_start and exec_end and exec_end >= exec_start:
+        durations['execution'] = round(exec_end - exec_start, 1)
+        durations['detection_lag'] = round(now - exec_end, 1)
+
+    result.update({
+        'status': status,
+        'status_details': invocation.get('StatusDetails', status),
+        'response_code': invocation.get('ResponseCode', -1),
+        'complete': status in SUCCESS_STATES,
+        'failed': status in FAILED_STATES,
+        'durations': durations,
+        'wait_seconds': next_wait(now - state['sent_at'])
+    })
+    if result['complete'] or result['failed']:
+        result['output'] = last_json_line(invocation.get('StandardOutputContent', ''))
+        if result['failed']:
+            result['error'] = invocation.get('StandardErrorContent', '')[-1000:]
+    return result
+
+
+def last_json_line(text):
+    """명령 출력의 마지막 JSON 줄 (수집기가 마지막에 요약을 출력) - 없으면 None"""
+    for line in reversed(text.strip().splitlines()):
+        line = line.strip()
+        if line.startswith('{'):
+            try:
+                return json.loads(line)
+            except ValueError:
+                return None
+    return None
+
+
+def wait(ssm, state, timeout, clock=time.time, sleep=time.sleep):
+    """Step Functions 없이 Lambda / 스크립트 안에서 완료까지 기다릴 때 (같은 조회 간격 사용)"""
+    deadline = clock() + timeout
+    state = update_progress(ssm, state, clock=clock)
+    while not (state['complete'] or state['failed']):
+        if clock() + state['wait_seconds'] > deadline:
+            state['failed'] = True
+            state['status_details'] = 'TrackerTimeout'
+            break
+        sleep(state['wait_seconds'])
+        state = update_progress(ssm, state, clock=clock)
+    return state
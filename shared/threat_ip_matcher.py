@@ -0,0 +1,106 @@
+import os
+import time
+
+import aws_clients  # 지연 생성 클라이언트 공용 모듈 (shared/aws_clients.py, 패키징 시 함께 포함)
+import ip_index
+
+# update_ip_list Lambda가 게시하는 FireHOL 인덱스 위치
+THREAT_LIST_BUCKET = os.environ.get('THREAT_LIST_BUCKET', '')
+THREAT_INDEX_KEY = os.environ.get('THREAT_INDEX_KEY', 'threat/malicious-ip-list.idx')
+# S3 ETag 변경 여부를 다시 확인하기까지의 최소 간격(초)
+CHECK_INTERVAL = int(os.environ.get('THREAT_LIST_CHECK_INTERVAL', '300'))
+
+
+class ThreatIPMatcher:
+    """FireHOL 목록 기반 IP 조회기
+
+    게시된 바이너리 인덱스(ip_index 포맷)를 컨테이너당 한 번 읽어 정렬된 정수 배열로 보관하고,
+    포함 여부(병합 구간 이진 탐색)와 최장 prefix 일치(prefix 길이별 이진 탐색)를 제공한다.
+    조회 시점에 CHECK_INTERVAL이 지났으면 head_object로 ETag를 확인해 바뀐 경우에만 다시 읽는다.
+    """
+
+    def __init__(self, bucket=THREAT_LIST_BUCKET, key=THREAT_INDEX_KEY, s3=None,
+                 check_interval=CHECK_INTERVAL, clock=time.monotonic):
+        self.bucket = bucket
+        self.key = key
+        self._s3 = s3
+        self.check_interval = check_interval
+        self.clock = clock
+        self.etag = None
+        self.checked_at = None
+        self.starts, self.ends, self.groups = (), (), {}
+
+    @classmethod
+    def from_lines(cls, lines):
+        """S3 없이 CIDR 줄 목록으로 조회기를 만든다 (로컬 테스트용)"""
+        matcher = cls(bucket='')
+        matcher.load_bytes(ip_index.dumps(
+            network for network in (ip_index.parse_cidr(line) for line in lines
+                                    if line.strip() and not line.startswith('#')) if network
+        ))
+        return matcher
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = aws_clients.client('s3')
+        return self._s3
+
+    def load_bytes(self, buf):
+        self.starts, self.ends, self.groups = ip_index.loads(buf)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def refresh(self):
+        """ETag가 바뀌었으면 인덱스를 다시 읽음 (실패 시 기존 인덱스 유지)"""
+        if not self.bucket:
+            return
+        now = self.clock()
+        if self.checked_at is not None and now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+        try:
+            etag = self.s3.head_object(Bucket=self.bucket, Key=self.key)['ETag']
+            if etag != self.etag:
+                body = self.s3.get_object(Bucket=self.bucket, Key=self.key)['Body'].read()
+                self.load_bytes(body)
+                self.etag = etag
+                print(f"[INFO] Threat index loaded: {len(self.starts)} ranges ({etag})")
+        except Exception as e:
+            print(f"[WARN] Threat index refresh failed: {e}")
+
+    def contains(self, ip):
+        self.refresh()
+        value = ip_index.ip_to_int(ip) if isinstance(ip, str) else None
+        return value is not None and ip_index.contains(self.starts, self.ends, value)
+
+    def match(self, ip):
+        """IP를 포함하는 가장 구체적인 목록 CIDR 문자열, 없으면 None"""
+        self.refresh()
+        value = ip_index.ip_to_int(ip) if isinstance(ip, str) else None
+        # 대부분의 질의는 미등재이므로 병합 구간 탐색 한 번으로 먼저 걸러냄
+        if value is None or not ip_index.contains(self.starts, self.ends, value):
+            return None
+        found = ip_index.longest_match(self.groups, value)
+        if found is None:
+            return None
+        network, prefixlen = found
+        return f"{network >> 24}.{(network >> 16) & 255}.{(network >> 8) & 255}.{network & 255}/{prefixlen}"
+
+
+_matcher = None
+
+
+def get_matcher():
+    """컨테이너당 하나의 조회기 (환경 변수 THREAT_LIST_BUCKET / THREAT_INDEX_KEY 사용)"""
+    global _matcher
+    if _matcher is None:
+        _matcher = ThreatIPMatcher()
+    return _matcher
+
+
+def lookup(ip):
+    """{"listed": bool, "match": CIDR 또는 None} (버킷 미설정 시 항상 미등재)"""
+    cidr = get_matcher().match(ip)
+    return {"listed": cidr is not None, "match": cidr}